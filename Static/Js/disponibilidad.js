@@ -0,0 +1,23 @@
+/**
+ * disponibilidad.js
+ * Consulta de disponibilidad de correos y NIT compartida por los cuatro formularios de registro.
+ * Se incluye antes del script de cada formulario.
+ */
+
+/**
+ * Consulta al servidor si el valor (correo, NIT...) ya está registrado y avisa con `notificar` si lo está.
+ * Si la consulta falla no se muestra nada: el registro lo comprueba al enviar el formulario.
+ */
+async function verificarDisponible(campo, valor, perfil, mensaje, notificar) {
+    try {
+        const params = new URLSearchParams({ campo: campo, valor: valor, perfil: perfil });
+        const response = await fetch(`/registro/disponible?${params}`);
+        if (!response.ok) return;
+        const result = await response.json();
+        if (result.success && !result.disponible) {
+            notificar(mensaje, 'error');
+        }
+    } catch (error) {
+        // Sin conexión: se valida al enviar.
+    }
+}
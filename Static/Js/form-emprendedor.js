@@ -114,6 +114,8 @@ document.addEventListener('DOMContentLoaded', function() {
             const emailRegex = /^[a-z0-9!#$%&'*+/=?^_`{|}~-]+(?:\.[a-z0-9!#$%&'*+/=?^_`{|}~-]+)*@(?:[a-z0-9](?:[a-z0-9-]*[a-z0-9])?\.)+[a-z0-9](?:[a-z0-9-]*[a-z0-9])?$/;
             if (correoInput.value && !emailRegex.test(correoInput.value)) {
                 showNotification('El correo no es válido o ya esta registrado. Por favor, ingrese un correo válido.', 'error');
+            } else if (correoInput.value) {
+                verificarDisponible('correo', correoInput.value, 'emprendedor', 'El correo electrónico ya está registrado. Por favor, utiliza otro.', showNotification);
             }
         });
     }
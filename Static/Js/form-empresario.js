@@ -147,6 +147,8 @@ document.addEventListener('DOMContentLoaded', function() {
             const emailRegex = /^[a-z0-9!#$%&'*+/=?^_`{|}~-]+(?:\.[a-z0-9!#$%&'*+/=?^_`{|}~-]+)*@(?:[a-z0-9](?:[a-z0-9-]*[a-z0-9])?\.)+[a-z0-9](?:[a-z0-9-]*[a-z0-9])?$/;
             if (correoInput.value && !emailRegex.test(correoInput.value)) {
                 showNotification('El correo no es válido o ya esta registrado. Por favor, ingrese un correo válido.', 'error');
+            } else if (correoInput.value) {
+                verificarDisponible('correo', correoInput.value, 'empresario', 'El correo electrónico ya está registrado. Por favor, utiliza otro.', showNotification);
             }
         });
     }
@@ -167,6 +169,8 @@ document.addEventListener('DOMContentLoaded', function() {
             const nitRegex = /^\d{10}$/;
             if (nitInput.value && !nitRegex.test(nitInput.value)) {
                 showNotification('El NIT debe contener exactamente 10 dígitos numéricos.', 'error');
+            } else if (nitInput.value) {
+                verificarDisponible('nit', nitInput.value, 'empresario', 'El NIT ya está registrado. Por favor, verifica la información.', showNotification);
             }
         });
     }
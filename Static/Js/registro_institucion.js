@@ -117,6 +117,8 @@ document.addEventListener('DOMContentLoaded', function () {
             if (emailInput) {
                 emailInput.focus();
             }
+        } else if (email) {
+            verificarDisponible('correo', email, 'institucion', 'El correo electrónico ya está registrado. Por favor, utiliza otro.', showNotification);
         }
     };
 
@@ -156,6 +158,8 @@ document.addEventListener('DOMContentLoaded', function () {
             const nit = this.value;
             if (nit && !validarNIT(nit)) {
                 showNotification('El NIT no es válido. Debe contener 10 dígitos numéricos, sin guiones ni puntos.', 'error');
+            } else if (nit) {
+                verificarDisponible('nit', nit, 'institucion', 'El NIT ya está registrado. Por favor, verifica la información.', showNotification);
             }
         });
     }
@@ -110,6 +110,8 @@ document.addEventListener('DOMContentLoaded', function () {
             if (emailInput) {
                 emailInput.focus();
             }
+        } else if (email) {
+            verificarDisponible('correo', email, 'inversionista', 'El correo electrónico ya está registrado. Por favor, utiliza otro.', showNotification);
         }
     }
 
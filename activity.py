@@ -0,0 +1,217 @@
+# Última conexión y registro de inicios de sesión, escritos por lotes.
+#
+# Escribir usuarios.ultima_conexion en cada petición duplicaría las escrituras
+# de la base de datos. En su lugar cada petición autenticada anota el momento en
+# un diccionario en memoria (usuario_id -> fecha): si el mismo usuario hace cien
+# peticiones en un intervalo queda una sola entrada. Los inicios de sesión se
+# anotan en una lista. Cada ACTIVITY_FLUSH_INTERVAL segundos un hilo intercambia
+# los buffers y los vuelca con un UPDATE por lotes (executemany, solo si la fecha
+# es más reciente que la guardada, por si otro worker escribió después) y un
+# INSERT por lotes en eventos_acceso, en una transacción.
+#
+# La memoria está acotada: como mucho ACTIVITY_MAX_USERS usuarios y
+# ACTIVITY_MAX_EVENTS eventos pendientes. Al llegar al límite se adelanta el
+# volcado y, mientras tanto, lo nuevo se descarta y se cuenta en /activity/stats.
+# Si un volcado falla, lo pendiente vuelve a los buffers (dentro de los mismos
+# límites) para el siguiente intento. Al salir el proceso (apagado ordenado de
+# gunicorn, fin de un comando) se vuelca lo que quede con atexit; un kill -9
+# pierde como mucho un intervalo.
+#
+# Solo se cuentan las peticiones cuya vista leyó la sesión (se comprueba al
+# guardarla): los estáticos y las páginas cacheadas no cuentan ni se tocan.
+# Con ACTIVITY_FLUSH_INTERVAL = 0 se escribe en cada anotación (pruebas).
+import atexit
+import logging
+import threading
+from datetime import datetime
+
+from sqlalchemy import bindparam, insert, or_, select, update
+
+from extensions import db
+from models import EventoAcceso, Usuario
+
+logger = logging.getLogger(__name__)
+
+
+class ActivityTracker:
+    """Buffers de última conexión y eventos de acceso con volcado periódico por lotes.
+
+    Se configura con app.config:
+        ACTIVITY_ENABLED          Si es False no se anota nada (por defecto True).
+        ACTIVITY_FLUSH_INTERVAL   Segundos entre volcados; 0 escribe en cada anotación (por defecto 30).
+        ACTIVITY_MAX_USERS        Usuarios distintos pendientes como máximo (por defecto 50000).
+        ACTIVITY_MAX_EVENTS       Eventos de acceso pendientes como máximo (por defecto 10000).
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()  # Un volcado a la vez (hilo, atexit o llamada directa)
+        self._vistos = {}     # usuario_id -> última fecha vista
+        self._eventos = []    # filas para eventos_acceso
+        self._despertar = threading.Event()
+        self._hilo = None
+        self._stats = {
+            'seen': 0,
+            'events': 0,
+            'dropped_seen': 0,
+            'dropped_events': 0,
+            'flushes': 0,
+            'failed_flushes': 0,
+            'rows_updated': 0,
+            'events_inserted': 0,
+        }
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('ACTIVITY_ENABLED', True)
+        app.config.setdefault('ACTIVITY_FLUSH_INTERVAL', 30)
+        app.config.setdefault('ACTIVITY_MAX_USERS', 50_000)
+        app.config.setdefault('ACTIVITY_MAX_EVENTS', 10_000)
+        self.app = app
+        app.extensions['activity'] = self
+        # Se engancha al guardado de la sesión: ahí Flask ya sabe si la vista la leyó.
+        # Leer flask.session desde un after_request la marcaría como leída en todas
+        # las peticiones (y añadiría Vary: Cookie a estáticos y páginas cacheadas).
+        tracker = self
+
+        class SessionInterface(type(app.session_interface)):
+            def save_session(self, app, session, response):
+                tracker._registrar_sesion(session)
+                return super().save_session(app, session, response)
+
+        app.session_interface = SessionInterface()
+
+    # --- API pública ---
+
+    def seen(self, usuario_id, fecha=None):
+        """Anota que el usuario está activo. Devuelve False si se descartó por el límite de memoria."""
+        if not self.app.config['ACTIVITY_ENABLED']:
+            return False
+        fecha = fecha or datetime.utcnow()
+        with self._lock:
+            if usuario_id not in self._vistos and len(self._vistos) >= self.app.config['ACTIVITY_MAX_USERS']:
+                self._stats['dropped_seen'] += 1
+                self._despertar.set()
+                return False
+            self._vistos[usuario_id] = fecha
+            self._stats['seen'] += 1
+        self._programar()
+        return True
+
+    def login(self, usuario_id, ip=None):
+        """Anota un inicio de sesión (evento de auditoría y última conexión)."""
+        if not self.app.config['ACTIVITY_ENABLED']:
+            return False
+        fecha = datetime.utcnow()
+        with self._lock:
+            if len(self._eventos) >= self.app.config['ACTIVITY_MAX_EVENTS']:
+                self._stats['dropped_events'] += 1
+                self._despertar.set()
+            else:
+                self._eventos.append({'usuario_id': usuario_id, 'tipo': 'login', 'fecha': fecha, 'ip': ip})
+                self._stats['events'] += 1
+        return self.seen(usuario_id, fecha)
+
+    def flush(self):
+        """Vuelca lo pendiente en una transacción. Devuelve (usuarios actualizados, eventos insertados)."""
+        with self._flush_lock:
+            with self._lock:
+                vistos, self._vistos = self._vistos, {}
+                eventos, self._eventos = self._eventos, []
+            if not vistos and not eventos:
+                return 0, 0
+            with self.app.app_context():
+                try:
+                    insertados = self._escribir(vistos, eventos)
+                except Exception as e:
+                    db.session.rollback()
+                    logger.error(f"❌ Error al volcar la actividad ({len(vistos)} usuarios, {len(eventos)} eventos): {e}")
+                    self._devolver(vistos, eventos)
+                    with self._lock:
+                        self._stats['failed_flushes'] += 1
+                    return 0, 0
+            with self._lock:
+                self._stats['flushes'] += 1
+                self._stats['rows_updated'] += len(vistos)
+                self._stats['events_inserted'] += insertados
+            return len(vistos), insertados
+
+    def stats(self):
+        with self._lock:
+            datos = dict(self._stats)
+            datos['pending_seen'] = len(self._vistos)
+            datos['pending_events'] = len(self._eventos)
+        datos['flush_interval'] = self.app.config['ACTIVITY_FLUSH_INTERVAL'] if self.app else None
+        return datos
+
+    # --- Funcionamiento interno ---
+
+    def _registrar_sesion(self, sesion):
+        # accessed: la vista ya leyó la sesión; así no se cuenta cualquier petición con cookie.
+        if getattr(sesion, 'accessed', False):
+            usuario_id = sesion.get('user_id')
+            if usuario_id is not None:
+                self.seen(usuario_id)
+
+    def _programar(self):
+        if not self.app.config['ACTIVITY_FLUSH_INTERVAL']:
+            self.flush()
+            return
+        if self._hilo is not None:
+            return
+        with self._lock:
+            if self._hilo is not None:
+                return
+            # El hilo nace con la primera anotación, ya dentro del worker (después del fork).
+            self._hilo = threading.Thread(target=self._bucle, name='activity-flush', daemon=True)
+            self._hilo.start()
+            atexit.register(self.flush)
+
+    def _bucle(self):
+        while True:
+            self._despertar.wait(self.app.config['ACTIVITY_FLUSH_INTERVAL'])
+            self._despertar.clear()
+            try:
+                self.flush()
+            except Exception as e:  # El hilo de volcado nunca debe morir.
+                logger.error(f"❌ Error inesperado al volcar la actividad: {e}")
+
+    def _escribir(self, vistos, eventos):
+        if vistos:
+            tabla = Usuario.__table__
+            db.session.execute(
+                update(tabla)
+                .where(tabla.c.id == bindparam('b_id'),
+                       or_(tabla.c.ultima_conexion.is_(None), tabla.c.ultima_conexion < bindparam('b_fecha')))
+                .values(ultima_conexion=bindparam('b_fecha')),
+                [{'b_id': usuario_id, 'b_fecha': fecha} for usuario_id, fecha in vistos.items()],
+            )
+        if eventos:
+            # Un usuario borrado después de iniciar sesión haría fallar la clave foránea de todo el lote.
+            existentes = set(db.session.execute(
+                select(Usuario.id).where(Usuario.id.in_({e['usuario_id'] for e in eventos}))).scalars())
+            eventos = [e for e in eventos if e['usuario_id'] in existentes]
+            if eventos:
+                db.session.execute(insert(EventoAcceso), eventos)
+        db.session.commit()
+        return len(eventos)
+
+    def _devolver(self, vistos, eventos):
+        """Tras un volcado fallido, devuelve lo pendiente a los buffers sin pasar de los límites."""
+        with self._lock:
+            for usuario_id, fecha in vistos.items():
+                actual = self._vistos.get(usuario_id)
+                if actual is not None:
+                    self._vistos[usuario_id] = max(actual, fecha)
+                elif len(self._vistos) < self.app.config['ACTIVITY_MAX_USERS']:
+                    self._vistos[usuario_id] = fecha
+                else:
+                    self._stats['dropped_seen'] += 1
+            hueco = max(0, self.app.config['ACTIVITY_MAX_EVENTS'] - len(self._eventos))
+            self._stats['dropped_events'] += max(0, len(eventos) - hueco)
+            self._eventos[:0] = eventos[:hueco]
+
+
+activity_tracker = ActivityTracker()
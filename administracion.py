@@ -0,0 +1,248 @@
+# Administración masiva de usuarios desde la línea de comandos.
+#
+#   flask deactivate-users       activo = false (no pueden iniciar sesión)
+#   flask reactivate-users       activo = true
+#   flask delete-users           borra los usuarios y, por ON DELETE CASCADE, sus perfiles,
+#                                intereses, diagnósticos y participaciones en conversaciones
+#                                (y los descuenta de las estadísticas del panel, de los
+#                                cupos ocupados de las convocatorias, del histograma del
+#                                diagnóstico y de los contadores de reacciones del foro)
+#   flask purge-inactive-users   borra los que no inician sesión desde --desde
+#
+# Los usuarios se eligen con filtros (perfil, dominio del correo, fechas, estado)
+# o con un archivo de correos, y nunca incluyen administradores. Cada comando
+# trabaja por lotes de USERS_BATCH_SIZE ids: un SELECT por keyset sobre la PK (o
+# por bloque de correos del archivo) y un UPDATE/DELETE ... WHERE id IN (...) por
+# lote, con su commit. No se cargan objetos del ORM: los borrados los encadena la
+# base de datos (en SQLite, con PRAGMA foreign_keys=ON, ver extensions.py).
+#
+# --simular solo cuenta y muestra algunos correos. Los índices en memoria de los
+# workers (búsqueda, emparejamiento) dejan de ver a los usuarios borrados en su
+# siguiente reconstrucción; sus rutas ya descartan los perfiles que no existen.
+import time
+
+import click
+from flask import Blueprint, current_app
+from sqlalchemy import delete, func, select, text, update
+
+import convocatorias
+import diagnostico
+import estadisticas
+import foro
+from extensions import db
+from models import Usuario, TipoPerfil
+
+
+class BorradoInseguro(Exception):
+    """La base de datos no borraría en cascada los perfiles de los usuarios."""
+
+
+def condiciones(perfil=None, dominio=None, registrados_desde=None, registrados_hasta=None,
+                activos=None, sin_conexion=False, inactivos_desde=None):
+    """Condiciones WHERE sobre Usuario para los filtros dados (siempre excluye administradores)."""
+    where = [Usuario.is_admin.is_(False)]
+    if perfil:
+        where.append(Usuario.tipo_perfil == TipoPerfil(perfil))
+    if dominio:
+        where.append(func.lower(Usuario.email).like('%@' + dominio.strip().lower().lstrip('@')))
+    if registrados_desde:
+        where.append(Usuario.fecha_registro >= registrados_desde)
+    if registrados_hasta:
+        where.append(Usuario.fecha_registro < registrados_hasta)
+    if activos is True:
+        where.append(Usuario.activo.isnot(False))  # NULL cuenta como activo, igual que en el login.
+    elif activos is False:
+        where.append(Usuario.activo.is_(False))
+    if sin_conexion:
+        where.append(Usuario.ultima_conexion.is_(None))
+    if inactivos_desde:
+        # Sin conexiones desde la fecha; quien nunca inició sesión cuenta desde su registro.
+        where.append(func.coalesce(Usuario.ultima_conexion, Usuario.fecha_registro) < inactivos_desde)
+    return where
+
+
+def leer_correos(ruta):
+    """Correos de un archivo (uno por línea; se ignoran las vacías y las que empiezan por '#')."""
+    with open(ruta, encoding='utf-8-sig') as archivo:
+        for linea in archivo:
+            correo = linea.strip().lower()
+            if correo and not correo.startswith('#'):
+                yield correo
+
+
+def _bloques(iterable, tamano):
+    bloque = []
+    for valor in iterable:
+        bloque.append(valor)
+        if len(bloque) >= tamano:
+            yield bloque
+            bloque = []
+    if bloque:
+        yield bloque
+
+
+def lotes_de_ids(where, lote, correos=None):
+    """Genera listas de como mucho 'lote' ids que cumplen 'where'.
+
+    Sin archivo de correos se recorre la PK por keyset (id > último), así cada
+    SELECT usa el índice y no vuelve a ver las filas ya tratadas aunque se hayan
+    borrado o actualizado. Con archivo, un SELECT por bloque de correos.
+    """
+    if correos is not None:
+        for bloque in _bloques(correos, lote):
+            ids = db.session.execute(
+                select(Usuario.id).where(*where, func.lower(Usuario.email).in_(bloque)).order_by(Usuario.id)
+            ).scalars().all()
+            if ids:
+                yield ids
+        return
+    ultimo = 0
+    while True:
+        ids = db.session.execute(
+            select(Usuario.id).where(*where, Usuario.id > ultimo).order_by(Usuario.id).limit(lote)
+        ).scalars().all()
+        if not ids:
+            return
+        yield ids
+        ultimo = ids[-1]
+
+
+def contar(where, correos=None, lote=1000, muestra=10):
+    """(total, primeros correos) de los usuarios elegidos, sin modificar nada."""
+    if correos is None:
+        total = db.session.execute(select(func.count(Usuario.id)).where(*where)).scalar()
+    else:
+        total = sum(db.session.execute(
+            select(func.count(Usuario.id)).where(*where, func.lower(Usuario.email).in_(bloque))).scalar()
+            for bloque in _bloques(correos, lote))
+    ejemplos = db.session.execute(select(Usuario.email).where(*where).order_by(Usuario.id).limit(muestra)).scalars().all() \
+        if correos is None else []
+    return total, ejemplos
+
+
+def comprobar_cascada():
+    """En SQLite, ON DELETE CASCADE solo funciona con las claves foráneas activadas en la conexión."""
+    if db.engine.dialect.name == 'sqlite' and not db.session.execute(text('PRAGMA foreign_keys')).scalar():
+        raise BorradoInseguro('Las claves foráneas de SQLite están desactivadas: el borrado dejaría perfiles huérfanos.')
+
+
+ACCIONES = {
+    # acción: (sentencia para un lote de ids, verbo para el resumen)
+    'desactivar': (lambda ids: update(Usuario).where(Usuario.id.in_(ids)).values(activo=False), 'desactivados'),
+    'reactivar': (lambda ids: update(Usuario).where(Usuario.id.in_(ids)).values(activo=True), 'reactivados'),
+    'borrar': (lambda ids: delete(Usuario).where(Usuario.id.in_(ids)), 'borrados'),
+}
+
+
+def ejecutar(accion, where, lote=1000, correos=None, progreso=print, total=None):
+    """Aplica la acción por lotes, con un commit por lote. Devuelve las filas afectadas."""
+    if accion == 'borrar':
+        comprobar_cascada()
+    sentencia, verbo = ACCIONES[accion]
+    afectados = 0
+    inicio = time.perf_counter()
+    for ids in lotes_de_ids(where, lote, correos):
+        if accion == 'borrar':
+            # Se descuentan de las estadísticas del panel, de los cupos de las convocatorias,
+            # del histograma del diagnóstico y de los contadores del foro en la misma
+            # transacción que el DELETE.
+            estadisticas.restar_bajas(ids)
+            convocatorias.liberar_cupos(ids)
+            diagnostico.restar_bajas(ids)
+            foro.restar_bajas(ids)
+        # Core con synchronize_session=False: no se buscan ni se cargan objetos en la sesión.
+        resultado = db.session.execute(sentencia(ids), execution_options={'synchronize_session': False})
+        db.session.commit()
+        afectados += resultado.rowcount
+        segundos = time.perf_counter() - inicio
+        avance = f'{afectados}/{total}' if total is not None else f'{afectados}'
+        progreso(f'  {avance} {verbo} ({afectados / max(segundos, 1e-9):.0f}/s)')
+    return afectados
+
+
+# --- Integración con Flask ---
+
+bp = Blueprint('administracion', __name__, cli_group=None)
+
+
+def init_app(app):
+    """Registra los comandos de administración masiva de usuarios."""
+    app.config.setdefault('USERS_BATCH_SIZE', 1000)
+    app.register_blueprint(bp)
+
+
+FECHA = click.DateTime(formats=['%Y-%m-%d'])
+
+
+def _filtros(comando):
+    """Opciones comunes a todos los comandos: filtros, archivo de correos, lote y simulación."""
+    opciones = [
+        click.option('--correos', 'archivo', type=click.Path(exists=True, dir_okay=False),
+                     help='Archivo con un correo por línea.'),
+        click.option('--perfil', type=click.Choice([t.value for t in TipoPerfil if t != TipoPerfil.ADMIN])),
+        click.option('--dominio', help='Dominio del correo, p. ej. spam.example.'),
+        click.option('--registrados-desde', type=FECHA, help='AAAA-MM-DD (incluido).'),
+        click.option('--registrados-hasta', type=FECHA, help='AAAA-MM-DD (excluido).'),
+        click.option('--sin-conexion', is_flag=True, help='Solo los que nunca iniciaron sesión.'),
+        click.option('--lote', type=int, help='Usuarios por sentencia y commit (por defecto USERS_BATCH_SIZE).'),
+        click.option('--simular', is_flag=True, help='Solo cuenta los usuarios elegidos; no modifica nada.'),
+        click.option('--si', is_flag=True, help='No pide confirmación.'),
+    ]
+    for opcion in reversed(opciones):
+        comando = opcion(comando)
+    return comando
+
+
+def _correr(accion, archivo, lote, simular, si, activos=None, **filtros):
+    # Sin ningún filtro se elegirían todos los usuarios; reactivar los desactivados sí está acotado.
+    if archivo is None and activos is not False and not any(filtros.values()):
+        print('❌ Indique al menos un filtro o un archivo de correos (--correos).')
+        return
+    where = condiciones(activos=activos, **filtros)
+    correos = list(leer_correos(archivo)) if archivo else None
+    lote = lote or current_app.config['USERS_BATCH_SIZE']
+
+    total, ejemplos = contar(where, correos, lote)
+    print(f'{total} usuarios elegidos.' + (f" Por ejemplo: {', '.join(ejemplos)}" if ejemplos else ''))
+    if simular or not total:
+        return
+    if not si and not click.confirm(f'¿Seguro que quiere {accion} {total} usuarios?'):
+        return
+    inicio = time.perf_counter()
+    try:
+        afectados = ejecutar(accion, where, lote, correos, total=total)
+    except BorradoInseguro as e:
+        print(f'❌ {e}')
+        return
+    print(f'✅ {afectados} usuarios {ACCIONES[accion][1]} en {time.perf_counter() - inicio:.1f} s')
+
+
+@bp.cli.command('deactivate-users')
+@_filtros
+def deactivate_users(**opciones):
+    """Desactiva los usuarios elegidos: no podrán iniciar sesión."""
+    _correr('desactivar', activos=True, **opciones)
+
+
+@bp.cli.command('reactivate-users')
+@_filtros
+def reactivate_users(**opciones):
+    """Reactiva los usuarios desactivados que cumplan los filtros."""
+    _correr('reactivar', activos=False, **opciones)
+
+
+@bp.cli.command('delete-users')
+@_filtros
+@click.option('--solo-desactivados', is_flag=True, help='Solo los usuarios desactivados.')
+def delete_users(solo_desactivados, **opciones):
+    """Borra los usuarios elegidos con sus perfiles (ON DELETE CASCADE en la base de datos)."""
+    _correr('borrar', activos=False if solo_desactivados else None, **opciones)
+
+
+@bp.cli.command('purge-inactive-users')
+@click.option('--desde', 'inactivos_desde', type=FECHA, required=True,
+              help='Borra a quien no inicia sesión desde esta fecha (AAAA-MM-DD).')
+@_filtros
+def purge_inactive_users(**opciones):
+    """Borra los usuarios sin conexiones desde --desde (o registrados antes, si nunca iniciaron sesión)."""
+    _correr('borrar', **opciones)
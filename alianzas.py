@@ -0,0 +1,561 @@
+# Alianzas entre empresas e instituciones de la cadena de valor minera.
+#
+# Cada empresario e institución es un nodo del grafo; las alianzas (pendientes o
+# confirmadas) son sus aristas. Un nodo se codifica como una firma (un int de
+# Python) con dos bitsets: lo que ofrece y lo que necesita.
+#   - Un empresario ofrece las etapas en que opera (producción, transformación,
+#     comercialización) y los servicios que presta a otras empresas
+#     (transporte, TIC, maquinaria, laboratorio...). Necesita las etapas
+#     vecinas a las suyas en que no opera (quien produce necesita quien
+#     transforme, etc.), los servicios que no presta y el apoyo institucional.
+#   - Una institución ofrece su área de especialización y sus formas de
+#     participación, y necesita empresas de cualquier etapa.
+# El puntaje de un par es simétrico: lo que A necesita y B ofrece más lo que B
+# necesita y A ofrece, con pesos por faceta.
+#
+# Como las actividades posibles son pocas, miles de nodos comparten firma: al
+# construir el índice se ordenan, para cada firma, las demás firmas por puntaje
+# (unos cientos de firmas, no todos los pares). Las sugerencias de un nodo se
+# leen recorriendo ese orden y los nodos de cada firma, saltando los que ya son
+# sus aliados (lista de adyacencia en memoria): cuestan O(k + aliados), no un
+# recálculo por cada visita. Altas, cambios de perfil y alianzas se aplican al
+# índice al hacer commit (eventos de la sesión, como en matching.py); una firma
+# nueva solo necesita puntuarse contra las existentes. Los borrados masivos con
+# Core no pasan por la sesión: la ruta descarta los usuarios que ya no existen y
+# un hilo reconstruye el índice cada ALIANZAS_REBUILD_INTERVAL segundos, fuera de
+# las peticiones y como en search.py: el índice nuevo se arma aparte y se
+# intercambia bajo el lock, y los commits que llegan mientras tanto se vuelven a
+# aplicar sobre él.
+import bisect
+import logging
+import threading
+import time
+from datetime import datetime
+
+import click
+from flask import Blueprint, current_app, jsonify, request, session
+from sqlalchemy import event, or_, select
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db
+from models import Alianza, Empresario, Institucion, InstitucionParticipacion
+
+logger = logging.getLogger(__name__)
+
+# --- Vocabulario y codificación ---
+
+ETAPAS = ['produccion', 'transformacion', 'comercializacion']
+# Actividades del registro de empresarios que son servicios para otras empresas; el resto es operación de su etapa.
+SERVICIOS = ['proveedores_insumos', 'maquinaria_equipos', 'servicios_ingenieria', 'instrumentos_control',
+             'servicios_seguridad', 'servicio_laboratorio', 'transportista', 'tics']
+# Áreas de especialización y formas de participación de las instituciones.
+APOYOS = ['asesoria_tecnica', 'programas_capacitacion', 'lineas_credito',
+          'interaccion_comunidad', 'banco_proyectos', 'analisis_impacto']
+SIN_ACTIVIDAD = 'ninguna'
+
+_BITS = {}
+for _faceta, _valores in (('etapa', ETAPAS), ('servicio', SERVICIOS), ('apoyo', APOYOS)):
+    for _valor in _valores:
+        _BITS[(_faceta, _valor)] = 1 << len(_BITS)
+DESPLAZAMIENTO = len(_BITS)  # Lo que el nodo necesita va en los bits altos de la firma.
+MASCARA_OFRECE = (1 << DESPLAZAMIENTO) - 1
+
+
+def _mascara(faceta):
+    return sum(bit for (f, _), bit in _BITS.items() if f == faceta)
+
+
+MASCARA_ETAPA = _mascara('etapa')
+MASCARA_SERVICIO = _mascara('servicio')
+MASCARA_APOYO = _mascara('apoyo')
+PESOS = ((MASCARA_ETAPA, 3), (MASCARA_SERVICIO, 2), (MASCARA_APOYO, 1))
+
+# ?tipo= de las sugerencias -> bits que debe ofrecer el aliado.
+TIPOS = {
+    'produccion': _BITS[('etapa', 'produccion')],
+    'transformacion': _BITS[('etapa', 'transformacion')],
+    'comercializacion': _BITS[('etapa', 'comercializacion')],
+    'servicios': MASCARA_SERVICIO,
+    'instituciones': MASCARA_APOYO,
+}
+
+
+def _bits(faceta, valores):
+    return sum(_BITS.get((faceta, v), 0) for v in valores)
+
+
+def codificar_empresario(produccion, transformacion, comercializacion):
+    """Firma de un empresario a partir de su actividad en cada etapa de la cadena."""
+    actividades = (produccion, transformacion, comercializacion)
+    opera = [bool(a) and a != SIN_ACTIVIDAD and a not in SERVICIOS for a in actividades]
+    ofrece = _bits('etapa', [e for e, activa in zip(ETAPAS, opera) if activa]) | _bits('servicio', actividades)
+    if any(opera):
+        vecinas = {ETAPAS[j] for i, activa in enumerate(opera) if activa
+                   for j in (i - 1, i + 1) if 0 <= j < len(ETAPAS) and not opera[j]}
+        necesita = _bits('etapa', vecinas) | (MASCARA_SERVICIO & ~ofrece) | MASCARA_APOYO
+    else:
+        # Solo presta servicios: sus clientes son las empresas de cualquier etapa.
+        necesita = MASCARA_ETAPA | MASCARA_APOYO
+    return ofrece | necesita << DESPLAZAMIENTO
+
+
+def codificar_institucion(area_especializacion, participaciones):
+    """Firma de una institución: ofrece su área y sus formas de participación; necesita empresas."""
+    return _bits('apoyo', [area_especializacion, *participaciones]) | MASCARA_ETAPA << DESPLAZAMIENTO
+
+
+def _peso(bits):
+    return sum((bits & mascara).bit_count() * peso for mascara, peso in PESOS)
+
+
+def puntaje(firma_a, firma_b):
+    """Complementariedad de dos nodos (simétrica); 0 si ninguno ofrece lo que el otro necesita."""
+    return _peso(firma_a >> DESPLAZAMIENTO & firma_b & MASCARA_OFRECE) + \
+        _peso(firma_b >> DESPLAZAMIENTO & firma_a & MASCARA_OFRECE)
+
+
+# --- Índice en memoria ---
+
+class IndiceAlianzas:
+    """Nodos agrupados por firma, orden de firmas por puntaje y lista de adyacencia de las alianzas."""
+
+    def __init__(self, top_k=20):
+        self.top_k = top_k
+        self._firmas = {}    # usuario_id -> firma
+        self._grupos = {}    # firma -> usuario_ids ordenados
+        self._ranking = {}   # firma -> [(-puntaje, firma)] ordenado, solo puntajes > 0
+        self._aliados = {}   # usuario_id -> set de usuario_ids con alianza pendiente o confirmada
+        self._lock = threading.RLock()
+        self._diario = None  # Cambios recibidos durante cargar(), para aplicarlos al índice nuevo
+        self.construido_en = None
+        self.stats = {'consultas': 0, 'firmas_nuevas': 0}
+
+    def cargar(self, nodos, aristas):
+        """Reemplaza todo el contenido y precalcula el orden de firmas. Recibe (id, firma) y (id_a, id_b).
+
+        El índice nuevo se construye aparte (nodos y aristas pueden ser generadores
+        que leen la base de datos); las consultas siguen viendo el anterior completo
+        hasta el intercambio.
+        """
+        with self._lock:
+            self._diario = []
+        nuevo = IndiceAlianzas(self.top_k)
+        try:
+            nuevo._firmas = dict(nodos)
+            for usuario_id, firma in nuevo._firmas.items():
+                nuevo._grupos.setdefault(firma, []).append(usuario_id)
+            for ids in nuevo._grupos.values():
+                ids.sort()
+            for a, b in aristas:
+                nuevo._aliados.setdefault(a, set()).add(b)
+                nuevo._aliados.setdefault(b, set()).add(a)
+            nuevo._ranking = {firma: self._ordenar(firma, nuevo._grupos) for firma in nuevo._grupos}
+        except BaseException:
+            with self._lock:
+                self._diario = None
+            raise
+        with self._lock:
+            diario, self._diario = self._diario, None
+            for metodo, args in diario:
+                getattr(nuevo, metodo)(*args)
+            self._firmas, self._grupos, self._ranking, self._aliados = \
+                nuevo._firmas, nuevo._grupos, nuevo._ranking, nuevo._aliados
+            self.construido_en = time.monotonic()
+
+    def recibe_cambios(self):
+        """Si los commits deben aplicarse: el índice ya está construido o se está construyendo."""
+        with self._lock:
+            return self.construido_en is not None or self._diario is not None
+
+    @staticmethod
+    def _ordenar(firma, firmas):
+        return sorted((-valor, otra) for otra in firmas if (valor := puntaje(firma, otra)) > 0)
+
+    def set_nodo(self, usuario_id, firma):
+        """Alta, cambio de perfil o baja (firma=None) de un nodo."""
+        with self._lock:
+            if self._diario is not None:
+                self._diario.append(('set_nodo', (usuario_id, firma)))
+            anterior = self._firmas.pop(usuario_id, None)
+            if anterior is not None:
+                grupo = self._grupos[anterior]
+                grupo.remove(usuario_id)
+                if not grupo:
+                    del self._grupos[anterior]  # Su entrada en los rankings se salta hasta la reconstrucción.
+            if firma is None:
+                return
+            self._firmas[usuario_id] = firma
+            bisect.insort(self._grupos.setdefault(firma, []), usuario_id)
+            if firma not in self._ranking:
+                # Firma nueva: se puntúa contra las existentes y se inserta en sus rankings.
+                self.stats['firmas_nuevas'] += 1
+                for otra, ranking in self._ranking.items():
+                    valor = puntaje(firma, otra)
+                    if valor > 0:
+                        bisect.insort(ranking, (-valor, firma))
+                self._ranking[firma] = self._ordenar(firma, self._ranking.keys() | {firma})
+
+    def set_arista(self, a, b, existe=True):
+        """Alta (o baja, con existe=False) de una alianza entre a y b."""
+        with self._lock:
+            if self._diario is not None:
+                self._diario.append(('set_arista', (a, b, existe)))
+            for origen, destino in ((a, b), (b, a)):
+                vecinos = self._aliados.setdefault(origen, set())
+                if existe:
+                    vecinos.add(destino)
+                else:
+                    vecinos.discard(destino)
+                    if not vecinos:
+                        del self._aliados[origen]
+
+    def aliados(self, usuario_id):
+        with self._lock:
+            return set(self._aliados.get(usuario_id, ()))
+
+    def sugerencias(self, usuario_id, k=None, ofrece=None):
+        """Lista de (usuario_id, puntaje) de mayor a menor, sin el nodo ni sus aliados; None si no es un nodo.
+
+        'ofrece' limita las sugerencias a las firmas que ofrecen alguno de esos bits.
+        """
+        k = k or self.top_k
+        with self._lock:
+            firma = self._firmas.get(usuario_id)
+            if firma is None:
+                return None
+            self.stats['consultas'] += 1
+            excluidos = self._aliados.get(usuario_id, set())
+            resultado = []
+            for valor, otra in self._ranking[firma]:
+                if ofrece is not None and not otra & ofrece:
+                    continue
+                ids = self._grupos.get(otra)
+                if not ids:
+                    continue
+                # Cada nodo empieza el grupo en un punto distinto: así no se sugieren a todos los mismos ids.
+                inicio = usuario_id * 2654435761 % len(ids)
+                for i in range(len(ids)):
+                    candidato = ids[(inicio + i) % len(ids)]
+                    if candidato != usuario_id and candidato not in excluidos:
+                        resultado.append((candidato, -valor))
+                        if len(resultado) >= k:
+                            return resultado
+            return resultado
+
+    def tamano(self):
+        with self._lock:
+            return {'nodos': len(self._firmas), 'firmas': len(self._grupos),
+                    'aristas': sum(len(v) for v in self._aliados.values()) // 2}
+
+
+indice = IndiceAlianzas()
+_estado = {'hilo': None}
+_construccion = threading.Lock()  # La primera construcción, una sola vez aunque lleguen varias peticiones
+
+
+def _nodos():
+    participaciones = {}
+    for inst_id, participacion in db.session.execute(
+            select(InstitucionParticipacion.institucion_id, InstitucionParticipacion.participacion)):
+        participaciones.setdefault(inst_id, []).append(participacion)
+    for usuario_id, produccion, transformacion, comercializacion in db.session.execute(select(
+            Empresario.usuario_id, Empresario.sector_produccion, Empresario.sector_transformacion,
+            Empresario.sector_comercializacion)):
+        yield usuario_id, codificar_empresario(produccion, transformacion, comercializacion)
+    for inst_id, usuario_id, area in db.session.execute(
+            select(Institucion.id, Institucion.usuario_id, Institucion.area_especializacion)):
+        yield usuario_id, codificar_institucion(area, participaciones.get(inst_id, ()))
+
+
+def _aristas():
+    yield from db.session.execute(select(Alianza.usuario_menor_id, Alianza.usuario_mayor_id))
+
+
+def construir_desde_bd():
+    """Lee nodos y aristas con cuatro consultas planas y reconstruye el índice."""
+    indice.cargar(_nodos(), _aristas())
+    tamano = indice.tamano()
+    return tamano['nodos'], tamano['aristas']
+
+
+def _asegurar_indice():
+    """Construye el índice con la primera petición y arranca el hilo que lo refresca."""
+    if indice.construido_en is None:
+        with _construccion:
+            if indice.construido_en is None:
+                construir_desde_bd()
+    if _estado['hilo'] is None and current_app.config['ALIANZAS_REBUILD_INTERVAL']:
+        with _construccion:
+            if _estado['hilo'] is None:
+                # Nace con la primera petición, ya dentro del worker (después del fork).
+                _estado['hilo'] = threading.Thread(target=_refrescar, args=(current_app._get_current_object(),),
+                                                   name='alianzas-rebuild', daemon=True)
+                _estado['hilo'].start()
+
+
+def _refrescar(app):
+    while True:
+        time.sleep(app.config['ALIANZAS_REBUILD_INTERVAL'])
+        with app.app_context():
+            try:
+                construir_desde_bd()
+            except Exception as e:  # El hilo de refresco nunca debe morir.
+                logger.error(f"❌ Error al reconstruir el índice de alianzas: {e}")
+            finally:
+                db.session.remove()
+
+
+# --- Actualización incremental a partir de la sesión ---
+
+def _registrar_cambios(session, flush_context):
+    """Durante el flush anota los nodos y aristas tocados (el estado de la sesión aún es el previo)."""
+    nodos = session.info.setdefault('alianzas_nodos', set())
+    aristas = session.info.setdefault('alianzas_aristas', {})
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Empresario):
+            nodos.add(('emp', obj.id))
+        elif isinstance(obj, Institucion):
+            nodos.add(('inst', obj.id))
+        elif isinstance(obj, InstitucionParticipacion):
+            nodos.add(('inst', obj.institucion_id))
+        elif isinstance(obj, Alianza):
+            aristas[(obj.usuario_menor_id, obj.usuario_mayor_id)] = True
+    for obj in session.deleted:
+        if isinstance(obj, (Empresario, Institucion)):
+            nodos.add((None, obj.usuario_id))  # Baja del nodo
+        elif isinstance(obj, InstitucionParticipacion):
+            nodos.add(('inst', obj.institucion_id))
+        elif isinstance(obj, Alianza):
+            aristas[(obj.usuario_menor_id, obj.usuario_mayor_id)] = False
+
+
+def _codificar_tocados(session, flush_context):
+    """Terminado el flush calcula la firma final de cada nodo tocado. Se aplican al hacer commit."""
+    nodos = session.info.pop('alianzas_nodos', None)
+    if not nodos:
+        return
+    pendientes = session.info.setdefault('alianzas_pendientes', {})
+    for tipo, obj_id in nodos:
+        if tipo is None:
+            pendientes[obj_id] = None
+            continue
+        perfil = session.get(Empresario if tipo == 'emp' else Institucion, obj_id)
+        if perfil is None or perfil in session.deleted:
+            continue  # La baja ya se anotó por usuario_id.
+        pendientes[perfil.usuario_id] = codificar_empresario(
+            perfil.sector_produccion, perfil.sector_transformacion, perfil.sector_comercializacion
+        ) if tipo == 'emp' else codificar_institucion(perfil.area_especializacion, perfil.participacion_activa)
+
+
+def _aplicar_cambios(session):
+    pendientes = session.info.pop('alianzas_pendientes', None)
+    aristas = session.info.pop('alianzas_aristas', None)
+    if not indice.recibe_cambios():
+        return
+    for usuario_id, firma in (pendientes or {}).items():
+        indice.set_nodo(usuario_id, firma)
+    for (a, b), existe in (aristas or {}).items():
+        indice.set_arista(a, b, existe)
+
+
+def _descartar_cambios(session):
+    for clave in ('alianzas_nodos', 'alianzas_aristas', 'alianzas_pendientes'):
+        session.info.pop(clave, None)
+
+
+# --- Integración con Flask ---
+
+bp = Blueprint('alianzas', __name__, cli_group=None)
+
+
+def init_app(app):
+    """Configura el índice y registra los eventos de sesión, las rutas y el comando CLI."""
+    app.config.setdefault('ALIANZAS_TOP_K', 20)
+    app.config.setdefault('ALIANZAS_REBUILD_INTERVAL', 300)
+    app.config.setdefault('ALIANZAS_POR_PAGINA', 30)
+    indice.top_k = app.config['ALIANZAS_TOP_K']
+    sesion = db.session.session_factory.class_
+    if not event.contains(sesion, 'after_flush', _registrar_cambios):
+        event.listen(sesion, 'after_flush', _registrar_cambios)
+        event.listen(sesion, 'after_flush_postexec', _codificar_tocados)
+        event.listen(sesion, 'after_commit', _aplicar_cambios)
+        event.listen(sesion, 'after_rollback', _descartar_cambios)
+    app.register_blueprint(bp)
+
+
+def _usuario_en_sesion():
+    if session.get('user_profile') not in ('empresario', 'institucion'):
+        return None
+    return session.get('user_id')
+
+
+def _no_autenticado():
+    return jsonify({'success': False, 'message': 'Debe iniciar sesión como empresario o institución.'}), 401
+
+
+def perfiles(usuario_ids):
+    """usuario_id -> datos públicos del empresario o la institución (dos consultas con IN)."""
+    resultado = {}
+    if not usuario_ids:
+        return resultado
+    for e in db.session.execute(select(Empresario).where(Empresario.usuario_id.in_(usuario_ids))).scalars():
+        resultado[e.usuario_id] = {
+            'tipo': 'empresario', 'nombre': e.nombre_empresa, 'tamano': e.tamano,
+            'actividades': {'produccion': e.sector_produccion, 'transformacion': e.sector_transformacion,
+                            'comercializacion': e.sector_comercializacion},
+        }
+    for i in db.session.execute(select(Institucion).where(Institucion.usuario_id.in_(usuario_ids))).scalars():
+        resultado[i.usuario_id] = {
+            'tipo': 'institucion', 'nombre': i.nombre_completo, 'tipo_institucion': i.tipo_institucion,
+            'municipio': i.municipio, 'descripcion': i.descripcion, 'area_especializacion': i.area_especializacion,
+            'participacion_activa': list(i.participacion_activa),
+        }
+    return resultado
+
+
+def _alianza_dict(alianza, usuario_id, perfil):
+    return {
+        'id': alianza.id,
+        'estado': alianza.estado,
+        'usuario_id': alianza.otro(usuario_id),
+        'solicitada_por_mi': alianza.solicitante_id == usuario_id,
+        'fecha': (alianza.fecha_confirmacion or alianza.fecha_solicitud).isoformat(),
+        'perfil': perfil,
+    }
+
+
+@bp.route('/alianzas/sugerencias')
+def aliados_sugeridos():
+    """Aliados sugeridos para el usuario en sesión (?k=N, como máximo ALIANZAS_TOP_K; ?tipo= para filtrar)."""
+    usuario_id = _usuario_en_sesion()
+    if usuario_id is None:
+        return _no_autenticado()
+    tipo = request.args.get('tipo')
+    if tipo and tipo not in TIPOS:
+        return jsonify({'success': False, 'message': f"Tipo no válido. Use {', '.join(TIPOS)}."}), 400
+    _asegurar_indice()
+    k = max(1, min(request.args.get('k', 10, type=int), current_app.config['ALIANZAS_TOP_K']))
+    resultado = indice.sugerencias(usuario_id, k, TIPOS.get(tipo))
+    if resultado is None:
+        return jsonify({'success': False, 'message': 'Tu perfil aún no está en el directorio de aliados.'}), 404
+
+    datos = perfiles([candidato for candidato, _ in resultado])
+    sugeridos = [dict(datos[candidato], usuario_id=candidato, puntaje=valor)
+                 for candidato, valor in resultado if candidato in datos]
+    return jsonify({'success': True, 'sugerencias': sugeridos})
+
+
+@bp.route('/alianzas')
+def listar_alianzas():
+    """Alianzas del usuario, confirmadas y pendientes, de la más reciente a la más antigua (?antes=<id>)."""
+    usuario_id = _usuario_en_sesion()
+    if usuario_id is None:
+        return _no_autenticado()
+    limite = current_app.config['ALIANZAS_POR_PAGINA']
+    consulta = select(Alianza).where(or_(Alianza.usuario_menor_id == usuario_id, Alianza.usuario_mayor_id == usuario_id))
+    antes = request.args.get('antes', type=int)
+    if antes is not None:
+        consulta = consulta.where(Alianza.id < antes)
+    filas = db.session.execute(consulta.order_by(Alianza.id.desc()).limit(limite + 1)).scalars().all()
+    hay_mas = len(filas) > limite
+    filas = filas[:limite]
+    datos = perfiles([a.otro(usuario_id) for a in filas])
+    return jsonify({'success': True,
+                    'alianzas': [_alianza_dict(a, usuario_id, datos.get(a.otro(usuario_id))) for a in filas],
+                    'siguiente': filas[-1].id if hay_mas and filas else None})
+
+
+def _par(a, b):
+    return (a, b) if a < b else (b, a)
+
+
+def _alianza_entre(a, b):
+    menor, mayor = _par(a, b)
+    return db.session.execute(
+        select(Alianza).where(Alianza.usuario_menor_id == menor, Alianza.usuario_mayor_id == mayor)
+    ).scalars().first()
+
+
+def _confirmar(alianza):
+    alianza.estado = 'confirmada'
+    alianza.fecha_confirmacion = datetime.utcnow()
+
+
+@bp.route('/alianzas', methods=['POST'])
+def proponer_alianza():
+    """Propone una alianza a otro empresario o institución ({'usuario_id': N}).
+
+    Si el otro ya la había propuesto, queda confirmada. Repetir la propuesta
+    devuelve la alianza existente.
+    """
+    usuario_id = _usuario_en_sesion()
+    if usuario_id is None:
+        return _no_autenticado()
+    destino = (request.get_json(silent=True) or {}).get('usuario_id')
+    if not isinstance(destino, int) or destino == usuario_id or destino not in perfiles([destino]):
+        return jsonify({'success': False, 'message': 'Aliado no válido.'}), 400
+
+    alianza = _alianza_entre(usuario_id, destino)
+    creada = alianza is None
+    try:
+        if creada:
+            menor, mayor = _par(usuario_id, destino)
+            alianza = Alianza(usuario_menor_id=menor, usuario_mayor_id=mayor, solicitante_id=usuario_id)
+            db.session.add(alianza)
+        elif alianza.estado == 'pendiente' and alianza.solicitante_id != usuario_id:
+            _confirmar(alianza)  # Interés mutuo
+        db.session.commit()
+    except IntegrityError:
+        # La misma propuesta llegó dos veces a la vez: la otra ya creó la alianza.
+        db.session.rollback()
+        alianza, creada = _alianza_entre(usuario_id, destino), False
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"❌ Error al proponer la alianza {usuario_id}-{destino}: {e}")
+        return jsonify({'success': False, 'message': 'No se pudo proponer la alianza.'}), 500
+    return jsonify({'success': True, 'alianza': _alianza_dict(alianza, usuario_id, None)}), 201 if creada else 200
+
+
+def _alianza_propia(alianza_id, usuario_id):
+    alianza = db.session.get(Alianza, alianza_id)
+    if alianza is None or usuario_id not in (alianza.usuario_menor_id, alianza.usuario_mayor_id):
+        return None
+    return alianza
+
+
+@bp.route('/alianzas/<int:alianza_id>/aceptar', methods=['POST'])
+def aceptar_alianza(alianza_id):
+    """Confirma una alianza pendiente que propuso el otro usuario."""
+    usuario_id = _usuario_en_sesion()
+    if usuario_id is None:
+        return _no_autenticado()
+    alianza = _alianza_propia(alianza_id, usuario_id)
+    if alianza is None or (alianza.estado == 'pendiente' and alianza.solicitante_id == usuario_id):
+        return jsonify({'success': False, 'message': 'Alianza no encontrada.'}), 404
+    if alianza.estado == 'pendiente':
+        _confirmar(alianza)
+        db.session.commit()
+    return jsonify({'success': True, 'alianza': _alianza_dict(alianza, usuario_id, None)})
+
+
+@bp.route('/alianzas/<int:alianza_id>', methods=['DELETE'])
+def eliminar_alianza(alianza_id):
+    """Rechaza, retira o termina una alianza (cualquiera de los dos usuarios)."""
+    usuario_id = _usuario_en_sesion()
+    if usuario_id is None:
+        return _no_autenticado()
+    alianza = _alianza_propia(alianza_id, usuario_id)
+    if alianza is None:
+        return jsonify({'success': False, 'message': 'Alianza no encontrada.'}), 404
+    db.session.delete(alianza)
+    db.session.commit()
+    return jsonify({'success': True})
+
+
+@bp.cli.command('rebuild-alliances')
+def rebuild_alliances():
+    """Reconstruye el índice de aliados sugeridos."""
+    inicio = time.perf_counter()
+    total_nodos, total_aristas = construir_desde_bd()
+    print(f"✅ Índice de alianzas reconstruido: {total_nodos} nodos ({indice.tamano()['firmas']} firmas), "
+          f"{total_aristas} alianzas en {time.perf_counter() - inicio:.2f} s")
@@ -0,0 +1,297 @@
+# Pipeline de archivos estáticos.
+#
+# 'flask assets build' copia Static/ a Static/dist/ con el hash del contenido en
+# el nombre (Css/Principal.css -> Css/Principal.3f9a1c2b7e.css), genera las
+# versiones .gz y .br de los archivos de texto y derivados WebP/AVIF en varios
+# anchos de las imágenes grandes, y escribe un manifest.json.
+#
+# En ejecución, url_for('static', filename='Css/Principal.css') apunta al
+# archivo con hash si está en el manifiesto. Como su nombre cambia cuando cambia
+# el contenido, se sirve con 'Cache-Control: immutable' y un año de max-age: el
+# navegador no vuelve a pedirlo. Sin manifiesto (por ejemplo, en desarrollo)
+# todo funciona como antes con el manejador de Flask.
+#
+# Los archivos se envían con send_file sobre la ruta: con gunicorn se usa
+# sendfile() (sin copiar al espacio de usuario) y con USE_X_SENDFILE el envío
+# lo hace el proxy. Las peticiones Range (el video) se responden con 206.
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import shutil
+import time
+
+import click
+from flask import Blueprint, current_app, request, send_from_directory, url_for
+from markupsafe import Markup, escape
+
+try:
+    import brotli
+except ImportError:  # Opcional: sin brotli solo se generan y sirven las versiones gzip.
+    brotli = None
+
+
+def _pillow():
+    """Módulos de Pillow, o None si no está instalado (entonces no se generan derivados WebP/AVIF).
+
+    Se importa solo al construir: servir los estáticos no lo necesita.
+    """
+    try:
+        from PIL import Image, features
+    except ImportError:
+        return None
+    return Image, features
+
+COMPRIMIBLES = {'.css', '.js', '.svg', '.ico', '.json', '.txt', '.map', '.html'}
+IMAGENES = {'.png', '.jpg', '.jpeg'}
+FORMATOS = [('image/avif', 'avif', 'AVIF', {'quality': 55}), ('image/webp', 'webp', 'WEBP', {'quality': 80, 'method': 6})]
+URL_CSS = re.compile(r'''url\(\s*(['"]?)(?!data:|https?:|//|/)([^'")?#]+)([?#][^'")]*)?\1\s*\)''')
+
+
+def _hash(datos):
+    return hashlib.sha256(datos).hexdigest()[:10]
+
+
+def _con_hash(ruta, huella, sufijo=''):
+    base, extension = os.path.splitext(ruta)
+    return f'{base}.{huella}{sufijo}{extension}'
+
+
+def _comprimir(destino, datos):
+    """Escribe destino.gz y destino.br si ocupan menos que el original. Devuelve las codificaciones escritas."""
+    codificaciones = []
+    variantes = [('gzip', '.gz', lambda d: gzip.compress(d, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variantes.insert(0, ('br', '.br', lambda d: brotli.compress(d, quality=11)))
+    for nombre, extension, comprimir in variantes:
+        comprimido = comprimir(datos)
+        if len(comprimido) < len(datos) * 0.9:
+            with open(destino + extension, 'wb') as archivo:
+                archivo.write(comprimido)
+            codificaciones.append(nombre)
+    return codificaciones
+
+
+def _derivados(origen, relativo, huella, dist, anchos):
+    """Genera los derivados WebP/AVIF de una imagen. Devuelve {mimetype: [[archivo, ancho], ...]}."""
+    resultado = {}
+    Image, features = _pillow()
+    with Image.open(origen) as imagen:
+        imagen.load()
+        ancho_original = imagen.width
+        objetivos = sorted({a for a in anchos if a < ancho_original} | {min(ancho_original, max(anchos))})
+        for mimetype, extension, formato, opciones in FORMATOS:
+            if not features.check(extension):
+                continue
+            lista = []
+            for ancho in objetivos:
+                alto = round(imagen.height * ancho / ancho_original)
+                copia = imagen if ancho == ancho_original else imagen.resize((ancho, alto), Image.LANCZOS)
+                if formato == 'AVIF' and copia.mode not in ('RGB', 'RGBA'):
+                    copia = copia.convert('RGBA')
+                nombre = f'{os.path.splitext(_con_hash(relativo, huella, f".{ancho}w"))[0]}.{extension}'
+                os.makedirs(os.path.dirname(os.path.join(dist, nombre)), exist_ok=True)
+                copia.save(os.path.join(dist, nombre), formato, **opciones)
+                lista.append([nombre.replace(os.sep, '/'), ancho])
+            resultado[mimetype] = lista
+    return resultado, ancho_original
+
+
+def construir(estaticos, dist, anchos=(192, 480, 960, 1600), min_bytes_imagen=100 * 1024, limpiar=False):
+    """Construye dist/ a partir de la carpeta de estáticos y devuelve el manifiesto."""
+    if limpiar and os.path.isdir(dist):
+        shutil.rmtree(dist)
+    os.makedirs(dist, exist_ok=True)
+    manifiesto = {'archivos': {}, 'codificaciones': {}, 'imagenes': {}, 'generado': int(time.time())}
+    pillow = _pillow() is not None
+
+    fuentes = []
+    for raiz, carpetas, archivos in os.walk(estaticos):
+        carpetas[:] = [c for c in carpetas if os.path.join(raiz, c) != os.path.normpath(dist)]
+        for nombre in archivos:
+            ruta = os.path.join(raiz, nombre)
+            fuentes.append((ruta, os.path.relpath(ruta, estaticos).replace(os.sep, '/')))
+    # Primero lo que no es CSS: las hojas de estilo se reescriben con los nombres ya calculados.
+    fuentes.sort(key=lambda f: (f[1].lower().endswith('.css'), f[1]))
+
+    for origen, relativo in fuentes:
+        with open(origen, 'rb') as archivo:
+            datos = archivo.read()
+        extension = os.path.splitext(relativo)[1].lower()
+        if extension == '.css':
+            datos = _reescribir_css(datos, relativo, manifiesto['archivos'])
+        huella = _hash(datos)
+        destino_relativo = _con_hash(relativo, huella)
+        destino = os.path.join(dist, destino_relativo)
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        with open(destino, 'wb') as archivo:
+            archivo.write(datos)
+        manifiesto['archivos'][relativo] = destino_relativo
+
+        if extension in COMPRIMIBLES:
+            codificaciones = _comprimir(destino, datos)
+            if codificaciones:
+                manifiesto['codificaciones'][destino_relativo] = codificaciones
+        elif extension in IMAGENES and len(datos) >= min_bytes_imagen and pillow:
+            derivados, ancho = _derivados(origen, relativo, huella, dist, anchos)
+            if derivados:
+                manifiesto['imagenes'][relativo] = {'ancho': ancho, 'fuentes': derivados}
+
+    with open(os.path.join(dist, 'manifest.json'), 'w', encoding='utf-8') as archivo:
+        json.dump(manifiesto, archivo, ensure_ascii=False, indent=1, sort_keys=True)
+    return manifiesto
+
+
+def _reescribir_css(datos, relativo, archivos):
+    """Cambia las url() relativas de una hoja de estilo por los nombres con hash."""
+    carpeta = os.path.dirname(relativo)
+
+    def reemplazar(coincidencia):
+        comilla, ruta, resto = coincidencia.group(1), coincidencia.group(2), coincidencia.group(3) or ''
+        objetivo = os.path.normpath(os.path.join(carpeta, ruta)).replace(os.sep, '/')
+        if objetivo not in archivos:
+            return coincidencia.group(0)
+        nueva = os.path.relpath(archivos[objetivo], carpeta).replace(os.sep, '/')
+        return f'url({comilla}{nueva}{resto}{comilla})'
+
+    texto = datos.decode('utf-8')
+    return URL_CSS.sub(reemplazar, texto).encode('utf-8')
+
+
+class AssetPipeline:
+    """Sirve los estáticos con hash de Static/dist y reescribe url_for('static', ...).
+
+    Se configura con app.config:
+        ASSETS_ENABLED         Si es False se ignora el manifiesto (por defecto True).
+        ASSETS_DIST            Carpeta de salida, relativa a la de estáticos (por defecto 'dist').
+        ASSETS_MAX_AGE         max-age de los archivos con hash (por defecto un año).
+        ASSETS_IMAGE_WIDTHS    Anchos de los derivados WebP/AVIF (por defecto 192, 480, 960, 1600).
+        ASSETS_IMAGE_MIN_BYTES Solo se generan derivados de imágenes de al menos este tamaño (100 KB).
+    """
+
+    def __init__(self, app=None):
+        self.manifiesto = None
+        self._inmutables = set()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('ASSETS_ENABLED', True)
+        app.config.setdefault('ASSETS_DIST', 'dist')
+        app.config.setdefault('ASSETS_MAX_AGE', 365 * 24 * 3600)
+        app.config.setdefault('ASSETS_IMAGE_WIDTHS', (192, 480, 960, 1600))
+        app.config.setdefault('ASSETS_IMAGE_MIN_BYTES', 100 * 1024)
+        app.extensions['assets'] = self
+        self.cargar(app)
+        app.url_defaults(self._url_defaults)
+        app.view_functions['static'] = self._servir_static
+        app.jinja_env.globals['asset_picture'] = self.picture
+        app.register_blueprint(bp)
+
+    def dist(self, app):
+        return os.path.join(app.static_folder, app.config['ASSETS_DIST'])
+
+    def cargar(self, app):
+        """Lee el manifiesto si existe; sin él se usan los archivos originales."""
+        ruta = os.path.join(self.dist(app), 'manifest.json')
+        self.manifiesto = None
+        if app.config['ASSETS_ENABLED'] and os.path.exists(ruta):
+            with open(ruta, encoding='utf-8') as archivo:
+                self.manifiesto = json.load(archivo)
+            self._inmutables = set(self.manifiesto['archivos'].values()) | {
+                fuente for imagen in self.manifiesto['imagenes'].values()
+                for lista in imagen['fuentes'].values() for fuente, _ in lista
+            }
+        if 'page_cache' in app.extensions:
+            app.extensions['page_cache'].clear()  # Las páginas guardadas tienen las URL anteriores.
+
+    def url(self, filename):
+        """Ruta (relativa a la carpeta de estáticos) con la que se debe pedir el archivo."""
+        if self.manifiesto is None:
+            return filename
+        hashed = self.manifiesto['archivos'].get(filename)
+        if hashed is None:
+            return filename
+        return f"{current_app.config['ASSETS_DIST']}/{hashed}"
+
+    def _url_defaults(self, endpoint, values):
+        if endpoint == 'static' and self.manifiesto is not None and 'filename' in values:
+            values['filename'] = self.url(values['filename'])
+
+    def picture(self, filename, alt='', **atributos):
+        """<picture> con fuentes AVIF/WebP en varios anchos y el <img> original como respaldo.
+
+        En las plantillas: {{ asset_picture('Img/Paramo.png', alt='Páramo', class_='cascadas') }}
+        ('class_' se escribe como 'class').
+        """
+        atributos.setdefault('loading', 'lazy')
+        atributos.setdefault('decoding', 'async')
+        sizes = atributos.pop('sizes', '100vw')
+        img_atributos = ''.join(
+            f' {escape(clave.rstrip("_").replace("_", "-"))}="{escape(valor)}"' for clave, valor in atributos.items()
+        )
+        img = f'<img src="{escape(url_for("static", filename=filename))}" alt="{escape(alt)}"{img_atributos}>'
+        imagen = (self.manifiesto or {}).get('imagenes', {}).get(filename)
+        if imagen is None:
+            return Markup(img)
+        dist = current_app.config['ASSETS_DIST']
+        fuentes = ''.join(
+            f'<source type="{tipo}" sizes="{escape(sizes)}" srcset="'
+            + ', '.join(f'{escape(url_for("static", filename=f"{dist}/{archivo}"))} {ancho}w' for archivo, ancho in lista)
+            + '">'
+            for tipo, lista in imagen['fuentes'].items()
+        )
+        return Markup(f'<picture>{fuentes}{img}</picture>')
+
+    def _servir_static(self, filename):
+        app = current_app
+        prefijo = app.config['ASSETS_DIST'] + '/'
+        if self.manifiesto is None or not filename.startswith(prefijo) or filename[len(prefijo):] not in self._inmutables:
+            return app.send_static_file(filename)
+
+        nombre = filename[len(prefijo):]
+        mimetype = mimetypes.guess_type(nombre)[0] or 'application/octet-stream'
+        codificacion = None
+        for disponible in self.manifiesto['codificaciones'].get(nombre, ()):
+            if request.accept_encodings[disponible]:
+                codificacion = disponible
+                break
+        archivo = nombre + {'br': '.br', 'gzip': '.gz'}[codificacion] if codificacion else nombre
+        respuesta = send_from_directory(self.dist(app), archivo, mimetype=mimetype, conditional=True,
+                                        max_age=app.config['ASSETS_MAX_AGE'])
+        if codificacion:
+            respuesta.headers['Content-Encoding'] = codificacion
+        if nombre in self.manifiesto['codificaciones']:
+            respuesta.headers['Vary'] = 'Accept-Encoding'
+        respuesta.cache_control.public = True
+        respuesta.cache_control.immutable = True
+        return respuesta
+
+
+assets = AssetPipeline()
+
+bp = Blueprint('assets', __name__, cli_group='assets')
+
+
+@bp.cli.command('build')
+@click.option('--limpiar', is_flag=True, help='Borra dist/ antes (por defecto se conservan los archivos de versiones anteriores).')
+def build(limpiar):
+    """Genera Static/dist con nombres con hash, versiones comprimidas y derivados de imágenes.
+
+    Los servidores leen el manifiesto al arrancar: hay que reiniciarlos después de construir.
+    """
+    app = current_app
+    inicio = time.perf_counter()
+    dist = assets.dist(app)
+    manifiesto = construir(app.static_folder, dist, anchos=app.config['ASSETS_IMAGE_WIDTHS'],
+                           min_bytes_imagen=app.config['ASSETS_IMAGE_MIN_BYTES'], limpiar=limpiar)
+    assets.cargar(app)
+    if brotli is None:
+        click.echo('⚠️  Paquete "brotli" no instalado: solo se generaron versiones gzip.')
+    if _pillow() is None:
+        click.echo('⚠️  Pillow no instalado: no se generaron derivados WebP/AVIF.')
+    click.echo(f"✅ {len(manifiesto['archivos'])} archivos, {len(manifiesto['codificaciones'])} comprimidos, "
+               f"{len(manifiesto['imagenes'])} imágenes con derivados en {dist} "
+               f"({time.perf_counter() - inicio:.1f} s)")
@@ -0,0 +1,30 @@
+# Comprobación de administrador compartida por las rutas de administración
+# (/admin/...) y las de estadísticas internas (/db/stats, /mail/stats...).
+#
+# Un administrador es un usuario con is_admin en la base de datos; se consulta
+# en cada petición para que quitar el permiso tenga efecto sin cerrar la sesión.
+from functools import wraps
+
+from flask import jsonify, session
+from sqlalchemy import select
+
+from extensions import db
+from models import Usuario
+
+
+def es_admin():
+    """True si el usuario de la sesión es administrador."""
+    usuario_id = session.get('user_id')
+    if usuario_id is None:
+        return False
+    return bool(db.session.execute(select(Usuario.is_admin).where(Usuario.id == usuario_id)).scalar())
+
+
+def solo_admin(vista):
+    """Responde 403 a quien no sea administrador."""
+    @wraps(vista)
+    def envoltura(*args, **kwargs):
+        if not es_admin():
+            return jsonify({'success': False, 'message': 'Solo los administradores pueden ver estas estadísticas.'}), 403
+        return vista(*args, **kwargs)
+    return envoltura
@@ -0,0 +1,497 @@
+# Convocatorias: catálogo con criterios de elegibilidad y postulaciones de los empresarios.
+#
+# El listado (/convocatorias) es igual para todos los que piden los mismos
+# filtros, así que se sirve desde una caché de lectura por proceso: la primera
+# petición de cada (filtros, cursor) consulta la base de datos y guarda el JSON
+# ya serializado; las siguientes lo devuelven sin tocarla. Cada entrada lleva la
+# versión del catálogo (fila 'convocatorias' de versiones_cache), que se
+# incrementa en la misma transacción que cualquier cambio visible en el listado:
+# publicar, cerrar o agotar los cupos. Los workers releen la versión como mucho
+# cada CONVOCATORIAS_VERSION_TTL segundos (el que hace el cambio, enseguida); al
+# cambiar, las entradas anteriores dejan de usarse y salen por LRU. Una entrada
+# caduca además con la fecha de cierre más próxima de sus convocatorias, que
+# dejan el listado sin que nadie toque la tabla.
+#
+# Las postulaciones no cambian la versión (el listado no muestra contadores), así
+# que escribirlas no vacía la caché; solo la que agota los cupos lo hace.
+#
+# El listado se pagina por cursor (?antes=<id>) con el índice (estado, id).
+# Filtros: ?tamano=, ?sector= (repetible: basta con que coincida uno) y ?q=
+# (texto en el título o la descripción). Una convocatoria sin criterios de un
+# campo admite cualquier valor de ese campo.
+#
+# La postulación es idempotente: hay una por empresario y convocatoria (UNIQUE) y
+# el navegador envía un Idempotency-Key por formulario; el reintento con la misma
+# clave (doble clic, red caída) devuelve la postulación ya creada con 200.
+#
+# Al borrar usuarios, ON DELETE CASCADE elimina sus postulaciones sin pasar por
+# aquí: flask delete-user y los borrados de administracion.py llaman antes a
+# liberar_cupos() en la misma transacción para descontarlas del contador.
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+import click
+from flask import Blueprint, current_app, jsonify, request, session
+from sqlalchemy import exists, func, or_, select, update
+from sqlalchemy.exc import IntegrityError
+
+from autorizacion import solo_admin
+from extensions import db
+from models import Convocatoria, ConvocatoriaCriterio, Empresario, Postulacion, VersionCache
+
+logger = logging.getLogger(__name__)
+
+VERSION = 'convocatorias'  # Fila de versiones_cache
+TAMANOS = ('pequena', 'mediana', 'grande')
+CAMPOS_CRITERIO = ('tamano', 'sector')
+MAX_SECTORES_FILTRO = 10
+
+
+class ConvocatoriaNoDisponible(Exception):
+    """La convocatoria está cerrada, venció o no le quedan cupos."""
+
+
+class NoElegible(Exception):
+    """El empresario no cumple los criterios de la convocatoria."""
+
+
+class PostulacionDuplicada(Exception):
+    """El empresario ya se postuló a la convocatoria con otra clave de idempotencia (o sin ella)."""
+
+    def __init__(self, postulacion):
+        super().__init__(postulacion.id)
+        self.postulacion = postulacion
+
+
+# --- Versión del catálogo ---
+
+def leer_version():
+    return db.session.execute(select(VersionCache.version).where(VersionCache.nombre == VERSION)).scalar() or 0
+
+
+def incrementar_version():
+    """Invalida el listado cacheado en todos los workers. No hace commit: va en la transacción del cambio."""
+    resultado = db.session.execute(
+        update(VersionCache).where(VersionCache.nombre == VERSION).values(version=VersionCache.version + 1),
+        execution_options={'synchronize_session': False})
+    if not resultado.rowcount:
+        db.session.add(VersionCache(nombre=VERSION, version=1))
+        db.session.flush()
+
+
+class CacheListado:
+    """Páginas del listado ya serializadas, por (versión, filtros, cursor), con desalojo LRU."""
+
+    def __init__(self, max_entradas=1000, ttl_version=1.0):
+        self.max_entradas = max_entradas
+        self.ttl_version = ttl_version
+        self._lock = threading.Lock()
+        self._entradas = OrderedDict()  # (versión, clave) -> (valida_hasta, cuerpo)
+        self._version = None
+        self._version_leida = 0.0
+        self._stats = {'hits': 0, 'misses': 0, 'caducadas': 0, 'versiones': 0}
+
+    def version(self):
+        """Versión del catálogo; se lee de la base de datos como mucho cada ttl_version segundos."""
+        ahora = time.monotonic()
+        if self._version is None or ahora - self._version_leida >= self.ttl_version:
+            version = leer_version()
+            with self._lock:
+                if version != self._version:
+                    self._stats['versiones'] += 1
+                self._version, self._version_leida = version, ahora
+        return self._version
+
+    def olvidar_version(self):
+        """La próxima petición relee la versión (tras un cambio hecho en este proceso)."""
+        self._version = None
+
+    def obtener(self, clave, calcular):
+        """Cuerpo cacheado para la clave; si falta o caducó, calcular() -> (cuerpo, valida_hasta)."""
+        llave = (self.version(), clave)
+        with self._lock:
+            entrada = self._entradas.get(llave)
+            if entrada is not None:
+                if entrada[0] is None or entrada[0] > datetime.utcnow():
+                    self._entradas.move_to_end(llave)
+                    self._stats['hits'] += 1
+                    return entrada[1]
+                self._stats['caducadas'] += 1
+            self._stats['misses'] += 1
+        cuerpo, valida_hasta = calcular()
+        with self._lock:
+            self._entradas[llave] = (valida_hasta, cuerpo)
+            self._entradas.move_to_end(llave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+        return cuerpo
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+            self._version = None
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, entradas=len(self._entradas), version=self._version)
+
+
+cache = CacheListado()
+
+
+# --- Consultas ---
+
+def abiertas(ahora):
+    """Condiciones de una convocatoria abierta: publicada, sin vencer y con cupos."""
+    return [
+        Convocatoria.estado == 'publicada',
+        or_(Convocatoria.fecha_cierre.is_(None), Convocatoria.fecha_cierre > ahora),
+        or_(Convocatoria.cupos.is_(None), Convocatoria.postulaciones < Convocatoria.cupos),
+    ]
+
+
+def _admite(campo, valores):
+    # Sin criterios del campo se admite cualquier valor; los dos EXISTS usan la PK de los criterios.
+    criterio = ConvocatoriaCriterio
+    return or_(
+        ~exists().where(criterio.convocatoria_id == Convocatoria.id, criterio.campo == campo),
+        exists().where(criterio.convocatoria_id == Convocatoria.id, criterio.campo == campo,
+                       criterio.valor.in_(valores)),
+    )
+
+
+def pagina(tamano=None, sectores=(), texto=None, antes=None, limite=20, ahora=None):
+    """Convocatorias abiertas, de la más reciente a la más antigua, por cursor. Devuelve (filas, cursor)."""
+    consulta = select(Convocatoria).where(*abiertas(ahora or datetime.utcnow()))
+    if tamano:
+        consulta = consulta.where(_admite('tamano', [tamano]))
+    if sectores:
+        consulta = consulta.where(_admite('sector', list(sectores)))
+    if texto:
+        consulta = consulta.where(or_(func.lower(Convocatoria.titulo).contains(texto, autoescape=True),
+                                      func.lower(Convocatoria.descripcion).contains(texto, autoescape=True)))
+    if antes is not None:
+        consulta = consulta.where(Convocatoria.id < antes)
+    filas = db.session.execute(consulta.order_by(Convocatoria.id.desc()).limit(limite + 1)).scalars().all()
+    hay_mas = len(filas) > limite
+    filas = filas[:limite]
+    return filas, (filas[-1].id if hay_mas and filas else None)
+
+
+def convocatoria_dict(convocatoria):
+    return {
+        'id': convocatoria.id,
+        'titulo': convocatoria.titulo,
+        'descripcion': convocatoria.descripcion,
+        'entidad': convocatoria.entidad,
+        'financiacion': convocatoria.financiacion,
+        'requisitos': [r.strip() for r in (convocatoria.requisitos or '').splitlines() if r.strip()],
+        'destacada': convocatoria.destacada,
+        'fecha_cierre': convocatoria.fecha_cierre.isoformat() if convocatoria.fecha_cierre else None,
+        'cupos': convocatoria.cupos,
+        'criterios': {campo: sorted(c.valor for c in convocatoria.criterios if c.campo == campo)
+                      for campo in CAMPOS_CRITERIO},
+    }
+
+
+def postulacion_dict(postulacion):
+    return {
+        'id': postulacion.id,
+        'convocatoria_id': postulacion.convocatoria_id,
+        'nombre_proyecto': postulacion.nombre_proyecto,
+        'descripcion': postulacion.descripcion,
+        'fecha': postulacion.fecha.isoformat(),
+    }
+
+
+def _pagina_json(tamano, sectores, texto, antes, limite):
+    filas, cursor = pagina(tamano, sectores, texto, antes, limite)
+    cuerpo = json.dumps({'success': True, 'convocatorias': [convocatoria_dict(c) for c in filas],
+                         'siguiente': cursor}, ensure_ascii=False).encode()
+    # La página cambia cuando vence la primera de sus convocatorias.
+    return cuerpo, min((c.fecha_cierre for c in filas if c.fecha_cierre), default=None)
+
+
+# --- Postulaciones ---
+
+def sectores_de(empresario):
+    return {empresario.sector_produccion, empresario.sector_transformacion, empresario.sector_comercializacion}
+
+
+def es_elegible(convocatoria, empresario):
+    valores = {'tamano': {empresario.tamano}, 'sector': sectores_de(empresario)}
+    for campo in CAMPOS_CRITERIO:
+        admitidos = {c.valor for c in convocatoria.criterios if c.campo == campo}
+        if admitidos and not admitidos & valores[campo]:
+            return False
+    return True
+
+
+def _postulacion_de(convocatoria_id, empresario_id):
+    return db.session.execute(
+        select(Postulacion).where(Postulacion.convocatoria_id == convocatoria_id,
+                                  Postulacion.empresario_id == empresario_id)
+    ).scalars().first()
+
+
+def _repetida(postulacion, clave):
+    if clave and postulacion.clave_idempotencia == clave:
+        return postulacion, False
+    raise PostulacionDuplicada(postulacion)
+
+
+def postular(convocatoria, empresario, nombre_proyecto, descripcion, clave=None):
+    """Crea la postulación y ocupa un cupo en una transacción, con su commit.
+
+    Devuelve (postulación, creada). Un reintento con la misma clave devuelve la
+    postulación existente con creada=False, también si los dos envíos llegan a
+    la vez: el segundo INSERT choca con la restricción única.
+    """
+    existente = _postulacion_de(convocatoria.id, empresario.id)
+    if existente is not None:
+        return _repetida(existente, clave)
+    if not es_elegible(convocatoria, empresario):
+        raise NoElegible()
+
+    postulacion = Postulacion(convocatoria_id=convocatoria.id, empresario_id=empresario.id,
+                              nombre_proyecto=nombre_proyecto, descripcion=descripcion, clave_idempotencia=clave)
+    db.session.add(postulacion)
+    try:
+        db.session.flush()
+    except IntegrityError:
+        db.session.rollback()
+        existente = _postulacion_de(convocatoria.id, empresario.id)
+        if existente is None:
+            # No chocó con otra postulación sino con una clave foránea: la convocatoria
+            # (o el empresario) se borró entre la lectura y el INSERT.
+            raise ConvocatoriaNoDisponible()
+        return _repetida(existente, clave)
+
+    # El cupo se ocupa solo si la convocatoria sigue abierta; la fila queda bloqueada hasta el commit.
+    ocupado = db.session.execute(
+        update(Convocatoria).where(Convocatoria.id == convocatoria.id, *abiertas(datetime.utcnow()))
+        .values(postulaciones=Convocatoria.postulaciones + 1),
+        execution_options={'synchronize_session': False})
+    if not ocupado.rowcount:
+        db.session.rollback()
+        raise ConvocatoriaNoDisponible()
+    agotada = convocatoria.cupos is not None and db.session.execute(
+        select(Convocatoria.postulaciones).where(Convocatoria.id == convocatoria.id)).scalar() >= convocatoria.cupos
+    if agotada:
+        incrementar_version()  # Sin cupos sale del listado.
+    db.session.commit()
+    if agotada:
+        cache.olvidar_version()
+    return postulacion, True
+
+
+def liberar_cupos(usuario_ids):
+    """Descuenta las postulaciones de estos usuarios, que su borrado elimina en cascada. No hace commit.
+
+    Se llama en la misma transacción y antes del DELETE de los usuarios. Si
+    alguna convocatoria estaba agotada, vuelve al listado.
+    """
+    if not usuario_ids:
+        return
+    por_convocatoria = db.session.execute(
+        select(Postulacion.convocatoria_id, func.count())
+        .join(Empresario, Empresario.id == Postulacion.empresario_id)
+        .where(Empresario.usuario_id.in_(usuario_ids))
+        .group_by(Postulacion.convocatoria_id)).all()
+    if not por_convocatoria:
+        return
+    agotadas = db.session.execute(
+        select(func.count()).where(Convocatoria.id.in_([c for c, _ in por_convocatoria]),
+                                   Convocatoria.postulaciones >= Convocatoria.cupos)).scalar()
+    for convocatoria_id, total in por_convocatoria:
+        db.session.execute(
+            update(Convocatoria).where(Convocatoria.id == convocatoria_id)
+            .values(postulaciones=Convocatoria.postulaciones - total),
+            execution_options={'synchronize_session': False})
+    if agotadas:
+        incrementar_version()  # Con cupos libres vuelve al listado.
+
+
+def publicar(convocatoria):
+    """No hace commit; la versión del catálogo cambia en la misma transacción."""
+    convocatoria.estado = 'publicada'
+    convocatoria.fecha_publicacion = datetime.utcnow()
+    incrementar_version()
+
+
+def cerrar(convocatoria):
+    """No hace commit; la versión del catálogo cambia en la misma transacción."""
+    convocatoria.estado = 'cerrada'
+    incrementar_version()
+
+
+# --- Integración con Flask ---
+
+bp = Blueprint('convocatorias', __name__, cli_group=None)
+
+
+def init_app(app):
+    """Configura la caché del listado y registra las rutas y comandos de convocatorias."""
+    app.config.setdefault('CONVOCATORIAS_POR_PAGINA', 20)
+    app.config.setdefault('CONVOCATORIAS_MAX_POR_PAGINA', 50)
+    app.config.setdefault('CONVOCATORIAS_CACHE_ENABLED', True)
+    app.config.setdefault('CONVOCATORIAS_CACHE_MAX_ENTRADAS', 1000)
+    app.config.setdefault('CONVOCATORIAS_VERSION_TTL', 1.0)
+    app.config.setdefault('CONVOCATORIAS_MAX_DESCRIPCION', 4000)
+    cache.max_entradas = app.config['CONVOCATORIAS_CACHE_MAX_ENTRADAS']
+    cache.ttl_version = app.config['CONVOCATORIAS_VERSION_TTL']
+    app.register_blueprint(bp)
+
+
+def _empresario_en_sesion():
+    if session.get('user_profile') != 'empresario' or 'user_id' not in session:
+        return None
+    return db.session.execute(
+        db.select(Empresario).where(Empresario.usuario_id == session['user_id'])
+    ).scalars().first()
+
+
+def _limite():
+    por_defecto = current_app.config['CONVOCATORIAS_POR_PAGINA']
+    return max(1, min(request.args.get('limite', por_defecto, type=int),
+                      current_app.config['CONVOCATORIAS_MAX_POR_PAGINA']))
+
+
+@bp.route('/convocatorias')
+def listar_convocatorias():
+    """Convocatorias abiertas: ?tamano=&sector=&sector=&q=&antes=<id>&limite=N"""
+    tamano = request.args.get('tamano') or None
+    sectores = tuple(sorted({s for s in request.args.getlist('sector') if s}))
+    if (tamano and tamano not in TAMANOS) or len(sectores) > MAX_SECTORES_FILTRO:
+        return jsonify({'success': False, 'message': 'Filtros no válidos.'}), 400
+    texto = (request.args.get('q') or '').strip().lower()[:100] or None
+    clave = (tamano, sectores, texto, request.args.get('antes', type=int), _limite())
+
+    if current_app.config['CONVOCATORIAS_CACHE_ENABLED']:
+        cuerpo = cache.obtener(clave, lambda: _pagina_json(*clave))
+    else:
+        cuerpo, _ = _pagina_json(*clave)
+    return current_app.response_class(cuerpo, mimetype='application/json')
+
+
+@bp.route('/convocatorias/mis-postulaciones')
+def mis_postulaciones():
+    """Tamaño y sectores del empresario (para filtrar las elegibles) e ids de las convocatorias a las que se postuló."""
+    empresario = _empresario_en_sesion()
+    if empresario is None:
+        return jsonify({'success': False, 'message': 'Debe iniciar sesión como empresario.'}), 401
+    postuladas = db.session.execute(
+        select(Postulacion.convocatoria_id).where(Postulacion.empresario_id == empresario.id)
+    ).scalars().all()
+    return jsonify({'success': True, 'tamano': empresario.tamano, 'sectores': sorted(sectores_de(empresario)),
+                    'postuladas': postuladas})
+
+
+@bp.route('/convocatorias/<int:convocatoria_id>/postulaciones', methods=['POST'])
+def crear_postulacion(convocatoria_id):
+    """Postula al empresario ({'nombre_proyecto', 'descripcion'}); repetir el Idempotency-Key devuelve la misma."""
+    empresario = _empresario_en_sesion()
+    if empresario is None:
+        return jsonify({'success': False, 'message': 'Debe iniciar sesión como empresario.'}), 401
+    convocatoria = db.session.get(Convocatoria, convocatoria_id)
+    if convocatoria is None or convocatoria.estado == 'borrador':
+        return jsonify({'success': False, 'message': 'Convocatoria no encontrada.'}), 404
+
+    datos = request.get_json(silent=True) or {}
+    nombre_proyecto = (datos.get('nombre_proyecto') or '').strip()
+    descripcion = (datos.get('descripcion') or '').strip()
+    clave = request.headers.get('Idempotency-Key', '').strip() or None
+    if not nombre_proyecto or len(nombre_proyecto) > 150 or not descripcion \
+            or len(descripcion) > current_app.config['CONVOCATORIAS_MAX_DESCRIPCION']:
+        return jsonify({'success': False, 'message': 'Indique el nombre y una descripción breve del proyecto.'}), 400
+    if clave and len(clave) > 64:
+        return jsonify({'success': False, 'message': 'Idempotency-Key demasiado larga.'}), 400
+
+    try:
+        postulacion, creada = postular(convocatoria, empresario, nombre_proyecto, descripcion, clave)
+    except NoElegible:
+        return jsonify({'success': False, 'message': 'Tu empresa no cumple los criterios de esta convocatoria.'}), 403
+    except ConvocatoriaNoDisponible:
+        return jsonify({'success': False, 'message': 'La convocatoria está cerrada o ya no tiene cupos.'}), 409
+    except PostulacionDuplicada as e:
+        return jsonify({'success': False, 'message': 'Ya te postulaste a esta convocatoria.',
+                        'postulacion': postulacion_dict(e.postulacion)}), 409
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"❌ Error al postular al empresario {empresario.id} a la convocatoria {convocatoria_id}: {e}")
+        return jsonify({'success': False, 'message': 'No se pudo enviar la postulación.'}), 500
+
+    if creada:
+        logger.info(f"✅ Postulación {postulacion.id} del empresario {empresario.id} a la convocatoria {convocatoria_id}")
+    return jsonify({'success': True, 'message': 'Postulación enviada.', 'postulacion': postulacion_dict(postulacion)}), \
+        201 if creada else 200
+
+
+@bp.route('/convocatorias/cache/stats')
+@solo_admin
+def cache_stats():
+    """Aciertos, fallos y entradas de la caché del listado en este worker."""
+    return jsonify(cache.stats())
+
+
+# --- Comandos CLI ---
+
+@bp.cli.command('create-convocatoria')
+@click.option('--titulo', required=True)
+@click.option('--descripcion', required=True)
+@click.option('--entidad')
+@click.option('--financiacion', help="Texto libre, p. ej. 'Financiación 100%'.")
+@click.option('--requisito', 'requisitos', multiple=True, help='Documento requerido (repetible).')
+@click.option('--cierre', type=click.DateTime(formats=['%Y-%m-%d']),
+              help='Último día para postularse (AAAA-MM-DD); sin él, abierta todo el año.')
+@click.option('--cupos', type=click.IntRange(min=1), help='Máximo de postulaciones.')
+@click.option('--tamano', 'tamanos', multiple=True, type=click.Choice(TAMANOS), help='Tamaño admitido (repetible).')
+@click.option('--sector', 'sectores', multiple=True, help='Sector admitido (repetible).')
+@click.option('--destacada', is_flag=True)
+@click.option('--publicar', 'publicada', is_flag=True, help='La publica enseguida en lugar de dejarla en borrador.')
+def create_convocatoria(requisitos, cierre, tamanos, sectores, publicada, **datos):
+    """Crea una convocatoria (en borrador, salvo con --publicar)."""
+    convocatoria = Convocatoria(
+        requisitos='\n'.join(requisitos) or None,
+        fecha_cierre=cierre + timedelta(days=1, microseconds=-1) if cierre else None,
+        criterios=[ConvocatoriaCriterio(campo='tamano', valor=v) for v in dict.fromkeys(tamanos)]
+                  + [ConvocatoriaCriterio(campo='sector', valor=v) for v in dict.fromkeys(sectores)],
+        **datos)
+    db.session.add(convocatoria)
+    if publicada:
+        publicar(convocatoria)
+    db.session.commit()
+    cache.olvidar_version()
+    print(f"✅ Convocatoria {convocatoria.id} creada ({convocatoria.estado}).")
+
+
+def _cambiar_estado(convocatoria_id, cambio, desde):
+    convocatoria = db.session.get(Convocatoria, convocatoria_id)
+    if convocatoria is None:
+        print(f'❌ No existe la convocatoria {convocatoria_id}.')
+        return
+    if convocatoria.estado not in desde:
+        print(f'❌ La convocatoria {convocatoria_id} está {convocatoria.estado}.')
+        return
+    cambio(convocatoria)
+    db.session.commit()
+    cache.olvidar_version()
+    print(f'✅ Convocatoria {convocatoria_id} {convocatoria.estado}.')
+
+
+@bp.cli.command('publish-convocatoria')
+@click.argument('convocatoria_id', type=int)
+def publish_convocatoria(convocatoria_id):
+    """Publica una convocatoria en borrador (o reabre una cerrada)."""
+    _cambiar_estado(convocatoria_id, publicar, ('borrador', 'cerrada'))
+
+
+@bp.cli.command('close-convocatoria')
+@click.argument('convocatoria_id', type=int)
+def close_convocatoria(convocatoria_id):
+    """Cierra una convocatoria publicada: deja de aparecer en el listado y de admitir postulaciones."""
+    _cambiar_estado(convocatoria_id, cerrar, ('publicada',))
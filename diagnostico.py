@@ -0,0 +1,363 @@
+# Diagnóstico del empresario: persistencia, puntajes y comparación con el sector.
+#
+# El navegador envía el cuestionario completo en un solo POST; se guarda en una
+# transacción (envío + respuestas + puntajes con inserciones masivas) y en la
+# misma transacción se actualiza el histograma de puntajes del grupo de
+# comparación (sector_produccion, tamano). La vista de comparación calcula los
+# percentiles a partir del histograma (como mucho 101 cubetas por sección), sin
+# recorrer los envíos. Del histograma solo forma parte el último envío de cada
+# empresario: al reenviar, las cubetas del envío anterior se descuentan, y al
+# borrar usuarios restar_bajas() descuenta las de su último envío antes de que
+# el DELETE se lleve los envíos en cascada. Los envíos de un empresario se
+# serializan con SELECT ... FOR UPDATE sobre su fila. 'flask
+# rebuild-diagnostic-benchmarks' recalcula el histograma desde los envíos.
+import logging
+
+from flask import Blueprint, jsonify, request, session
+from sqlalchemy import insert
+
+from extensions import db
+from models import (
+    DiagnosticoEnvio, DiagnosticoHistograma, DiagnosticoPuntaje, DiagnosticoRespuesta, Empresario,
+)
+
+logger = logging.getLogger(__name__)
+
+# --- Catálogo de preguntas (debe coincidir con Empresario-diagnostico.html) ---
+
+ETAPAS_CADENA = {
+    'produccion': ['licencias', 'exploracion', 'perforacion', 'voladura', 'remocion', 'proveedores',
+                   'extractivas', 'maquinaria', 'servicios', 'instrumentos', 'seguridad'],
+    'transformacion': ['extraccion_trans', 'triturado', 'lavado', 'secado', 'clasificacion', 'acopio',
+                       'cargue', 'puertos', 'industrializacion', 'recuperacion', 'desechos'],
+    'comercializacion': ['mercadeo', 'laboratorio', 'minoristas', 'mayoristas', 'exportadores', 'usos'],
+}
+
+# Categoría de competitividad -> prefijo de sus cinco preguntas ('maq1' ... 'maq5').
+PREFIJOS_COMPETITIVIDAD = {
+    'maquinaria': 'maq', 'propiedad': 'prop', 'investigacion': 'inv', 'innovacion': 'inn', 'asistencia': 'asis',
+    'oferta': 'oferta', 'canales': 'canales', 'valoracion': 'valoracion', 'verdes': 'verdes',
+    'inteligencia': 'inteligencia', 'formacion': 'formacion', 'alianzas': 'alianzas', 'gremios': 'gremios',
+    'estimulo': 'estimulo',
+}
+CATEGORIAS_COMPETITIVIDAD = {
+    categoria: [f'{prefijo}{n}' for n in range(1, 6)] for categoria, prefijo in PREFIJOS_COMPETITIVIDAD.items()
+}
+GRUPOS_COMPETITIVIDAD = {
+    'tecnologia': ['maquinaria', 'propiedad', 'investigacion', 'innovacion', 'asistencia'],
+    'comercial': ['oferta', 'canales', 'valoracion', 'verdes', 'inteligencia'],
+    'fortalecimiento': ['formacion', 'alianzas', 'gremios', 'estimulo'],
+}
+
+# Cuestionario -> (secciones con sus preguntas, grupos de secciones).
+CUESTIONARIOS = {
+    'cadena_valor': (ETAPAS_CADENA, {}),
+    'competitividad': (CATEGORIAS_COMPETITIVIDAD, GRUPOS_COMPETITIVIDAD),
+}
+SECCION_TOTAL = 'total'
+
+VALORES = {'si': True, 'no': False, True: True, False: False, 1: True, 0: False}
+
+
+def preguntas(cuestionario):
+    secciones, _ = CUESTIONARIOS[cuestionario]
+    return [pregunta for lista in secciones.values() for pregunta in lista]
+
+
+def validar_respuestas(cuestionario, datos):
+    """Convierte {'pregunta': 'si'|'no'} en {'pregunta': bool}.
+
+    Devuelve (respuestas, errores); el cuestionario debe venir completo.
+    """
+    if not isinstance(datos, dict):
+        return None, ['Las respuestas deben ser un objeto {pregunta: "si" | "no"}.']
+    esperadas = preguntas(cuestionario)
+    errores = []
+    faltantes = [p for p in esperadas if p not in datos]
+    if faltantes:
+        errores.append(f"Faltan respuestas: {', '.join(faltantes)}")
+    desconocidas = sorted(set(datos) - set(esperadas))
+    if desconocidas:
+        errores.append(f"Preguntas desconocidas: {', '.join(desconocidas)}")
+    respuestas = {}
+    for pregunta in esperadas:
+        if pregunta not in datos:
+            continue
+        valor = datos[pregunta]
+        clave = valor.strip().lower() if isinstance(valor, str) else valor
+        if isinstance(clave, (str, bool, int)) and clave in VALORES:
+            respuestas[pregunta] = VALORES[clave]
+        else:
+            errores.append(f'Valor inválido para {pregunta}: {valor!r}')
+    return respuestas, errores
+
+
+def calcular_puntajes(cuestionario, respuestas):
+    """Puntaje 0-100 (porcentaje de respuestas 'Sí') por sección, por grupo y total."""
+    secciones, grupos = CUESTIONARIOS[cuestionario]
+
+    def porcentaje(lista):
+        return round(100 * sum(respuestas[p] for p in lista) / len(lista), 2)
+
+    puntajes = {seccion: porcentaje(lista) for seccion, lista in secciones.items()}
+    for grupo, miembros in grupos.items():
+        puntajes[grupo] = porcentaje([p for seccion in miembros for p in secciones[seccion]])
+    puntajes[SECCION_TOTAL] = porcentaje(preguntas(cuestionario))
+    return puntajes
+
+
+def bucket(puntaje):
+    return min(100, max(0, int(round(puntaje))))
+
+
+# --- Histograma del sector ---
+
+def _upsert_histograma(deltas):
+    """Suma los deltas {(cuestionario, sector, tamano, seccion, bucket): n} al histograma."""
+    if not deltas:
+        return
+    filas = [
+        {'cuestionario': c, 'sector_produccion': s, 'tamano': t, 'seccion': sec, 'bucket': b, 'total': n}
+        for (c, s, t, sec, b), n in deltas.items() if n
+    ]
+    if not filas:
+        return
+    tabla = DiagnosticoHistograma.__table__
+    dialecto = db.session.get_bind().dialect.name
+    if dialecto in ('sqlite', 'postgresql'):
+        if dialecto == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert as insert_dialecto
+        else:
+            from sqlalchemy.dialects.postgresql import insert as insert_dialecto
+        stmt = insert_dialecto(tabla)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[c.name for c in tabla.primary_key],
+            set_={'total': tabla.c.total + stmt.excluded.total},
+        )
+        db.session.execute(stmt, filas)
+        return
+
+    # Otros motores: actualizar y luego insertar las cubetas que no existían.
+    for fila in filas:
+        clave = [tabla.c[nombre] == fila[nombre] for nombre in
+                 ('cuestionario', 'sector_produccion', 'tamano', 'seccion', 'bucket')]
+        actualizadas = db.session.execute(
+            tabla.update().where(*clave).values(total=tabla.c.total + fila['total'])
+        ).rowcount
+        if not actualizadas:
+            db.session.execute(insert(tabla), fila)
+
+
+def _deltas(envio_clave, puntajes, signo, deltas):
+    cuestionario, sector, tamano = envio_clave
+    for seccion, valor in puntajes.items():
+        clave = (cuestionario, sector, tamano, seccion, bucket(valor))
+        deltas[clave] = deltas.get(clave, 0) + signo
+
+
+def percentil(histograma, puntaje):
+    """Rango percentil de un puntaje dentro de {bucket: total} (punto medio en empates)."""
+    n = sum(histograma.values())
+    if not n:
+        return None
+    b = bucket(puntaje)
+    debajo = sum(total for cubeta, total in histograma.items() if cubeta < b)
+    return round(100 * (debajo + 0.5 * histograma.get(b, 0)) / n, 1)
+
+
+def cuantil(histograma, q):
+    """Cubeta en la que cae el cuantil q (0-1) del histograma."""
+    n = sum(histograma.values())
+    if not n:
+        return None
+    objetivo, acumulado = q * n, 0
+    for cubeta in sorted(histograma):
+        acumulado += histograma[cubeta]
+        if acumulado >= objetivo:
+            return cubeta
+    return max(histograma)
+
+
+# --- Persistencia ---
+
+def guardar_envio(empresario, cuestionario, respuestas):
+    """Guarda el envío, sus respuestas y puntajes y actualiza el histograma. No hace commit."""
+    puntajes = calcular_puntajes(cuestionario, respuestas)
+    # Los envíos de un mismo empresario se serializan sobre su fila: bloquear el envío
+    # anterior no basta, porque en el primero no hay fila que bloquear y dos envíos
+    # simultáneos sumarían los dos al histograma sin descontar ninguno.
+    db.session.execute(db.select(Empresario.id).where(Empresario.id == empresario.id).with_for_update())
+    anterior = db.session.execute(
+        db.select(DiagnosticoEnvio)
+        .where(DiagnosticoEnvio.empresario_id == empresario.id, DiagnosticoEnvio.cuestionario == cuestionario)
+        .order_by(DiagnosticoEnvio.id.desc())
+        .limit(1)
+    ).scalars().first()
+
+    envio = DiagnosticoEnvio(
+        empresario_id=empresario.id, cuestionario=cuestionario,
+        sector_produccion=empresario.sector_produccion, tamano=empresario.tamano,
+        puntaje_total=puntajes[SECCION_TOTAL],
+    )
+    db.session.add(envio)
+    db.session.flush()
+
+    db.session.execute(insert(DiagnosticoRespuesta), [
+        {'envio_id': envio.id, 'pregunta': pregunta, 'valor': valor} for pregunta, valor in respuestas.items()
+    ])
+    db.session.execute(insert(DiagnosticoPuntaje), [
+        {'envio_id': envio.id, 'seccion': seccion, 'puntaje': valor} for seccion, valor in puntajes.items()
+    ])
+
+    deltas = {}
+    if anterior is not None:
+        _deltas((cuestionario, anterior.sector_produccion, anterior.tamano),
+                {p.seccion: p.puntaje for p in anterior.puntajes}, -1, deltas)
+    _deltas((cuestionario, envio.sector_produccion, envio.tamano), puntajes, 1, deltas)
+    _upsert_histograma(deltas)
+    return envio, puntajes
+
+
+def _ultimos_puntajes(*where):
+    """(cuestionario, sector, tamano, seccion, puntaje) del último envío de cada empresario y cuestionario."""
+    maximo = (
+        db.select(db.func.max(DiagnosticoEnvio.id).label('id'))
+        .join(Empresario, Empresario.id == DiagnosticoEnvio.empresario_id)
+        .where(*where)
+        .group_by(DiagnosticoEnvio.empresario_id, DiagnosticoEnvio.cuestionario)
+        .subquery()
+    )
+    return db.session.execute(
+        db.select(DiagnosticoEnvio.cuestionario, DiagnosticoEnvio.sector_produccion, DiagnosticoEnvio.tamano,
+                  DiagnosticoPuntaje.seccion, DiagnosticoPuntaje.puntaje)
+        .join(DiagnosticoPuntaje, DiagnosticoPuntaje.envio_id == DiagnosticoEnvio.id)
+        .where(DiagnosticoEnvio.id.in_(db.select(maximo.c.id)))
+    )
+
+
+def restar_bajas(usuario_ids):
+    """Descuenta del histograma el último envío de estos usuarios, que su borrado elimina en cascada. No hace commit.
+
+    Se llama en la misma transacción y antes del DELETE de los usuarios.
+    """
+    if not usuario_ids:
+        return
+    deltas = {}
+    for cuestionario, sector, tamano, seccion, valor in _ultimos_puntajes(Empresario.usuario_id.in_(usuario_ids)):
+        _deltas((cuestionario, sector, tamano), {seccion: valor}, -1, deltas)
+    _upsert_histograma(deltas)
+
+
+def reconstruir_histograma():
+    """Recalcula el histograma desde el último envío de cada empresario. No hace commit."""
+    db.session.execute(DiagnosticoHistograma.__table__.delete())
+    deltas = {}
+    for cuestionario, sector, tamano, seccion, valor in _ultimos_puntajes():
+        _deltas((cuestionario, sector, tamano), {seccion: valor}, 1, deltas)
+    _upsert_histograma(deltas)
+    return sum(deltas.values())
+
+
+# --- Integración con Flask ---
+
+bp = Blueprint('diagnostico', __name__, cli_group=None)
+
+
+def init_app(app):
+    app.register_blueprint(bp)
+
+
+def _empresario_en_sesion():
+    if session.get('user_profile') != 'empresario' or 'user_id' not in session:
+        return None
+    return db.session.execute(
+        db.select(Empresario).where(Empresario.usuario_id == session['user_id'])
+    ).scalars().first()
+
+
+def _validar_cuestionario(cuestionario):
+    """Devuelve (empresario, None) o (None, respuesta de error)."""
+    if cuestionario not in CUESTIONARIOS:
+        return None, (jsonify({'success': False, 'message': 'Cuestionario no encontrado.'}), 404)
+    empresario = _empresario_en_sesion()
+    if empresario is None:
+        return None, (jsonify({'success': False, 'message': 'Debe iniciar sesión como empresario.'}), 401)
+    return empresario, None
+
+
+@bp.route('/diagnostico/<cuestionario>', methods=['POST'])
+def enviar_diagnostico(cuestionario):
+    """Guarda un cuestionario completo ({'respuestas': {pregunta: 'si'|'no'}}) y devuelve sus puntajes."""
+    empresario, error = _validar_cuestionario(cuestionario)
+    if error:
+        return error
+    datos = request.get_json(silent=True) or {}
+    respuestas, errores = validar_respuestas(cuestionario, datos.get('respuestas'))
+    if errores:
+        return jsonify({'success': False, 'message': 'Respuestas inválidas.', 'errors': errores}), 400
+
+    try:
+        envio, puntajes = guardar_envio(empresario, cuestionario, respuestas)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"❌ Error al guardar el diagnóstico de {empresario.id}: {e}")
+        return jsonify({'success': False, 'message': 'No se pudo guardar el diagnóstico.'}), 500
+
+    logger.info(f"✅ Diagnóstico {cuestionario} guardado para el empresario {empresario.id} (envío {envio.id})")
+    return jsonify({'success': True, 'message': 'Diagnóstico guardado.', 'envio_id': envio.id,
+                    'puntajes': puntajes})
+
+
+@bp.route('/diagnostico/<cuestionario>/comparacion')
+def comparar_diagnostico(cuestionario):
+    """Puntajes del último envío frente al grupo del sector (mismo sector de producción y tamaño)."""
+    empresario, error = _validar_cuestionario(cuestionario)
+    if error:
+        return error
+    envio = db.session.execute(
+        db.select(DiagnosticoEnvio)
+        .where(DiagnosticoEnvio.empresario_id == empresario.id, DiagnosticoEnvio.cuestionario == cuestionario)
+        .order_by(DiagnosticoEnvio.id.desc())
+        .limit(1)
+    ).scalars().first()
+    if envio is None:
+        return jsonify({'success': False, 'message': 'Aún no ha enviado este diagnóstico.'}), 404
+
+    histogramas = {}
+    filas = db.session.execute(
+        db.select(DiagnosticoHistograma.seccion, DiagnosticoHistograma.bucket, DiagnosticoHistograma.total)
+        .where(DiagnosticoHistograma.cuestionario == cuestionario,
+               DiagnosticoHistograma.sector_produccion == envio.sector_produccion,
+               DiagnosticoHistograma.tamano == envio.tamano,
+               DiagnosticoHistograma.total > 0)
+    )
+    for seccion, cubeta, total in filas:
+        histogramas.setdefault(seccion, {})[cubeta] = total
+
+    secciones = {}
+    for p in envio.puntajes:
+        histograma = histogramas.get(p.seccion, {})
+        secciones[p.seccion] = {
+            'puntaje': p.puntaje,
+            'percentil': percentil(histograma, p.puntaje),
+            'p25': cuantil(histograma, 0.25),
+            'mediana': cuantil(histograma, 0.5),
+            'p75': cuantil(histograma, 0.75),
+        }
+    return jsonify({
+        'success': True,
+        'envio_id': envio.id,
+        'fecha': envio.fecha.isoformat(),
+        'grupo': {'sector_produccion': envio.sector_produccion, 'tamano': envio.tamano,
+                  'empresas': sum(histogramas.get(SECCION_TOTAL, {}).values())},
+        'secciones': secciones,
+    })
+
+
+@bp.cli.command('rebuild-diagnostic-benchmarks')
+def rebuild_diagnostic_benchmarks():
+    """Recalcula el histograma del sector desde el último envío de cada empresario."""
+    total = reconstruir_histograma()
+    db.session.commit()
+    print(f"✅ Histograma del diagnóstico reconstruido ({total} puntajes)")
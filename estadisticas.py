@@ -0,0 +1,239 @@
+# Estadísticas del panel de administración, mantenidas al escribir.
+#
+# El panel muestra registros por día y tipo de perfil, instituciones por
+# municipio, inversionistas por tipo de inversión y empresarios por tamaño.
+# Calcularlas con GROUP BY sobre usuarios y las tablas de perfil en cada carga
+# recorre tablas que solo crecen; en su lugar los conteos se guardan en dos tablas
+# pequeñas (estadisticas_registros y estadisticas_perfiles) y se ajustan con un
+# upsert de deltas, como el histograma del diagnóstico, en la misma transacción
+# que el alta o el borrado:
+#   - registro.registrar(), flask import-profiles y flask create-superuser suman las altas,
+#   - flask delete-user y los borrados de administracion.ejecutar() (delete-users,
+#     purge-inactive-users) restan los usuarios borrados, leídos con una consulta
+#     limitada a sus ids antes del DELETE.
+# Si la transacción se deshace, el ajuste se deshace con ella.
+#
+# /admin/estadisticas solo lee esas tablas: una fila por día y tipo de perfil en
+# la ventana pedida y una por valor de cada campo, sin importar cuántos usuarios
+# haya. Las filas que bajan a cero se conservan y no se muestran.
+#
+# flask rebuild-stats recalcula las tablas desde usuarios y perfiles (tras migrar,
+# o para reparar un borrado hecho a mano en la base de datos) y flask verify-stats
+# las compara con los conteos reales y sale con código 1 si difieren.
+from datetime import date, datetime, timedelta
+
+from flask import Blueprint, current_app, jsonify, request
+from sqlalchemy import func, insert, select
+
+from autorizacion import es_admin
+from extensions import db
+from models import (
+    EstadisticaPerfil, EstadisticaRegistro, Empresario, Institucion, Inversionista, TipoPerfil, Usuario,
+)
+
+# Tipo de perfil -> columna contada en estadisticas_perfiles (el nombre de la columna es el campo).
+CAMPOS = {
+    TipoPerfil.INSTITUCION: Institucion.municipio,
+    TipoPerfil.INVERSIONISTA: Inversionista.tipo_inversion,
+    TipoPerfil.EMPRESARIO: Empresario.tamano,
+}
+
+
+# --- Deltas ---
+
+def _valor(tipo_perfil, perfil):
+    """Valor del campo contado de un perfil (objeto del modelo o diccionario de columnas)."""
+    columna = CAMPOS.get(tipo_perfil)
+    if columna is None or perfil is None:
+        return None
+    return perfil.get(columna.key) if isinstance(perfil, dict) else getattr(perfil, columna.key)
+
+
+def _deltas(filas, signo, registros=None, perfiles=None):
+    """Acumula los deltas de filas (tipo_perfil, fecha_registro, valor del campo)."""
+    registros = {} if registros is None else registros
+    perfiles = {} if perfiles is None else perfiles
+    for tipo_perfil, fecha, valor in filas:
+        if fecha is not None:
+            clave = (fecha.date(), tipo_perfil.value)
+            registros[clave] = registros.get(clave, 0) + signo
+        if valor is not None and tipo_perfil in CAMPOS:
+            clave = (CAMPOS[tipo_perfil].key, valor)
+            perfiles[clave] = perfiles.get(clave, 0) + signo
+    return registros, perfiles
+
+
+def _upsert(modelo, deltas):
+    """Suma los deltas {clave primaria: n} a la columna total del modelo."""
+    tabla = modelo.__table__
+    claves = [c.name for c in tabla.primary_key]
+    filas = [dict(zip(claves, clave), total=n) for clave, n in deltas.items() if n]
+    if not filas:
+        return
+    dialecto = db.session.get_bind().dialect.name
+    if dialecto in ('sqlite', 'postgresql'):
+        if dialecto == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert as insert_dialecto
+        else:
+            from sqlalchemy.dialects.postgresql import insert as insert_dialecto
+        stmt = insert_dialecto(tabla)
+        stmt = stmt.on_conflict_do_update(index_elements=claves, set_={'total': tabla.c.total + stmt.excluded.total})
+        db.session.execute(stmt, filas)
+        return
+
+    # Otros motores: actualizar y luego insertar las filas que no existían.
+    for fila in filas:
+        actualizadas = db.session.execute(
+            tabla.update().where(*[tabla.c[nombre] == fila[nombre] for nombre in claves])
+            .values(total=tabla.c.total + fila['total'])
+        ).rowcount
+        if not actualizadas:
+            db.session.execute(insert(tabla), fila)
+
+
+def _aplicar(registros, perfiles):
+    _upsert(EstadisticaRegistro, registros)
+    _upsert(EstadisticaPerfil, perfiles)
+
+
+# --- Mantenimiento incremental ---
+
+def sumar_alta(usuario):
+    """Cuenta el alta de un usuario nuevo con su perfil ya asignado. No hace commit.
+
+    Fija usuario.fecha_registro para que el día contado sea el que se guarda.
+    """
+    if usuario.fecha_registro is None:
+        usuario.fecha_registro = datetime.utcnow()
+    _aplicar(*_deltas([(usuario.tipo_perfil, usuario.fecha_registro,
+                        _valor(usuario.tipo_perfil, usuario.get_perfil()))], 1))
+
+
+def sumar_altas(tipo_perfil, fecha_registro, perfiles):
+    """Cuenta un lote de altas del mismo tipo y fecha (perfiles como diccionarios de columnas). No hace commit."""
+    _aplicar(*_deltas(((tipo_perfil, fecha_registro, _valor(tipo_perfil, perfil)) for perfil in perfiles), 1))
+
+
+def _filas_de_usuarios():
+    """(tipo_perfil, fecha_registro, valor del campo contado) de cada usuario."""
+    return (
+        select(Usuario.tipo_perfil, Usuario.fecha_registro,
+               func.coalesce(*[columna for columna in CAMPOS.values()]))
+        .outerjoin(Institucion, Institucion.usuario_id == Usuario.id)
+        .outerjoin(Inversionista, Inversionista.usuario_id == Usuario.id)
+        .outerjoin(Empresario, Empresario.usuario_id == Usuario.id)
+    )
+
+
+def restar_bajas(ids):
+    """Descuenta los usuarios de ids; llamar antes de borrarlos, en la misma transacción. No hace commit."""
+    if not ids:
+        return
+    filas = db.session.execute(_filas_de_usuarios().where(Usuario.id.in_(ids))).all()
+    _aplicar(*_deltas(filas, -1))
+
+
+# --- Reconstrucción y verificación ---
+
+def conteos_reales():
+    """Conteos calculados desde usuarios y perfiles: ({(dia, tipo): n}, {(campo, valor): n})."""
+    registros = {}
+    filas = db.session.execute(
+        select(Usuario.tipo_perfil, Usuario.fecha_registro)
+        .where(Usuario.fecha_registro.is_not(None))
+        .execution_options(yield_per=10_000))
+    _deltas(((tipo_perfil, fecha, None) for tipo_perfil, fecha in filas), 1, registros=registros)
+    perfiles = {}
+    for columna in CAMPOS.values():
+        for valor, total in db.session.execute(select(columna, func.count()).group_by(columna)):
+            perfiles[(columna.key, valor)] = total
+    return registros, perfiles
+
+
+def guardados():
+    """Conteos de las tablas de estadísticas, sin las filas en cero."""
+    registros = {(r.dia, r.tipo_perfil): r.total for r in db.session.execute(
+        select(EstadisticaRegistro).where(EstadisticaRegistro.total != 0)).scalars()}
+    perfiles = {(p.campo, p.valor): p.total for p in db.session.execute(
+        select(EstadisticaPerfil).where(EstadisticaPerfil.total != 0)).scalars()}
+    return registros, perfiles
+
+
+def reconstruir():
+    """Recalcula las tablas de estadísticas desde cero. No hace commit. Devuelve (usuarios, perfiles) contados."""
+    registros, perfiles = conteos_reales()
+    db.session.execute(EstadisticaRegistro.__table__.delete())
+    db.session.execute(EstadisticaPerfil.__table__.delete())
+    _aplicar(registros, perfiles)
+    return sum(registros.values()), sum(perfiles.values())
+
+
+def verificar():
+    """Diferencias entre lo guardado y los conteos reales: [(tabla, clave, guardado, real)]."""
+    diferencias = []
+    for tabla, guardado, real in zip(('registros', 'perfiles'), guardados(), conteos_reales()):
+        for clave in sorted(set(guardado) | set(real), key=str):
+            if guardado.get(clave, 0) != real.get(clave, 0):
+                diferencias.append((tabla, clave, guardado.get(clave, 0), real.get(clave, 0)))
+    return diferencias
+
+
+def resumen(desde):
+    """Registros por día desde 'desde' y perfiles por valor de cada campo, leídos de las tablas de estadísticas."""
+    registros = {}
+    for fila in db.session.execute(
+            select(EstadisticaRegistro)
+            .where(EstadisticaRegistro.dia >= desde, EstadisticaRegistro.total > 0)
+            .order_by(EstadisticaRegistro.dia)).scalars():
+        registros.setdefault(fila.dia.isoformat(), {})[fila.tipo_perfil] = fila.total
+    perfiles = {columna.key: {} for columna in CAMPOS.values()}
+    for fila in db.session.execute(
+            select(EstadisticaPerfil).where(EstadisticaPerfil.total > 0)
+            .order_by(EstadisticaPerfil.campo, EstadisticaPerfil.total.desc())).scalars():
+        perfiles.setdefault(fila.campo, {})[fila.valor] = fila.total
+    return registros, perfiles
+
+
+# --- Integración con Flask ---
+
+bp = Blueprint('estadisticas', __name__, cli_group=None)
+
+
+def init_app(app):
+    """Registra /admin/estadisticas y los comandos rebuild-stats y verify-stats."""
+    app.config.setdefault('ESTADISTICAS_DIAS', 90)
+    app.register_blueprint(bp)
+
+
+@bp.route('/admin/estadisticas')
+def estadisticas_panel():
+    """Resúmenes del panel: ?desde=AAAA-MM-DD (por defecto, los últimos ESTADISTICAS_DIAS días)."""
+    if not es_admin():
+        return jsonify({'success': False, 'message': 'Solo los administradores pueden ver las estadísticas.'}), 403
+    try:
+        desde = date.fromisoformat(request.args['desde']) if request.args.get('desde') else \
+            datetime.utcnow().date() - timedelta(days=current_app.config['ESTADISTICAS_DIAS'] - 1)
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Fecha no válida (AAAA-MM-DD).'}), 400
+    registros, perfiles = resumen(desde)
+    return jsonify({'success': True, 'desde': desde.isoformat(), 'registros_por_dia': registros, **perfiles})
+
+
+@bp.cli.command('rebuild-stats')
+def rebuild_stats():
+    """Recalcula las estadísticas del panel desde usuarios y perfiles."""
+    usuarios, perfiles = reconstruir()
+    db.session.commit()
+    print(f"✅ Estadísticas reconstruidas ({usuarios} usuarios, {perfiles} perfiles)")
+
+
+@bp.cli.command('verify-stats')
+def verify_stats():
+    """Compara las estadísticas guardadas con los conteos reales; sale con código 1 si difieren."""
+    diferencias = verificar()
+    for tabla, clave, guardado, real in diferencias:
+        print(f"❌ {tabla} {clave}: guardado {guardado}, real {real}")
+    if diferencias:
+        print(f"❌ {len(diferencias)} diferencias; 'flask rebuild-stats' las corrige")
+        raise SystemExit(1)
+    print("✅ Las estadísticas coinciden con los conteos reales")
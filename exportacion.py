@@ -0,0 +1,292 @@
+# Exportación de usuarios con sus perfiles en streaming (flask export-profiles y
+# /admin/export/perfiles).
+#
+# La consulta se lee con un cursor del lado del servidor (yield_per: en
+# PostgreSQL activa stream_results) por particiones de EXPORT_BATCH_SIZE filas, y
+# cada partición se escribe y se entrega antes de pedir la siguiente. No se
+# construyen objetos del ORM ni se guarda el resultado entero: la memoria
+# depende del tamaño de la partición, no del de la tabla.
+#
+# Formatos: csv, jsonl y parquet (este necesita el paquete 'pyarrow'; cada
+# partición es un row group). El hash de la contraseña nunca se exporta.
+#
+# Sin perfil se exportan todos los usuarios con las columnas de los cuatro
+# perfiles (LEFT OUTER JOIN, con el nombre del perfil como prefijo); con perfil,
+# solo los de ese tipo y las columnas de su perfil. Los intereses de
+# inversionistas e instituciones van en una columna, separados por ';'.
+import csv
+import enum
+import io
+import json
+import sys
+import time
+from datetime import datetime
+
+import click
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
+from sqlalchemy import func, select
+
+from autorizacion import es_admin
+from extensions import db
+from models import (Usuario, Emprendedor, Empresario, Inversionista, Institucion, TipoPerfil,
+                    InversionistaEtapa, InversionistaArea, InstitucionParticipacion)
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # Opcional: sin pyarrow no se ofrece el formato parquet.
+    pyarrow = None
+
+TIPOS_MIME = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+PERFILES = {
+    TipoPerfil.EMPRENDEDOR: Emprendedor,
+    TipoPerfil.EMPRESARIO: Empresario,
+    TipoPerfil.INVERSIONISTA: Inversionista,
+    TipoPerfil.INSTITUCION: Institucion,
+}
+
+# Intereses guardados en tablas hijas: (columna exportada, FK al perfil, valor).
+LISTAS = {
+    TipoPerfil.INVERSIONISTA: [
+        ('etapas_interes', InversionistaEtapa.inversionista_id, InversionistaEtapa.etapa),
+        ('areas_interes', InversionistaArea.inversionista_id, InversionistaArea.area),
+    ],
+    TipoPerfil.INSTITUCION: [
+        ('participacion_activa', InstitucionParticipacion.institucion_id, InstitucionParticipacion.participacion),
+    ],
+}
+
+COLUMNAS_USUARIO = (Usuario.id, Usuario.email, Usuario.tipo_perfil, Usuario.is_admin, Usuario.activo,
+                    Usuario.fecha_registro, Usuario.ultima_conexion)
+
+
+class FormatoNoDisponible(Exception):
+    """El formato pedido no existe o necesita un paquete que no está instalado."""
+
+
+def formatos():
+    """Formatos disponibles en esta instalación."""
+    return [f for f in TIPOS_MIME if f != 'parquet' or pyarrow is not None]
+
+
+# --- Consulta ---
+
+def _agregado(valor):
+    # string_agg en PostgreSQL; group_concat en SQLite y MySQL.
+    if db.engine.dialect.name == 'postgresql':
+        return func.string_agg(valor, ';')
+    return func.group_concat(valor, ';')
+
+
+def consulta(tipo_perfil=None):
+    """SELECT de los usuarios con las columnas de su perfil (o de los cuatro si tipo_perfil es None)."""
+    perfiles = [tipo_perfil] if tipo_perfil is not None else list(PERFILES)
+    columnas = [c.label(c.key) for c in COLUMNAS_USUARIO]
+    for tipo in perfiles:
+        modelo = PERFILES[tipo]
+        prefijo = '' if tipo_perfil is not None else f'{tipo.value}_'
+        columnas += [c.label(prefijo + c.key) for c in modelo.__table__.columns if c.key not in ('id', 'usuario_id')]
+        for nombre, fk, valor in LISTAS.get(tipo, ()):
+            # Subconsulta correlacionada: usa la PK (perfil_id, valor) de la tabla hija.
+            columnas.append(select(_agregado(valor)).where(fk == modelo.id).scalar_subquery().label(prefijo + nombre))
+
+    stmt = select(*columnas).select_from(Usuario)
+    for tipo in perfiles:
+        modelo = PERFILES[tipo]
+        if tipo_perfil is not None:
+            stmt = stmt.join(modelo, modelo.usuario_id == Usuario.id).where(Usuario.tipo_perfil == tipo)
+        else:
+            stmt = stmt.outerjoin(modelo, modelo.usuario_id == Usuario.id)
+    return stmt.order_by(Usuario.id)
+
+
+# --- Escritura por particiones ---
+
+def _indices(stmt, *tipos):
+    return [i for i, c in enumerate(stmt.selected_columns) if isinstance(c.type, tipos)]
+
+
+def _convertir(filas, indices, funcion):
+    if not indices:
+        return filas
+    filas = [list(f) for f in filas]
+    for fila in filas:
+        for i in indices:
+            if fila[i] is not None:
+                fila[i] = funcion(fila[i])
+    return filas
+
+
+def _texto(valor):
+    return valor.value if isinstance(valor, enum.Enum) else valor.isoformat()
+
+
+def _csv(stmt, columnas, partes):
+    indices = _indices(stmt, db.DateTime, db.Enum)
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow(columnas)
+    for filas in partes:
+        escritor.writerows(_convertir(filas, indices, _texto))
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue().encode()  # La cabecera, si no hubo filas.
+
+
+def _jsonl(stmt, columnas, partes):
+    indices = _indices(stmt, db.DateTime, db.Enum)
+    for filas in partes:
+        yield ''.join(json.dumps(dict(zip(columnas, fila)), ensure_ascii=False) + '\n'
+                      for fila in _convertir(filas, indices, _texto)).encode()
+
+
+class _Sumidero(io.RawIOBase):
+    """Archivo de solo escritura que acumula lo que escribe pyarrow hasta que se vacía."""
+
+    def __init__(self):
+        super().__init__()
+        self._partes = []
+        self._posicion = 0
+
+    def writable(self):
+        return True
+
+    def write(self, datos):
+        self._partes.append(bytes(datos))
+        self._posicion += len(datos)
+        return len(datos)
+
+    def tell(self):
+        return self._posicion
+
+    def vaciar(self):
+        datos, self._partes = b''.join(self._partes), []
+        return datos
+
+
+def _tipo_arrow(columna):
+    if isinstance(columna.type, db.Boolean):
+        return pyarrow.bool_()
+    if isinstance(columna.type, db.Integer):
+        return pyarrow.int64()
+    if isinstance(columna.type, db.DateTime):
+        return pyarrow.timestamp('us')
+    return pyarrow.string()
+
+
+def _parquet(stmt, columnas, partes):
+    esquema = pyarrow.schema([(nombre, _tipo_arrow(c)) for nombre, c in zip(columnas, stmt.selected_columns)])
+    indices = _indices(stmt, db.Enum)
+    sumidero = _Sumidero()
+    with pyarrow.parquet.ParquetWriter(sumidero, esquema, compression='zstd') as escritor:
+        for filas in partes:
+            filas = _convertir(filas, indices, _texto)
+            escritor.write_table(pyarrow.Table.from_arrays(
+                [pyarrow.array(valores, type=campo.type) for valores, campo in zip(zip(*filas), esquema)],
+                schema=esquema))
+            yield sumidero.vaciar()
+    yield sumidero.vaciar()  # Pie del archivo (metadatos).
+
+
+ESCRITORES = {'csv': _csv, 'jsonl': _jsonl, 'parquet': _parquet}
+
+
+class Exportacion:
+    """Una exportación: genera el archivo en trozos de bytes, una partición cada vez."""
+
+    def __init__(self, formato='csv', tipo_perfil=None, lote=1000):
+        if formato not in formatos():
+            raise FormatoNoDisponible(
+                "El formato parquet necesita el paquete 'pyarrow'." if formato == 'parquet'
+                else f"Formato no válido: {formato!r}. Use {', '.join(formatos())}.")
+        self.formato = formato
+        self.tipo_perfil = tipo_perfil
+        self.lote = lote
+        self.filas = 0
+
+    @property
+    def nombre_archivo(self):
+        perfil = f'-{self.tipo_perfil.value}' if self.tipo_perfil else ''
+        return f'perfiles{perfil}-{datetime.now():%Y%m%d-%H%M%S}.{self.formato}'
+
+    def generar(self):
+        """Genera los bytes del archivo. Usa su propia conexión, que se devuelve al pool al terminar."""
+        stmt = consulta(self.tipo_perfil)
+        columnas = list(stmt.selected_columns.keys())
+        with db.engine.connect() as conexion:
+            resultado = conexion.execution_options(yield_per=self.lote).execute(stmt)
+            yield from ESCRITORES[self.formato](stmt, columnas, self._contar(resultado.partitions()))
+
+    def _contar(self, partes):
+        for filas in partes:
+            self.filas += len(filas)
+            yield filas
+
+
+# --- Integración con Flask ---
+
+bp = Blueprint('exportacion', __name__, cli_group=None)
+
+
+def init_app(app):
+    """Registra /admin/export/perfiles y el comando export-profiles."""
+    app.config.setdefault('EXPORT_BATCH_SIZE', 1000)
+    app.register_blueprint(bp)
+
+
+def _perfil(valor):
+    if not valor:
+        return None
+    tipo = TipoPerfil(valor)
+    if tipo not in PERFILES:
+        raise ValueError(valor)
+    return tipo
+
+
+@bp.route('/admin/export/perfiles')
+def exportar_perfiles():
+    """Descarga en streaming: ?formato=csv|jsonl|parquet&perfil=emprendedor|empresario|inversionista|institucion"""
+    if not es_admin():
+        return jsonify({'success': False, 'message': 'Solo los administradores pueden exportar perfiles.'}), 403
+    try:
+        exportacion = Exportacion(request.args.get('formato', 'csv'), _perfil(request.args.get('perfil')),
+                                  current_app.config['EXPORT_BATCH_SIZE'])
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Perfil no válido.'}), 400
+    except FormatoNoDisponible as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    db.session.close()  # El generador usa su propia conexión; esta no se necesita mientras dura la descarga.
+
+    return Response(stream_with_context(exportacion.generar()), mimetype=TIPOS_MIME[exportacion.formato],
+                    headers={'Content-Disposition': f'attachment; filename="{exportacion.nombre_archivo}"',
+                             'Cache-Control': 'no-store', 'X-Accel-Buffering': 'no'})
+
+
+@bp.cli.command('export-profiles')
+@click.option('--formato', type=click.Choice(list(TIPOS_MIME)), default='csv', show_default=True)
+@click.option('--perfil', type=click.Choice([t.value for t in PERFILES]),
+              help='Solo los usuarios de este perfil (por defecto, todos con las columnas de los cuatro).')
+@click.option('--salida', type=click.Path(dir_okay=False, allow_dash=True),
+              help="Archivo de salida; '-' para la salida estándar (por defecto, perfiles-<fecha>.<formato>).")
+@click.option('--lote', type=int, help='Filas por partición (por defecto EXPORT_BATCH_SIZE).')
+def export_profiles(formato, perfil, salida, lote):
+    """Exporta los usuarios con sus perfiles en CSV, JSONL o Parquet sin cargarlos en memoria."""
+    try:
+        exportacion = Exportacion(formato, _perfil(perfil), lote or current_app.config['EXPORT_BATCH_SIZE'])
+    except FormatoNoDisponible as e:
+        print(f'❌ {e}')
+        return
+    salida = salida or exportacion.nombre_archivo
+    inicio = time.perf_counter()
+    with click.open_file(salida, 'wb') as archivo:
+        for trozo in exportacion.generar():
+            archivo.write(trozo)
+    # Con '-' el resumen va a stderr para no mezclarse con los datos.
+    print(f'✅ {exportacion.filas} usuarios exportados a {salida} en {time.perf_counter() - inicio:.1f} s',
+          file=sys.stderr if salida == '-' else sys.stdout)
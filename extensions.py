@@ -1,5 +1,55 @@
+import sqlite3
+
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+
+from instrumentation import InstrumentedQueuePool
 
 # Crea la instancia de SQLAlchemy aquí, sin asociarla a ninguna aplicación todavía.
 # Esta será la única instancia de 'db' que usará toda tu aplicación.
 db = SQLAlchemy()
+
+
+def engine_options(uri, pool_size=5, max_overflow=10, pool_timeout=30, pool_recycle=1800,
+                   pool_pre_ping=True, statement_timeout_ms=0):
+    """Opciones del engine (SQLALCHEMY_ENGINE_OPTIONS) para el pool y el timeout de sentencias.
+
+    - pool_pre_ping comprueba la conexión al sacarla del pool: tras reiniciar
+      PostgreSQL las conexiones viejas se descartan en lugar de fallar en la consulta.
+    - pool_recycle cierra las conexiones más antiguas que eso (en segundos), antes
+      de que las corte el servidor o un proxy por inactividad.
+    - statement_timeout_ms lo aplica el servidor a cada sentencia (PostgreSQL y MySQL).
+
+    SQLite en memoria usa un StaticPool con una sola conexión: ahí no aplican el
+    tamaño del pool ni el overflow.
+    """
+    if not uri:
+        return {}
+    url = make_url(uri)
+    opciones = {'pool_pre_ping': pool_pre_ping}
+    memoria = url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+    if not memoria:
+        opciones.update({
+            'poolclass': InstrumentedQueuePool,
+            'pool_size': pool_size,
+            'max_overflow': max_overflow,
+            'pool_timeout': pool_timeout,
+            'pool_recycle': pool_recycle,
+        })
+    if statement_timeout_ms:
+        backend = url.get_backend_name()
+        if backend == 'postgresql':
+            opciones['connect_args'] = {'options': f'-c statement_timeout={int(statement_timeout_ms)}'}
+        elif backend in ('mysql', 'mariadb'):
+            opciones['connect_args'] = {'init_command': f'SET SESSION max_execution_time={int(statement_timeout_ms)}'}
+    return opciones
+
+
+@event.listens_for(Engine, 'connect')
+def _sqlite_foreign_keys(dbapi_connection, connection_record):
+    """SQLite solo aplica las claves foráneas (y su ON DELETE CASCADE) si se activan en cada conexión."""
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA foreign_keys=ON')
+        cursor.close()
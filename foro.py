@@ -0,0 +1,406 @@
+# Foro de discusión: temas, respuestas anidadas y reacciones.
+#
+# Las respuestas forman un árbol guardado como camino materializado: cada una
+# lleva en 'ruta' los ids de sus ancestros y el suyo, en 8 dígitos hexadecimales
+# (ancho fijo, así el orden de texto es el orden del árbol). Con el índice
+# (tema_id, ruta):
+#   - el tema completo en orden de lectura (cada respuesta seguida de las suyas)
+#     es un rango del índice, paginado por cursor (?despues=<ruta>) sin OFFSET;
+#   - el subárbol de una respuesta es el rango [ruta, ruta + 'g'), una sola
+#     consulta sin recursión;
+#   - los ancestros salen de la propia ruta, sin consultarlos.
+# La ruta se completa tras el INSERT (necesita el id), en la misma transacción.
+# Más allá de FORO_MAX_PROFUNDIDAD niveles la respuesta se cuelga del abuelo,
+# así la ruta cabe siempre en su columna.
+#
+# Los contadores (respuestas y reacciones de cada tema, descendientes y
+# reacciones de cada respuesta) se actualizan con UPDATE ... SET n = n + 1 en la
+# misma transacción que el cambio, así que el listado no hace COUNT(*). Los
+# borrados de usuarios se llevan sus reacciones por ON DELETE CASCADE:
+# restar_bajas() las descuenta antes, en la misma transacción. 'flask
+# recount-forum' recalcula todos los contadores desde las tablas.
+#
+# Los temas se listan del más nuevo al más antiguo por cursor (?antes=<id>) con
+# el índice (categoria, id) cuando se filtra por categoría.
+import logging
+import time
+
+from flask import Blueprint, current_app, jsonify, request, session
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db
+from models import ReaccionRespuesta, ReaccionTema, Respuesta, Tema, Usuario
+
+logger = logging.getLogger(__name__)
+
+CATEGORIAS = ['normativa', 'negocios', 'maquinaria', 'seguridad', 'ambiental', 'general']
+TIPOS_REACCION = ['me_gusta', 'util']
+DIGITOS_RUTA = 8
+FIN_RUTA = 'g'  # Mayor que cualquier dígito hexadecimal: [ruta, ruta + FIN_RUTA) es el subárbol.
+
+
+def segmento(respuesta_id):
+    return f'{respuesta_id:0{DIGITOS_RUTA}x}'
+
+
+def ancestros(ruta):
+    """Ids de los ancestros de la respuesta con esa ruta, de la raíz al padre."""
+    return [int(ruta[i:i + DIGITOS_RUTA], 16) for i in range(0, len(ruta) - DIGITOS_RUTA, DIGITOS_RUTA)]
+
+
+def crear_tema(autor_id, titulo, categoria, contenido):
+    """Inserta el tema. No hace commit."""
+    tema = Tema(autor_id=autor_id, titulo=titulo, categoria=categoria, contenido=contenido)
+    db.session.add(tema)
+    db.session.flush()
+    return tema
+
+
+def responder(tema_id, autor_id, texto, padre=None, max_profundidad=20):
+    """Inserta la respuesta, completa su ruta y actualiza los contadores. No hace commit."""
+    if padre is not None and padre.profundidad + 1 >= max_profundidad:
+        padre = db.session.get(Respuesta, padre.padre_id) if padre.padre_id else None
+    respuesta = Respuesta(tema_id=tema_id, autor_id=autor_id, texto=texto,
+                          padre_id=padre.id if padre else None,
+                          profundidad=padre.profundidad + 1 if padre else 0)
+    db.session.add(respuesta)
+    db.session.flush()
+    respuesta.ruta = (padre.ruta if padre else '') + segmento(respuesta.id)
+    db.session.execute(
+        update(Tema).where(Tema.id == tema_id)
+        .values(respuestas=Tema.respuestas + 1, ultima_respuesta=respuesta.fecha)
+    )
+    if padre is not None:
+        db.session.execute(
+            update(Respuesta).where(Respuesta.id.in_(ancestros(respuesta.ruta)))
+            .values(descendientes=Respuesta.descendientes + 1),
+            execution_options={'synchronize_session': False},
+        )
+    return respuesta
+
+
+def respuestas_pagina(tema_id, prefijo=None, despues=None, limite=100):
+    """Respuestas del tema (o del subárbol de ruta 'prefijo') en orden de lectura.
+
+    Devuelve las filas y el cursor de la página siguiente (una ruta) o None.
+    """
+    consulta = select(Respuesta).where(Respuesta.tema_id == tema_id)
+    if prefijo:
+        consulta = consulta.where(Respuesta.ruta >= prefijo, Respuesta.ruta < prefijo + FIN_RUTA)
+    if despues:
+        consulta = consulta.where(Respuesta.ruta > despues)
+    filas = db.session.execute(consulta.order_by(Respuesta.ruta).limit(limite + 1)).scalars().all()
+    hay_mas = len(filas) > limite
+    filas = filas[:limite]
+    return filas, filas[-1].ruta if hay_mas and filas else None
+
+
+def temas_pagina(categoria=None, antes=None, limite=30):
+    """Temas del más nuevo al más antiguo y el cursor de la página siguiente (un id) o None."""
+    consulta = select(Tema)
+    if categoria:
+        consulta = consulta.where(Tema.categoria == categoria)
+    if antes is not None:
+        consulta = consulta.where(Tema.id < antes)
+    filas = db.session.execute(consulta.order_by(Tema.id.desc()).limit(limite + 1)).scalars().all()
+    hay_mas = len(filas) > limite
+    filas = filas[:limite]
+    return filas, filas[-1].id if hay_mas and filas else None
+
+
+# Reacción -> (modelo de la reacción, columna del objeto, modelo con el contador)
+REACCIONES = {
+    'tema': (ReaccionTema, 'tema_id', Tema),
+    'respuesta': (ReaccionRespuesta, 'respuesta_id', Respuesta),
+}
+
+
+def reaccionar(objeto, objeto_id, usuario_id, tipo, activa=True):
+    """Pone o quita una reacción y ajusta el contador, con commit. Devuelve el contador actual.
+
+    Poner una reacción que ya existe o quitar una que no existe no cambia nada.
+    """
+    modelo, columna, contado = REACCIONES[objeto]
+    try:
+        if activa:
+            db.session.add(modelo(**{columna: objeto_id}, usuario_id=usuario_id, tipo=tipo))
+            db.session.flush()
+            cambio = 1
+        else:
+            cambio = -db.session.execute(delete(modelo).where(
+                getattr(modelo, columna) == objeto_id, modelo.usuario_id == usuario_id, modelo.tipo == tipo
+            )).rowcount
+        if cambio:
+            db.session.execute(update(contado).where(contado.id == objeto_id)
+                               .values(reacciones=contado.reacciones + cambio),
+                               execution_options={'synchronize_session': False})
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()  # Ya existía (o llegó dos veces a la vez): el contador no cambia.
+    return db.session.execute(select(contado.reacciones).where(contado.id == objeto_id)).scalar()
+
+
+def mis_reacciones(objeto, ids, usuario_id):
+    """objeto_id -> tipos de reacción del usuario, para una página de objetos (una consulta)."""
+    modelo, columna, _ = REACCIONES[objeto]
+    resultado = {}
+    if not ids:
+        return resultado
+    for objeto_id, tipo in db.session.execute(
+            select(getattr(modelo, columna), modelo.tipo)
+            .where(modelo.usuario_id == usuario_id, getattr(modelo, columna).in_(ids))):
+        resultado.setdefault(objeto_id, []).append(tipo)
+    return resultado
+
+
+def restar_bajas(usuario_ids):
+    """Descuenta las reacciones de estos usuarios, que su borrado elimina en cascada. No hace commit.
+
+    Se llama en la misma transacción y antes del DELETE de los usuarios.
+    """
+    if not usuario_ids:
+        return
+    for modelo, columna, contado in REACCIONES.values():
+        objeto = getattr(modelo, columna)
+        por_objeto = db.session.execute(
+            select(objeto, func.count()).where(modelo.usuario_id.in_(usuario_ids)).group_by(objeto)).all()
+        for objeto_id, total in por_objeto:
+            db.session.execute(update(contado).where(contado.id == objeto_id)
+                               .values(reacciones=contado.reacciones - total),
+                               execution_options={'synchronize_session': False})
+
+
+def recontar():
+    """Recalcula todos los contadores desde las tablas. Devuelve las filas actualizadas."""
+    hijas = Respuesta.__table__.alias('hijas')
+    sentencias = [
+        update(Tema).values(
+            respuestas=select(func.count()).where(Respuesta.tema_id == Tema.id).scalar_subquery(),
+            reacciones=select(func.count()).where(ReaccionTema.tema_id == Tema.id).scalar_subquery(),
+        ),
+        update(Respuesta).values(
+            reacciones=select(func.count()).where(ReaccionRespuesta.respuesta_id == Respuesta.id).scalar_subquery(),
+            descendientes=select(func.count()).where(
+                hijas.c.tema_id == Respuesta.tema_id, hijas.c.ruta > Respuesta.ruta,
+                hijas.c.ruta < Respuesta.ruta + FIN_RUTA).scalar_subquery(),
+        ),
+    ]
+    filas = sum(db.session.execute(s, execution_options={'synchronize_session': False}).rowcount for s in sentencias)
+    db.session.commit()
+    return filas
+
+
+# --- Integración con Flask ---
+
+bp = Blueprint('foro', __name__, cli_group=None)
+
+
+def init_app(app):
+    """Configura el foro y registra sus rutas y el comando CLI."""
+    app.config.setdefault('FORO_TEMAS_POR_PAGINA', 30)
+    app.config.setdefault('FORO_RESPUESTAS_POR_PAGINA', 100)
+    app.config.setdefault('FORO_MAX_POR_PAGINA', 500)
+    app.config.setdefault('FORO_MAX_LONGITUD', 10000)
+    app.config.setdefault('FORO_MAX_PROFUNDIDAD', 20)
+    app.register_blueprint(bp)
+
+
+def _usuario_en_sesion():
+    return session.get('user_id')
+
+
+def _no_autenticado():
+    return jsonify({'success': False, 'message': 'Debe iniciar sesión.'}), 401
+
+
+def _no_encontrado(que):
+    return jsonify({'success': False, 'message': f'{que} no encontrado.'}), 404
+
+
+def _limite(clave):
+    por_defecto = current_app.config[clave]
+    return max(1, min(request.args.get('limite', por_defecto, type=int), current_app.config['FORO_MAX_POR_PAGINA']))
+
+
+def _autores(ids):
+    """usuario_id -> nombre y tipo de perfil, en una consulta con el perfil ya cargado."""
+    ids = {i for i in ids if i is not None}
+    if not ids:
+        return {}
+    return {
+        u.id: {'id': u.id, 'nombre': getattr(u.get_perfil(), 'nombre_completo', u.email),
+               'tipo_perfil': u.tipo_perfil.value}
+        for u in db.session.execute(Usuario.select_con_perfil().where(Usuario.id.in_(ids))).unique().scalars()
+    }
+
+
+def _tema_dict(tema, autores, mias=()):
+    return {
+        'id': tema.id,
+        'titulo': tema.titulo,
+        'categoria': tema.categoria,
+        'contenido': tema.contenido,
+        'autor': autores.get(tema.autor_id),
+        'fecha': tema.fecha_creacion.isoformat(),
+        'ultima_respuesta': tema.ultima_respuesta.isoformat() if tema.ultima_respuesta else None,
+        'respuestas': tema.respuestas,
+        'reacciones': tema.reacciones,
+        'mis_reacciones': list(mias),
+    }
+
+
+def _respuestas_json(filas, cursor, usuario_id):
+    autores = _autores(r.autor_id for r in filas)
+    mias = mis_reacciones('respuesta', [r.id for r in filas], usuario_id)
+    return jsonify({'success': True, 'siguiente': cursor, 'respuestas': [{
+        'id': r.id,
+        'padre_id': r.padre_id,
+        'profundidad': r.profundidad,
+        'autor': autores.get(r.autor_id),
+        'texto': r.texto,
+        'fecha': r.fecha.isoformat(),
+        'descendientes': r.descendientes,
+        'reacciones': r.reacciones,
+        'mis_reacciones': mias.get(r.id, []),
+    } for r in filas]})
+
+
+def _texto(datos, campo, maximo):
+    valor = (datos.get(campo) or '').strip()
+    return valor if 0 < len(valor) <= maximo else None
+
+
+@bp.route('/foro/temas')
+def listar_temas():
+    """Temas del más nuevo al más antiguo (?categoria=, ?antes=<id> para la página siguiente)."""
+    usuario_id = _usuario_en_sesion()
+    if usuario_id is None:
+        return _no_autenticado()
+    categoria = request.args.get('categoria') or None
+    if categoria and categoria not in CATEGORIAS:
+        return jsonify({'success': False, 'message': 'Categoría no válida.'}), 400
+    filas, cursor = temas_pagina(categoria, request.args.get('antes', type=int), _limite('FORO_TEMAS_POR_PAGINA'))
+    autores = _autores(t.autor_id for t in filas)
+    mias = mis_reacciones('tema', [t.id for t in filas], usuario_id)
+    return jsonify({'success': True, 'siguiente': cursor,
+                    'temas': [_tema_dict(t, autores, mias.get(t.id, ())) for t in filas]})
+
+
+@bp.route('/foro/temas', methods=['POST'])
+def publicar_tema():
+    """Crea un tema: {'titulo', 'categoria', 'contenido'}."""
+    usuario_id = _usuario_en_sesion()
+    if usuario_id is None:
+        return _no_autenticado()
+    datos = request.get_json(silent=True) or {}
+    titulo = _texto(datos, 'titulo', 200)
+    contenido = _texto(datos, 'contenido', current_app.config['FORO_MAX_LONGITUD'])
+    if titulo is None or contenido is None or datos.get('categoria') not in CATEGORIAS:
+        return jsonify({'success': False, 'message': 'Título, categoría y contenido son obligatorios.'}), 400
+    try:
+        tema = crear_tema(usuario_id, titulo, datos['categoria'], contenido)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"❌ Error al crear el tema de {usuario_id}: {e}")
+        return jsonify({'success': False, 'message': 'No se pudo publicar el tema.'}), 500
+    return jsonify({'success': True, 'tema': _tema_dict(tema, _autores([usuario_id]))}), 201
+
+
+@bp.route('/foro/temas/<int:tema_id>')
+def ver_tema(tema_id):
+    usuario_id = _usuario_en_sesion()
+    if usuario_id is None:
+        return _no_autenticado()
+    tema = db.session.get(Tema, tema_id)
+    if tema is None:
+        return _no_encontrado('Tema')
+    mias = mis_reacciones('tema', [tema_id], usuario_id).get(tema_id, ())
+    return jsonify({'success': True, 'tema': _tema_dict(tema, _autores([tema.autor_id]), mias)})
+
+
+@bp.route('/foro/temas/<int:tema_id>/respuestas')
+def listar_respuestas(tema_id):
+    """Respuestas del tema en orden de lectura, por páginas (?despues=<cursor>)."""
+    usuario_id = _usuario_en_sesion()
+    if usuario_id is None:
+        return _no_autenticado()
+    filas, cursor = respuestas_pagina(tema_id, despues=request.args.get('despues'),
+                                      limite=_limite('FORO_RESPUESTAS_POR_PAGINA'))
+    return _respuestas_json(filas, cursor, usuario_id)
+
+
+@bp.route('/foro/respuestas/<int:respuesta_id>/hilo')
+def ver_hilo(respuesta_id):
+    """La respuesta y todas las que cuelgan de ella, en orden de lectura (?despues=<cursor>)."""
+    usuario_id = _usuario_en_sesion()
+    if usuario_id is None:
+        return _no_autenticado()
+    raiz = db.session.get(Respuesta, respuesta_id)
+    if raiz is None:
+        return _no_encontrado('Respuesta')
+    filas, cursor = respuestas_pagina(raiz.tema_id, raiz.ruta, request.args.get('despues'),
+                                      _limite('FORO_RESPUESTAS_POR_PAGINA'))
+    return _respuestas_json(filas, cursor, usuario_id)
+
+
+@bp.route('/foro/temas/<int:tema_id>/respuestas', methods=['POST'])
+def publicar_respuesta(tema_id):
+    """Responde al tema o, con 'padre_id', a otra respuesta del mismo tema: {'texto', 'padre_id'?}."""
+    usuario_id = _usuario_en_sesion()
+    if usuario_id is None:
+        return _no_autenticado()
+    if db.session.get(Tema, tema_id) is None:
+        return _no_encontrado('Tema')
+    datos = request.get_json(silent=True) or {}
+    texto = _texto(datos, 'texto', current_app.config['FORO_MAX_LONGITUD'])
+    if texto is None:
+        return jsonify({'success': False, 'message': 'La respuesta no puede estar vacía.'}), 400
+    padre = None
+    if datos.get('padre_id') is not None:
+        padre = db.session.get(Respuesta, datos['padre_id']) if isinstance(datos['padre_id'], int) else None
+        if padre is None or padre.tema_id != tema_id:
+            return _no_encontrado('Respuesta')
+    try:
+        respuesta = responder(tema_id, usuario_id, texto, padre, current_app.config['FORO_MAX_PROFUNDIDAD'])
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"❌ Error al responder el tema {tema_id}: {e}")
+        return jsonify({'success': False, 'message': 'No se pudo publicar la respuesta.'}), 500
+    return _respuestas_json([respuesta], None, usuario_id), 201
+
+
+def _cambiar_reaccion(objeto, modelo, objeto_id):
+    usuario_id = _usuario_en_sesion()
+    if usuario_id is None:
+        return _no_autenticado()
+    tipo = (request.get_json(silent=True) or {}).get('tipo') or request.args.get('tipo')
+    if tipo not in TIPOS_REACCION:
+        return jsonify({'success': False, 'message': f"Reacción no válida. Use {', '.join(TIPOS_REACCION)}."}), 400
+    if db.session.get(modelo, objeto_id) is None:
+        return _no_encontrado(objeto.capitalize())
+    activa = request.method == 'POST'
+    total = reaccionar(objeto, objeto_id, usuario_id, tipo, activa)
+    return jsonify({'success': True, 'reacciones': total, 'activa': activa})
+
+
+@bp.route('/foro/temas/<int:tema_id>/reacciones', methods=['POST', 'DELETE'])
+def reaccion_tema(tema_id):
+    """Pone (POST) o quita (DELETE) una reacción al tema: {'tipo': 'me_gusta'}."""
+    return _cambiar_reaccion('tema', Tema, tema_id)
+
+
+@bp.route('/foro/respuestas/<int:respuesta_id>/reacciones', methods=['POST', 'DELETE'])
+def reaccion_respuesta(respuesta_id):
+    """Pone (POST) o quita (DELETE) una reacción a la respuesta: {'tipo': 'util'}."""
+    return _cambiar_reaccion('respuesta', Respuesta, respuesta_id)
+
+
+@bp.cli.command('recount-forum')
+def recount_forum():
+    """Recalcula los contadores de respuestas y reacciones del foro."""
+    inicio = time.perf_counter()
+    filas = recontar()
+    print(f"✅ Contadores del foro recalculados en {filas} filas ({time.perf_counter() - inicio:.1f} s)")
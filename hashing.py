@@ -0,0 +1,140 @@
+# Hash de contraseñas fuera del hilo de la petición.
+#
+# scrypt/pbkdf2 consumen decenas de milisegundos de CPU por llamada. Ejecutarlos
+# en un pool de procesos libera el hilo de la petición (que solo espera el
+# resultado) y reparte el trabajo entre todos los núcleos en lugar de competir
+# por el GIL con el resto de peticiones del worker.
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from werkzeug.security import generate_password_hash, check_password_hash
+
+from telemetry import span
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_METHOD = 'scrypt:32768:8:1'
+
+# Parámetros de cada método en su forma completa ('scrypt:n:r:p', 'pbkdf2:hash:iteraciones').
+PARAMETROS = {'scrypt': 3, 'pbkdf2': 2}
+
+
+class HashingBusy(Exception):
+    """Se lanza cuando ya hay PASSWORD_HASH_MAX_INFLIGHT hashes en curso."""
+
+
+class PasswordHasher:
+    """Genera y verifica hashes de contraseñas con un método configurable.
+
+    Se configura con app.config:
+        PASSWORD_HASH_METHOD     Método de werkzeug, p. ej. 'scrypt:32768:8:1' o 'pbkdf2:sha256:600000'.
+        PASSWORD_HASH_WORKERS    Procesos del pool (por defecto os.cpu_count()). 0 calcula en el propio hilo.
+        PASSWORD_HASH_MAX_INFLIGHT  Máximo de hashes en curso o en espera en este proceso; por encima
+                                 se lanza HashingBusy en lugar de encolar (por defecto 4 por proceso
+                                 del pool; 0 sin límite).
+    """
+
+    def __init__(self, app=None):
+        self.method = DEFAULT_METHOD
+        self.workers = 0
+        self.max_inflight = 0
+        self.in_flight = 0
+        self._method_prefix = None
+        self._executor = None
+        self._lock = threading.Lock()
+        self._inflight_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('PASSWORD_HASH_METHOD', DEFAULT_METHOD)
+        app.config.setdefault('PASSWORD_HASH_WORKERS', os.cpu_count() or 1)
+        app.config.setdefault('PASSWORD_HASH_MAX_INFLIGHT', 4 * max(app.config['PASSWORD_HASH_WORKERS'], 1))
+        self.configure(app.config['PASSWORD_HASH_METHOD'], app.config['PASSWORD_HASH_WORKERS'])
+        self.max_inflight = app.config['PASSWORD_HASH_MAX_INFLIGHT']
+        app.extensions['password_hasher'] = self
+
+    def configure(self, method, workers):
+        """Cambia el método y el tamaño del pool. El pool anterior se cierra."""
+        self.method = method
+        self.workers = workers
+        # Un método con todos sus parámetros es ya el prefijo de sus hashes. Si le faltan
+        # ('scrypt' -> 'scrypt:32768:8:1'), los completa werkzeug con un hash, pero no al
+        # arrancar: en el primer needs_rehash.
+        nombre, _, parametros = method.partition(':')
+        completo = PARAMETROS.get(nombre) == (parametros.count(':') + 1 if parametros else 0)
+        self._method_prefix = method if completo else None
+        self.shutdown()
+
+    # --- API pública ---
+
+    def hash(self, password):
+        """Devuelve el hash de la contraseña con el método configurado."""
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, pwhash, password):
+        """Compara la contraseña con el hash guardado (con el método que tenga el hash)."""
+        return self._run(check_password_hash, pwhash, password)
+
+    def hash_many(self, passwords):
+        """Calcula varios hashes en paralelo, en el mismo orden que la entrada."""
+        passwords = list(passwords)
+        executor = self._get_executor()
+        if executor is None:
+            return [generate_password_hash(p, self.method) for p in passwords]
+        chunksize = max(1, len(passwords) // (self.workers * 4))
+        return list(executor.map(generate_password_hash, passwords, [self.method] * len(passwords), chunksize=chunksize))
+
+    def saturated(self):
+        """True si un hash más superaría PASSWORD_HASH_MAX_INFLIGHT."""
+        return bool(self.max_inflight) and self.in_flight >= self.max_inflight
+
+    def needs_rehash(self, pwhash):
+        """True si el hash se generó con un método o costo distinto al configurado."""
+        return pwhash.split('$', 1)[0] != self._prefijo()
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    # --- Funcionamiento interno ---
+
+    def _prefijo(self):
+        if self._method_prefix is None:
+            self._method_prefix = generate_password_hash('', method=self.method).split('$', 1)[0]
+        return self._method_prefix
+
+    def _get_executor(self):
+        if self.workers <= 0:
+            return None
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    # 'spawn' evita heredar hilos y conexiones abiertas del worker web.
+                    ctx = multiprocessing.get_context('spawn')
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=ctx)
+                    logger.info(f"Pool de hashing iniciado con {self.workers} procesos ({self.method})")
+        return self._executor
+
+    def _run(self, fn, *args):
+        with self._inflight_lock:
+            if self.max_inflight and self.in_flight >= self.max_inflight:
+                raise HashingBusy('Demasiados hashes de contraseña en curso.')
+            self.in_flight += 1
+        try:
+            executor = self._get_executor()
+            with span('hashing'):
+                if executor is None:
+                    return fn(*args)
+                return executor.submit(fn, *args).result()
+        finally:
+            with self._inflight_lock:
+                self.in_flight -= 1
+
+
+# Instancia compartida, igual que 'db' en extensions.py.
+password_hasher = PasswordHasher()
@@ -0,0 +1,65 @@
+# Comprobaciones de salud para el balanceador o el orquestador.
+#
+#   /health/live    El proceso está vivo y atiende peticiones. No toca la base de
+#                   datos: si esta cae, reiniciar los workers no la arregla.
+#   /health/ready   Además la base de datos acepta consultas (SELECT 1). Responde
+#                   503 si no, para dejar de enviar tráfico a esta instancia.
+#
+# Sustituye a la prueba de conexión que se hacía al importar play.py, que
+# retrasaba el arranque de cada worker y de cada comando de la CLI.
+import logging
+import time
+
+from flask import Blueprint, current_app, jsonify
+from sqlalchemy import text
+
+from extensions import db
+
+logger = logging.getLogger(__name__)
+
+bp = Blueprint('health', __name__, cli_group=None)
+
+_estado = {'bd_ok': None}  # Último resultado, para registrar solo los cambios.
+
+
+def init_app(app):
+    """Registra /health/live y /health/ready."""
+    app.config.setdefault('HEALTH_DB_TIMEOUT_MS', 2000)
+    app.register_blueprint(bp)
+
+
+def probar_bd(timeout_ms):
+    """Ejecuta SELECT 1 y devuelve la latencia en milisegundos. Lanza la excepción del driver si falla."""
+    inicio = time.perf_counter()
+    with db.engine.connect() as conexion:
+        if conexion.dialect.name == 'postgresql':
+            conexion.execute(text(f'SET LOCAL statement_timeout = {int(timeout_ms)}'))
+        conexion.execute(text('SELECT 1'))
+    return (time.perf_counter() - inicio) * 1000
+
+
+def _sin_cache(respuesta, codigo=200):
+    respuesta.status_code = codigo
+    respuesta.headers['Cache-Control'] = 'no-store'
+    return respuesta
+
+
+@bp.route('/health/live')
+def live():
+    return _sin_cache(jsonify({'success': True, 'status': 'live'}))
+
+
+@bp.route('/health/ready')
+def ready():
+    try:
+        latencia = probar_bd(current_app.config['HEALTH_DB_TIMEOUT_MS'])
+    except Exception as e:
+        if _estado['bd_ok'] is not False:
+            logger.error(f"❌ Error al conectar con la base de datos: {e}")
+        _estado['bd_ok'] = False
+        return _sin_cache(jsonify({'success': False, 'message': 'La base de datos no responde.'}), 503)
+
+    if not _estado['bd_ok']:
+        logger.info("✅ Conexión a la base de datos exitosa")
+    _estado['bd_ok'] = True
+    return _sin_cache(jsonify({'success': True, 'status': 'ready', 'database_ms': round(latencia, 2)}))
@@ -0,0 +1,412 @@
+# Importación masiva de perfiles desde CSV o JSONL (flask import-profiles).
+#
+# El archivo se lee en streaming y se procesa por lotes de IMPORT_BATCH_SIZE filas:
+#   1. cada fila se valida contra las columnas de Usuario y del perfil (campos
+#      obligatorios y longitudes) y las mismas reglas del formulario de registro;
+#   2. los valores únicos (correo, documentos, NIT) se comprueban contra las filas
+#      anteriores del archivo y contra la BD, con una consulta IN por columna y lote;
+#   3. las contraseñas del lote se calculan en paralelo con password_hasher.hash_many;
+#   4. usuarios y perfiles se insertan con executemany (INSERT de varias filas con
+#      RETURNING para obtener los id) en una transacción por lote.
+#
+# Tras cada commit se guarda un punto de control con la última fila procesada: un
+# import interrumpido se reanuda desde el lote siguiente. Si se corta entre el
+# commit y el punto de control, las filas de ese lote se vuelven a leer y se
+# rechazan como ya registradas. Las filas rechazadas van a un informe CSV con la
+# fila, el correo, el campo y el motivo.
+#
+# Las filas sin contraseña reciben un hash inutilizable: la cuenta no puede iniciar
+# sesión hasta que el usuario elija su contraseña con "¿Olvidaste tu contraseña?".
+# Los índices en memoria de los workers (búsqueda, emparejamiento, filtro de
+# disponibilidad) ven los perfiles importados en su siguiente reconstrucción.
+import csv
+import itertools
+import json
+import os
+import re
+import time
+from datetime import datetime
+
+import click
+from flask import Blueprint, current_app
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+
+import estadisticas
+from extensions import db
+from hashing import password_hasher
+from models import Usuario, Emprendedor, Empresario, TipoPerfil
+from registro import CAMPOS_UNICOS, MENSAJES, normalizar
+
+# Perfiles importables: los que no tienen tablas hijas de intereses.
+MODELOS = {
+    TipoPerfil.EMPRENDEDOR: Emprendedor,
+    TipoPerfil.EMPRESARIO: Empresario,
+}
+
+# Hash que ningún check_password_hash acepta (no tiene el formato 'método$sal$hash').
+HASH_INUTILIZABLE = '!'
+
+_CORREO = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+
+
+class ImportacionError(Exception):
+    """Error que impide seguir con la importación (archivo, cabecera o punto de control)."""
+
+
+def _columnas(modelo):
+    return [c for c in modelo.__table__.columns if c.key not in ('id', 'usuario_id')]
+
+
+# --- Lectura ---
+
+def formato_de(ruta):
+    return 'jsonl' if ruta.lower().endswith(('.jsonl', '.ndjson')) else 'csv'
+
+
+def leer_filas(ruta, formato=None, delimitador=None):
+    """Genera (número de fila, dict) sin cargar el archivo en memoria.
+
+    Las claves se normalizan a minúsculas sin espacios. En CSV la fila 1 es la
+    primera después de la cabecera; en JSONL, la primera línea no vacía.
+    """
+    formato = formato or formato_de(ruta)
+    with open(ruta, encoding='utf-8-sig', newline='') as archivo:
+        if formato == 'jsonl':
+            numero = 0
+            for linea in archivo:
+                if not linea.strip():
+                    continue
+                numero += 1
+                try:
+                    datos = json.loads(linea)
+                except ValueError as e:
+                    yield numero, ValueError(f'JSON no válido: {e}')
+                    continue
+                if not isinstance(datos, dict):
+                    yield numero, ValueError('Cada línea debe ser un objeto JSON.')
+                    continue
+                yield numero, {str(k).strip().lower(): v for k, v in datos.items()}
+            return
+
+        if delimitador is None:
+            muestra = archivo.read(64 * 1024)
+            archivo.seek(0)
+            try:
+                delimitador = csv.Sniffer().sniff(muestra, delimiters=',;\t').delimiter
+            except csv.Error:
+                delimitador = ','
+        lector = csv.reader(archivo, delimiter=delimitador)
+        cabecera = [c.strip().lower() for c in next(lector, [])]
+        if not cabecera:
+            raise ImportacionError('El archivo está vacío.')
+        for numero, valores in enumerate(lector, start=1):
+            if not any(v.strip() for v in valores):
+                continue
+            valores += [''] * (len(cabecera) - len(valores))
+            yield numero, dict(zip(cabecera, valores))
+
+
+# --- Validación ---
+
+def _texto(valor):
+    if valor is None:
+        return None
+    valor = str(valor).strip()
+    return valor or None
+
+
+def validar(tipo_perfil, datos):
+    """Valida una fila. Devuelve (usuario, perfil, errores) con errores como [(campo, mensaje)]."""
+    errores = []
+    correo = normalizar(Usuario.email, datos.get('correo'))
+    if correo is None:
+        errores.append(('correo', 'Campo obligatorio.'))
+    elif len(correo) > Usuario.email.type.length or not _CORREO.match(correo):
+        errores.append(('correo', 'Correo electrónico no válido.'))
+    usuario = {'email': correo, 'contrasena': _texto(datos.get('contrasena'))}
+
+    perfil = {c.key: _texto(datos.get(c.key)) for c in _columnas(MODELOS[tipo_perfil])}
+    if tipo_perfil == TipoPerfil.EMPRESARIO:
+        # Igual que el formulario: el documento del contribuyente o el NIT, según el tipo.
+        tipo = (perfil['tipo_contribuyente'] or '').lower()
+        if tipo == 'natural':
+            perfil['nit'] = None
+            if perfil['numero_documento_contribuyente'] is None:
+                errores.append(('numero_documento_contribuyente', 'Obligatorio para persona natural.'))
+        elif tipo == 'juridica':
+            perfil['numero_documento_contribuyente'] = None
+            if perfil['nit'] is None:
+                errores.append(('nit', 'Obligatorio para persona jurídica.'))
+        elif perfil['tipo_contribuyente'] is not None:
+            errores.append(('tipo_contribuyente', "Debe ser 'natural' o 'juridica'."))
+        perfil['tipo_contribuyente'] = tipo or None
+
+    for columna in _columnas(MODELOS[tipo_perfil]):
+        valor = perfil[columna.key]
+        if valor is None:
+            if not columna.nullable and not any(campo == columna.key for campo, _ in errores):
+                errores.append((columna.key, 'Campo obligatorio.'))
+        elif getattr(columna.type, 'length', None) and len(valor) > columna.type.length:
+            errores.append((columna.key, f'Máximo {columna.type.length} caracteres.'))
+    return usuario, perfil, errores
+
+
+def columnas_requeridas(tipo_perfil):
+    return {'correo'} | {c.key for c in _columnas(MODELOS[tipo_perfil]) if not c.nullable}
+
+
+def _valores_unicos(tipo_perfil, usuario, perfil):
+    """{campo: valor normalizado} de los campos únicos que trae la fila."""
+    valores = {}
+    for campo, columna in CAMPOS_UNICOS[tipo_perfil].items():
+        valor = usuario['email'] if columna is Usuario.email else normalizar(columna, perfil[columna.key])
+        if valor is not None:
+            valores[campo] = valor
+    return valores
+
+
+def ocupados_en_bd(tipo_perfil, filas):
+    """{campo: valores ya registrados} para los valores únicos de las filas, una consulta por campo."""
+    ocupados = {}
+    for campo, columna in CAMPOS_UNICOS[tipo_perfil].items():
+        valores = {f['unicos'][campo] for f in filas if campo in f['unicos']}
+        if not valores:
+            continue
+        expresion = func.lower(Usuario.email) if columna is Usuario.email else columna
+        ocupados[campo] = set(db.session.execute(select(expresion).where(expresion.in_(valores))).scalars())
+    return ocupados
+
+
+# --- Escritura ---
+
+def _insertar_usuarios(filas):
+    tabla = Usuario.__table__
+    if db.engine.dialect.insert_executemany_returning_sort_by_parameter_order:
+        return db.session.execute(tabla.insert().returning(tabla.c.id, sort_by_parameter_order=True), filas).scalars().all()
+    # Sin RETURNING en executemany (MySQL): los id se leen por correo, que es único.
+    db.session.execute(tabla.insert(), filas)
+    ids = dict(db.session.execute(
+        select(tabla.c.email, tabla.c.id).where(tabla.c.email.in_([f['email'] for f in filas]))).all())
+    return [ids[f['email']] for f in filas]
+
+
+def insertar_lote(tipo_perfil, filas):
+    """Inserta los usuarios y perfiles de las filas (ya validadas y con hash) y los cuenta en las estadísticas. Sin commit."""
+    ahora = datetime.utcnow()
+    ids = _insertar_usuarios([
+        {'email': f['usuario']['email'], 'password_hash': f['hash'], 'tipo_perfil': tipo_perfil,
+         'is_admin': False, 'activo': True, 'fecha_registro': ahora}
+        for f in filas])
+    db.session.execute(MODELOS[tipo_perfil].__table__.insert(),
+                       [dict(f['perfil'], usuario_id=usuario_id) for f, usuario_id in zip(filas, ids)])
+    estadisticas.sumar_altas(tipo_perfil, ahora, [f['perfil'] for f in filas])
+
+
+class Importacion:
+    """Una importación de un archivo: lotes, informe de errores y punto de control."""
+
+    def __init__(self, tipo_perfil, informe, lote=1000, simular=False):
+        self.tipo_perfil = tipo_perfil
+        self.informe = informe  # csv.writer del informe de errores
+        self.lote = lote
+        self.simular = simular
+        self.vistos = {campo: set() for campo in CAMPOS_UNICOS[tipo_perfil]}
+        self.procesadas = self.importadas = self.rechazadas = 0
+        self.sin_contrasena = 0
+        self.segundos_hash = 0.0
+
+    def _rechazar(self, fila, errores):
+        correo = fila['usuario']['email'] if 'usuario' in fila else ''
+        for campo, mensaje in errores:
+            self.informe.writerow([fila['numero'], correo or '', campo, mensaje])
+        self.rechazadas += 1
+
+    def procesar(self, pendientes):
+        """Valida, calcula los hashes e inserta un lote de (número, datos) en una transacción."""
+        filas = []
+        for numero, datos in pendientes:
+            self.procesadas += 1
+            if isinstance(datos, Exception):
+                self._rechazar({'numero': numero}, [('', str(datos))])
+                continue
+            usuario, perfil, errores = validar(self.tipo_perfil, datos)
+            fila = {'numero': numero, 'usuario': usuario, 'perfil': perfil}
+            if errores:
+                self._rechazar(fila, errores)
+                continue
+            fila['unicos'] = _valores_unicos(self.tipo_perfil, usuario, perfil)
+            repetidos = [(campo, 'Repetido en una fila anterior del archivo.')
+                         for campo, valor in fila['unicos'].items() if valor in self.vistos[campo]]
+            if repetidos:
+                self._rechazar(fila, repetidos)
+                continue
+            for campo, valor in fila['unicos'].items():
+                self.vistos[campo].add(valor)
+            filas.append(fila)
+
+        filas = self._descartar_ocupados(filas)
+        if not filas or self.simular:
+            self.importadas += len(filas)
+            return
+
+        inicio = time.perf_counter()
+        con_contrasena = [f for f in filas if f['usuario']['contrasena']]
+        for fila, pwhash in zip(con_contrasena, password_hasher.hash_many(f['usuario']['contrasena'] for f in con_contrasena)):
+            fila['hash'] = pwhash
+        self.segundos_hash += time.perf_counter() - inicio
+        for fila in filas:
+            fila.setdefault('hash', HASH_INUTILIZABLE)
+
+        while filas:
+            try:
+                insertar_lote(self.tipo_perfil, filas)
+                db.session.commit()
+                break
+            except IntegrityError as e:
+                # Un registro web se adelantó con alguno de los valores: se apartan esas filas y se
+                # reintenta, tantas veces como haga falta mientras el lote siga encogiendo.
+                db.session.rollback()
+                libres = self._descartar_ocupados(filas)
+                if len(libres) == len(filas):
+                    # Ninguna fila choca con un valor registrado: el lote entero va al informe.
+                    for fila in filas:
+                        self._rechazar(fila, [('', f'No se pudo insertar el lote: {e.orig}')])
+                    libres = []
+                filas = libres
+        self.importadas += len(filas)
+        self.sin_contrasena += sum(1 for f in filas if f['hash'] == HASH_INUTILIZABLE)
+
+    def _descartar_ocupados(self, filas):
+        ocupados = ocupados_en_bd(self.tipo_perfil, filas)
+        libres = []
+        for fila in filas:
+            errores = [(campo, MENSAJES.get(campo, 'El valor ya está registrado.'))
+                       for campo, valor in fila['unicos'].items() if valor in ocupados.get(campo, ())]
+            if errores:
+                self._rechazar(fila, errores)
+            else:
+                libres.append(fila)
+        return libres
+
+
+# --- Punto de control ---
+
+def _leer_control(ruta):
+    if not os.path.exists(ruta):
+        return None
+    with open(ruta, encoding='utf-8') as archivo:
+        return json.load(archivo)
+
+
+def _guardar_control(ruta, datos):
+    temporal = ruta + '.tmp'
+    with open(temporal, 'w', encoding='utf-8') as archivo:
+        json.dump(datos, archivo)
+    os.replace(temporal, ruta)  # Atómico: nunca queda un punto de control a medias.
+
+
+def importar(ruta, tipo_perfil, lote=1000, informe=None, control=None, reanudar=True,
+             simular=False, formato=None, delimitador=None, progreso=print):
+    """Importa el archivo y devuelve la Importacion con los contadores."""
+    informe = informe or ruta + '.errores.csv'
+    control = control or ruta + '.checkpoint'
+    estado = _leer_control(control) if reanudar and not simular else None
+    if estado and estado['perfil'] != tipo_perfil.value:
+        raise ImportacionError(f"El punto de control {control} es de una importación de '{estado['perfil']}'.")
+    if estado and estado.get('archivo') != os.path.abspath(ruta):
+        # Reanudar otro archivo desde la fila guardada se saltaría sus primeras filas sin avisar.
+        raise ImportacionError(f"El punto de control {control} es del archivo {estado.get('archivo')}; "
+                               f"use --desde-cero o --checkpoint para empezar este.")
+    desde = estado['fila'] if estado else 0
+    formato = formato or formato_de(ruta)
+
+    with open(informe, 'a' if estado else 'w', encoding='utf-8', newline='') as archivo_informe:
+        escritor = csv.writer(archivo_informe)
+        if not estado:
+            escritor.writerow(['fila', 'correo', 'campo', 'mensaje'])
+        importacion = Importacion(tipo_perfil, escritor, lote=lote, simular=simular)
+        if estado:
+            importacion.importadas, importacion.rechazadas = estado['importadas'], estado['rechazadas']
+            progreso(f'Reanudando después de la fila {desde} ({estado["importadas"]} ya importadas).')
+
+        inicio = time.perf_counter()
+        pendientes, ultima = [], desde
+        filas = leer_filas(ruta, formato, delimitador)
+        if formato == 'csv':
+            # Con una columna mal escrita se rechazarían todas las filas: mejor parar antes.
+            primera = next(filas, None)
+            if primera is not None:
+                faltan = columnas_requeridas(tipo_perfil) - set(primera[1])
+                if faltan:
+                    raise ImportacionError(f"Faltan columnas en la cabecera: {', '.join(sorted(faltan))}.")
+                filas = itertools.chain([primera], filas)
+        while True:
+            for numero, datos in filas:
+                if numero <= desde:
+                    continue
+                pendientes.append((numero, datos))
+                if len(pendientes) >= lote:
+                    break
+            if not pendientes:
+                break
+            importacion.procesar(pendientes)
+            ultima = pendientes[-1][0]
+            pendientes = []
+            archivo_informe.flush()
+            if not simular:
+                _guardar_control(control, {'archivo': os.path.abspath(ruta), 'perfil': tipo_perfil.value,
+                                           'fila': ultima, 'importadas': importacion.importadas,
+                                           'rechazadas': importacion.rechazadas})
+            segundos = time.perf_counter() - inicio
+            progreso(f'  fila {ultima}: {importacion.importadas} importadas, {importacion.rechazadas} rechazadas '
+                     f'({importacion.procesadas / max(segundos, 1e-9):.0f} filas/s)')
+
+    if not simular and os.path.exists(control):
+        os.remove(control)  # Terminada: una nueva ejecución empieza desde el principio.
+    return importacion
+
+
+# --- Integración con Flask ---
+
+bp = Blueprint('importacion', __name__, cli_group=None)
+
+
+def init_app(app):
+    """Registra el comando import-profiles."""
+    app.config.setdefault('IMPORT_BATCH_SIZE', 1000)
+    app.register_blueprint(bp)
+
+
+@bp.cli.command('import-profiles')
+@click.argument('archivo', type=click.Path(exists=True, dir_okay=False))
+@click.option('--perfil', required=True, type=click.Choice([t.value for t in MODELOS]),
+              help='Tipo de perfil de todas las filas.')
+@click.option('--formato', type=click.Choice(['csv', 'jsonl']), help='Por defecto, según la extensión.')
+@click.option('--delimitador', help="Separador del CSV (por defecto se detecta entre ',', ';' y tabulador).")
+@click.option('--lote', type=int, help='Filas por transacción (por defecto IMPORT_BATCH_SIZE).')
+@click.option('--errores', 'informe', type=click.Path(dir_okay=False), help='Informe de filas rechazadas (ARCHIVO.errores.csv).')
+@click.option('--checkpoint', 'control', type=click.Path(dir_okay=False), help='Punto de control (ARCHIVO.checkpoint).')
+@click.option('--desde-cero', is_flag=True, help='Ignora el punto de control y empieza desde la primera fila.')
+@click.option('--simular', is_flag=True, help='Solo valida (también contra la BD); no calcula hashes ni inserta.')
+def import_profiles(archivo, perfil, formato, delimitador, lote, informe, control, desde_cero, simular):
+    """Importa emprendedores o empresarios desde un CSV o JSONL (una fila por perfil).
+
+    Columnas: correo, contrasena (opcional) y los campos del perfil con el mismo
+    nombre que en el modelo. Las filas rechazadas se listan en el informe de errores.
+    """
+    tipo_perfil = TipoPerfil(perfil)
+    inicio = time.perf_counter()
+    try:
+        resultado = importar(archivo, tipo_perfil, lote=lote or current_app.config['IMPORT_BATCH_SIZE'],
+                             informe=informe, control=control, reanudar=not desde_cero, simular=simular,
+                             formato=formato, delimitador=delimitador)
+    except ImportacionError as e:
+        print(f'❌ {e}')
+        return
+    segundos = time.perf_counter() - inicio
+    accion = 'válidas' if simular else 'importadas'
+    print(f"✅ {resultado.importadas} filas {accion}, {resultado.rechazadas} rechazadas en {segundos:.1f} s "
+          f"(hashes: {resultado.segundos_hash:.1f} s). Informe: {informe or archivo + '.errores.csv'}")
+    if resultado.sin_contrasena:
+        print(f'   {resultado.sin_contrasena} cuentas sin contraseña: deben crearla con "¿Olvidaste tu contraseña?".')
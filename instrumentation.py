@@ -0,0 +1,292 @@
+# Instrumentación de la base de datos.
+#
+# Cuenta las sentencias SQL que ejecuta cada petición. Sirve para detectar
+# consultas N+1 y para que las pruebas puedan afirmar cuántas consultas hace
+# un endpoint (por ejemplo, que /login resuelva usuario y perfil en una sola).
+#
+# También mide el pool de conexiones (espera en el checkout, conexiones en uso,
+# conexiones invalidadas) y la latencia de cada sentencia, con un log de las
+# consultas lentas. Todo se expone en /db/stats.
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from flask import g, has_app_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as SATimeoutError
+from sqlalchemy.pool import Pool, QueuePool
+from telemetry import add_span
+
+logger = logging.getLogger(__name__)
+
+
+class QueryCounter:
+    """Cuenta las consultas por petición y opcionalmente las expone en una cabecera.
+
+    Se configura con app.config:
+        QUERY_COUNT_HEADER   Si es True añade 'X-Query-Count' a cada respuesta (por defecto False).
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('QUERY_COUNT_HEADER', False)
+        if not event.contains(Engine, 'before_cursor_execute', _count_query):
+            event.listen(Engine, 'before_cursor_execute', _count_query)
+
+        @app.before_request
+        def _reset_query_count():
+            g.query_count = 0
+
+        @app.after_request
+        def _add_query_count_header(response):
+            if app.config['QUERY_COUNT_HEADER']:
+                response.headers['X-Query-Count'] = str(g.get('query_count', 0))
+            return response
+
+        app.extensions['query_counter'] = self
+
+
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    if has_app_context():
+        g.query_count = g.get('query_count', 0) + 1
+
+
+def get_query_count():
+    """Número de consultas ejecutadas en el contexto actual."""
+    return g.get('query_count', 0)
+
+
+@contextmanager
+def count_queries():
+    """Cuenta las consultas ejecutadas dentro del bloque.
+
+        with app.app_context(), count_queries() as contador:
+            ...
+        assert contador['total'] <= 1
+    """
+    inicio = get_query_count()
+    contador = {'total': 0}
+    try:
+        yield contador
+    finally:
+        contador['total'] = get_query_count() - inicio
+
+
+# --- Pool de conexiones y latencia de las sentencias ---
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool que mide cuánto espera cada checkout por una conexión libre.
+
+    SQLAlchemy no tiene un evento al empezar un checkout, así que la espera se
+    mide alrededor de _do_get(): incluye abrir una conexión nueva si hace falta
+    y el tiempo bloqueado cuando el pool y el overflow están agotados.
+    """
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            return super()._do_get()
+        except SATimeoutError:
+            db_metrics.record_checkout_timeout(time.perf_counter() - inicio)
+            raise
+        finally:
+            db_metrics.record_checkout_wait(time.perf_counter() - inicio)
+
+
+class DatabaseMetrics:
+    """Espera de checkout, ocupación del pool, latencia por sentencia y consultas lentas.
+
+    Se configura con app.config:
+        DB_SLOW_QUERY_MS      Sentencias más lentas que esto se registran en el log (por defecto 500; 0 desactiva).
+        DB_SLOW_QUERY_KEEP    Cuántas consultas lentas recientes se guardan para /db/stats (por defecto 20).
+
+    Los contadores son del proceso (suman todos los engines); cada worker expone los suyos.
+    """
+
+    # Límites superiores en milisegundos de los buckets de latencia (el último es +inf).
+    BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self.slow_query_ms = 500
+        self._slow = deque(maxlen=20)
+        self.reset()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('DB_SLOW_QUERY_MS', 500)
+        app.config.setdefault('DB_SLOW_QUERY_KEEP', 20)
+        self.slow_query_ms = app.config['DB_SLOW_QUERY_MS']
+        self._slow = deque(self._slow, maxlen=app.config['DB_SLOW_QUERY_KEEP'])
+        for objetivo, nombre, funcion in self._listeners():
+            if not event.contains(objetivo, nombre, funcion):
+                event.listen(objetivo, nombre, funcion)
+        app.extensions['db_metrics'] = self
+
+    def reset(self):
+        with self._lock:
+            self._stats = {
+                'checkouts': 0,
+                'checkout_wait_total': 0.0,
+                'checkout_wait_max': 0.0,
+                'checkout_timeouts': 0,
+                'connections_opened': 0,
+                'invalidated': 0,
+                'in_use': 0,
+                'in_use_max': 0,
+                'statements': 0,
+                'statement_errors': 0,
+                'statement_time_total': 0.0,
+                'statement_time_max': 0.0,
+                'slow_queries': 0,
+            }
+            self._buckets = [0] * (len(self.BUCKETS_MS) + 1)
+            self._slow.clear()
+
+    # --- Registro (llamado desde el pool y los eventos) ---
+
+    def record_checkout_wait(self, segundos):
+        with self._lock:
+            self._stats['checkout_wait_total'] += segundos
+            if segundos > self._stats['checkout_wait_max']:
+                self._stats['checkout_wait_max'] = segundos
+
+    def record_checkout_timeout(self, segundos):
+        with self._lock:
+            self._stats['checkout_timeouts'] += 1
+        logger.error(f"❌ Sin conexiones libres en el pool tras {segundos:.2f} s")
+
+    def _record_statement(self, segundos, statement, error=False):
+        ms = segundos * 1000
+        lenta = self.slow_query_ms and ms >= self.slow_query_ms
+        with self._lock:
+            s = self._stats
+            s['statements'] += 1
+            s['statement_time_total'] += segundos
+            if segundos > s['statement_time_max']:
+                s['statement_time_max'] = segundos
+            if error:
+                s['statement_errors'] += 1
+            self._buckets[bisect_left(self.BUCKETS_MS, ms)] += 1
+            if lenta:
+                s['slow_queries'] += 1
+                self._slow.append({'ms': round(ms, 2), 'statement': _abreviar(statement), 'at': time.time()})
+        if lenta:
+            logger.warning(f"Consulta lenta ({ms:.0f} ms): {_abreviar(statement)}")
+
+    # --- Consulta ---
+
+    def stats(self, engine=None):
+        """Contadores acumulados y, si se pasa el engine, el estado actual de su pool."""
+        with self._lock:
+            data = dict(self._stats)
+            buckets = list(self._buckets)
+            slow = list(self._slow)
+        checkouts = data['checkouts']
+        statements = data['statements']
+        data['checkout_wait_avg'] = data['checkout_wait_total'] / checkouts if checkouts else 0.0
+        data['statement_time_avg'] = data['statement_time_total'] / statements if statements else 0.0
+        # [límite superior en ms (None = +inf), sentencias] en orden creciente
+        data['statement_latency_buckets'] = [list(par) for par in zip(list(self.BUCKETS_MS) + [None], buckets)]
+        data['recent_slow_queries'] = slow
+        if engine is not None:
+            data['pool'] = _estado_pool(engine.pool)
+        return data
+
+    # --- Eventos ---
+
+    def _listeners(self):
+        return [
+            (Engine, 'before_cursor_execute', _antes_de_sentencia),
+            (Engine, 'after_cursor_execute', _despues_de_sentencia),
+            (Engine, 'handle_error', _error_de_sentencia),
+            (Pool, 'connect', _conexion_abierta),
+            (Pool, 'checkout', _checkout),
+            (Pool, 'checkin', _checkin),
+            (Pool, 'invalidate', _invalidada),
+        ]
+
+    def _contar(self, clave, cantidad=1):
+        with self._lock:
+            self._stats[clave] += cantidad
+
+    def _en_uso(self, delta):
+        with self._lock:
+            s = self._stats
+            s['in_use'] += delta
+            if delta > 0:
+                s['checkouts'] += 1
+                if s['in_use'] > s['in_use_max']:
+                    s['in_use_max'] = s['in_use']
+
+
+def _abreviar(statement, limite=300):
+    statement = ' '.join(str(statement).split())
+    return statement if len(statement) <= limite else statement[:limite] + '…'
+
+
+def _estado_pool(pool):
+    """Tamaño y ocupación actual del pool. La saturación es en uso / (tamaño + overflow máximo)."""
+    estado = {'class': type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        capacidad = pool.size() + max(pool._max_overflow, 0)
+        estado.update({
+            'size': pool.size(),
+            'max_overflow': pool._max_overflow,
+            'checked_out': pool.checkedout(),
+            'checked_in': pool.checkedin(),
+            'overflow': pool.overflow(),
+            'timeout': pool.timeout(),
+            'saturation': round(pool.checkedout() / capacidad, 4) if capacidad > 0 else None,
+        })
+    return estado
+
+
+def _antes_de_sentencia(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._inicio_sentencia = time.perf_counter()
+
+
+def _despues_de_sentencia(conn, cursor, statement, parameters, context, executemany):
+    inicio = getattr(context, '_inicio_sentencia', None)
+    if inicio is not None:
+        segundos = time.perf_counter() - inicio
+        db_metrics._record_statement(segundos, statement)
+        add_span('db', segundos)
+
+
+def _error_de_sentencia(contexto):
+    inicio = getattr(contexto.execution_context, '_inicio_sentencia', None)
+    if inicio is not None:
+        segundos = time.perf_counter() - inicio
+        db_metrics._record_statement(segundos, contexto.statement, error=True)
+        add_span('db', segundos)
+
+
+def _conexion_abierta(dbapi_connection, connection_record):
+    db_metrics._contar('connections_opened')
+
+
+def _checkout(dbapi_connection, connection_record, connection_proxy):
+    db_metrics._en_uso(1)
+
+
+def _checkin(dbapi_connection, connection_record):
+    # checkin también se emite al descartar una conexión invalidada (dbapi_connection es None).
+    db_metrics._en_uso(-1)
+
+
+def _invalidada(dbapi_connection, connection_record, exception):
+    db_metrics._contar('invalidated')
+    if exception is not None:
+        logger.warning(f"Conexión descartada por el pool: {exception}")
+
+
+db_metrics = DatabaseMetrics()
@@ -0,0 +1,226 @@
+# Cola de envío de correos en segundo plano.
+#
+# Las rutas construyen el mensaje (render_template necesita el contexto de la
+# petición) y lo encolan; un pool de hilos lo envía después. Cada hilo toma un
+# lote de la cola y lo envía con una sola conexión SMTP (mail.connect()), así el
+# handshake y la negociación TLS se pagan una vez por lote y no una por correo.
+#
+# Flask-Mail no se importa hasta el primer envío: arrancar un worker o un
+# comando de la CLI no paga la carga del paquete 'email' de la biblioteca estándar.
+import logging
+import queue
+import threading
+import time
+
+from telemetry import span
+
+logger = logging.getLogger(__name__)
+
+
+class MailQueueFull(Exception):
+    """Se lanza cuando la cola de correos está llena y no se puede encolar más."""
+
+
+class MailDispatcher:
+    """Cola acotada de correos con un pool de hilos que reutiliza conexiones SMTP.
+
+    Se configura con las variables MAIL_QUEUE_* de app.config:
+        MAIL_QUEUE_MAXSIZE       Tamaño máximo de la cola (por defecto 1000).
+        MAIL_QUEUE_WORKERS       Número de hilos de envío (por defecto 2).
+        MAIL_QUEUE_BATCH_SIZE    Máximo de correos por conexión SMTP (por defecto 20).
+        MAIL_QUEUE_MAX_RETRIES   Reintentos por correo antes de descartarlo (por defecto 3).
+        MAIL_QUEUE_BACKOFF       Espera base en segundos, se duplica en cada reintento (por defecto 1.0).
+        MAIL_QUEUE_SYNC          Si es True envía en línea, útil en pruebas (por defecto False).
+    """
+
+    def __init__(self, mail=None, app=None):
+        self.mail = mail
+        self.app = None
+        self._queue = None
+        self._workers = []
+        self._reintentos = 0  # Reintentos esperando su temporizador (aún fuera de la cola)
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            'enqueued': 0,
+            'sent': 0,
+            'failed': 0,
+            'retried': 0,
+            'rejected': 0,
+            'batches': 0,
+            'send_time_total': 0.0,
+            'send_time_max': 0.0,
+        }
+        if app is not None:
+            self.init_app(app, mail)
+
+    def init_app(self, app, mail=None):
+        """Asocia el despachador a la app. Flask-Mail y los hilos se crean con el primer envío."""
+        self.mail = mail
+        self.app = app
+        app.config.setdefault('MAIL_QUEUE_MAXSIZE', 1000)
+        app.config.setdefault('MAIL_QUEUE_WORKERS', 2)
+        app.config.setdefault('MAIL_QUEUE_BATCH_SIZE', 20)
+        app.config.setdefault('MAIL_QUEUE_MAX_RETRIES', 3)
+        app.config.setdefault('MAIL_QUEUE_BACKOFF', 1.0)
+        app.config.setdefault('MAIL_QUEUE_SYNC', False)
+        self._queue = queue.Queue(maxsize=app.config['MAIL_QUEUE_MAXSIZE'])
+        app.extensions['mail_queue'] = self
+
+    # --- API pública ---
+
+    def enqueue(self, msg):
+        """Encola un mensaje y regresa de inmediato.
+
+        Lanza MailQueueFull si la cola está llena, para que la ruta pueda
+        responder con un error en lugar de bloquear al worker.
+        """
+        if self.app.config['MAIL_QUEUE_SYNC']:
+            self._record('enqueued')
+            self._send_batch([(msg, 0)])
+            return
+
+        self._ensure_workers()
+        try:
+            self._queue.put_nowait((msg, 0))
+        except queue.Full:
+            self._record('rejected')
+            raise MailQueueFull('La cola de correos está llena.')
+        self._record('enqueued')
+
+    def message(self, *args, **kwargs):
+        """Crea un flask_mail.Message, inicializando Flask-Mail si aún no se ha hecho."""
+        self._get_mail()
+        from flask_mail import Message
+        return Message(*args, **kwargs)
+
+    def stats(self):
+        """Devuelve un diccionario con la profundidad de la cola y los contadores."""
+        with self._stats_lock:
+            data = dict(self._stats)
+        enviados = data['sent']
+        data['queue_depth'] = self._queue.qsize() if self._queue is not None else 0
+        data['retries_pending'] = self._reintentos
+        data['workers'] = sum(1 for w in self._workers if w.is_alive())
+        data['send_time_avg'] = data['send_time_total'] / enviados if enviados else 0.0
+        return data
+
+    def join(self, timeout=None):
+        """Espera a que la cola quede vacía y sin reintentos pendientes. Pensado para pruebas y apagado ordenado."""
+        fin = time.monotonic() + timeout if timeout is not None else None
+        while self._queue.unfinished_tasks or self._reintentos:
+            if fin is not None and time.monotonic() >= fin:
+                return False
+            time.sleep(0.01)
+        return True
+
+    # --- Funcionamiento interno ---
+
+    def _record(self, key, amount=1):
+        with self._stats_lock:
+            self._stats[key] += amount
+
+    def _get_mail(self):
+        if self.mail is None:
+            with self._lock:
+                if self.mail is None:
+                    from flask_mail import Mail
+                    self.mail = Mail(self.app)
+        return self.mail
+
+    def _ensure_workers(self):
+        if self._workers:
+            return
+        with self._lock:
+            if self._workers:
+                return
+            for i in range(self.app.config['MAIL_QUEUE_WORKERS']):
+                worker = threading.Thread(target=self._worker_loop, name=f'mail-queue-{i}', daemon=True)
+                worker.start()
+                self._workers.append(worker)
+
+    def _take_batch(self):
+        """Bloquea hasta tener un mensaje y luego toma los que haya disponibles hasta el tamaño de lote."""
+        batch = [self._queue.get()]
+        while len(batch) < self.app.config['MAIL_QUEUE_BATCH_SIZE']:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _worker_loop(self):
+        while True:
+            batch = self._take_batch()
+            try:
+                self._send_batch(batch)
+            except Exception as e:  # Un hilo de envío nunca debe morir.
+                logger.error(f"❌ Error inesperado en la cola de correos: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _send_batch(self, batch):
+        """Envía un lote por una sola conexión SMTP. Los fallos se reprograman con backoff."""
+        pendientes = list(batch)
+        with self.app.app_context():
+            try:
+                with span('smtp'), self._get_mail().connect() as conn:
+                    self._record('batches')
+                    while pendientes:
+                        msg, intentos = pendientes[0]
+                        inicio = time.perf_counter()
+                        try:
+                            conn.send(msg)
+                        except Exception as e:
+                            pendientes.pop(0)
+                            self._retry_or_drop(msg, intentos, e)
+                            continue
+                        pendientes.pop(0)
+                        self._record_send(time.perf_counter() - inicio)
+            except Exception as e:
+                # Falló la conexión (o el cierre): todo lo que no se envió se reprograma.
+                for msg, intentos in pendientes:
+                    self._retry_or_drop(msg, intentos, e)
+
+    def _record_send(self, elapsed):
+        with self._stats_lock:
+            self._stats['sent'] += 1
+            self._stats['send_time_total'] += elapsed
+            if elapsed > self._stats['send_time_max']:
+                self._stats['send_time_max'] = elapsed
+
+    def _retry_or_drop(self, msg, intentos, error):
+        if intentos >= self.app.config['MAIL_QUEUE_MAX_RETRIES']:
+            self._record('failed')
+            logger.error(f"❌ Correo a {msg.recipients} descartado tras {intentos + 1} intentos: {error}")
+            return
+
+        espera = self.app.config['MAIL_QUEUE_BACKOFF'] * (2 ** intentos)
+        self._record('retried')
+        logger.warning(f"Reintentando correo a {msg.recipients} en {espera:.1f}s: {error}")
+        if self.app.config['MAIL_QUEUE_SYNC']:
+            time.sleep(espera)
+            self._send_batch([(msg, intentos + 1)])
+            return
+        # El reintento se programa con un temporizador para no bloquear el hilo de envío.
+        # Se cuenta antes de que el lote se marque como hecho, para que join() no lo pierda de vista.
+        with self._stats_lock:
+            self._reintentos += 1
+        timer = threading.Timer(espera, self._requeue, args=(msg, intentos + 1))
+        timer.daemon = True
+        timer.start()
+
+    def _requeue(self, msg, intentos):
+        try:
+            self._queue.put_nowait((msg, intentos))
+        except queue.Full:
+            self._record('failed')
+            logger.error(f"❌ Correo a {msg.recipients} descartado: la cola está llena.")
+        finally:
+            # Ya está en la cola (o descartado): desde aquí lo cubre unfinished_tasks.
+            with self._stats_lock:
+                self._reintentos -= 1
+
+
+mail_dispatcher = MailDispatcher()
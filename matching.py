@@ -0,0 +1,413 @@
+# Emparejamiento entre emprendedores e inversionistas.
+#
+# Cada perfil se codifica como un bitset (un int de Python) con sus facetas:
+# tipo de inversión, etapas y áreas. El puntaje de un par es el popcount de la
+# intersección por faceta, con pesos. Como los valores posibles son pocos, miles
+# de perfiles comparten el mismo bitset: se agrupan por firma y se puntúan las
+# firmas distintas (unos cientos) en lugar de todos los pares. El top-K se
+# guarda por firma de emprendedor y se invalida solo cuando un cambio puede
+# alterarlo.
+#
+# El índice se construye con la primera consulta del proceso. Después un hilo lo
+# reconstruye cada MATCHING_REBUILD_INTERVAL segundos (recoge los cambios de otros
+# workers) fuera de las peticiones, como en search.py: el índice nuevo se arma
+# aparte y se intercambia bajo el lock, y los commits de este proceso que llegan
+# mientras tanto se vuelven a aplicar sobre él.
+import bisect
+import logging
+import threading
+import time
+import unicodedata
+
+from flask import Blueprint, current_app, jsonify, request, session
+from sqlalchemy import event, select
+
+from extensions import db
+from models import Emprendedor, Inversionista, InversionistaArea, InversionistaEtapa
+
+logger = logging.getLogger(__name__)
+
+# --- Vocabulario y codificación ---
+
+TIPOS_INVERSION = ['capital', 'angel', 'credito']
+ETAPAS = ['idea', 'prototipo', 'empresa']
+AREAS = ['tecnologias', 'optimizacion', 'industrializacion']
+
+# Qué tipos de inversión sirven para cada tipo de apoyo que busca el emprendedor.
+APOYO_A_INVERSION = {
+    'financiamiento': {'capital', 'angel', 'credito'},
+    'mentoria': {'angel'},
+    'alianzas': {'capital'},
+}
+
+# El emprendedor describe su proyecto en texto libre; las áreas y la etapa se infieren por raíces de palabras.
+PALABRAS_AREA = {
+    'tecnologias': ['tecnolog', 'digital', 'software', 'sensor', 'automatiz', 'dato', 'app', 'plataforma'],
+    'optimizacion': ['optimiz', 'eficien', 'proceso', 'seguridad', 'costo', 'mejora', 'ambiental'],
+    'industrializacion': ['industri', 'transform', 'coque', 'planta', 'produc', 'maquinaria', 'comercializ'],
+}
+PALABRAS_ETAPA = {
+    'prototipo': ['prototipo', 'piloto', 'mvp', 'validacion', 'prueba'],
+    'empresa': ['empresa', 'ventas', 'clientes', 'operacion', 'facturacion'],
+}
+
+_BITS = {}
+for _faceta, _valores in (('tipo', TIPOS_INVERSION), ('etapa', ETAPAS), ('area', AREAS)):
+    for _valor in _valores:
+        _BITS[(_faceta, _valor)] = 1 << len(_BITS)
+
+
+def _mascara(faceta):
+    return sum(bit for (f, _), bit in _BITS.items() if f == faceta)
+
+
+MASCARA_TIPO = _mascara('tipo')
+MASCARA_ETAPA = _mascara('etapa')
+MASCARA_AREA = _mascara('area')
+PESOS = ((MASCARA_TIPO, 3), (MASCARA_ETAPA, 2), (MASCARA_AREA, 2))
+
+
+def _bits(faceta, valores):
+    return sum(_BITS.get((faceta, v), 0) for v in valores)
+
+
+def _normalizar(texto):
+    texto = unicodedata.normalize('NFKD', (texto or '').lower())
+    return ''.join(c for c in texto if not unicodedata.combining(c))
+
+
+def codificar_inversionista(tipo_inversion, etapas, areas):
+    """Bitset de un inversionista a partir de su tipo de inversión, etapas y áreas."""
+    return _bits('tipo', [tipo_inversion]) | _bits('etapa', etapas) | _bits('area', areas)
+
+
+def codificar_emprendedor(tipo_apoyo, *textos):
+    """Bitset de un emprendedor: tipos de inversión compatibles y áreas/etapa inferidas del texto."""
+    texto = _normalizar(' '.join(t or '' for t in textos))
+    areas = [area for area, raices in PALABRAS_AREA.items() if any(r in texto for r in raices)]
+    etapa = next((e for e, raices in PALABRAS_ETAPA.items() if any(r in texto for r in raices)), 'idea')
+    return _bits('tipo', APOYO_A_INVERSION.get(tipo_apoyo, ())) | _bits('area', areas) | _bits('etapa', [etapa])
+
+
+def puntaje(mascara_emprendedor, mascara_inversionista):
+    """Puntaje de un par. Es 0 si el tipo de inversión no es compatible con el apoyo buscado."""
+    comun = mascara_emprendedor & mascara_inversionista
+    if not comun & MASCARA_TIPO:
+        return 0
+    return sum((comun & mascara).bit_count() * peso for mascara, peso in PESOS)
+
+
+# --- Índice en memoria ---
+
+class MatchingIndex:
+    """Índice de emparejamiento con caché de top-K por firma de emprendedor."""
+
+    def __init__(self, top_k=20):
+        self.top_k = top_k
+        self._inversionistas = {}      # id -> bitset
+        self._grupos = {}              # bitset -> ids ordenados
+        self._emprendedores = {}       # id -> bitset
+        self._cache = {}               # bitset de emprendedor -> (resultado, umbral)
+        self._lock = threading.RLock()
+        self._diario = None  # Cambios recibidos durante cargar(), para aplicarlos al índice nuevo
+        self.construido_en = None
+        self.stats = {'hits': 0, 'misses': 0, 'invalidaciones': 0}
+
+    def cargar(self, inversionistas, emprendedores):
+        """Reemplaza todo el contenido. Recibe iterables de (id, bitset).
+
+        El índice nuevo se construye aparte (los iterables pueden ser generadores
+        que leen la base de datos); las consultas siguen viendo el anterior
+        completo hasta el intercambio.
+        """
+        with self._lock:
+            self._diario = []
+        nuevo = MatchingIndex(self.top_k)
+        try:
+            nuevo._inversionistas = dict(inversionistas)
+            for inv_id, mascara in nuevo._inversionistas.items():
+                nuevo._grupos.setdefault(mascara, []).append(inv_id)
+            for ids in nuevo._grupos.values():
+                ids.sort()
+            nuevo._emprendedores = dict(emprendedores)
+        except BaseException:
+            with self._lock:
+                self._diario = None
+            raise
+        with self._lock:
+            diario, self._diario = self._diario, None
+            for metodo, args in diario:
+                getattr(nuevo, metodo)(*args)
+            self._inversionistas = nuevo._inversionistas
+            self._grupos = nuevo._grupos
+            self._emprendedores = nuevo._emprendedores
+            self._cache = {}
+            self.construido_en = time.monotonic()
+
+    def recibe_cambios(self):
+        """Si los commits deben aplicarse: el índice ya está construido o se está construyendo."""
+        with self._lock:
+            return self.construido_en is not None or self._diario is not None
+
+    def calcular_todo(self):
+        """Precalcula el top-K de todas las firmas de emprendedor presentes."""
+        with self._lock:
+            for mascara in set(self._emprendedores.values()):
+                self._top_k_mascara(mascara)
+
+    def set_inversionista(self, inv_id, mascara):
+        """Alta, cambio (mascara nueva) o baja (mascara=None) de un inversionista."""
+        with self._lock:
+            if self._diario is not None:
+                self._diario.append(('set_inversionista', (inv_id, mascara)))
+            anterior = self._inversionistas.pop(inv_id, None)
+            if anterior is not None:
+                grupo = self._grupos[anterior]
+                grupo.remove(inv_id)
+                if not grupo:
+                    del self._grupos[anterior]
+            if mascara is not None:
+                self._inversionistas[inv_id] = mascara
+                bisect.insort(self._grupos.setdefault(mascara, []), inv_id)
+            self._invalidar(inv_id, mascara)
+
+    def set_emprendedor(self, emp_id, mascara):
+        """Alta, cambio o baja de un emprendedor. El top-K de su firma se calcula al pedirlo."""
+        with self._lock:
+            if self._diario is not None:
+                self._diario.append(('set_emprendedor', (emp_id, mascara)))
+            if mascara is None:
+                self._emprendedores.pop(emp_id, None)
+            else:
+                self._emprendedores[emp_id] = mascara
+
+    def tamano(self):
+        """(inversionistas, emprendedores) en el índice."""
+        with self._lock:
+            return len(self._inversionistas), len(self._emprendedores)
+
+    def top_k_emprendedor(self, emp_id, k=None):
+        """Lista de (inversionista_id, puntaje) para un emprendedor, de mayor a menor puntaje."""
+        with self._lock:
+            mascara = self._emprendedores.get(emp_id)
+            if mascara is None:
+                return None
+            return self._top_k_mascara(mascara)[:k or self.top_k]
+
+    # --- Funcionamiento interno ---
+
+    def _top_k_mascara(self, mascara):
+        cacheado = self._cache.get(mascara)
+        if cacheado is not None:
+            self.stats['hits'] += 1
+            return cacheado[0]
+        self.stats['misses'] += 1
+
+        puntuados = sorted(
+            ((puntaje(mascara, m), m) for m in self._grupos),
+            key=lambda par: -par[0],
+        )
+        resultado = []
+        for valor, m in puntuados:
+            if valor == 0 or (len(resultado) >= self.top_k and valor < resultado[-1][1]):
+                break
+            # Los empates de puntaje entre grupos se resuelven por id, como dentro de un grupo.
+            candidatos = [(inv_id, valor) for inv_id in self._grupos[m][:self.top_k]]
+            resultado = sorted(resultado + candidatos, key=lambda par: (-par[1], par[0]))[:self.top_k]
+        umbral = resultado[-1][1] if len(resultado) >= self.top_k else 1
+        self._cache[mascara] = (resultado, umbral)
+        return resultado
+
+    def _invalidar(self, inv_id, mascara_nueva):
+        """Descarta solo los top-K que el cambio de este inversionista puede alterar."""
+        for mascara, (resultado, umbral) in list(self._cache.items()):
+            presente = any(i == inv_id for i, _ in resultado)
+            entra = mascara_nueva is not None and puntaje(mascara, mascara_nueva) >= umbral
+            if presente or entra:
+                del self._cache[mascara]
+                self.stats['invalidaciones'] += 1
+
+
+matching_index = MatchingIndex()
+
+
+_estado = {'hilo': None}
+_construccion = threading.Lock()  # La primera construcción, una sola vez aunque lleguen varias consultas
+
+
+def _inversionistas():
+    etapas, areas = {}, {}
+    for inv_id, etapa in db.session.execute(db.select(InversionistaEtapa.inversionista_id, InversionistaEtapa.etapa)):
+        etapas.setdefault(inv_id, []).append(etapa)
+    for inv_id, area in db.session.execute(db.select(InversionistaArea.inversionista_id, InversionistaArea.area)):
+        areas.setdefault(inv_id, []).append(area)
+    for inv_id, tipo in db.session.execute(db.select(Inversionista.id, Inversionista.tipo_inversion)):
+        yield inv_id, codificar_inversionista(tipo, etapas.get(inv_id, ()), areas.get(inv_id, ()))
+
+
+def _emprendedores():
+    for emp_id, apoyo, relacion, titulo, descripcion in db.session.execute(db.select(
+            Emprendedor.id, Emprendedor.tipo_apoyo, Emprendedor.relacion_sector,
+            Emprendedor.titulo_proyecto, Emprendedor.descripcion_proyecto)):
+        yield emp_id, codificar_emprendedor(apoyo, relacion, titulo, descripcion)
+
+
+def construir_desde_bd():
+    """Lee todos los perfiles con cuatro consultas planas y reconstruye el índice."""
+    matching_index.cargar(_inversionistas(), _emprendedores())
+    return matching_index.tamano()
+
+
+def _asegurar_indice():
+    """Construye el índice con la primera consulta y arranca el hilo que lo refresca."""
+    if matching_index.construido_en is None:
+        with _construccion:
+            if matching_index.construido_en is None:
+                construir_desde_bd()
+    if _estado['hilo'] is None and current_app.config['MATCHING_REBUILD_INTERVAL']:
+        with _construccion:
+            if _estado['hilo'] is None:
+                # Nace con la primera consulta, ya dentro del worker (después del fork).
+                _estado['hilo'] = threading.Thread(target=_refrescar, args=(current_app._get_current_object(),),
+                                                   name='matching-rebuild', daemon=True)
+                _estado['hilo'].start()
+
+
+def _refrescar(app):
+    while True:
+        time.sleep(app.config['MATCHING_REBUILD_INTERVAL'])
+        with app.app_context():
+            try:
+                construir_desde_bd()
+            except Exception as e:  # El hilo de refresco nunca debe morir.
+                logger.error(f"❌ Error al reconstruir el índice de emparejamiento: {e}")
+            finally:
+                db.session.remove()
+
+
+# --- Actualización incremental a partir de la sesión ---
+
+def _registrar_cambios(session, flush_context):
+    """Durante el flush anota qué perfiles se tocaron (el estado de la sesión aún es el previo)."""
+    tocados = session.info.setdefault('matching_tocados', set())
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Inversionista):
+            tocados.add(('inv', obj.id))
+        elif isinstance(obj, Emprendedor):
+            tocados.add(('emp', obj.id))
+        elif isinstance(obj, (InversionistaEtapa, InversionistaArea)):
+            tocados.add(('inv', obj.inversionista_id))
+    for obj in session.deleted:
+        if isinstance(obj, Inversionista):
+            tocados.add(('inv', obj.id))
+        elif isinstance(obj, Emprendedor):
+            tocados.add(('emp', obj.id))
+        elif isinstance(obj, (InversionistaEtapa, InversionistaArea)):
+            tocados.add(('inv', obj.inversionista_id))
+
+
+def _codificar_tocados(session, flush_context):
+    """Terminado el flush calcula el bitset final de cada perfil tocado (None si se borró).
+
+    Se aplican al índice solo cuando la transacción hace commit.
+    """
+    tocados = session.info.pop('matching_tocados', None)
+    if not tocados:
+        return
+    pendientes = session.info.setdefault('matching_pendientes', {})
+    for tipo, obj_id in tocados:
+        if tipo == 'inv':
+            inv = session.get(Inversionista, obj_id)
+            pendientes[(tipo, obj_id)] = None if inv is None or inv in session.deleted else codificar_inversionista(
+                inv.tipo_inversion, inv.etapas_interes, inv.areas_interes)
+        else:
+            emp = session.get(Emprendedor, obj_id)
+            pendientes[(tipo, obj_id)] = None if emp is None or emp in session.deleted else codificar_emprendedor(
+                emp.tipo_apoyo, emp.relacion_sector, emp.titulo_proyecto, emp.descripcion_proyecto)
+
+
+def _aplicar_cambios(session):
+    pendientes = session.info.pop('matching_pendientes', None)
+    if not pendientes or not matching_index.recibe_cambios():
+        return
+    for (tipo, obj_id), mascara in pendientes.items():
+        if tipo == 'inv':
+            matching_index.set_inversionista(obj_id, mascara)
+        else:
+            matching_index.set_emprendedor(obj_id, mascara)
+
+
+def _descartar_cambios(session):
+    session.info.pop('matching_tocados', None)
+    session.info.pop('matching_pendientes', None)
+
+
+# --- Integración con Flask ---
+
+bp = Blueprint('matching', __name__, cli_group=None)
+
+
+def init_app(app):
+    """Configura el índice y registra los eventos de sesión, la ruta y el comando CLI."""
+    app.config.setdefault('MATCHING_TOP_K', 20)
+    app.config.setdefault('MATCHING_REBUILD_INTERVAL', 300)
+    matching_index.top_k = app.config['MATCHING_TOP_K']
+    sesion = db.session.session_factory.class_
+    if not event.contains(sesion, 'after_flush', _registrar_cambios):
+        event.listen(sesion, 'after_flush', _registrar_cambios)
+        event.listen(sesion, 'after_flush_postexec', _codificar_tocados)
+        event.listen(sesion, 'after_commit', _aplicar_cambios)
+        event.listen(sesion, 'after_rollback', _descartar_cambios)
+    app.register_blueprint(bp)
+
+
+def _puede_ver_sugeridos(emprendedor_id):
+    """Los sugeridos de un emprendedor los ve él mismo o cualquier inversionista."""
+    perfil = session.get('user_profile')
+    if perfil == 'inversionista':
+        return True
+    if perfil != 'emprendedor':
+        return False
+    propietario = db.session.execute(
+        select(Emprendedor.usuario_id).where(Emprendedor.id == emprendedor_id)).scalar()
+    return propietario is not None and propietario == session['user_id']
+
+
+@bp.route('/matching/emprendedores/<int:emprendedor_id>')
+def inversionistas_sugeridos(emprendedor_id):
+    """Top-K de inversionistas para un emprendedor (?k=N, como máximo MATCHING_TOP_K)."""
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'message': 'Debe iniciar sesión.'}), 401
+    if not _puede_ver_sugeridos(emprendedor_id):
+        return jsonify({'success': False, 'message': 'Solo el emprendedor o un inversionista pueden ver estas sugerencias.'}), 403
+    _asegurar_indice()
+    k = min(request.args.get('k', 10, type=int), current_app.config['MATCHING_TOP_K'])
+    resultado = matching_index.top_k_emprendedor(emprendedor_id, k)
+    if resultado is None:
+        return jsonify({'success': False, 'message': 'Emprendedor no encontrado.'}), 404
+
+    ids = [inv_id for inv_id, _ in resultado]
+    perfiles = {
+        inv.id: inv for inv in db.session.execute(db.select(Inversionista).where(Inversionista.id.in_(ids))).scalars()
+    }
+    sugeridos = [
+        {
+            'inversionista_id': inv_id,
+            'nombre_completo': perfiles[inv_id].nombre_completo,
+            'nombre_fondo': perfiles[inv_id].nombre_fondo,
+            'tipo_inversion': perfiles[inv_id].tipo_inversion,
+            'puntaje': valor,
+        }
+        for inv_id, valor in resultado if inv_id in perfiles
+    ]
+    return jsonify({'success': True, 'inversionistas': sugeridos})
+
+
+@bp.cli.command('rebuild-matches')
+def rebuild_matches():
+    """Reconstruye el índice de emparejamiento y precalcula todos los top-K."""
+    inicio = time.perf_counter()
+    total_inv, total_emp = construir_desde_bd()
+    matching_index.calcular_todo()
+    print(f"✅ Índice reconstruido: {total_inv} inversionistas, {total_emp} emprendedores "
+          f"en {time.perf_counter() - inicio:.2f} s")
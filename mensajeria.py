@@ -0,0 +1,445 @@
+# Mensajería entre usuarios.
+#
+# - Los mensajes se paginan por cursor (id): "dame los N anteriores a este id"
+#   usa el índice (conversacion_id, id) y cuesta lo mismo en la primera página
+#   que en la página mil.
+# - Los contadores de no leídos viven en participantes_conversacion y se
+#   actualizan al escribir, en la misma transacción que el mensaje.
+# - La entrega es por Server-Sent Events (/mensajes/stream). Un broker en
+#   memoria reparte cada mensaje confirmado a las conexiones abiertas de sus
+#   destinatarios. Si el cliente se reconecta envía Last-Event-ID y recibe lo
+#   que se perdió desde la base de datos.
+#
+# Cada conexión SSE ocupa un worker mientras está abierta. Con workers síncronos
+# (un hilo por petición) unas pocas conexiones inactivas bastan para bloquear la
+# aplicación; en producción el stream debe servirse con workers asíncronos, por
+# ejemplo:
+#     gunicorn -k gevent --worker-connections 5000 -w 4 play:app
+# Con gevent, queue.Queue y threading cooperan, así que el broker no cambia.
+# Como el broker es por proceso, cada conexión revisa también la base de datos
+# cada MENSAJES_HEARTBEAT segundos (una consulta por índice) para recibir los
+# mensajes escritos en otros workers.
+import json
+import logging
+import queue
+import threading
+
+from flask import Blueprint, Response, current_app, jsonify, request, session, stream_with_context
+from sqlalchemy import update
+
+from autorizacion import solo_admin
+from extensions import db
+from models import Conversacion, Mensaje, ParticipanteConversacion, Usuario
+
+logger = logging.getLogger(__name__)
+
+CERRAR = object()  # Evento que pide al cliente reconectarse (cola desbordada o apagado)
+
+
+class Broker:
+    """Reparte eventos a las conexiones SSE abiertas de cada usuario, dentro del proceso."""
+
+    def __init__(self, max_pendientes=100):
+        self.max_pendientes = max_pendientes
+        self._lock = threading.Lock()
+        self._suscriptores = {}  # usuario_id -> set de colas
+        self.stats = {'conexiones': 0, 'publicados': 0, 'entregados': 0, 'desbordados': 0}
+
+    def suscribir(self, usuario_id):
+        cola = queue.Queue(maxsize=self.max_pendientes)
+        with self._lock:
+            self._suscriptores.setdefault(usuario_id, set()).add(cola)
+            self.stats['conexiones'] += 1
+        return cola
+
+    def cancelar(self, usuario_id, cola):
+        with self._lock:
+            colas = self._suscriptores.get(usuario_id)
+            if colas and cola in colas:
+                colas.discard(cola)
+                self.stats['conexiones'] -= 1
+                if not colas:
+                    del self._suscriptores[usuario_id]
+
+    def publicar(self, usuario_ids, evento):
+        """Entrega el evento a todas las conexiones de los usuarios indicados. Nunca bloquea."""
+        with self._lock:
+            colas = [cola for uid in usuario_ids for cola in self._suscriptores.get(uid, ())]
+            self.stats['publicados'] += 1
+        for cola in colas:
+            try:
+                cola.put_nowait(evento)
+                self.stats['entregados'] += 1
+            except queue.Full:
+                # Cliente demasiado lento: se le pide reconectarse y ponerse al día desde la BD.
+                self._vaciar(cola)
+                cola.put_nowait(CERRAR)
+                self.stats['desbordados'] += 1
+
+    @staticmethod
+    def _vaciar(cola):
+        try:
+            while True:
+                cola.get_nowait()
+        except queue.Empty:
+            pass
+
+    def conectados(self, usuario_id):
+        with self._lock:
+            return len(self._suscriptores.get(usuario_id, ()))
+
+
+broker = Broker()
+
+
+# --- Consultas ---
+
+def _mensaje_dict(mensaje):
+    return {
+        'id': mensaje.id,
+        'conversacion_id': mensaje.conversacion_id,
+        'remitente_id': mensaje.remitente_id,
+        'texto': mensaje.texto,
+        'fecha': mensaje.fecha.isoformat(),
+    }
+
+
+def _participante(conversacion_id, usuario_id):
+    return db.session.get(ParticipanteConversacion, (conversacion_id, usuario_id))
+
+
+def mensajes_pagina(conversacion_id, antes=None, despues=None, limite=30):
+    """Página de mensajes por cursor.
+
+    Con 'antes' devuelve los mensajes más antiguos que ese id (historial hacia
+    atrás); con 'despues', los más nuevos (ponerse al día). Siempre en orden
+    cronológico. El segundo valor es el cursor de la página siguiente o None.
+    """
+    consulta = db.select(Mensaje).where(Mensaje.conversacion_id == conversacion_id)
+    if despues is not None:
+        consulta = consulta.where(Mensaje.id > despues).order_by(Mensaje.id.asc())
+    else:
+        if antes is not None:
+            consulta = consulta.where(Mensaje.id < antes)
+        consulta = consulta.order_by(Mensaje.id.desc())
+    filas = db.session.execute(consulta.limit(limite + 1)).scalars().all()
+    hay_mas = len(filas) > limite
+    filas = filas[:limite]
+    if despues is None:
+        filas.reverse()
+        cursor = filas[0].id if hay_mas and filas else None
+    else:
+        cursor = filas[-1].id if hay_mas and filas else None
+    return filas, cursor
+
+
+def mensajes_nuevos(usuario_id, despues, limite=100):
+    """Mensajes de todas las conversaciones del usuario con id > despues (reconexión del stream)."""
+    return db.session.execute(
+        db.select(Mensaje)
+        .join(ParticipanteConversacion, ParticipanteConversacion.conversacion_id == Mensaje.conversacion_id)
+        .where(ParticipanteConversacion.usuario_id == usuario_id, Mensaje.id > despues)
+        .order_by(Mensaje.id.asc())
+        .limit(limite)
+    ).scalars().all()
+
+
+def ultimo_mensaje_id(usuario_id):
+    return db.session.execute(
+        db.select(db.func.max(ParticipanteConversacion.ultimo_mensaje_id))
+        .where(ParticipanteConversacion.usuario_id == usuario_id)
+    ).scalar() or 0
+
+
+def obtener_o_crear_directa(usuario_id, destinatario_id):
+    """Conversación directa entre dos usuarios; la crea si no existe. No hace commit."""
+    clave = Conversacion.clave_directa(usuario_id, destinatario_id)
+    conversacion = db.session.execute(
+        db.select(Conversacion).where(Conversacion.clave == clave)
+    ).scalars().first()
+    if conversacion is None:
+        conversacion = Conversacion(clave=clave, participantes=[
+            ParticipanteConversacion(usuario_id=uid) for uid in dict.fromkeys((usuario_id, destinatario_id))
+        ])
+        db.session.add(conversacion)
+        db.session.flush()
+    return conversacion
+
+
+def escribir_mensaje(conversacion_id, remitente_id, texto):
+    """Inserta el mensaje y actualiza los contadores de los participantes. No hace commit."""
+    mensaje = Mensaje(conversacion_id=conversacion_id, remitente_id=remitente_id, texto=texto)
+    db.session.add(mensaje)
+    db.session.flush()
+    tabla = ParticipanteConversacion
+    db.session.execute(
+        update(tabla)
+        .where(tabla.conversacion_id == conversacion_id, tabla.usuario_id != remitente_id)
+        .values(no_leidos=tabla.no_leidos + 1, ultimo_mensaje_id=mensaje.id)
+    )
+    db.session.execute(
+        update(tabla)
+        .where(tabla.conversacion_id == conversacion_id, tabla.usuario_id == remitente_id)
+        .values(ultimo_mensaje_id=mensaje.id, ultimo_leido_id=mensaje.id)
+    )
+    return mensaje
+
+
+def marcar_leido(participante, hasta_id=None):
+    """Marca como leídos los mensajes hasta hasta_id (por defecto, todos). No hace commit."""
+    participante.ultimo_leido_id = max(participante.ultimo_leido_id, hasta_id or participante.ultimo_mensaje_id)
+    if participante.ultimo_leido_id >= participante.ultimo_mensaje_id:
+        participante.no_leidos = 0
+        return
+    # Lectura parcial: se cuentan solo los mensajes posteriores, que suelen ser pocos.
+    participante.no_leidos = db.session.execute(
+        db.select(db.func.count()).select_from(Mensaje)
+        .where(Mensaje.conversacion_id == participante.conversacion_id,
+               Mensaje.id > participante.ultimo_leido_id,
+               Mensaje.remitente_id != participante.usuario_id)
+    ).scalar()
+
+
+# --- Integración con Flask ---
+
+bp = Blueprint('mensajeria', __name__, cli_group=None)
+
+
+def init_app(app):
+    """Configura el broker y registra las rutas de mensajería."""
+    app.config.setdefault('MENSAJES_POR_PAGINA', 30)
+    app.config.setdefault('MENSAJES_MAX_POR_PAGINA', 100)
+    app.config.setdefault('MENSAJES_MAX_LONGITUD', 4000)
+    app.config.setdefault('MENSAJES_HEARTBEAT', 25)
+    app.config.setdefault('MENSAJES_SINCRONIZAR_BD', True)
+    app.config.setdefault('MENSAJES_MAX_PENDIENTES', 100)
+    broker.max_pendientes = app.config['MENSAJES_MAX_PENDIENTES']
+    app.register_blueprint(bp)
+
+
+def _usuario_en_sesion():
+    return session.get('user_id')
+
+
+def _no_autenticado():
+    return jsonify({'success': False, 'message': 'Debe iniciar sesión.'}), 401
+
+
+def _limite():
+    por_defecto = current_app.config['MENSAJES_POR_PAGINA']
+    return max(1, min(request.args.get('limite', por_defecto, type=int), current_app.config['MENSAJES_MAX_POR_PAGINA']))
+
+
+@bp.route('/mensajes/conversaciones')
+def listar_conversaciones():
+    """Bandeja de entrada por actividad reciente (?antes=<ultimo_mensaje_id> para la página siguiente)."""
+    usuario_id = _usuario_en_sesion()
+    if usuario_id is None:
+        return _no_autenticado()
+    limite = _limite()
+    consulta = db.select(ParticipanteConversacion).where(ParticipanteConversacion.usuario_id == usuario_id)
+    antes = request.args.get('antes', type=int)
+    if antes is not None:
+        consulta = consulta.where(ParticipanteConversacion.ultimo_mensaje_id < antes)
+    filas = db.session.execute(
+        consulta.order_by(ParticipanteConversacion.ultimo_mensaje_id.desc()).limit(limite + 1)
+    ).scalars().all()
+    hay_mas = len(filas) > limite
+    filas = filas[:limite]
+
+    conversaciones = {
+        c.id: c for c in db.session.execute(
+            db.select(Conversacion).where(Conversacion.id.in_([p.conversacion_id for p in filas]))
+        ).scalars()
+    }
+    ultimos = {
+        m.id: m for m in db.session.execute(
+            db.select(Mensaje).where(Mensaje.id.in_([p.ultimo_mensaje_id for p in filas if p.ultimo_mensaje_id]))
+        ).scalars()
+    }
+    otros_ids = {o.usuario_id for c in conversaciones.values() for o in c.participantes if o.usuario_id != usuario_id}
+    usuarios = {
+        u.id: u for u in db.session.execute(
+            Usuario.select_con_perfil().where(Usuario.id.in_(otros_ids))
+        ).unique().scalars()
+    }
+
+    resultado = []
+    for p in filas:
+        otros = [usuarios[o.usuario_id] for o in conversaciones[p.conversacion_id].participantes
+                 if o.usuario_id != usuario_id and o.usuario_id in usuarios]
+        ultimo = ultimos.get(p.ultimo_mensaje_id)
+        resultado.append({
+            'id': p.conversacion_id,
+            'participantes': [
+                {'id': u.id, 'nombre': getattr(u.get_perfil(), 'nombre_completo', u.email),
+                 'tipo_perfil': u.tipo_perfil.value} for u in otros
+            ],
+            'no_leidos': p.no_leidos,
+            'ultimo_mensaje': _mensaje_dict(ultimo) if ultimo else None,
+        })
+    cursor = filas[-1].ultimo_mensaje_id if hay_mas and filas else None
+    return jsonify({'success': True, 'usuario_id': usuario_id, 'conversaciones': resultado, 'siguiente': cursor})
+
+
+@bp.route('/mensajes/conversaciones', methods=['POST'])
+def crear_conversacion():
+    """Abre (o devuelve) la conversación directa con otro usuario: {'destinatario_id': N}."""
+    usuario_id = _usuario_en_sesion()
+    if usuario_id is None:
+        return _no_autenticado()
+    destinatario_id = (request.get_json(silent=True) or {}).get('destinatario_id')
+    if not isinstance(destinatario_id, int) or destinatario_id == usuario_id \
+            or db.session.get(Usuario, destinatario_id) is None:
+        return jsonify({'success': False, 'message': 'Destinatario inválido.'}), 400
+    try:
+        conversacion = obtener_o_crear_directa(usuario_id, destinatario_id)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"❌ Error al crear la conversación {usuario_id}-{destinatario_id}: {e}")
+        return jsonify({'success': False, 'message': 'No se pudo crear la conversación.'}), 500
+    return jsonify({'success': True, 'conversacion_id': conversacion.id})
+
+
+@bp.route('/mensajes/conversaciones/<int:conversacion_id>/mensajes')
+def listar_mensajes(conversacion_id):
+    """Mensajes por cursor: ?antes=<id> hacia atrás o ?despues=<id> hacia adelante."""
+    usuario_id = _usuario_en_sesion()
+    if usuario_id is None:
+        return _no_autenticado()
+    if _participante(conversacion_id, usuario_id) is None:
+        return jsonify({'success': False, 'message': 'Conversación no encontrada.'}), 404
+    mensajes, cursor = mensajes_pagina(conversacion_id, antes=request.args.get('antes', type=int),
+                                       despues=request.args.get('despues', type=int), limite=_limite())
+    return jsonify({'success': True, 'mensajes': [_mensaje_dict(m) for m in mensajes], 'siguiente': cursor})
+
+
+@bp.route('/mensajes/conversaciones/<int:conversacion_id>/mensajes', methods=['POST'])
+def enviar_mensaje(conversacion_id):
+    """Escribe un mensaje ({'texto': ...}) y lo entrega a las conexiones abiertas de los participantes."""
+    usuario_id = _usuario_en_sesion()
+    if usuario_id is None:
+        return _no_autenticado()
+    participante = _participante(conversacion_id, usuario_id)
+    if participante is None:
+        return jsonify({'success': False, 'message': 'Conversación no encontrada.'}), 404
+    texto = ((request.get_json(silent=True) or {}).get('texto') or '').strip()
+    if not texto or len(texto) > current_app.config['MENSAJES_MAX_LONGITUD']:
+        return jsonify({'success': False, 'message': 'El mensaje está vacío o es demasiado largo.'}), 400
+
+    try:
+        mensaje = escribir_mensaje(conversacion_id, usuario_id, texto)
+        destinatarios = db.session.execute(
+            db.select(ParticipanteConversacion.usuario_id)
+            .where(ParticipanteConversacion.conversacion_id == conversacion_id)
+        ).scalars().all()
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"❌ Error al enviar el mensaje en la conversación {conversacion_id}: {e}")
+        return jsonify({'success': False, 'message': 'No se pudo enviar el mensaje.'}), 500
+
+    datos = _mensaje_dict(mensaje)
+    broker.publicar(destinatarios, ('mensaje', mensaje.id, datos))
+    return jsonify({'success': True, 'mensaje': datos}), 201
+
+
+@bp.route('/mensajes/conversaciones/<int:conversacion_id>/leido', methods=['POST'])
+def marcar_conversacion_leida(conversacion_id):
+    """Marca la conversación como leída (opcionalmente hasta {'hasta_id': N})."""
+    usuario_id = _usuario_en_sesion()
+    if usuario_id is None:
+        return _no_autenticado()
+    participante = _participante(conversacion_id, usuario_id)
+    if participante is None:
+        return jsonify({'success': False, 'message': 'Conversación no encontrada.'}), 404
+    hasta_id = (request.get_json(silent=True) or {}).get('hasta_id')
+    marcar_leido(participante, hasta_id if isinstance(hasta_id, int) else None)
+    db.session.commit()
+    broker.publicar([usuario_id], ('leido', None, {'conversacion_id': conversacion_id,
+                                                   'no_leidos': participante.no_leidos}))
+    return jsonify({'success': True, 'no_leidos': participante.no_leidos})
+
+
+@bp.route('/mensajes/no-leidos')
+def total_no_leidos():
+    usuario_id = _usuario_en_sesion()
+    if usuario_id is None:
+        return _no_autenticado()
+    total = db.session.execute(
+        db.select(db.func.coalesce(db.func.sum(ParticipanteConversacion.no_leidos), 0))
+        .where(ParticipanteConversacion.usuario_id == usuario_id)
+    ).scalar()
+    return jsonify({'success': True, 'no_leidos': total})
+
+
+def _evento_sse(tipo, evento_id, datos):
+    linea_id = f'id: {evento_id}\n' if evento_id is not None else ''
+    return f'{linea_id}event: {tipo}\ndata: {json.dumps(datos, ensure_ascii=False)}\n\n'
+
+
+@bp.route('/mensajes/stream')
+def stream_mensajes():
+    """Server-Sent Events con los mensajes nuevos del usuario.
+
+    Al reconectarse, el navegador envía Last-Event-ID (o ?desde=) con el id del
+    último mensaje recibido y se le reenvían los que se perdió.
+    """
+    usuario_id = _usuario_en_sesion()
+    if usuario_id is None:
+        return _no_autenticado()
+    config = current_app.config
+    heartbeat = config['MENSAJES_HEARTBEAT']
+    sincronizar = config['MENSAJES_SINCRONIZAR_BD']
+    ultimo_id = request.headers.get('Last-Event-ID', type=int)
+    if ultimo_id is None:
+        ultimo_id = request.args.get('desde', type=int)
+    if ultimo_id is None:
+        ultimo_id = ultimo_mensaje_id(usuario_id)
+    db.session.close()  # No retener una conexión del pool mientras el stream está abierto.
+    cola = broker.suscribir(usuario_id)
+
+    def ponerse_al_dia(desde):
+        mensajes = mensajes_nuevos(usuario_id, desde)
+        db.session.close()
+        return [_evento_sse('mensaje', m.id, _mensaje_dict(m)) for m in mensajes], \
+            (mensajes[-1].id if mensajes else desde)
+
+    def generar():
+        nonlocal ultimo_id
+        try:
+            yield 'retry: 3000\n\n'
+            eventos, ultimo_id = ponerse_al_dia(ultimo_id)
+            yield from eventos
+            while True:
+                try:
+                    evento = cola.get(timeout=heartbeat)
+                except queue.Empty:
+                    if sincronizar and ultimo_mensaje_id(usuario_id) > ultimo_id:
+                        eventos, ultimo_id = ponerse_al_dia(ultimo_id)
+                        yield from eventos
+                    else:
+                        db.session.close()
+                        yield ': ping\n\n'
+                    continue
+                if evento is CERRAR:
+                    yield _evento_sse('reconectar', None, {})
+                    return
+                tipo, evento_id, datos = evento
+                if tipo == 'mensaje':
+                    if evento_id <= ultimo_id:
+                        continue  # Ya enviado al ponerse al día.
+                    ultimo_id = evento_id
+                yield _evento_sse(tipo, evento_id, datos)
+        finally:
+            broker.cancelar(usuario_id, cola)
+
+    return Response(stream_with_context(generar()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+@bp.route('/mensajes/stats')
+@solo_admin
+def mensajes_stats():
+    return jsonify({'success': True, 'stats': dict(broker.stats)})
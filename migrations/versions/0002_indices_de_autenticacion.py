@@ -0,0 +1,32 @@
+"""indices de autenticacion
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 15:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Login: WHERE lower(email) = :email AND tipo_perfil = :perfil.
+    # La recuperación de contraseña usa solo lower(email), que es el prefijo del índice.
+    # Los NIT y documentos ya están cubiertos por los índices de sus restricciones UNIQUE.
+    op.create_index(
+        'ix_usuarios_email_lower_tipo_perfil',
+        'usuarios',
+        [sa.text('lower(email)'), 'tipo_perfil'],
+        unique=False,
+    )
+
+
+def downgrade():
+    op.drop_index('ix_usuarios_email_lower_tipo_perfil', table_name='usuarios')
@@ -0,0 +1,123 @@
+"""intereses normalizados
+
+Pasa etapas_interes, areas_interes y participacion_activa de strings separados
+por comas a tablas con una fila por valor, copiando los datos existentes.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 15:10:51.955678
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+# Columnas de texto antiguas -> (tabla nueva, columna del dueño, columna de valor)
+DIVISIONES = [
+    ('inversionistas', 'etapas_interes', 'inversionista_etapas', 'inversionista_id', 'etapa'),
+    ('inversionistas', 'areas_interes', 'inversionista_areas', 'inversionista_id', 'area'),
+    ('instituciones', 'participacion_activa', 'institucion_participaciones', 'institucion_id', 'participacion'),
+]
+
+
+def _dividir_datos():
+    """Copia cada valor de los strings separados por comas a su tabla nueva."""
+    conn = op.get_bind()
+    for tabla, columna, tabla_nueva, col_id, col_valor in DIVISIONES:
+        origen = sa.table(tabla, sa.column('id', sa.Integer), sa.column(columna, sa.String))
+        destino = sa.table(tabla_nueva, sa.column(col_id, sa.Integer), sa.column(col_valor, sa.String))
+        filas = []
+        for dueno_id, texto in conn.execute(sa.select(origen.c.id, origen.c[columna]).where(origen.c[columna] != '')):
+            valores = dict.fromkeys(v.strip() for v in (texto or '').split(',') if v.strip())
+            filas.extend({col_id: dueno_id, col_valor: valor} for valor in valores)
+            if len(filas) >= 5000:
+                conn.execute(destino.insert(), filas)
+                filas = []
+        if filas:
+            conn.execute(destino.insert(), filas)
+
+
+def _unir_datos():
+    """Operación inversa: reconstruye los strings separados por comas."""
+    conn = op.get_bind()
+    for tabla, columna, tabla_nueva, col_id, col_valor in DIVISIONES:
+        origen = sa.table(tabla_nueva, sa.column(col_id, sa.Integer), sa.column(col_valor, sa.String))
+        destino = sa.table(tabla, sa.column('id', sa.Integer), sa.column(columna, sa.String))
+        agrupados = {}
+        for dueno_id, valor in conn.execute(sa.select(origen.c[col_id], origen.c[col_valor]).order_by(origen.c[col_id], origen.c[col_valor])):
+            agrupados.setdefault(dueno_id, []).append(valor)
+        for dueno_id, valores in agrupados.items():
+            conn.execute(destino.update().where(destino.c.id == dueno_id).values({columna: ','.join(valores)}))
+
+
+def upgrade():
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.create_table('institucion_participaciones',
+    sa.Column('institucion_id', sa.Integer(), nullable=False),
+    sa.Column('participacion', sa.String(length=50), nullable=False),
+    sa.ForeignKeyConstraint(['institucion_id'], ['instituciones.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('institucion_id', 'participacion')
+    )
+    with op.batch_alter_table('institucion_participaciones', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_institucion_participaciones_participacion'), ['participacion'], unique=False)
+
+    op.create_table('inversionista_areas',
+    sa.Column('inversionista_id', sa.Integer(), nullable=False),
+    sa.Column('area', sa.String(length=50), nullable=False),
+    sa.ForeignKeyConstraint(['inversionista_id'], ['inversionistas.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('inversionista_id', 'area')
+    )
+    with op.batch_alter_table('inversionista_areas', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_inversionista_areas_area'), ['area'], unique=False)
+
+    op.create_table('inversionista_etapas',
+    sa.Column('inversionista_id', sa.Integer(), nullable=False),
+    sa.Column('etapa', sa.String(length=50), nullable=False),
+    sa.ForeignKeyConstraint(['inversionista_id'], ['inversionistas.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('inversionista_id', 'etapa')
+    )
+    with op.batch_alter_table('inversionista_etapas', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_inversionista_etapas_etapa'), ['etapa'], unique=False)
+
+    _dividir_datos()
+
+    with op.batch_alter_table('instituciones', schema=None) as batch_op:
+        batch_op.drop_column('participacion_activa')
+
+    with op.batch_alter_table('inversionistas', schema=None) as batch_op:
+        batch_op.drop_column('etapas_interes')
+        batch_op.drop_column('areas_interes')
+
+    # ### end Alembic commands ###
+
+
+def downgrade():
+    # ### commands auto generated by Alembic - please adjust! ###
+    with op.batch_alter_table('inversionistas', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('areas_interes', sa.VARCHAR(length=255), nullable=True))
+        batch_op.add_column(sa.Column('etapas_interes', sa.VARCHAR(length=255), nullable=True))
+
+    with op.batch_alter_table('instituciones', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('participacion_activa', sa.VARCHAR(length=255), nullable=True))
+
+    _unir_datos()
+
+    with op.batch_alter_table('inversionista_etapas', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_inversionista_etapas_etapa'))
+
+    op.drop_table('inversionista_etapas')
+    with op.batch_alter_table('inversionista_areas', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_inversionista_areas_area'))
+
+    op.drop_table('inversionista_areas')
+    with op.batch_alter_table('institucion_participaciones', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_institucion_participaciones_participacion'))
+
+    op.drop_table('institucion_participaciones')
+    # ### end Alembic commands ###
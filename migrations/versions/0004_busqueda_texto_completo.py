@@ -0,0 +1,53 @@
+"""busqueda de texto completo
+
+Índices GIN con to_tsvector('spanish') sin tildes sobre los textos de
+emprendedores e instituciones. Solo aplica a PostgreSQL; en SQLite la búsqueda
+usa el índice en memoria de search.py y esta migración no hace nada.
+
+Las expresiones deben coincidir con EXPRESIONES_PG en search.py.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 15:20:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute('CREATE EXTENSION IF NOT EXISTS unaccent')
+    # unaccent() no es IMMUTABLE y no se puede usar en un índice; este envoltorio sí.
+    op.execute("""
+        CREATE OR REPLACE FUNCTION f_unaccent(text) RETURNS text AS
+        $func$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $func$
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+    """)
+    op.execute("""
+        CREATE INDEX ix_emprendedores_busqueda ON emprendedores USING gin (
+            to_tsvector('spanish'::regconfig, f_unaccent(coalesce(emprendedores.titulo_proyecto, '')
+            || ' ' || coalesce(emprendedores.descripcion_proyecto, '')))
+        )
+    """)
+    op.execute("""
+        CREATE INDEX ix_instituciones_busqueda ON instituciones USING gin (
+            to_tsvector('spanish'::regconfig, f_unaccent(coalesce(instituciones.area_especializacion, '')
+            || ' ' || coalesce(instituciones.descripcion, '')))
+        )
+    """)
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute('DROP INDEX IF EXISTS ix_instituciones_busqueda')
+    op.execute('DROP INDEX IF EXISTS ix_emprendedores_busqueda')
+    op.execute('DROP FUNCTION IF EXISTS f_unaccent(text)')
@@ -1,9 +1,12 @@
 
 # Importaciones necesarias de las librerías
-from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload
+from sqlalchemy.ext.associationproxy import association_proxy
 from enum import Enum
 from extensions import db # Importa la instancia 'db' desde extensions.py
+from hashing import password_hasher # Hash de contraseñas en un pool de procesos
 
 class TipoPerfil(Enum):
     EMPRESARIO = "empresario"
@@ -37,11 +40,37 @@ class Usuario(db.Model):
 
     def set_password(self, password):
         """Toma una contraseña en texto plano y la guarda como un hash seguro."""
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_hasher.hash(password)
 
     def check_password(self, password):
         """Toma una contraseña en texto plano y la compara con el hash guardado."""
-        return check_password_hash(self.password_hash, password)
+        return password_hasher.verify(self.password_hash, password)
+
+    def password_needs_rehash(self):
+        """True si el hash guardado no usa el método y costo configurados actualmente."""
+        return password_hasher.needs_rehash(self.password_hash)
+
+    @classmethod
+    def select_con_perfil(cls, tipo_perfil=None):
+        """Consulta de usuarios que trae también su perfil en la misma ida a la BD.
+
+        Si se conoce el tipo de perfil solo se hace JOIN con esa tabla; si no, se
+        cargan las cuatro relaciones con LEFT OUTER JOIN. Así get_perfil() no
+        necesita un SELECT adicional.
+        """
+        relaciones = {
+            TipoPerfil.EMPRESARIO: cls.empresario,
+            TipoPerfil.EMPRENDEDOR: cls.emprendedor,
+            TipoPerfil.INVERSIONISTA: cls.inversionista,
+            TipoPerfil.INSTITUCION: cls.institucion,
+        }
+        if tipo_perfil is None:
+            opciones = [joinedload(rel) for rel in relaciones.values()]
+        elif tipo_perfil in relaciones:
+            opciones = [joinedload(relaciones[tipo_perfil])]
+        else:
+            opciones = []  # ADMIN no tiene tabla de perfil.
+        return db.select(cls).options(*opciones)
 
     def get_perfil(self):
         """Método útil para obtener el objeto del perfil específico del usuario."""
@@ -62,6 +91,11 @@ class Usuario(db.Model):
         """Representación en string del objeto, útil para debugging."""
         return f'<Usuario {self.email} - {self.tipo_perfil.value}>'
 
+# Índice para el login: búsqueda por correo (sin distinguir mayúsculas) y tipo de perfil.
+# También sirve para las búsquedas solo por correo, al ser la primera columna.
+# Los documentos y NIT de los perfiles ya tienen índice por su restricción UNIQUE.
+db.Index('ix_usuarios_email_lower_tipo_perfil', func.lower(Usuario.email), Usuario.tipo_perfil)
+
 # Paso 4: Crear los Modelos Específicos para cada Perfil
 # Ahora, crearías las clases para cada tipo de perfil. Estas clases contendrán los
 # campos que son únicos para cada rol. Cada uno tiene una llave foránea 'usuario_id'
@@ -126,9 +160,43 @@ class Inversionista(db.Model):
     numero_celular = db.Column(db.String(15), nullable=False)
     nombre_fondo = db.Column(db.String(150)) # Puede ser opcional
     tipo_inversion = db.Column(db.String(50), nullable=False)
-    # Para los checkboxes, guardaremos una lista de strings separada por comas.
-    etapas_interes = db.Column(db.String(255))
-    areas_interes = db.Column(db.String(255))
+    # Los checkboxes se guardan en tablas propias (una fila por valor, indexadas por valor).
+    # etapas_interes y areas_interes se usan como listas de strings.
+    _etapas = db.relationship('InversionistaEtapa', lazy='selectin', cascade='all, delete-orphan', passive_deletes=True)
+    _areas = db.relationship('InversionistaArea', lazy='selectin', cascade='all, delete-orphan', passive_deletes=True)
+    etapas_interes = association_proxy('_etapas', 'etapa', creator=lambda valor: InversionistaEtapa(etapa=valor))
+    areas_interes = association_proxy('_areas', 'area', creator=lambda valor: InversionistaArea(area=valor))
+
+    @classmethod
+    def buscar(cls, etapas=None, areas=None, tipo_inversion=None, todas=True):
+        """Consulta de inversionistas filtrada por cualquier combinación de intereses.
+
+        Con todas=True el inversionista debe tener todas las etapas y todas las
+        áreas pedidas; con todas=False basta con una de cada grupo.
+        """
+        stmt = db.select(cls)
+        if etapas:
+            stmt = stmt.where(cls.id.in_(_con_valores(InversionistaEtapa.inversionista_id, InversionistaEtapa.etapa, etapas, todas)))
+        if areas:
+            stmt = stmt.where(cls.id.in_(_con_valores(InversionistaArea.inversionista_id, InversionistaArea.area, areas, todas)))
+        if tipo_inversion:
+            stmt = stmt.where(cls.tipo_inversion == tipo_inversion)
+        return stmt
+
+
+class InversionistaEtapa(db.Model):
+    """Etapa de proyecto que le interesa a un inversionista."""
+    __tablename__ = 'inversionista_etapas'
+    inversionista_id = db.Column(db.Integer, db.ForeignKey('inversionistas.id', ondelete='CASCADE'), primary_key=True)
+    etapa = db.Column(db.String(50), primary_key=True, index=True)
+
+
+class InversionistaArea(db.Model):
+    """Área de interés de un inversionista."""
+    __tablename__ = 'inversionista_areas'
+    inversionista_id = db.Column(db.Integer, db.ForeignKey('inversionistas.id', ondelete='CASCADE'), primary_key=True)
+    area = db.Column(db.String(50), primary_key=True, index=True)
+
 
 class Institucion(db.Model):
     """Modelo que representa a una institución."""
@@ -142,8 +210,337 @@ class Institucion(db.Model):
     municipio = db.Column(db.String(100), nullable=False)
     descripcion = db.Column(db.Text, nullable=False)
     area_especializacion = db.Column(db.String(100), nullable=False)
-    # Para los checkboxes, guardaremos una lista de strings separada por comas.
-    participacion_activa = db.Column(db.String(255))
+    # Los checkboxes se guardan en su propia tabla; participacion_activa se usa como lista de strings.
+    _participaciones = db.relationship('InstitucionParticipacion', lazy='selectin', cascade='all, delete-orphan', passive_deletes=True)
+    participacion_activa = association_proxy('_participaciones', 'participacion', creator=lambda valor: InstitucionParticipacion(participacion=valor))
+
+    @classmethod
+    def buscar(cls, participaciones=None, municipio=None, area_especializacion=None, todas=True):
+        """Consulta de instituciones filtrada por participación, municipio y área."""
+        stmt = db.select(cls)
+        if participaciones:
+            stmt = stmt.where(cls.id.in_(_con_valores(
+                InstitucionParticipacion.institucion_id, InstitucionParticipacion.participacion, participaciones, todas)))
+        if municipio:
+            stmt = stmt.where(cls.municipio == municipio)
+        if area_especializacion:
+            stmt = stmt.where(cls.area_especializacion == area_especializacion)
+        return stmt
 
     def __repr__(self):
         return f'<Institucion {self.nombre_institucion}>'
+
+
+class InstitucionParticipacion(db.Model):
+    """Forma de participación activa que ofrece una institución."""
+    __tablename__ = 'institucion_participaciones'
+    institucion_id = db.Column(db.Integer, db.ForeignKey('instituciones.id', ondelete='CASCADE'), primary_key=True)
+    participacion = db.Column(db.String(50), primary_key=True, index=True)
+
+
+def _con_valores(columna_id, columna_valor, valores, todas):
+    """Subconsulta con los ids que tienen todos (o alguno) de los valores pedidos.
+
+    Usa el índice sobre la columna de valor en lugar de un LIKE sobre un string.
+    """
+    valores = set(valores)
+    sub = db.select(columna_id).where(columna_valor.in_(valores))
+    if todas and len(valores) > 1:
+        sub = sub.group_by(columna_id).having(func.count() == len(valores))
+    return sub
+
+
+class DiagnosticoEnvio(db.Model):
+    """Un cuestionario de diagnóstico completo enviado por un empresario."""
+    __tablename__ = 'diagnostico_envios'
+    id = db.Column(db.Integer, primary_key=True)
+    empresario_id = db.Column(db.Integer, db.ForeignKey('empresarios.id', ondelete='CASCADE'), nullable=False)
+    cuestionario = db.Column(db.String(30), nullable=False)  # 'cadena_valor' o 'competitividad'
+    # Copia del perfil al momento del envío: define el grupo de comparación del sector.
+    sector_produccion = db.Column(db.String(100), nullable=False)
+    tamano = db.Column(db.String(20), nullable=False)
+    puntaje_total = db.Column(db.Float, nullable=False)
+    fecha = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    respuestas = db.relationship('DiagnosticoRespuesta', cascade='all, delete-orphan', passive_deletes=True)
+    puntajes = db.relationship('DiagnosticoPuntaje', lazy='selectin', cascade='all, delete-orphan', passive_deletes=True)
+
+    __table_args__ = (
+        db.Index('ix_diagnostico_envios_empresario_cuestionario', 'empresario_id', 'cuestionario', 'id'),
+    )
+
+
+class DiagnosticoRespuesta(db.Model):
+    """Respuesta a una pregunta del diagnóstico (True = 'Sí')."""
+    __tablename__ = 'diagnostico_respuestas'
+    envio_id = db.Column(db.Integer, db.ForeignKey('diagnostico_envios.id', ondelete='CASCADE'), primary_key=True)
+    pregunta = db.Column(db.String(30), primary_key=True)
+    valor = db.Column(db.Boolean, nullable=False)
+
+
+class DiagnosticoPuntaje(db.Model):
+    """Puntaje (0-100) de un envío en una etapa de la cadena de valor o categoría de competitividad."""
+    __tablename__ = 'diagnostico_puntajes'
+    envio_id = db.Column(db.Integer, db.ForeignKey('diagnostico_envios.id', ondelete='CASCADE'), primary_key=True)
+    seccion = db.Column(db.String(30), primary_key=True)
+    puntaje = db.Column(db.Float, nullable=False)
+
+
+class DiagnosticoHistograma(db.Model):
+    """Histograma de puntajes por grupo de comparación (sector de producción y tamaño).
+
+    Se mantiene al guardar cada envío (solo cuenta el último envío de cada
+    empresario), así los percentiles del sector salen de como mucho 101 filas
+    por sección sin recorrer los envíos.
+    """
+    __tablename__ = 'diagnostico_histogramas'
+    cuestionario = db.Column(db.String(30), primary_key=True)
+    sector_produccion = db.Column(db.String(100), primary_key=True)
+    tamano = db.Column(db.String(20), primary_key=True)
+    seccion = db.Column(db.String(30), primary_key=True)
+    bucket = db.Column(db.Integer, primary_key=True)  # Puntaje redondeado, 0-100
+    total = db.Column(db.Integer, nullable=False, default=0)
+
+
+class Conversacion(db.Model):
+    """Conversación entre usuarios. Las directas (dos usuarios) se identifican por 'clave'."""
+    __tablename__ = 'conversaciones'
+    id = db.Column(db.Integer, primary_key=True)
+    clave = db.Column(db.String(50), unique=True)  # 'menor_id:mayor_id' para conversaciones directas
+    fecha_creacion = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    participantes = db.relationship('ParticipanteConversacion', lazy='selectin', cascade='all, delete-orphan',
+                                    passive_deletes=True)
+
+    @staticmethod
+    def clave_directa(usuario_a, usuario_b):
+        menor, mayor = sorted((usuario_a, usuario_b))
+        return f'{menor}:{mayor}'
+
+
+class ParticipanteConversacion(db.Model):
+    """Participación de un usuario en una conversación, con sus contadores de no leídos.
+
+    no_leidos y ultimo_mensaje_id se actualizan al escribir cada mensaje, así la
+    bandeja de entrada se lista por (usuario_id, ultimo_mensaje_id) sin contar
+    mensajes ni buscar el último de cada conversación.
+    """
+    __tablename__ = 'participantes_conversacion'
+    conversacion_id = db.Column(db.Integer, db.ForeignKey('conversaciones.id', ondelete='CASCADE'), primary_key=True)
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id', ondelete='CASCADE'), primary_key=True)
+    no_leidos = db.Column(db.Integer, default=0, nullable=False)
+    ultimo_leido_id = db.Column(db.Integer, default=0, nullable=False)
+    ultimo_mensaje_id = db.Column(db.Integer, default=0, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_participantes_usuario_ultimo_mensaje', 'usuario_id', 'ultimo_mensaje_id'),
+    )
+
+
+class Mensaje(db.Model):
+    """Mensaje de una conversación. Se pagina por id (cursor), nunca con OFFSET."""
+    __tablename__ = 'mensajes'
+    id = db.Column(db.Integer, primary_key=True)
+    conversacion_id = db.Column(db.Integer, db.ForeignKey('conversaciones.id', ondelete='CASCADE'), nullable=False)
+    remitente_id = db.Column(db.Integer, db.ForeignKey('usuarios.id', ondelete='SET NULL'))
+    texto = db.Column(db.Text, nullable=False)
+    fecha = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_mensajes_conversacion_id', 'conversacion_id', 'id'),
+        # Al borrar un usuario, ON DELETE SET NULL busca sus mensajes por remitente.
+        db.Index('ix_mensajes_remitente_id', 'remitente_id'),
+    )
+
+
+class Convocatoria(db.Model):
+    """Convocatoria (fondo, premio, certificación, feria...) a la que se postulan los empresarios.
+
+    Estados: 'borrador' -> 'publicada' -> 'cerrada'. Una convocatoria publicada
+    deja de estar abierta al pasar su fecha de cierre (None = todo el año) o al
+    agotar sus cupos (None = sin límite).
+    """
+    __tablename__ = 'convocatorias'
+    id = db.Column(db.Integer, primary_key=True)
+    titulo = db.Column(db.String(200), nullable=False)
+    descripcion = db.Column(db.Text, nullable=False)
+    entidad = db.Column(db.String(150))
+    financiacion = db.Column(db.String(100))  # Texto libre, p. ej. 'Hasta $50.000.000 COP'
+    requisitos = db.Column(db.Text)  # Documentación requerida, uno por línea
+    estado = db.Column(db.String(20), nullable=False, default='borrador')
+    destacada = db.Column(db.Boolean, nullable=False, default=False)
+    fecha_cierre = db.Column(db.DateTime)
+    cupos = db.Column(db.Integer)
+    # Contador de postulaciones; se incrementa en la misma transacción que cada postulación.
+    postulaciones = db.Column(db.Integer, nullable=False, default=0)
+    fecha_creacion = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    fecha_publicacion = db.Column(db.DateTime)
+
+    criterios = db.relationship('ConvocatoriaCriterio', lazy='selectin', cascade='all, delete-orphan',
+                                passive_deletes=True)
+
+    __table_args__ = (
+        db.Index('ix_convocatorias_estado_id', 'estado', 'id'),
+    )
+
+    def __repr__(self):
+        return f'<Convocatoria {self.titulo}>'
+
+
+class ConvocatoriaCriterio(db.Model):
+    """Criterio de elegibilidad: un valor admitido de 'tamano' o 'sector' (sin filas de un campo, vale cualquiera)."""
+    __tablename__ = 'convocatoria_criterios'
+    convocatoria_id = db.Column(db.Integer, db.ForeignKey('convocatorias.id', ondelete='CASCADE'), primary_key=True)
+    campo = db.Column(db.String(20), primary_key=True)
+    valor = db.Column(db.String(100), primary_key=True)
+
+
+class Postulacion(db.Model):
+    """Postulación de un empresario a una convocatoria (una por empresario y convocatoria)."""
+    __tablename__ = 'postulaciones'
+    id = db.Column(db.Integer, primary_key=True)
+    convocatoria_id = db.Column(db.Integer, db.ForeignKey('convocatorias.id', ondelete='CASCADE'), nullable=False)
+    empresario_id = db.Column(db.Integer, db.ForeignKey('empresarios.id', ondelete='CASCADE'), nullable=False)
+    nombre_proyecto = db.Column(db.String(150), nullable=False)
+    descripcion = db.Column(db.Text, nullable=False)
+    # Idempotency-Key del envío: repetirlo devuelve la misma postulación en lugar de un error.
+    clave_idempotencia = db.Column(db.String(64))
+    fecha = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint('convocatoria_id', 'empresario_id', name='uq_postulaciones_convocatoria_empresario'),
+        db.Index('ix_postulaciones_empresario_id', 'empresario_id', 'id'),
+    )
+
+
+class VersionCache(db.Model):
+    """Versión de un conjunto de datos cacheado en los workers; cambiarla invalida sus entradas en todos."""
+    __tablename__ = 'versiones_cache'
+    nombre = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+
+class Alianza(db.Model):
+    """Alianza entre dos usuarios (empresarios o instituciones): una arista del grafo de la cadena de valor.
+
+    El par se guarda ordenado (usuario_menor_id < usuario_mayor_id), así la
+    restricción única impide dos alianzas entre los mismos usuarios. Nace
+    'pendiente' y pasa a 'confirmada' cuando la acepta el otro usuario.
+    """
+    __tablename__ = 'alianzas'
+    id = db.Column(db.Integer, primary_key=True)
+    usuario_menor_id = db.Column(db.Integer, db.ForeignKey('usuarios.id', ondelete='CASCADE'), nullable=False)
+    usuario_mayor_id = db.Column(db.Integer, db.ForeignKey('usuarios.id', ondelete='CASCADE'), nullable=False)
+    solicitante_id = db.Column(db.Integer, nullable=False)  # Uno de los dos usuarios del par
+    estado = db.Column(db.String(20), nullable=False, default='pendiente')
+    fecha_solicitud = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    fecha_confirmacion = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.UniqueConstraint('usuario_menor_id', 'usuario_mayor_id', name='uq_alianzas_par'),
+        db.Index('ix_alianzas_usuario_mayor_id', 'usuario_mayor_id', 'id'),
+    )
+
+    def otro(self, usuario_id):
+        return self.usuario_mayor_id if usuario_id == self.usuario_menor_id else self.usuario_menor_id
+
+
+class Tema(db.Model):
+    """Tema del foro de discusión. 'respuestas' y 'reacciones' son contadores que se mantienen al escribir."""
+    __tablename__ = 'temas'
+    id = db.Column(db.Integer, primary_key=True)
+    autor_id = db.Column(db.Integer, db.ForeignKey('usuarios.id', ondelete='SET NULL'))
+    titulo = db.Column(db.String(200), nullable=False)
+    categoria = db.Column(db.String(50), nullable=False)
+    contenido = db.Column(db.Text, nullable=False)
+    fecha_creacion = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    ultima_respuesta = db.Column(db.DateTime)
+    respuestas = db.Column(db.Integer, default=0, nullable=False)
+    reacciones = db.Column(db.Integer, default=0, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_temas_categoria_id', 'categoria', 'id'),
+        db.Index('ix_temas_autor_id', 'autor_id'),
+    )
+
+
+class Respuesta(db.Model):
+    """Respuesta de un tema, anidada bajo otra respuesta o directamente bajo el tema.
+
+    'ruta' es el camino materializado: los ids de sus ancestros y el suyo, cada
+    uno en 8 dígitos hexadecimales. Ordenar por ruta recorre el árbol en
+    profundidad, y el subárbol de una respuesta es el rango de rutas que
+    empiezan por la suya. 'descendientes' cuenta todas las respuestas del subárbol.
+    """
+    __tablename__ = 'respuestas'
+    id = db.Column(db.Integer, primary_key=True)
+    tema_id = db.Column(db.Integer, db.ForeignKey('temas.id', ondelete='CASCADE'), nullable=False)
+    padre_id = db.Column(db.Integer, db.ForeignKey('respuestas.id', ondelete='CASCADE'))
+    autor_id = db.Column(db.Integer, db.ForeignKey('usuarios.id', ondelete='SET NULL'))
+    ruta = db.Column(db.String(255), nullable=False, default='')
+    profundidad = db.Column(db.Integer, nullable=False, default=0)
+    texto = db.Column(db.Text, nullable=False)
+    fecha = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    descendientes = db.Column(db.Integer, default=0, nullable=False)
+    reacciones = db.Column(db.Integer, default=0, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_respuestas_tema_ruta', 'tema_id', 'ruta'),
+        db.Index('ix_respuestas_padre_id', 'padre_id'),
+        db.Index('ix_respuestas_autor_id', 'autor_id'),
+    )
+
+
+class ReaccionTema(db.Model):
+    """Reacción de un usuario a un tema (una por tipo)."""
+    __tablename__ = 'reacciones_tema'
+    tema_id = db.Column(db.Integer, db.ForeignKey('temas.id', ondelete='CASCADE'), primary_key=True)
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id', ondelete='CASCADE'), primary_key=True)
+    tipo = db.Column(db.String(20), primary_key=True)
+
+    __table_args__ = (
+        db.Index('ix_reacciones_tema_usuario_id', 'usuario_id'),
+    )
+
+
+class ReaccionRespuesta(db.Model):
+    """Reacción de un usuario a una respuesta (una por tipo)."""
+    __tablename__ = 'reacciones_respuesta'
+    respuesta_id = db.Column(db.Integer, db.ForeignKey('respuestas.id', ondelete='CASCADE'), primary_key=True)
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id', ondelete='CASCADE'), primary_key=True)
+    tipo = db.Column(db.String(20), primary_key=True)
+
+    __table_args__ = (
+        db.Index('ix_reacciones_respuesta_usuario_id', 'usuario_id'),
+    )
+
+
+class EventoAcceso(db.Model):
+    """Inicio de sesión de un usuario (registro de auditoría). Se insertan por lotes desde activity.py."""
+    __tablename__ = 'eventos_acceso'
+    id = db.Column(db.Integer, primary_key=True)
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id', ondelete='CASCADE'), nullable=False)
+    tipo = db.Column(db.String(20), nullable=False, default='login')
+    fecha = db.Column(db.DateTime, nullable=False)
+    ip = db.Column(db.String(45))
+
+    __table_args__ = (
+        db.Index('ix_eventos_acceso_usuario_id', 'usuario_id', 'id'),
+        db.Index('ix_eventos_acceso_fecha', 'fecha'),
+    )
+
+
+class EstadisticaRegistro(db.Model):
+    """Usuarios registrados por día y tipo de perfil. Se mantiene en cada alta y borrado (ver estadisticas.py)."""
+    __tablename__ = 'estadisticas_registros'
+    dia = db.Column(db.Date, primary_key=True)
+    tipo_perfil = db.Column(db.String(20), primary_key=True)  # Valor de TipoPerfil ('empresario', ...)
+    total = db.Column(db.Integer, nullable=False, default=0)
+
+
+class EstadisticaPerfil(db.Model):
+    """Perfiles por valor de un campo: municipio, tipo_inversion o tamano (ver estadisticas.py)."""
+    __tablename__ = 'estadisticas_perfiles'
+    campo = db.Column(db.String(30), primary_key=True)
+    valor = db.Column(db.String(100), primary_key=True)
+    total = db.Column(db.Integer, nullable=False, default=0)
@@ -0,0 +1,149 @@
+# Caché de páginas renderizadas.
+#
+# Las páginas informativas (Principal, Habeas Data, el panel del empresario) no
+# dependen del usuario ni de la petición: su HTML solo cambia cuando cambia la
+# plantilla. Se renderizan una vez por versión de la plantilla (su mtime) y se
+# guardan ya comprimidas en gzip y, si está instalado el paquete 'brotli', en
+# brotli. Cada versión lleva un ETag fuerte; si el navegador ya la tiene
+# (If-None-Match) se responde 304 sin renderizar ni enviar el cuerpo.
+#
+# Solo deben pasar por aquí plantillas cuyo resultado sea igual para todos los
+# usuarios: nada de session, flash ni datos de la base de datos.
+import gzip
+import hashlib
+import os
+import threading
+
+from flask import current_app, render_template, request
+
+try:
+    import brotli
+except ImportError:  # Opcional: sin brotli se sirven gzip y sin comprimir.
+    brotli = None
+
+
+class _Entrada:
+    __slots__ = ('mtime', 'etag', 'cuerpos')
+
+    def __init__(self, mtime, etag, cuerpos):
+        self.mtime = mtime
+        self.etag = etag
+        self.cuerpos = cuerpos  # codificación ('identity', 'gzip', 'br') -> bytes
+
+
+class PageCache:
+    """Renderiza plantillas estáticas una sola vez por versión y responde 304 a peticiones condicionales.
+
+    Se configura con app.config:
+        PAGE_CACHE_ENABLED         Si es False se renderiza en cada petición (por defecto True).
+        PAGE_CACHE_MAX_AGE         max-age de Cache-Control en segundos; 0 obliga a revalidar
+                                   con el ETag en cada visita (por defecto 0).
+        PAGE_CACHE_MIN_COMPRESS    Tamaño mínimo en bytes para guardar versiones comprimidas (por defecto 1024).
+    """
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self._entradas = {}
+        self._rutas = {}  # plantilla -> archivo, para comprobar su mtime sin leerlo
+        self._stats = {'hits': 0, 'misses': 0, 'not_modified': 0, 'renders': 0}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('PAGE_CACHE_ENABLED', True)
+        app.config.setdefault('PAGE_CACHE_MAX_AGE', 0)
+        app.config.setdefault('PAGE_CACHE_MIN_COMPRESS', 1024)
+        app.extensions['page_cache'] = self
+
+    def render(self, template_name):
+        """Respuesta para la plantilla, desde la caché si su archivo no ha cambiado."""
+        app = current_app._get_current_object()
+        if not app.config['PAGE_CACHE_ENABLED']:
+            return render_template(template_name)
+
+        mtime = self._mtime(app, template_name)
+        entrada = self._entradas.get(template_name)
+        if entrada is not None and entrada.mtime == mtime:
+            self._contar('hits')
+        else:
+            self._contar('misses')
+            entrada = self._renderizar(app, template_name, mtime)
+
+        codificacion = self._elegir_codificacion(entrada)
+        etag = entrada.etag if codificacion == 'identity' else f'{entrada.etag}-{codificacion}'
+        if request.if_none_match and self._coincide(request.if_none_match, entrada.etag):
+            self._contar('not_modified')
+            respuesta = app.response_class(status=304)
+        else:
+            respuesta = app.response_class(entrada.cuerpos[codificacion], mimetype='text/html')
+            if codificacion != 'identity':
+                respuesta.headers['Content-Encoding'] = codificacion
+        respuesta.set_etag(etag)
+        respuesta.headers['Vary'] = 'Accept-Encoding'
+        max_age = app.config['PAGE_CACHE_MAX_AGE']
+        respuesta.headers['Cache-Control'] = f'public, max-age={max_age}' if max_age else 'no-cache'
+        return respuesta
+
+    def stats(self):
+        """Contadores de aciertos/fallos y tamaño de lo guardado."""
+        with self._lock:
+            datos = dict(self._stats)
+        datos['templates'] = len(self._entradas)
+        datos['bytes'] = sum(len(c) for e in self._entradas.values() for c in e.cuerpos.values())
+        total = datos['hits'] + datos['misses']
+        datos['hit_ratio'] = round(datos['hits'] / total, 4) if total else None
+        datos['brotli'] = brotli is not None
+        return datos
+
+    def clear(self):
+        with self._lock:
+            self._entradas.clear()
+            self._rutas.clear()
+
+    # --- Internos ---
+
+    def _contar(self, clave):
+        with self._lock:
+            self._stats[clave] += 1
+
+    def _mtime(self, app, template_name):
+        ruta = self._rutas.get(template_name)
+        if ruta is None:
+            _, ruta, _ = app.jinja_loader.get_source(app.jinja_env, template_name)
+            self._rutas[template_name] = ruta
+        return os.stat(ruta).st_mtime_ns
+
+    def _renderizar(self, app, template_name, mtime):
+        with self._lock:
+            # Otra petición pudo renderizarla mientras esperábamos el lock.
+            entrada = self._entradas.get(template_name)
+            if entrada is not None and entrada.mtime == mtime:
+                return entrada
+            html = render_template(template_name).encode('utf-8')
+            cuerpos = {'identity': html}
+            if len(html) >= app.config['PAGE_CACHE_MIN_COMPRESS']:
+                cuerpos['gzip'] = gzip.compress(html, compresslevel=9, mtime=0)
+                if brotli is not None:
+                    cuerpos['br'] = brotli.compress(html, quality=11)
+            entrada = _Entrada(mtime, hashlib.sha256(html).hexdigest()[:32], cuerpos)
+            self._entradas[template_name] = entrada
+            self._stats['renders'] += 1
+            return entrada
+
+    @staticmethod
+    def _elegir_codificacion(entrada):
+        aceptadas = request.accept_encodings
+        for codificacion in ('br', 'gzip'):
+            if codificacion in entrada.cuerpos and aceptadas[codificacion]:
+                return codificacion
+        return 'identity'
+
+    @staticmethod
+    def _coincide(if_none_match, etag):
+        """True si el navegador ya tiene alguna codificación de esta versión (todas tienen el mismo HTML)."""
+        if if_none_match.star_tag:
+            return True
+        return any(valor == etag or valor.startswith(f'{etag}-') for valor in if_none_match.as_set())
+
+
+page_cache = PageCache()
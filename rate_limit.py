@@ -0,0 +1,259 @@
+# Límite de intentos y descarte de carga en los endpoints de autenticación.
+#
+# Cada regla es un token bucket: 'N/S' permite ráfagas de hasta N peticiones y
+# recupera N fichas cada S segundos. Las reglas se aplican con un decorador y se
+# evalúan antes de la vista, así que una petición rechazada (429) no llega a
+# consultar la base de datos, calcular un hash ni enviar un correo.
+#
+# Backends:
+#   memory://            Un diccionario por proceso. Las entradas expiran cuando
+#                        su bucket volvería a estar lleno (olvidarlas no cambia
+#                        nada) y hay un máximo de claves.
+#   redis://host:6379/0  Compartido entre workers y servidores (paquete 'redis').
+# Se puede pasar cualquier objeto con consume() como backend a init_app().
+#
+# Además, si el pool de hashing está saturado (ver hashing.PasswordHasher) las
+# rutas marcadas con shed=True responden 503 de inmediato en lugar de encolar
+# más trabajo de CPU.
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, jsonify, request
+
+from hashing import HashingBusy, password_hasher
+
+logger = logging.getLogger(__name__)
+
+
+def parse_rule(regla):
+    """'5/300' -> (5, 300.0): capacidad del bucket y segundos para rellenarlo."""
+    capacidad, periodo = str(regla).split('/')
+    capacidad, periodo = int(capacidad), float(periodo)
+    if capacidad <= 0 or periodo <= 0:
+        raise ValueError(f'Regla de límite inválida: {regla!r}')
+    return capacidad, periodo
+
+
+class MemoryBackend:
+    """Token buckets en memoria del proceso, con expiración y tamaño máximo."""
+
+    def __init__(self, max_keys=100_000):
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._buckets = OrderedDict()  # clave -> [fichas, actualizado, expira], del más antiguo al más reciente
+        self.evicted = 0
+
+    def consume(self, clave, capacidad, periodo, costo=1):
+        """Gasta 'costo' fichas si las hay. Devuelve (permitido, segundos hasta poder reintentar)."""
+        tasa = capacidad / periodo
+        ahora = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.pop(clave, None)
+            if bucket is None or bucket[2] <= ahora:
+                fichas = float(capacidad)
+            else:
+                fichas = min(capacidad, bucket[0] + (ahora - bucket[1]) * tasa)
+            permitido = fichas >= costo
+            if permitido:
+                fichas -= costo
+            self._buckets[clave] = [fichas, ahora, ahora + (capacidad - fichas) / tasa]
+            self._purgar(ahora)
+        return permitido, 0.0 if permitido else (costo - fichas) / tasa
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def _purgar(self, ahora):
+        # Los más antiguos van primero; basta con mirar el principio.
+        while self._buckets:
+            clave, bucket = next(iter(self._buckets.items()))
+            if bucket[2] <= ahora:
+                del self._buckets[clave]
+            elif len(self._buckets) > self.max_keys:
+                # Olvidar un bucket que no está lleno le devuelve fichas a esa clave:
+                # max_keys debe quedar muy por encima de las claves activas.
+                del self._buckets[clave]
+                self.evicted += 1
+            else:
+                break
+
+
+class RedisBackend:
+    """Token buckets en Redis: un hash por clave, actualizado de forma atómica con un script Lua."""
+
+    SCRIPT = """
+    local capacidad = tonumber(ARGV[1])
+    local tasa = tonumber(ARGV[2])
+    local costo = tonumber(ARGV[3])
+    local t = redis.call('TIME')
+    local ahora = tonumber(t[1]) + tonumber(t[2]) / 1000000
+    local datos = redis.call('HMGET', KEYS[1], 'f', 'a')
+    local fichas = tonumber(datos[1])
+    if fichas == nil then
+        fichas = capacidad
+    else
+        fichas = math.min(capacidad, fichas + math.max(0, ahora - tonumber(datos[2])) * tasa)
+    end
+    local permitido = 0
+    local espera = 0
+    if fichas >= costo then
+        fichas = fichas - costo
+        permitido = 1
+    else
+        espera = (costo - fichas) / tasa
+    end
+    redis.call('HSET', KEYS[1], 'f', tostring(fichas), 'a', tostring(ahora))
+    redis.call('PEXPIRE', KEYS[1], math.ceil((capacidad - fichas) / tasa * 1000) + 1000)
+    return {permitido, tostring(espera)}
+    """
+
+    def __init__(self, url, prefijo='ratelimit:'):
+        import redis  # Opcional: solo hace falta con RATELIMIT_STORAGE_URL=redis://...
+        self._cliente = redis.Redis.from_url(url)
+        self._script = self._cliente.register_script(self.SCRIPT)
+        self.prefijo = prefijo
+
+    def consume(self, clave, capacidad, periodo, costo=1):
+        permitido, espera = self._script(keys=[self.prefijo + clave], args=[capacidad, capacidad / periodo, costo])
+        return bool(permitido), float(espera)
+
+
+def create_backend(url, max_keys=100_000):
+    if not url or url.startswith('memory://'):
+        return MemoryBackend(max_keys=max_keys)
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisBackend(url)
+    raise ValueError(f'Backend de límite de intentos no soportado: {url!r}')
+
+
+class RateLimiter:
+    """Decorador de límites por clave (IP, correo, perfil...) y descarte de carga.
+
+    Se configura con app.config:
+        RATELIMIT_ENABLED       Si es False no se limita nada (por defecto True).
+        RATELIMIT_STORAGE_URL   'memory://' (por defecto) o 'redis://...'.
+        RATELIMIT_MAX_KEYS      Máximo de claves del backend en memoria (por defecto 100000).
+        RATELIMIT_<REGLA>       Cada regla usada en limit(), como 'N/segundos'.
+    """
+
+    def __init__(self, app=None, backend=None):
+        self.backend = backend
+        self._lock = threading.Lock()
+        self._stats = {'allowed': 0, 'limited': 0, 'shed': 0, 'backend_errors': 0}
+        self._limited_by_rule = {}
+        if app is not None:
+            self.init_app(app, backend)
+
+    def init_app(self, app, backend=None):
+        app.config.setdefault('RATELIMIT_ENABLED', True)
+        app.config.setdefault('RATELIMIT_STORAGE_URL', 'memory://')
+        app.config.setdefault('RATELIMIT_MAX_KEYS', 100_000)
+        if backend is not None:
+            self.backend = backend
+        elif self.backend is None:
+            self.backend = create_backend(app.config['RATELIMIT_STORAGE_URL'], app.config['RATELIMIT_MAX_KEYS'])
+        app.register_error_handler(HashingBusy, _respuesta_saturado)
+        app.extensions['rate_limiter'] = self
+
+    def limit(self, *reglas, methods=('POST',), shed=False):
+        """Aplica las reglas [(nombre_config, función_clave), ...] a la vista.
+
+        función_clave devuelve la clave del bucket para la petición actual (o None
+        para no aplicar esa regla). Con shed=True la vista también responde 503 si
+        el pool de hashing está saturado.
+        """
+        def decorador(vista):
+            @wraps(vista)
+            def envoltura(*args, **kwargs):
+                if request.method in methods and current_app.config['RATELIMIT_ENABLED']:
+                    respuesta = self._comprobar(reglas, shed)
+                    if respuesta is not None:
+                        return respuesta
+                return vista(*args, **kwargs)
+            return envoltura
+        return decorador
+
+    def stats(self):
+        with self._lock:
+            datos = dict(self._stats)
+            datos['limited_by_rule'] = dict(self._limited_by_rule)
+        datos['backend'] = type(self.backend).__name__
+        if isinstance(self.backend, MemoryBackend):
+            datos['keys'] = len(self.backend)
+            datos['evicted'] = self.backend.evicted
+        datos['hashing_in_flight'] = password_hasher.in_flight
+        return datos
+
+    # --- Internos ---
+
+    def _comprobar(self, reglas, shed):
+        espera_max, rechazada = 0.0, None
+        for nombre, funcion_clave in reglas:
+            clave = funcion_clave()
+            if clave is None:
+                continue
+            capacidad, periodo = parse_rule(current_app.config[nombre])
+            try:
+                permitido, espera = self.backend.consume(f'{nombre.lower()}:{clave}', capacidad, periodo)
+            except Exception as e:  # Si el backend compartido falla, no bloqueamos el login.
+                self._contar('backend_errors')
+                logger.error(f"❌ Error en el backend de límite de intentos: {e}")
+                continue
+            if not permitido and espera >= espera_max:
+                espera_max, rechazada = espera, nombre
+
+        if rechazada is None:
+            # Se comprueba después de los límites: así quien ya los superó recibe 429
+            # y solo el tráfico que pasó los límites compite por el pool de hashing.
+            if shed and password_hasher.saturated():
+                self._contar('shed')
+                return _respuesta_saturado()
+            self._contar('allowed')
+            return None
+        with self._lock:
+            self._stats['limited'] += 1
+            self._limited_by_rule[rechazada] = self._limited_by_rule.get(rechazada, 0) + 1
+        segundos = max(1, math.ceil(espera_max))
+        respuesta = jsonify({'success': False,
+                             'message': f'Demasiados intentos. Intenta de nuevo en {segundos} segundos.'})
+        respuesta.status_code = 429
+        respuesta.headers['Retry-After'] = str(segundos)
+        return respuesta
+
+    def _contar(self, clave):
+        with self._lock:
+            self._stats[clave] += 1
+
+
+def _respuesta_saturado(error=None):
+    respuesta = jsonify({'success': False, 'message': 'El servicio está ocupado. Intenta de nuevo en unos segundos.'})
+    respuesta.status_code = 503
+    respuesta.headers['Retry-After'] = '2'
+    return respuesta
+
+
+# --- Funciones de clave ---
+
+def by_ip():
+    return request.remote_addr
+
+
+def _json():
+    return request.get_json(silent=True) or {}
+
+
+def by_email():
+    email = _json().get('email')
+    return email.strip().lower() if isinstance(email, str) and email.strip() else None
+
+
+def by_email_and_profile():
+    email = by_email()
+    return f"{email}|{_json().get('profile')}" if email else None
+
+
+rate_limiter = RateLimiter()
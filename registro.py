@@ -0,0 +1,353 @@
+# Registro de usuarios: alta del usuario y su perfil, y disponibilidad de correos y NIT.
+#
+# Las cuatro rutas de registro usan registrar(). Las restricciones de unicidad de
+# cada perfil (correo, documentos, NIT) se comprueban en una sola consulta: una
+# UNION ALL de EXISTS que devuelve los campos ocupados. Esa consulta se hace antes
+# de calcular el hash de la contraseña, salvo que el filtro de Bloom asegure que
+# ningún valor está ocupado; en ese caso se inserta directamente y, si otro
+# registro se adelantó, la IntegrityError se traduce a errores por campo.
+#
+# El filtro de Bloom guarda los correos y NIT registrados. Un "no está" del
+# filtro es definitivo para los valores que conoce, así que /registro/disponible
+# responde sin ir a la base de datos a casi todos los valores libres; un "puede
+# estar" se confirma con la base de datos. El filtro se construye con la primera
+# consulta, se amplía con los registros de este proceso y se refresca cada
+# REGISTRO_BLOOM_REFRESH segundos para ver los de otros workers: hasta entonces
+# esos valores pueden aparecer como libres, pero el INSERT los rechaza igual.
+import hashlib
+import logging
+import math
+import re
+import threading
+import time
+
+from flask import Blueprint, current_app, jsonify, request
+from sqlalchemy import exists, func, literal, select, union_all
+from sqlalchemy.exc import IntegrityError
+
+import estadisticas
+from autorizacion import solo_admin
+from extensions import db
+from models import Usuario, Emprendedor, Empresario, Inversionista, Institucion, TipoPerfil
+from rate_limit import rate_limiter, by_ip
+
+logger = logging.getLogger(__name__)
+
+# Campos únicos de cada perfil: nombre del campo -> columna.
+CAMPOS_UNICOS = {
+    TipoPerfil.EMPRENDEDOR: {'correo': Usuario.email, 'numero_documento': Emprendedor.numero_documento},
+    TipoPerfil.EMPRESARIO: {
+        'correo': Usuario.email,
+        'numero_documento_personal': Empresario.numero_documento_personal,
+        'numero_documento_contribuyente': Empresario.numero_documento_contribuyente,
+        'nit': Empresario.nit,
+    },
+    TipoPerfil.INVERSIONISTA: {'correo': Usuario.email, 'numero_documento': Inversionista.numero_documento},
+    TipoPerfil.INSTITUCION: {'correo': Usuario.email, 'nit': Institucion.nit},
+}
+
+# Relación de Usuario que apunta al perfil de cada tipo.
+RELACION_PERFIL = {
+    TipoPerfil.EMPRENDEDOR: 'emprendedor',
+    TipoPerfil.EMPRESARIO: 'empresario',
+    TipoPerfil.INVERSIONISTA: 'inversionista',
+    TipoPerfil.INSTITUCION: 'institucion',
+}
+
+MENSAJES = {
+    'correo': 'El correo electrónico ya está registrado. Por favor, utiliza otro.',
+    'nit': 'El NIT ya está registrado. Por favor, verifica la información.',
+    'numero_documento': 'El número de documento ya está registrado.',
+    'numero_documento_personal': 'El número de documento ya está registrado.',
+    'numero_documento_contribuyente': 'El número de documento del contribuyente ya está registrado.',
+}
+
+# Columnas que se guardan en el filtro de Bloom.
+COLUMNAS_BLOOM = (Usuario.email, Empresario.nit, Institucion.nit)
+
+
+class RegistroDuplicado(Exception):
+    """Uno o más campos únicos ya están registrados. 'errores' es {campo: mensaje}."""
+
+    def __init__(self, errores):
+        super().__init__(', '.join(errores))
+        self.errores = errores
+
+
+def normalizar(columna, valor):
+    """Valor tal como se compara (y se guarda): el correo sin espacios y en minúsculas."""
+    if valor is None:
+        return None
+    valor = str(valor).strip()
+    if columna is Usuario.email:
+        valor = valor.lower()
+    return valor or None
+
+
+def _en_bloom(columna):
+    return any(columna is c for c in COLUMNAS_BLOOM)
+
+
+def _prefijo(columna):
+    # class_ y key son atributos directos; columna.table pasa por el proxy de SQLAlchemy (lento).
+    return f'{columna.class_.__tablename__}.{columna.key}:'
+
+
+def _clave(columna, valor):
+    return _prefijo(columna) + valor
+
+
+# --- Filtro de Bloom ---
+
+class BloomFilter:
+    """Filtro de Bloom sobre un bytearray, con k posiciones por doble hash (blake2b)."""
+
+    def __init__(self, capacidad, error=0.01):
+        capacidad = max(int(capacidad), 1)
+        self.bits = max(8, int(math.ceil(-capacidad * math.log(error) / math.log(2) ** 2)))
+        self.k = max(1, round(self.bits / capacidad * math.log(2)))
+        self.capacidad = capacidad
+        self.elementos = 0
+        self._datos = bytearray((self.bits + 7) // 8)
+
+    def _posiciones(self, clave):
+        digest = hashlib.blake2b(clave.encode(), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.bits for i in range(self.k)]
+
+    def add(self, clave):
+        datos = self._datos
+        for p in self._posiciones(clave):
+            datos[p >> 3] |= 1 << (p & 7)
+        self.elementos += 1
+
+    def __contains__(self, clave):
+        datos = self._datos
+        return all(datos[p >> 3] & (1 << (p & 7)) for p in self._posiciones(clave))
+
+    @property
+    def bytes(self):
+        return len(self._datos)
+
+
+class Disponibilidad:
+    """Responde si un correo, documento o NIT está libre, con el filtro de Bloom delante."""
+
+    def __init__(self):
+        self.filtro = None
+        self.construido_en = None
+        self._lock = threading.Lock()
+        self._stats = {'bloom_negatives': 0, 'db_checks': 0, 'false_positives': 0}
+        self.duracion_construccion = None
+        self._reconstruyendo = False
+
+    def construir(self, error):
+        """Lee los correos y NIT de la base de datos y reemplaza el filtro."""
+        inicio = time.perf_counter()
+        total = sum(db.session.execute(select(func.count(columna))).scalar() for columna in COLUMNAS_BLOOM)
+        # Margen para los registros de este proceso hasta el próximo refresco.
+        filtro = BloomFilter(max(2 * total, 10_000), error)
+        for columna in COLUMNAS_BLOOM:
+            prefijo = _prefijo(columna)
+            valores = db.session.execute(select(columna).where(columna.isnot(None))
+                                         .execution_options(yield_per=10_000)).scalars()
+            for valor in valores:
+                filtro.add(prefijo + normalizar(columna, valor))
+        with self._lock:
+            self.filtro = filtro
+            self.construido_en = time.monotonic()
+            self.duracion_construccion = time.perf_counter() - inicio
+        logger.info(f"✅ Filtro de disponibilidad construido: {total} valores, {filtro.bytes / 1024:.0f} KB "
+                    f"en {self.duracion_construccion:.2f} s")
+        return total
+
+    def asegurar(self):
+        """Construye el filtro la primera vez y lo refresca cada REGISTRO_BLOOM_REFRESH segundos.
+
+        La primera construcción bloquea la petición; los refrescos se hacen en un
+        hilo y mientras tanto se sigue usando el filtro anterior.
+        """
+        if not current_app.config['REGISTRO_BLOOM_ENABLED']:
+            return None
+        error = current_app.config['REGISTRO_BLOOM_ERROR_RATE']
+        filtro = self.filtro
+        if filtro is None:
+            self.construir(error)
+            return self.filtro
+        intervalo = current_app.config['REGISTRO_BLOOM_REFRESH']
+        if filtro.elementos > filtro.capacidad or (intervalo and time.monotonic() - self.construido_en > intervalo):
+            with self._lock:
+                if self._reconstruyendo:
+                    return filtro
+                self._reconstruyendo = True
+            threading.Thread(target=self._reconstruir, args=(current_app._get_current_object(), error),
+                             name='registro-bloom', daemon=True).start()
+        return filtro
+
+    def _reconstruir(self, app, error):
+        try:
+            with app.app_context():
+                self.construir(error)
+        except Exception as e:
+            logger.error(f"❌ Error al reconstruir el filtro de disponibilidad: {e}")
+        finally:
+            self._reconstruyendo = False
+
+    def quizas_ocupados(self, valores):
+        """Campos de 'valores' ({campo: (columna, valor)}) que el filtro no puede descartar."""
+        filtro = self.asegurar()
+        return {campo: cv for campo, cv in valores.items()
+                if filtro is None or not _en_bloom(cv[0]) or _clave(*cv) in filtro}
+
+    def disponible(self, columna, valor):
+        filtro = self.asegurar()
+        consultado = filtro is not None and _en_bloom(columna)
+        if consultado and _clave(columna, valor) not in filtro:
+            self._contar('bloom_negatives')
+            return True
+        self._contar('db_checks')
+        ocupado = db.session.execute(select(exists().where(_condicion(columna, valor)))).scalar()
+        if consultado and not ocupado:
+            self._contar('false_positives')
+        return not ocupado
+
+    def agregar(self, valores):
+        filtro = self.filtro
+        if filtro is None:
+            return
+        with self._lock:
+            for columna, valor in valores.values():
+                if _en_bloom(columna):
+                    filtro.add(_clave(columna, valor))
+
+    def stats(self):
+        with self._lock:
+            datos = dict(self._stats)
+        filtro = self.filtro
+        if filtro is not None:
+            datos.update({'bloom_items': filtro.elementos, 'bloom_capacity': filtro.capacidad,
+                          'bloom_bytes': filtro.bytes, 'bloom_hashes': filtro.k,
+                          'bloom_build_seconds': round(self.duracion_construccion, 3),
+                          'bloom_age_seconds': round(time.monotonic() - self.construido_en, 1)})
+        return datos
+
+    def _contar(self, clave):
+        with self._lock:
+            self._stats[clave] += 1
+
+
+disponibilidad = Disponibilidad()
+
+
+# --- Alta de usuarios ---
+
+def _condicion(columna, valor):
+    if columna is Usuario.email:
+        return func.lower(Usuario.email) == valor  # Usa ix_usuarios_email_lower_tipo_perfil.
+    return columna == valor
+
+
+def campos_ocupados(valores):
+    """Campos de 'valores' ({campo: (columna, valor)}) ya registrados, en una sola consulta."""
+    if not valores:
+        return set()
+    consultas = [select(literal(campo)).where(exists().where(_condicion(columna, valor)))
+                 for campo, (columna, valor) in valores.items()]
+    return set(db.session.execute(union_all(*consultas)).scalars())
+
+
+def _campos_de_integridad(error, valores):
+    """Campos que nombra el mensaje de una IntegrityError de unicidad (SQLite, PostgreSQL o MySQL)."""
+    mensaje = str(getattr(error, 'orig', error))
+    campos = set()
+    for campo, (columna, _) in valores.items():
+        tabla, nombre = columna.table.name, columna.name
+        if (f'{tabla}.{nombre}' in mensaje or f'{tabla}_{nombre}_key' in mensaje
+                or re.search(rf"for key '(?:{tabla}\.)?{nombre}'", mensaje)):
+            campos.add(campo)
+    return campos
+
+
+def _errores(campos):
+    return {campo: MENSAJES.get(campo, 'El valor ya está registrado.') for campo in sorted(campos)}
+
+
+def registrar(tipo_perfil, correo, contrasena, perfil):
+    """Crea el usuario con su perfil y hace commit. Devuelve el usuario.
+
+    Lanza RegistroDuplicado con los errores por campo si algún valor único ya
+    está registrado.
+    """
+    correo = normalizar(Usuario.email, correo)
+    valores = {'correo': (Usuario.email, correo)}
+    for campo, columna in CAMPOS_UNICOS[tipo_perfil].items():
+        if columna is not Usuario.email:
+            valor = normalizar(columna, getattr(perfil, columna.key))
+            setattr(perfil, columna.key, valor)
+            if valor is not None:
+                valores[campo] = (columna, valor)
+
+    # Antes del hash (lo caro): una consulta, salvo que el filtro descarte todos los valores.
+    if disponibilidad.quizas_ocupados(valores):
+        ocupados = campos_ocupados(valores)
+        if ocupados:
+            raise RegistroDuplicado(_errores(ocupados))
+
+    usuario = Usuario(email=correo, tipo_perfil=tipo_perfil)
+    usuario.set_password(contrasena)
+    setattr(usuario, RELACION_PERFIL[tipo_perfil], perfil)
+    db.session.add(usuario)
+    try:
+        # En la misma transacción: el INSERT del usuario se hace con el autoflush del upsert.
+        estadisticas.sumar_alta(usuario)
+        db.session.commit()
+    except IntegrityError as e:
+        # Otro registro con los mismos datos se adelantó entre la comprobación y el INSERT.
+        db.session.rollback()
+        ocupados = campos_ocupados(valores) or _campos_de_integridad(e, valores)
+        if not ocupados:
+            raise
+        raise RegistroDuplicado(_errores(ocupados)) from e
+
+    disponibilidad.agregar(valores)
+    return usuario
+
+
+# --- Integración con Flask ---
+
+bp = Blueprint('registro', __name__, cli_group=None)
+
+
+def init_app(app):
+    """Configura el filtro de disponibilidad y registra /registro/disponible."""
+    app.config.setdefault('REGISTRO_BLOOM_ENABLED', True)
+    app.config.setdefault('REGISTRO_BLOOM_ERROR_RATE', 0.01)
+    app.config.setdefault('REGISTRO_BLOOM_REFRESH', 300)
+    app.config.setdefault('RATELIMIT_DISPONIBLE_IP', '60/60')
+    app.register_blueprint(bp)
+
+
+@bp.route('/registro/disponible')
+@rate_limiter.limit(('RATELIMIT_DISPONIBLE_IP', by_ip), methods=('GET',))
+def registro_disponible():
+    """¿Está libre un valor único? ?campo=correo&valor=... (para nit y documentos, también &perfil=...)."""
+    campo = request.args.get('campo', '')
+    perfil = request.args.get('perfil', 'emprendedor')
+    try:
+        columna = CAMPOS_UNICOS[TipoPerfil(perfil)][campo]
+    except (ValueError, KeyError):
+        return jsonify({'success': False, 'message': 'Campo o perfil no válido.'}), 400
+    valor = normalizar(columna, request.args.get('valor'))
+    if valor is None:
+        return jsonify({'success': False, 'message': 'El valor es requerido.'}), 400
+
+    respuesta = jsonify({'success': True, 'campo': campo, 'disponible': disponibilidad.disponible(columna, valor)})
+    respuesta.headers['Cache-Control'] = 'no-store'
+    return respuesta
+
+
+@bp.route('/registro/stats')
+@solo_admin
+def registro_stats():
+    """Respuestas del filtro de Bloom sin ir a la base de datos, consultas y falsos positivos."""
+    return jsonify(disponibilidad.stats())
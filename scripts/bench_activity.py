@@ -0,0 +1,184 @@
+"""Benchmark de la última conexión por lotes (activity.py).
+
+Siembra una base desechable con usuarios y mide:
+    - el coste por petición de anotar la actividad (el gancho al guardar la
+      sesión y ActivityTracker.seen) en µs, contra escribir ultima_conexion con
+      UPDATE + commit en la misma petición,
+    - una carga simulada (N peticiones repartidas entre U usuarios a lo largo de
+      unos minutos) escribiendo en cada petición contra volcar cada
+      ACTIVITY_FLUSH_INTERVAL segundos: sentencias, commits y tiempo en la base,
+    - la memoria del buffer con ACTIVITY_MAX_USERS usuarios pendientes y lo que se
+      descarta al pasar el límite,
+y comprueba que ambas estrategias dejan la misma ultima_conexion.
+
+Uso:
+    python scripts/bench_activity.py --url sqlite:////tmp/bench_activity.db --usuarios 1000 --peticiones 50000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+HASH_FIJO = 'scrypt:32768:8:1$benchmark$' + '0' * 128
+
+
+def sembrar(db, usuarios):
+    from models import Usuario
+    db.drop_all()
+    db.create_all()
+    db.session.execute(Usuario.__table__.insert(), [
+        {'id': i, 'email': f'usuario{i}@example.com', 'password_hash': HASH_FIJO, 'tipo_perfil': 'EMPRESARIO',
+         'is_admin': False, 'activo': True} for i in range(1, usuarios + 1)])
+    db.session.commit()
+
+
+def micro(etiqueta, fn, repeticiones):
+    tiempos = []
+    for _ in range(5):
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            fn()
+        tiempos.append((time.perf_counter() - inicio) / repeticiones * 1e6)
+    print(f'  {etiqueta:<55} {statistics.median(tiempos):9.2f} µs')
+    return statistics.median(tiempos)
+
+
+class Contador:
+    """Cuenta sentencias y commits con los eventos del engine."""
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+        self.sentencias = self.filas = self.commits = 0
+        event.listen(engine, 'before_cursor_execute', self._sentencia)
+        event.listen(engine, 'commit', self._commit)
+
+    def _sentencia(self, conn, cursor, statement, parameters, context, executemany):
+        self.sentencias += 1
+        self.filas += len(parameters) if executemany else 1
+
+    def _commit(self, conn):
+        self.commits += 1
+
+    def reiniciar(self):
+        self.sentencias = self.filas = self.commits = 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='sqlite:////tmp/bench_activity.db', help='Base de datos desechable.')
+    parser.add_argument('--usuarios', type=int, default=1000)
+    parser.add_argument('--peticiones', type=int, default=50_000)
+    parser.add_argument('--minutos', type=int, default=10, help='Duración simulada de la carga.')
+    parser.add_argument('--intervalo', type=int, default=30, help='ACTIVITY_FLUSH_INTERVAL simulado (s).')
+    parser.add_argument('--max-usuarios', type=int, default=50_000)
+    args = parser.parse_args()
+    random.seed(42)
+
+    os.environ['DATABASE_URL'] = args.url
+    from play import create_app
+    from extensions import db
+    from flask.sessions import SecureCookieSession
+    from sqlalchemy import select, update
+    from models import Usuario
+    from activity import activity_tracker
+
+    # Intervalo largo: los volcados los hace el benchmark, no el hilo.
+    app = create_app({'TELEMETRY_ENABLED': False, 'ACTIVITY_FLUSH_INTERVAL': 3600,
+                      'ACTIVITY_MAX_USERS': args.max_usuarios})
+    with app.app_context():
+        sembrar(db, args.usuarios)
+        contador = Contador(db.engine)
+
+        print(f'Coste por petición ({args.usuarios:,} usuarios):')
+        sesion = SecureCookieSession({'user_id': 1})
+        sesion.accessed = True
+        with app.test_request_context():
+            gancho = micro('gancho al guardar la sesión (vista que leyó la sesión)',
+                           lambda: activity_tracker._registrar_sesion(sesion), 20_000)
+            anonima = SecureCookieSession()
+            micro('gancho sin sesión leída (estáticos, páginas cacheadas)',
+                  lambda: activity_tracker._registrar_sesion(anonima), 20_000)
+            micro('ActivityTracker.seen()', lambda: activity_tracker.seen(random.randint(1, args.usuarios)), 20_000)
+
+            def escribir_en_peticion():
+                db.session.execute(update(Usuario).where(Usuario.id == random.randint(1, args.usuarios))
+                                   .values(ultima_conexion=datetime.utcnow()))
+                db.session.commit()
+            directo = micro('UPDATE ultima_conexion + commit en la petición', escribir_en_peticion, 200)
+        print(f'  {"":<55} {directo / gancho:9.0f}x')
+        activity_tracker.flush()
+
+        # Carga simulada: fechas repartidas en la duración, usuarios con reparto sesgado
+        # (unos pocos muy activos), como en la aplicación.
+        inicio_carga = datetime(2024, 1, 1)
+        duracion = args.minutos * 60
+        carga = sorted((random.uniform(0, duracion), min(int(random.paretovariate(1.2)), args.usuarios))
+                       for _ in range(args.peticiones))
+        print(f'\nCarga simulada: {args.peticiones:,} peticiones en {args.minutos} min, '
+              f'volcado cada {args.intervalo} s:')
+
+        db.session.execute(update(Usuario).values(ultima_conexion=None))
+        db.session.commit()
+        contador.reiniciar()
+        inicio = time.perf_counter()
+        for segundo, usuario_id in carga:
+            db.session.execute(update(Usuario).where(Usuario.id == usuario_id)
+                               .values(ultima_conexion=inicio_carga + timedelta(seconds=segundo)))
+            db.session.commit()
+        tiempo_directo = time.perf_counter() - inicio
+        directas = (contador.sentencias, contador.filas, contador.commits)
+        esperado = db.session.execute(select(Usuario.id, Usuario.ultima_conexion).order_by(Usuario.id)).all()
+
+        db.session.execute(update(Usuario).values(ultima_conexion=None))
+        db.session.commit()
+        contador.reiniciar()
+        tiempo_lotes = 0.0
+        siguiente = args.intervalo
+        volcados = []
+        for segundo, usuario_id in carga:
+            if segundo >= siguiente:
+                inicio = time.perf_counter()
+                volcados.append(activity_tracker.flush()[0])
+                tiempo_lotes += time.perf_counter() - inicio
+                siguiente += args.intervalo
+            activity_tracker.seen(usuario_id, inicio_carga + timedelta(seconds=segundo))
+        inicio = time.perf_counter()
+        volcados.append(activity_tracker.flush()[0])
+        tiempo_lotes += time.perf_counter() - inicio
+        lotes = (contador.sentencias, contador.filas, contador.commits)
+        obtenido = db.session.execute(select(Usuario.id, Usuario.ultima_conexion).order_by(Usuario.id)).all()
+
+        print(f'  {"":<30} {"sentencias":>11} {"filas":>9} {"commits":>9} {"tiempo":>9}')
+        print(f'  {"UPDATE en cada petición":<30} {directas[0]:>11,} {directas[1]:>9,} {directas[2]:>9,} '
+              f'{tiempo_directo:8.2f}s')
+        print(f'  {"volcado por lotes":<30} {lotes[0]:>11,} {lotes[1]:>9,} {lotes[2]:>9,} {tiempo_lotes:8.2f}s')
+        print(f'  {len(volcados)} volcados, {statistics.mean(volcados):.0f} usuarios por volcado de media; '
+              f'commits ahorrados {1 - lotes[2] / directas[2]:.2%}, filas escritas ahorradas {1 - lotes[1] / directas[1]:.1%}')
+        print(f"  ultima_conexion {'igual' if obtenido == esperado else 'DISTINTA'} con ambas estrategias")
+
+    print(f'\nMemoria del buffer ({args.max_usuarios:,} usuarios pendientes como máximo):')
+    tracemalloc.start()
+    antes = tracemalloc.get_traced_memory()[0]
+    ahora = datetime.utcnow()
+    for usuario_id in range(1, args.max_usuarios + 1):
+        activity_tracker.seen(usuario_id, ahora)
+    ocupada = tracemalloc.get_traced_memory()[0] - antes
+    tracemalloc.stop()
+    pendientes = activity_tracker.stats()['pending_seen']
+    # Pasado el límite se descarta y se despierta al hilo para que vuelque antes.
+    descartados = sum(not activity_tracker.seen(usuario_id, ahora)
+                      for usuario_id in range(args.max_usuarios + 1, args.max_usuarios + 1001))
+    print(f'  pendientes {pendientes:,}: {ocupada / 1024 / 1024:.1f} MiB ({ocupada / max(pendientes, 1):.0f} bytes por usuario); '
+          f'{descartados:,} de 1,000 usuarios nuevos descartados al pasar el límite')
+    # Vuelca lo pendiente a la base desechable (sus ids no existen: el UPDATE no toca filas).
+    activity_tracker.flush()
+
+
+if __name__ == '__main__':
+    main()
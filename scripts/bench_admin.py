@@ -0,0 +1,119 @@
+"""Borrado y desactivación masiva de usuarios: por objeto (delete-user) contra por lotes.
+
+Siembra N usuarios en una base desechable (un cuarto con correos de un dominio
+de spam), con perfiles de emprendedor e inversionista (con intereses) y
+mensajes entre ellos, y mide:
+    - el borrado por objeto del ORM, como 'flask delete-user', sobre una muestra,
+      extrapolado a todos los usuarios de spam,
+    - administracion.ejecutar('desactivar') y ('borrar') por lotes sobre el
+      dominio de spam, con ON DELETE CASCADE en la base de datos,
+y comprueba que no quedan perfiles, intereses ni participaciones huérfanos.
+
+Uso:
+    python scripts/bench_admin.py --url sqlite:////tmp/bench_admin.db --usuarios 400000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+HASH_FIJO = 'scrypt:32768:8:1$benchmark$' + '0' * 128
+
+
+def correo(i):
+    return f'spam{i}@spam.example' if i % 4 == 0 else f'usuario{i}@example.com'
+
+
+def sembrar(db, total, lote=50_000):
+    from models import (Usuario, Emprendedor, Inversionista, InversionistaEtapa, Conversacion,
+                        ParticipanteConversacion, Mensaje)
+    db.drop_all()
+    db.create_all()
+    for base in range(1, total + 1, lote):
+        ids = range(base, min(base + lote, total + 1))
+        db.session.execute(Usuario.__table__.insert(), [
+            {'id': i, 'email': correo(i), 'password_hash': HASH_FIJO,
+             'tipo_perfil': 'EMPRENDEDOR' if i % 2 else 'INVERSIONISTA', 'is_admin': False, 'activo': True}
+            for i in ids])
+        db.session.execute(Emprendedor.__table__.insert(), [
+            {'id': i, 'usuario_id': i, 'nombre_completo': f'Emprendedor {i}', 'tipo_documento': 'CC',
+             'numero_documento': f'E{i}', 'numero_celular': '3000000000', 'programa_formacion': 'x',
+             'titulo_proyecto': 'x', 'descripcion_proyecto': 'x', 'relacion_sector': 'x', 'tipo_apoyo': 'x'}
+            for i in ids if i % 2])
+        db.session.execute(Inversionista.__table__.insert(), [
+            {'id': i, 'usuario_id': i, 'nombre_completo': f'Inversionista {i}', 'tipo_documento': 'CC',
+             'numero_documento': f'I{i}', 'numero_celular': '3000000000', 'tipo_inversion': 'angel'}
+            for i in ids if i % 2 == 0])
+        db.session.execute(InversionistaEtapa.__table__.insert(), [
+            {'inversionista_id': i, 'etapa': etapa} for i in ids if i % 2 == 0 for etapa in ('idea', 'semilla')])
+        # Una conversación por cada par (i, i+1) con dos mensajes.
+        pares = [i for i in ids if i % 2 and i + 1 <= total]
+        db.session.execute(Conversacion.__table__.insert(), [{'id': i, 'clave': f'{i}:{i + 1}'} for i in pares])
+        db.session.execute(ParticipanteConversacion.__table__.insert(), [
+            {'conversacion_id': i, 'usuario_id': u} for i in pares for u in (i, i + 1)])
+        db.session.execute(Mensaje.__table__.insert(), [
+            {'conversacion_id': i, 'remitente_id': u, 'texto': 'hola'} for i in pares for u in (i, i + 1)])
+        db.session.commit()
+
+
+def huerfanos(db):
+    from sqlalchemy import text
+    consultas = {
+        'emprendedores': 'SELECT count(*) FROM emprendedores WHERE usuario_id NOT IN (SELECT id FROM usuarios)',
+        'inversionistas': 'SELECT count(*) FROM inversionistas WHERE usuario_id NOT IN (SELECT id FROM usuarios)',
+        'etapas': 'SELECT count(*) FROM inversionista_etapas WHERE inversionista_id NOT IN (SELECT id FROM inversionistas)',
+        'participantes': 'SELECT count(*) FROM participantes_conversacion WHERE usuario_id NOT IN (SELECT id FROM usuarios)',
+        'mensajes con remitente borrado': 'SELECT count(*) FROM mensajes WHERE remitente_id NOT IN (SELECT id FROM usuarios)',
+    }
+    return {nombre: db.session.execute(text(sql)).scalar() for nombre, sql in consultas.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='sqlite:////tmp/bench_admin.db', help='Base de datos desechable.')
+    parser.add_argument('--usuarios', type=int, default=400_000)
+    parser.add_argument('--muestra', type=int, default=300, help='Borrados por objeto para extrapolar.')
+    parser.add_argument('--lote', type=int, default=1000)
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = args.url
+    from play import create_app
+    from extensions import db
+    from models import Usuario
+    import administracion
+
+    app = create_app({'TELEMETRY_ENABLED': False})
+    with app.app_context():
+        inicio = time.perf_counter()
+        sembrar(db, args.usuarios)
+        print(f'{args.usuarios:,} usuarios sembrados en {time.perf_counter() - inicio:.1f} s\n')
+
+        where = administracion.condiciones(dominio='spam.example')
+        spam, _ = administracion.contar(where)
+
+        # Como delete-user: cargar el objeto y dejar que el ORM borre perfil e intereses uno a uno.
+        muestra = db.session.execute(db.select(Usuario.email).where(*where).limit(args.muestra)).scalars().all()
+        inicio = time.perf_counter()
+        for email in muestra:
+            usuario = db.session.execute(db.select(Usuario).filter_by(email=email)).scalar_one()
+            db.session.delete(usuario)
+            db.session.commit()
+        segundos = time.perf_counter() - inicio
+        print(f'Por objeto (delete-user): {len(muestra) / segundos:.0f} usuarios/s -> '
+              f'{(spam - len(muestra)) * segundos / len(muestra) / 60:.1f} min para los {spam - len(muestra):,} restantes')
+
+        pendientes, _ = administracion.contar(where)
+        for accion in ('desactivar', 'borrar'):
+            inicio = time.perf_counter()
+            afectados = administracion.ejecutar(accion, where, args.lote, progreso=lambda mensaje: None)
+            segundos = time.perf_counter() - inicio
+            print(f'Por lotes ({accion}): {afectados:,} de {pendientes:,} en {segundos:.1f} s '
+                  f'({afectados / segundos:.0f} usuarios/s)')
+
+        print(f'\nQuedan {administracion.contar(administracion.condiciones())[0]:,} usuarios. Huérfanos: {huerfanos(db)}')
+
+
+if __name__ == '__main__':
+    main()
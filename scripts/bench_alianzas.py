@@ -0,0 +1,186 @@
+"""Benchmark del índice de alianzas de la cadena de valor.
+
+Genera empresarios e instituciones sintéticos en memoria y mide:
+    - construcción del índice (agrupación por firma y orden de firmas por puntaje),
+    - latencia de las sugerencias (p50/p99), con y sin filtro de tipo,
+    - altas de alianzas y cambios de perfil incrementales,
+y compara contra puntuar todos los nodos en cada consulta sobre una muestra.
+Con --url además siembra una base desechable y mide la reconstrucción desde
+la base de datos (lo que hace 'flask rebuild-alliances').
+
+Uso:
+    python scripts/bench_alianzas.py --empresarios 90000 --instituciones 10000 --alianzas 200000
+    python scripts/bench_alianzas.py --url sqlite:////tmp/bench_alianzas.db
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+from alianzas import APOYOS, TIPOS, IndiceAlianzas, codificar_empresario, codificar_institucion, puntaje  # noqa: E402
+
+HASH_FIJO = 'scrypt:32768:8:1$benchmark$' + '0' * 128
+
+# Opciones de cada etapa en el formulario de registro de empresarios.
+ACTIVIDADES = {
+    'produccion': ['licencias_exploracion', 'exploracion_terrenos', 'perforacion', 'voladura', 'descapote',
+                   'remocion_materiales', 'proveedores_insumos', 'maquinaria_equipos', 'servicios_ingenieria',
+                   'instrumentos_control', 'servicios_seguridad', 'transportista', 'tics'],
+    'transformacion': ['extraccion', 'triturado', 'lavado', 'secado', 'clasificacion', 'centros_acopio',
+                       'cargue_descargue', 'puertos_vias', 'industrializacion', 'recuperacion_valores',
+                       'manejo_desechos', 'transportista', 'tics'],
+    'comercializacion': ['mercadeo_productos', 'servicio_laboratorio', 'minoristas', 'mayoristas', 'exportadores',
+                         'usos_finales', 'transportista', 'tics'],
+}
+AREAS = APOYOS[:3]
+PARTICIPACIONES = APOYOS[3:]
+
+
+def actividades():
+    # Cada etapa: sin actividad con probabilidad 1/2, si no una opción al azar.
+    return tuple(random.choice(opciones) if random.random() < 0.5 else 'ninguna' for opciones in ACTIVIDADES.values())
+
+
+def institucion():
+    return random.choice(AREAS), random.sample(PARTICIPACIONES, random.randint(0, len(PARTICIPACIONES)))
+
+
+def generar(n_emp, n_inst, n_alianzas):
+    empresarios = [(i, actividades()) for i in range(1, n_emp + 1)]
+    instituciones = [(n_emp + i, institucion()) for i in range(1, n_inst + 1)]
+    total = n_emp + n_inst
+    pares = set()
+    while len(pares) < n_alianzas:
+        a, b = random.randint(1, total), random.randint(1, total)
+        if a != b:
+            pares.add((min(a, b), max(a, b)))
+    return empresarios, instituciones, sorted(pares)
+
+
+def nodos(empresarios, instituciones):
+    return [(i, codificar_empresario(*act)) for i, act in empresarios] + \
+        [(i, codificar_institucion(area, part)) for i, (area, part) in instituciones]
+
+
+def cronometrar(etiqueta, fn, *args):
+    inicio = time.perf_counter()
+    resultado = fn(*args)
+    print(f'  {etiqueta:<45} {(time.perf_counter() - inicio) * 1000:10.1f} ms')
+    return resultado
+
+
+def percentiles(tiempos):
+    tiempos = sorted(tiempos)
+    return tiempos[len(tiempos) // 2] * 1000, tiempos[int(len(tiempos) * 0.99)] * 1000
+
+
+def sembrar(db, empresarios, instituciones, alianzas, lote=20_000):
+    from models import Usuario, Empresario, Institucion, InstitucionParticipacion, Alianza
+    db.drop_all()
+    db.create_all()
+    for base in range(0, len(empresarios), lote):
+        bloque = empresarios[base:base + lote]
+        db.session.execute(Usuario.__table__.insert(), [
+            {'id': i, 'email': f'empresa{i}@example.com', 'password_hash': HASH_FIJO, 'tipo_perfil': 'EMPRESARIO',
+             'is_admin': False, 'activo': True} for i, _ in bloque])
+        db.session.execute(Empresario.__table__.insert(), [
+            {'id': i, 'usuario_id': i, 'nombre_completo': f'Empresario {i}', 'tipo_documento_personal': 'CC',
+             'numero_documento_personal': f'E{i}', 'numero_celular': '3000000000', 'nombre_empresa': f'Empresa {i}',
+             'tipo_contribuyente': 'juridica', 'nit': f'N{i}', 'tamano': 'pequena', 'sector_produccion': p,
+             'sector_transformacion': t, 'sector_comercializacion': c} for i, (p, t, c) in bloque])
+    db.session.execute(Usuario.__table__.insert(), [
+        {'id': i, 'email': f'institucion{i}@example.com', 'password_hash': HASH_FIJO, 'tipo_perfil': 'INSTITUCION',
+         'is_admin': False, 'activo': True} for i, _ in instituciones])
+    db.session.execute(Institucion.__table__.insert(), [
+        {'id': i, 'usuario_id': i, 'nombre_completo': f'Institución {i}', 'nit': f'I{i}', 'tipo_institucion': 'publica',
+         'municipio': 'Tunja', 'descripcion': 'x', 'area_especializacion': area} for i, (area, _) in instituciones])
+    db.session.execute(InstitucionParticipacion.__table__.insert(), [
+        {'institucion_id': i, 'participacion': p} for i, (_, part) in instituciones for p in part])
+    for base in range(0, len(alianzas), lote):
+        db.session.execute(Alianza.__table__.insert(), [
+            {'usuario_menor_id': a, 'usuario_mayor_id': b, 'solicitante_id': a, 'estado': 'confirmada'}
+            for a, b in alianzas[base:base + lote]])
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--empresarios', type=int, default=90_000)
+    parser.add_argument('--instituciones', type=int, default=10_000)
+    parser.add_argument('--alianzas', type=int, default=200_000)
+    parser.add_argument('--top-k', type=int, default=20)
+    parser.add_argument('--consultas', type=int, default=20_000)
+    parser.add_argument('--actualizaciones', type=int, default=1000)
+    parser.add_argument('--url', help='Base de datos desechable para medir la reconstrucción desde la BD.')
+    args = parser.parse_args()
+    random.seed(42)
+
+    total = args.empresarios + args.instituciones
+    print(f'{args.empresarios:,} empresarios + {args.instituciones:,} instituciones, '
+          f'{args.alianzas:,} alianzas, top-{args.top_k}')
+    empresarios, instituciones, alianzas = generar(args.empresarios, args.instituciones, args.alianzas)
+    lista_nodos = cronometrar('codificación de los nodos', nodos, empresarios, instituciones)
+    indice = IndiceAlianzas(top_k=args.top_k)
+    cronometrar('construcción del índice', indice.cargar, lista_nodos, alianzas)
+    print(f"  firmas distintas: {indice.tamano()['firmas']}, "
+          f"pares de firmas puntuados: {sum(len(r) for r in indice._ranking.values()):,}")
+
+    ids = [random.randint(1, total) for _ in range(args.consultas)]
+    for etiqueta, filtro in (('sin filtro', None), ('tipo=instituciones', TIPOS['instituciones'])):
+        tiempos = []
+        for usuario_id in ids:
+            inicio = time.perf_counter()
+            indice.sugerencias(usuario_id, args.top_k, filtro)
+            tiempos.append(time.perf_counter() - inicio)
+        p50, p99 = percentiles(tiempos)
+        print(f'  {len(ids):,} sugerencias ({etiqueta}): p50 {p50:.3f} ms, p99 {p99:.3f} ms')
+
+    def proponer():
+        for _ in range(args.actualizaciones):
+            indice.set_arista(random.randint(1, total), random.randint(1, total))
+    cronometrar(f'{args.actualizaciones:,} alianzas nuevas', proponer)
+
+    def cambiar_perfiles():
+        for _ in range(args.actualizaciones):
+            indice.set_nodo(random.randint(1, args.empresarios), codificar_empresario(*actividades()))
+    indice.stats['firmas_nuevas'] = 0
+    cronometrar(f'{args.actualizaciones:,} cambios de perfil', cambiar_perfiles)
+    print(f"  firmas nuevas puntuadas: {indice.stats['firmas_nuevas']}")
+
+    # Referencia: puntuar todos los nodos en cada visita, sin el nodo ni sus aliados.
+    firmas = dict(indice._firmas)
+    muestra = random.sample(list(firmas), 50)
+
+    def ingenuo():
+        for usuario_id in muestra:
+            excluidos = indice.aliados(usuario_id) | {usuario_id}
+            propia = firmas[usuario_id]
+            puntajes = sorted((-p, otro) for otro, f in firmas.items()
+                              if otro not in excluidos and (p := puntaje(propia, f)) > 0)
+            esperado = [-p for p, _ in puntajes[:args.top_k]]
+            obtenido = [p for _, p in indice.sugerencias(usuario_id, args.top_k)]
+            assert esperado == obtenido, f'Diferencia en el nodo {usuario_id}'
+    inicio = time.perf_counter()
+    ingenuo()
+    por_nodo = (time.perf_counter() - inicio) / len(muestra)
+    print(f'  todos los nodos por visita (verificado en {len(muestra)} nodos): {por_nodo * 1000:.1f} ms por consulta')
+
+    if args.url:
+        os.environ['DATABASE_URL'] = args.url
+        from play import create_app
+        from extensions import db
+        import alianzas as modulo
+
+        app = create_app({'TELEMETRY_ENABLED': False})
+        with app.app_context():
+            inicio = time.perf_counter()
+            sembrar(db, empresarios, instituciones, alianzas)
+            print(f'\n{total:,} nodos sembrados en {time.perf_counter() - inicio:.1f} s')
+            cronometrar('reconstrucción desde la base de datos', modulo.construir_desde_bd)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,169 @@
+"""Benchmark y comprobación de las estadísticas del panel (estadisticas.py).
+
+Siembra una base desechable con usuarios de los cuatro perfiles registrados a lo
+largo de dos años, reconstruye las estadísticas (lo que hace 'flask
+rebuild-stats') y mide:
+    - el panel leyendo las tablas de estadísticas contra los GROUP BY sobre
+      usuarios y perfiles que haría sin ellas,
+    - el coste añadido a un registro (registro.registrar) y a los borrados por
+      lotes (administracion.ejecutar) y 'flask delete-user',
+    - una importación por lotes (importacion.insertar_lote),
+y después de cada paso comprueba con estadisticas.verificar() que los conteos
+mantenidos coinciden con los reales.
+
+Uso:
+    python scripts/bench_estadisticas.py --url sqlite:////tmp/bench_estadisticas.db --usuarios 200000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+HASH_FIJO = 'scrypt:32768:8:1$benchmark$' + '0' * 128
+
+MUNICIPIOS = ['Tunja', 'Duitama', 'Sogamoso', 'Paipa', 'Chiquinquirá', 'Nobsa', 'Samacá', 'Socha', 'Tasco',
+              'Paz de Río', 'Cucunubá', 'Guachetá', 'Lenguazaque', 'Sutatausa', 'Ubaté', 'Muzo', 'Otanche']
+TAMANOS = ['micro', 'pequena', 'mediana', 'grande']
+TIPOS_INVERSION = ['capital_semilla', 'angel', 'capital_riesgo', 'deuda', 'donacion']
+
+
+def perfil(tipo_perfil, n):
+    from models import TipoPerfil
+    if tipo_perfil == TipoPerfil.EMPRENDEDOR:
+        return {'nombre_completo': f'Emprendedor {n}', 'tipo_documento': 'CC', 'numero_documento': f'E{n}',
+                'numero_celular': '3000000000', 'programa_formacion': 'Minería', 'titulo_proyecto': 'Proyecto',
+                'descripcion_proyecto': 'x', 'relacion_sector': 'x', 'tipo_apoyo': 'financiero'}
+    if tipo_perfil == TipoPerfil.EMPRESARIO:
+        return {'nombre_completo': f'Empresario {n}', 'tipo_documento_personal': 'CC',
+                'numero_documento_personal': f'P{n}', 'numero_celular': '3000000000', 'nombre_empresa': f'Empresa {n}',
+                'tipo_contribuyente': 'juridica', 'nit': f'N{n}', 'tamano': random.choice(TAMANOS),
+                'sector_produccion': 'carbon', 'sector_transformacion': 'ninguna', 'sector_comercializacion': 'ninguna'}
+    if tipo_perfil == TipoPerfil.INVERSIONISTA:
+        return {'nombre_completo': f'Inversionista {n}', 'tipo_documento': 'CC', 'numero_documento': f'I{n}',
+                'numero_celular': '3000000000', 'tipo_inversion': random.choice(TIPOS_INVERSION)}
+    return {'nombre_completo': f'Institución {n}', 'nit': f'T{n}', 'tipo_institucion': 'universidad',
+            'municipio': random.choice(MUNICIPIOS), 'descripcion': 'x', 'area_especializacion': 'mineria'}
+
+
+def sembrar(db, usuarios):
+    from models import Usuario, TipoPerfil, Emprendedor, Empresario, Inversionista, Institucion
+    modelos = {TipoPerfil.EMPRENDEDOR: Emprendedor, TipoPerfil.EMPRESARIO: Empresario,
+               TipoPerfil.INVERSIONISTA: Inversionista, TipoPerfil.INSTITUCION: Institucion}
+    db.drop_all()
+    db.create_all()
+    inicio = datetime.utcnow() - timedelta(days=730)
+    for base in range(1, usuarios + 1, 20_000):
+        ids = range(base, min(base + 20_000, usuarios + 1))
+        tipos = {i: random.choice(list(modelos)) for i in ids}
+        db.session.execute(Usuario.__table__.insert(), [
+            {'id': i, 'email': f'usuario{i}@example.com', 'password_hash': HASH_FIJO, 'tipo_perfil': tipos[i],
+             'is_admin': False, 'activo': True,
+             'fecha_registro': inicio + timedelta(seconds=random.randint(0, 730 * 86400))} for i in ids])
+        for tipo_perfil, modelo in modelos.items():
+            db.session.execute(modelo.__table__.insert(), [
+                dict(perfil(tipo_perfil, i), usuario_id=i) for i in ids if tipos[i] == tipo_perfil])
+    db.session.commit()
+
+
+def medir(etiqueta, fn, repeticiones=20):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = fn()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    print(f'  {etiqueta:<55} p50 {statistics.median(tiempos):8.2f} ms   máx {max(tiempos):8.2f} ms')
+    return resultado
+
+
+def comprobar(estadisticas, paso):
+    diferencias = estadisticas.verificar()
+    print(f"  {'✅' if not diferencias else '❌'} {paso}: "
+          f"{'coinciden con los conteos reales' if not diferencias else f'{len(diferencias)} diferencias'}")
+    assert not diferencias, diferencias[:10]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='sqlite:////tmp/bench_estadisticas.db', help='Base de datos desechable.')
+    parser.add_argument('--usuarios', type=int, default=200_000)
+    parser.add_argument('--registros', type=int, default=200, help='Altas con registro.registrar().')
+    parser.add_argument('--borrados', type=int, default=5_000, help='Usuarios borrados con administracion.ejecutar().')
+    args = parser.parse_args()
+    random.seed(42)
+
+    os.environ['DATABASE_URL'] = args.url
+    from play import create_app
+    from extensions import db
+    from sqlalchemy import func, select
+    from models import Usuario, TipoPerfil, Emprendedor, Empresario, Inversionista, Institucion
+    import administracion
+    import estadisticas
+    import importacion
+    from registro import registrar
+
+    # Hash barato y sin pool de procesos: se mide lo que añaden las estadísticas, no el hash.
+    app = create_app({'TELEMETRY_ENABLED': False, 'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1',
+                      'PASSWORD_HASH_WORKERS': 0, 'REGISTRO_BLOOM_ENABLED': False})
+    with app.app_context():
+        inicio = time.perf_counter()
+        sembrar(db, args.usuarios)
+        print(f'{args.usuarios:,} usuarios sembrados en {time.perf_counter() - inicio:.1f} s')
+        inicio = time.perf_counter()
+        contados = estadisticas.reconstruir()
+        db.session.commit()
+        print(f'flask rebuild-stats: {time.perf_counter() - inicio:.2f} s ({contados[0]:,} usuarios, {contados[1]:,} perfiles)\n')
+
+        print('Panel (registros de los últimos 90 días y perfiles por campo):')
+        desde = datetime.utcnow().date() - timedelta(days=89)
+        medir('tablas de estadísticas', lambda: estadisticas.resumen(desde))
+
+        def agrupar():
+            dia = func.date(Usuario.fecha_registro)
+            registros = db.session.execute(
+                select(dia, Usuario.tipo_perfil, func.count())
+                .where(Usuario.fecha_registro >= datetime.combine(desde, datetime.min.time()))
+                .group_by(dia, Usuario.tipo_perfil)).all()
+            return registros, [db.session.execute(select(c, func.count()).group_by(c)).all()
+                               for c in (Institucion.municipio, Inversionista.tipo_inversion, Empresario.tamano)]
+        medir('GROUP BY sobre usuarios y perfiles', agrupar, repeticiones=5)
+        comprobar(estadisticas, 'tras la reconstrucción')
+
+        print('\nEscrituras:')
+        tiempos = []
+        siguiente = args.usuarios + 1
+        modelos = {TipoPerfil.EMPRENDEDOR: Emprendedor, TipoPerfil.EMPRESARIO: Empresario,
+                   TipoPerfil.INVERSIONISTA: Inversionista, TipoPerfil.INSTITUCION: Institucion}
+        for n in range(args.registros):
+            tipo_perfil, modelo = random.choice(list(modelos.items()))
+            objeto = modelo(**perfil(tipo_perfil, siguiente + n))
+            inicio = time.perf_counter()
+            registrar(tipo_perfil, f'nuevo{n}@example.com', 'Clave-segura-1', objeto)
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        print(f'  {args.registros} altas con registro.registrar(){"":<26} p50 {statistics.median(tiempos):8.2f} ms')
+        comprobar(estadisticas, 'tras las altas')
+
+        inicio = time.perf_counter()
+        administracion.ejecutar('borrar', [Usuario.id <= args.borrados], progreso=lambda mensaje: None)
+        print(f'  {args.borrados:,} usuarios borrados por lotes de 1000 en {time.perf_counter() - inicio:.2f} s')
+        comprobar(estadisticas, 'tras los borrados por lotes')
+
+        resultado = app.test_cli_runner().invoke(args=['delete-user', 'nuevo0@example.com'])
+        print(f'  {resultado.output.strip()}')
+        comprobar(estadisticas, 'tras flask delete-user')
+
+        filas = [{'usuario': {'email': f'importado{n}@example.com'}, 'hash': HASH_FIJO,
+                  'perfil': perfil(TipoPerfil.EMPRESARIO, f'importado{n}')} for n in range(1000)]
+        inicio = time.perf_counter()
+        importacion.insertar_lote(TipoPerfil.EMPRESARIO, filas)
+        db.session.commit()
+        print(f'  lote de 1000 empresarios importados en {(time.perf_counter() - inicio) * 1000:.1f} ms')
+        comprobar(estadisticas, 'tras la importación')
+
+
+if __name__ == '__main__':
+    main()
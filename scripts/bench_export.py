@@ -0,0 +1,143 @@
+"""Memoria y tiempo de la exportación de usuarios y perfiles (flask export-profiles).
+
+Siembra N usuarios (emprendedores, empresarios e inversionistas con intereses)
+en una base desechable y mide, cada caso en un proceso nuevo para que el pico de
+memoria (ru_maxrss) sea solo suyo:
+    orm            Usuario.select_con_perfil() con .all() y un CSV escrito a
+                   partir de los objetos (lo que se haría sin streaming),
+    csv / jsonl    exportacion.Exportacion sobre un cursor con yield_per,
+    parquet        ídem, si está instalado pyarrow,
+    http           /admin/export/perfiles consumido en trozos por el cliente de pruebas.
+Con --filas distintas se ve que la memoria del streaming no crece con la tabla.
+
+Uso:
+    python scripts/bench_export.py --url sqlite:////tmp/bench_export.db --filas 1000000
+"""
+import argparse
+import csv
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+HASH_FIJO = 'scrypt:32768:8:1$benchmark$' + '0' * 128
+TIPOS = ('EMPRENDEDOR', 'EMPRESARIO', 'INVERSIONISTA')
+
+
+def sembrar(db, total, lote=50_000):
+    from models import Usuario, Emprendedor, Empresario, Inversionista, InversionistaEtapa, InversionistaArea
+    db.drop_all()
+    db.create_all()
+    for base in range(1, total + 1, lote):
+        ids = range(base, min(base + lote, total + 1))
+        db.session.execute(Usuario.__table__.insert(), [
+            {'id': i, 'email': f'usuario{i}@example.com', 'password_hash': HASH_FIJO, 'tipo_perfil': TIPOS[i % 3],
+             'is_admin': i == 1, 'activo': True} for i in ids])
+        db.session.execute(Emprendedor.__table__.insert(), [
+            {'id': i, 'usuario_id': i, 'nombre_completo': f'Emprendedor {i}', 'tipo_documento': 'CC',
+             'numero_documento': f'E{i}', 'numero_celular': '3000000000', 'programa_formacion': 'Tecnología',
+             'titulo_proyecto': f'Proyecto {i}', 'descripcion_proyecto': 'Plataforma de comercialización de café',
+             'relacion_sector': 'Agroindustria', 'tipo_apoyo': 'Capital'} for i in ids if i % 3 == 0])
+        db.session.execute(Empresario.__table__.insert(), [
+            {'id': i, 'usuario_id': i, 'nombre_completo': f'Empresario {i}', 'tipo_documento_personal': 'CC',
+             'numero_documento_personal': f'P{i}', 'numero_celular': '3000000000', 'nombre_empresa': f'Empresa {i}',
+             'tipo_contribuyente': 'juridica', 'nit': f'N{i}', 'tamano': 'pequena', 'sector_produccion': 'x',
+             'sector_transformacion': 'x', 'sector_comercializacion': 'x'} for i in ids if i % 3 == 1])
+        inversionistas = [i for i in ids if i % 3 == 2]
+        db.session.execute(Inversionista.__table__.insert(), [
+            {'id': i, 'usuario_id': i, 'nombre_completo': f'Inversionista {i}', 'tipo_documento': 'CC',
+             'numero_documento': f'I{i}', 'numero_celular': '3000000000', 'tipo_inversion': 'angel'}
+            for i in inversionistas])
+        db.session.execute(InversionistaEtapa.__table__.insert(), [
+            {'inversionista_id': i, 'etapa': etapa} for i in inversionistas for etapa in ('idea', 'semilla')])
+        db.session.execute(InversionistaArea.__table__.insert(), [
+            {'inversionista_id': i, 'area': 'agro'} for i in inversionistas])
+        db.session.commit()
+
+
+def medir(caso, lote):
+    """Ejecuta un caso en este proceso e imprime JSON con filas, bytes, segundos y pico de memoria."""
+    from play import create_app
+    from extensions import db
+    from models import Usuario
+    import exportacion
+
+    app = create_app({'RATELIMIT_ENABLED': False, 'TELEMETRY_ENABLED': False, 'EXPORT_BATCH_SIZE': lote})
+    base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    inicio = time.perf_counter()
+    filas = tamano = 0
+    with app.app_context():
+        if caso == 'orm':
+            usuarios = db.session.execute(Usuario.select_con_perfil()).unique().scalars().all()
+            with open(os.devnull, 'w', newline='') as archivo:
+                escritor = csv.writer(archivo)
+                for usuario in usuarios:
+                    perfil = usuario.get_perfil()
+                    datos = {c.key: getattr(perfil, c.key) for c in type(perfil).__table__.columns} if perfil else {}
+                    escritor.writerow([usuario.id, usuario.email, usuario.tipo_perfil.value, *datos.values()])
+                    filas += 1
+        elif caso == 'http':
+            cliente = app.test_client()
+            with cliente.session_transaction() as sesion:
+                sesion['user_id'] = 1  # Administrador sembrado.
+            respuesta = cliente.get('/admin/export/perfiles?formato=csv', buffered=False)
+            for trozo in respuesta.response:
+                tamano += len(trozo)
+            respuesta.close()
+            filas = -1  # El cliente no cuenta filas; el tamaño basta para comparar.
+        else:
+            exportar = exportacion.Exportacion(caso, lote=lote)
+            for trozo in exportar.generar():
+                tamano += len(trozo)
+            filas = exportar.filas
+    print(json.dumps({'filas': filas, 'bytes': tamano, 'segundos': time.perf_counter() - inicio,
+                      'pico_mib': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+                      'base_mib': base / 1024}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='sqlite:////tmp/bench_export.db', help='Base de datos desechable.')
+    parser.add_argument('--filas', type=int, default=1_000_000)
+    parser.add_argument('--lote', type=int, default=1000, help='EXPORT_BATCH_SIZE.')
+    parser.add_argument('--casos', default='orm,csv,jsonl,parquet,http')
+    parser.add_argument('--sin-sembrar', action='store_true', help='Reutiliza la base de una ejecución anterior.')
+    parser.add_argument('--medir', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    os.environ['DATABASE_URL'] = args.url
+
+    if args.medir:
+        medir(args.medir, args.lote)
+        return
+
+    if not args.sin_sembrar:
+        from play import create_app
+        from extensions import db
+        app = create_app({'TELEMETRY_ENABLED': False})
+        with app.app_context():
+            inicio = time.perf_counter()
+            sembrar(db, args.filas)
+            print(f'{args.filas:,} usuarios sembrados en {time.perf_counter() - inicio:.1f} s')
+
+    import exportacion
+    print(f'{args.filas:,} usuarios, particiones de {args.lote} filas\n')
+    for caso in args.casos.split(','):
+        if caso == 'parquet' and exportacion.pyarrow is None:
+            print(f'  {caso:<8} (sin pyarrow instalado)')
+            continue
+        salida = subprocess.run([sys.executable, __file__, '--url', args.url, '--lote', str(args.lote), '--medir', caso],
+                                capture_output=True, text=True)
+        if salida.returncode:
+            print(f'  {caso:<8} falló:\n{salida.stderr[-2000:]}')
+            continue
+        r = json.loads(salida.stdout.strip().splitlines()[-1])
+        print(f"  {caso:<8} {r['segundos']:6.1f} s  pico {r['pico_mib']:7.1f} MiB "
+              f"(tras arrancar la app {r['base_mib']:.1f} MiB)  {r['bytes'] / 2**20:8.1f} MiB generados")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,192 @@
+"""Benchmark del foro: caminos materializados, contadores y paginación por cursor.
+
+Siembra una base desechable con muchos temas, un tema grande con N respuestas
+anidadas al azar (más de 10k) y reacciones, y mide con las funciones de foro.py:
+    - el listado de temas con los contadores guardados contra COUNT(*) al
+      mostrarlo, y una página profunda por cursor contra OFFSET,
+    - la primera página del tema grande, una página intermedia por cursor y el
+      tema entero en una consulta,
+    - el subárbol de la respuesta con más descendientes por rango de la ruta,
+      contra recorrerlo por padre_id (una consulta por nodo) y con un CTE recursivo,
+    - publicar respuestas profundas y poner/quitar reacciones,
+y comprueba que los contadores incrementales coinciden con 'flask recount-forum'.
+
+Uso:
+    python scripts/bench_foro.py --url sqlite:////tmp/bench_foro.db --respuestas 20000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+HASH_FIJO = 'scrypt:32768:8:1$benchmark$' + '0' * 128
+
+
+def arbol(tema_id, total, primer_id, max_profundidad, enlazar=0.8):
+    """Filas de respuestas al azar: cada una cuelga de una anterior con probabilidad 'enlazar'."""
+    from foro import segmento
+    filas = []
+    for n in range(total):
+        respuesta_id = primer_id + n
+        padre = random.choice(filas[max(0, n - 2000):]) if filas and random.random() < enlazar else None
+        if padre is not None and padre['profundidad'] + 1 >= max_profundidad:
+            padre = filas[padre['padre_id'] - primer_id] if padre['padre_id'] else None
+        filas.append({
+            'id': respuesta_id, 'tema_id': tema_id, 'padre_id': padre['id'] if padre else None,
+            'autor_id': random.randint(1, 1000), 'texto': f'Respuesta {respuesta_id}',
+            'ruta': (padre['ruta'] if padre else '') + segmento(respuesta_id),
+            'profundidad': padre['profundidad'] + 1 if padre else 0,
+            'fecha': datetime.utcnow(), 'descendientes': 0, 'reacciones': 0,
+        })
+        # Contador de descendientes, como lo mantiene foro.responder().
+        while padre is not None:
+            padre['descendientes'] += 1
+            padre = filas[padre['padre_id'] - primer_id] if padre['padre_id'] else None
+    return filas
+
+
+def sembrar(db, args):
+    from foro import CATEGORIAS
+    from models import Usuario, Tema, Respuesta, ReaccionRespuesta
+    db.drop_all()
+    db.create_all()
+    db.session.execute(Usuario.__table__.insert(), [
+        {'id': i, 'email': f'usuario{i}@example.com', 'password_hash': HASH_FIJO, 'tipo_perfil': 'EMPRESARIO',
+         'is_admin': False, 'activo': True} for i in range(1, 1001)])
+    # Temas pequeños con algunas respuestas cada uno; el grande es el más reciente.
+    grande = args.temas
+    respuestas = []
+    siguiente_id = 1
+    for tema_id in range(args.temas - 200, args.temas):
+        respuestas += arbol(tema_id, 50, siguiente_id, args.max_profundidad)
+        siguiente_id += 50
+    respuestas += arbol(grande, args.respuestas, siguiente_id, args.max_profundidad)
+    por_tema = {}
+    for r in respuestas:
+        por_tema[r['tema_id']] = por_tema.get(r['tema_id'], 0) + 1
+    db.session.execute(Tema.__table__.insert(), [
+        {'id': t, 'autor_id': random.randint(1, 1000), 'titulo': f'Tema {t}', 'categoria': random.choice(CATEGORIAS),
+         'contenido': 'x', 'fecha_creacion': datetime.utcnow(), 'respuestas': por_tema.get(t, 0), 'reacciones': 0}
+        for t in range(1, args.temas + 1)])
+    reacciones = {(random.choice(respuestas)['id'], random.randint(1, 1000)) for _ in range(args.reacciones)}
+    for respuesta_id, _ in reacciones:
+        respuestas[respuesta_id - 1]['reacciones'] += 1
+    for base in range(0, len(respuestas), 20_000):
+        db.session.execute(Respuesta.__table__.insert(), respuestas[base:base + 20_000])
+    db.session.execute(ReaccionRespuesta.__table__.insert(), [
+        {'respuesta_id': r, 'usuario_id': u, 'tipo': 'me_gusta'} for r, u in reacciones])
+    db.session.commit()
+    return grande
+
+
+def medir(etiqueta, fn, repeticiones=20):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = fn()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    print(f'  {etiqueta:<55} p50 {statistics.median(tiempos):8.2f} ms   máx {max(tiempos):8.2f} ms')
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='sqlite:////tmp/bench_foro.db', help='Base de datos desechable.')
+    parser.add_argument('--temas', type=int, default=100_000)
+    parser.add_argument('--respuestas', type=int, default=20_000, help='Respuestas del tema grande.')
+    parser.add_argument('--reacciones', type=int, default=50_000)
+    parser.add_argument('--max-profundidad', type=int, default=20)
+    parser.add_argument('--escrituras', type=int, default=200)
+    args = parser.parse_args()
+    random.seed(42)
+
+    os.environ['DATABASE_URL'] = args.url
+    from play import create_app
+    from extensions import db
+    from sqlalchemy import func, select, text
+    from models import Respuesta, Tema
+    import foro
+
+    app = create_app({'TELEMETRY_ENABLED': False})
+    with app.app_context():
+        inicio = time.perf_counter()
+        grande = sembrar(db, args)
+        print(f'{args.temas:,} temas y {args.respuestas:,} respuestas en el tema grande, '
+              f'sembrados en {time.perf_counter() - inicio:.1f} s\n')
+
+        print('Listado de temas (30 por página):')
+        temas, _ = medir('contadores guardados', lambda: foro.temas_pagina(limite=30))
+
+        def contar_al_mostrar():
+            filas, cursor = foro.temas_pagina(limite=30)
+            return dict(db.session.execute(
+                select(Respuesta.tema_id, func.count()).where(Respuesta.tema_id.in_([t.id for t in filas]))
+                .group_by(Respuesta.tema_id)).all())
+        conteos = medir('COUNT(*) de respuestas al mostrar', contar_al_mostrar)
+        assert all(conteos.get(t.id, 0) == t.respuestas for t in temas)
+        antes = args.temas - 30 * 2000
+        medir('página 2000 por cursor (?antes=)', lambda: foro.temas_pagina(antes=antes, limite=30))
+        medir('página 2000 con OFFSET', lambda: db.session.execute(
+            select(Tema).order_by(Tema.id.desc()).offset(30 * 2000).limit(30)).scalars().all())
+
+        print(f'\nTema grande ({args.respuestas:,} respuestas):')
+        primera, cursor = medir('primera página (100 respuestas)', lambda: foro.respuestas_pagina(grande, limite=100))
+        mitad = db.session.execute(select(Respuesta.ruta).where(Respuesta.tema_id == grande)
+                                   .order_by(Respuesta.ruta).offset(args.respuestas // 2).limit(1)).scalar()
+        medir('página intermedia por cursor (?despues=)', lambda: foro.respuestas_pagina(grande, despues=mitad, limite=100))
+        todas, _ = medir('tema entero en una consulta',
+                         lambda: foro.respuestas_pagina(grande, limite=args.respuestas), repeticiones=5)
+        db.session.expunge_all()
+
+        raiz = db.session.execute(select(Respuesta).where(Respuesta.tema_id == grande)
+                                  .order_by(Respuesta.descendientes.desc()).limit(1)).scalar_one()
+        subarbol, _ = medir(f'subárbol de {raiz.descendientes:,} respuestas por rango de ruta',
+                            lambda: foro.respuestas_pagina(grande, raiz.ruta, limite=args.respuestas), repeticiones=5)
+        assert len(subarbol) == raiz.descendientes + 1
+
+        def por_padre():
+            pendientes, vistos = [raiz.id], 0
+            while pendientes:
+                hijos = db.session.execute(select(Respuesta.id).where(Respuesta.padre_id == pendientes.pop())).scalars().all()
+                pendientes += hijos
+                vistos += 1
+            return vistos
+        assert medir('el mismo subárbol por padre_id (una consulta por nodo)', por_padre, repeticiones=3) == len(subarbol)
+        cte = text('WITH RECURSIVE sub(id) AS (SELECT :raiz UNION ALL '
+                   'SELECT r.id FROM respuestas r JOIN sub ON r.padre_id = sub.id) '
+                   'SELECT respuestas.* FROM respuestas JOIN sub ON respuestas.id = sub.id ORDER BY respuestas.ruta')
+        assert len(medir('el mismo subárbol con CTE recursivo',
+                         lambda: db.session.execute(select(Respuesta).from_statement(cte), {'raiz': raiz.id}).scalars().all(), repeticiones=5)) == len(subarbol)
+
+        print('\nEscrituras:')
+        profundas = [r for r in todas if r.profundidad >= 10][:args.escrituras]
+        tiempos = []
+        for padre in profundas:
+            inicio = time.perf_counter()
+            foro.responder(grande, 1, 'Respuesta profunda', db.session.get(Respuesta, padre.id), args.max_profundidad)
+            db.session.commit()
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        print(f'  {len(tiempos)} respuestas de profundidad >= 10{"":<23} p50 {statistics.median(tiempos):8.2f} ms')
+        tiempos = []
+        for i in range(args.escrituras):
+            inicio = time.perf_counter()
+            foro.reaccionar('respuesta', primera[i % len(primera)].id, 2, 'util', activa=i % 2 == 0)
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        print(f'  {len(tiempos)} reacciones puestas y quitadas{"":<25} p50 {statistics.median(tiempos):8.2f} ms')
+
+        contadores = lambda: (db.session.execute(select(Tema.id, Tema.respuestas, Tema.reacciones)).all(),
+                              db.session.execute(select(Respuesta.id, Respuesta.descendientes, Respuesta.reacciones)).all())
+        incrementales = contadores()
+        inicio = time.perf_counter()
+        foro.recontar()
+        print(f'\nflask recount-forum: {time.perf_counter() - inicio:.1f} s; '
+              f"contadores incrementales {'iguales' if contadores() == incrementales else 'DISTINTOS'} al recuento")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""Micro-benchmark del hash de contraseñas.
+
+Para cada método muestra los hashes por segundo en un solo núcleo (en línea) y
+con el pool de procesos, y el rendimiento por núcleo del pool.
+
+Uso:
+    python scripts/bench_hashing.py
+    python scripts/bench_hashing.py --methods scrypt:16384:8:1 pbkdf2:sha256:600000 --n 64
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from hashing import PasswordHasher  # noqa: E402
+
+DEFAULT_METHODS = [
+    'scrypt:16384:8:1',
+    'scrypt:32768:8:1',
+    'scrypt:65536:8:1',
+    'pbkdf2:sha256:600000',
+    'pbkdf2:sha256:1000000',
+]
+
+
+def medir(hasher, n):
+    passwords = [f'contrasena-{i}' for i in range(n)]
+    inicio = time.perf_counter()
+    hasher.hash_many(passwords)
+    return n / (time.perf_counter() - inicio)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--methods', nargs='+', default=DEFAULT_METHODS)
+    parser.add_argument('--n', type=int, default=32, help='Hashes por medición.')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    print(f'{"método":<24} {"1 núcleo h/s":>14} {"pool h/s":>10} {"h/s por núcleo":>16} {"ms por hash":>12}')
+    for method in args.methods:
+        hasher = PasswordHasher()
+        hasher.configure(method, 0)
+        en_linea = medir(hasher, max(4, args.n // 4))
+
+        hasher.configure(method, args.workers)
+        hasher.hash('calentamiento')  # Arranca el pool fuera de la medición.
+        pool = medir(hasher, args.n)
+        hasher.shutdown()
+
+        print(f'{method:<24} {en_linea:>14.1f} {pool:>10.1f} {pool / args.workers:>16.1f} {1000 / en_linea:>12.1f}')
+
+
+if __name__ == '__main__':
+    main()
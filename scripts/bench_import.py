@@ -0,0 +1,113 @@
+"""Importación masiva de perfiles (flask import-profiles) contra el alta fila a fila.
+
+Genera un CSV de N emprendedores (con un 1 % de filas inválidas y otro 1 % de
+correos repetidos) en una base desechable y mide:
+    - el alta fila a fila con registro.registrar() (como los formularios) sobre
+      una muestra, extrapolada a N,
+    - importacion.importar() del archivo completo: filas/s, tiempo en hashes y
+      filas rechazadas,
+y muestra el costo de un hash con el método configurado, que acota el import
+cuando las filas traen contraseña: N hashes / (procesos del pool) por hash.
+
+Uso:
+    python scripts/bench_import.py --url sqlite:////tmp/bench_import.db --filas 100000
+    python scripts/bench_import.py --filas 100000 --con-contrasena 0.1 --workers 8
+"""
+import argparse
+import csv
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+COLUMNAS = ['correo', 'contrasena', 'nombre_completo', 'tipo_documento', 'numero_documento', 'numero_celular',
+            'programa_formacion', 'titulo_proyecto', 'descripcion_proyecto', 'relacion_sector', 'tipo_apoyo']
+
+
+def fila(i, contrasena):
+    return [f'importado{i}@example.com', contrasena, f'Emprendedor {i}', 'CC', f'{1_000_000_000 + i}', '3000000000',
+            'Tecnología', f'Proyecto {i}', 'Plataforma de comercialización de café especial', 'Agroindustria', 'Capital']
+
+
+def generar(ruta, filas, fraccion_contrasena, semilla=1):
+    rng = random.Random(semilla)
+    with open(ruta, 'w', encoding='utf-8', newline='') as archivo:
+        escritor = csv.writer(archivo)
+        escritor.writerow(COLUMNAS)
+        for i in range(filas):
+            valores = fila(i, 'Contrasena-Importada-1' if rng.random() < fraccion_contrasena else '')
+            suerte = rng.random()
+            if suerte < 0.01:
+                valores[0] = 'sin-arroba'  # Correo no válido
+            elif suerte < 0.02 and i:
+                valores[0] = f'importado{rng.randrange(i)}@example.com'  # Repetido
+            escritor.writerow(valores)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='sqlite:////tmp/bench_import.db', help='Base de datos desechable.')
+    parser.add_argument('--filas', type=int, default=100_000)
+    parser.add_argument('--muestra', type=int, default=200, help='Altas fila a fila para extrapolar.')
+    parser.add_argument('--con-contrasena', type=float, default=0.0,
+                        help='Fracción de filas con contraseña (el resto recibe un hash inutilizable).')
+    parser.add_argument('--lote', type=int, default=1000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Procesos del pool de hashing.')
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = args.url
+    from play import create_app
+    from extensions import db
+    from hashing import password_hasher
+    from models import Emprendedor, TipoPerfil
+    import importacion
+    import registro
+
+    app = create_app({'RATELIMIT_ENABLED': False, 'TELEMETRY_ENABLED': False, 'REGISTRO_BLOOM_ENABLED': False,
+                      'PASSWORD_HASH_WORKERS': args.workers})
+    ruta = '/tmp/bench_import.csv'
+    generar(ruta, args.filas, args.con_contrasena)
+    print(f'{args.filas:,} filas en {ruta} ({100 * args.con_contrasena:.0f} % con contraseña), '
+          f'{args.workers} procesos de hashing, {os.cpu_count()} CPU\n')
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+        password_hasher.hash('x')  # Arranca el pool fuera de la medición.
+        inicio = time.perf_counter()
+        password_hasher.hash('x')
+        por_hash = time.perf_counter() - inicio
+        print(f'Un hash {password_hasher.method}: {por_hash * 1000:.0f} ms')
+
+        # Fila a fila, como los formularios (cada alta con su hash y su commit).
+        inicio = time.perf_counter()
+        for i in range(args.muestra):
+            valores = dict(zip(COLUMNAS, fila(10_000_000 + i, 'Contrasena-1')))
+            perfil = Emprendedor(**{k: v for k, v in valores.items() if k not in ('correo', 'contrasena')})
+            registro.registrar(TipoPerfil.EMPRENDEDOR, valores['correo'], valores['contrasena'], perfil)
+        segundos = time.perf_counter() - inicio
+        print(f'Alta fila a fila (registrar): {args.muestra / segundos:.0f} filas/s -> '
+              f'{args.filas * segundos / args.muestra / 60:.1f} min para {args.filas:,}')
+
+        inicio = time.perf_counter()
+        resultado = importacion.importar(ruta, TipoPerfil.EMPRENDEDOR, lote=args.lote, reanudar=False,
+                                         progreso=lambda mensaje: None)
+        segundos = time.perf_counter() - inicio
+        print(f'import-profiles: {resultado.importadas:,} importadas, {resultado.rechazadas:,} rechazadas '
+              f'en {segundos:.1f} s ({resultado.procesadas / segundos:.0f} filas/s; '
+              f'hashes {resultado.segundos_hash:.1f} s, resto {segundos - resultado.segundos_hash:.1f} s)')
+        con_contrasena = resultado.importadas - resultado.sin_contrasena
+        if con_contrasena:
+            print(f'  {con_contrasena:,} hashes: {resultado.segundos_hash / con_contrasena * 1000:.1f} ms cada uno '
+                  f'con {args.workers} procesos')
+        estimado = args.filas * por_hash / max(args.workers, 1)
+        print(f'  con todas las filas con contraseña los hashes tomarían ~{estimado / 60:.1f} min '
+              f'con {args.workers} procesos')
+    password_hasher.shutdown()
+
+
+if __name__ == '__main__':
+    main()
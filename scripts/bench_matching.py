@@ -0,0 +1,101 @@
+"""Benchmark del emparejamiento emprendedor-inversionista.
+
+Genera perfiles sintéticos en memoria (sin base de datos) y mide:
+    - construcción del índice,
+    - cálculo del top-K de todos los emprendedores,
+    - consultas de top-K con la caché caliente,
+    - actualizaciones incrementales de inversionistas y sus invalidaciones,
+y compara contra el cálculo ingenuo par a par sobre una muestra.
+
+Uso:
+    python scripts/bench_matching.py --emprendedores 10000 --inversionistas 50000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+from matching import (  # noqa: E402
+    APOYO_A_INVERSION, AREAS, ETAPAS, TIPOS_INVERSION, PALABRAS_AREA,
+    MatchingIndex, codificar_emprendedor, codificar_inversionista, puntaje,
+)
+
+
+def muestra(valores):
+    return random.sample(valores, random.randint(0, len(valores)))
+
+
+def generar(n_emp, n_inv):
+    palabras = [raices[0] for raices in PALABRAS_AREA.values()] + ['prototipo', 'empresa', 'carbón', 'comunidad']
+    inversionistas = [
+        (i, codificar_inversionista(random.choice(TIPOS_INVERSION), muestra(ETAPAS), muestra(AREAS)))
+        for i in range(1, n_inv + 1)
+    ]
+    emprendedores = [
+        (i, codificar_emprendedor(random.choice(list(APOYO_A_INVERSION)), ' '.join(random.sample(palabras, 3))))
+        for i in range(1, n_emp + 1)
+    ]
+    return inversionistas, emprendedores
+
+
+def cronometrar(etiqueta, fn, *args):
+    inicio = time.perf_counter()
+    resultado = fn(*args)
+    print(f'  {etiqueta:<45} {(time.perf_counter() - inicio) * 1000:10.1f} ms')
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--emprendedores', type=int, default=10_000)
+    parser.add_argument('--inversionistas', type=int, default=50_000)
+    parser.add_argument('--top-k', type=int, default=20)
+    parser.add_argument('--actualizaciones', type=int, default=1000)
+    args = parser.parse_args()
+    random.seed(42)
+
+    print(f'{args.emprendedores:,} emprendedores × {args.inversionistas:,} inversionistas, top-{args.top_k}')
+    inversionistas, emprendedores = generar(args.emprendedores, args.inversionistas)
+    indice = MatchingIndex(top_k=args.top_k)
+
+    cronometrar('carga del índice', indice.cargar, inversionistas, emprendedores)
+    print(f'  firmas distintas: {len(indice._grupos)} de inversionista, '
+          f'{len(set(m for _, m in emprendedores))} de emprendedor')
+    cronometrar('top-K de todos los emprendedores (en frío)', indice.calcular_todo)
+
+    def consultar_todos():
+        for emp_id, _ in emprendedores:
+            indice.top_k_emprendedor(emp_id)
+    cronometrar(f'{len(emprendedores):,} consultas top-K (caché caliente)', consultar_todos)
+
+    def actualizar():
+        for _ in range(args.actualizaciones):
+            inv_id = random.randint(1, args.inversionistas)
+            indice.set_inversionista(inv_id, codificar_inversionista(
+                random.choice(TIPOS_INVERSION), muestra(ETAPAS), muestra(AREAS)))
+    indice.stats['invalidaciones'] = 0
+    cronometrar(f'{args.actualizaciones:,} actualizaciones incrementales', actualizar)
+    print(f'  firmas invalidadas: {indice.stats["invalidaciones"]}')
+    cronometrar('recálculo tras las actualizaciones', indice.calcular_todo)
+
+    # Referencia: puntuar todos los pares para una muestra de emprendedores.
+    muestra_emp = emprendedores[:50]
+    mapa_inv = dict(indice._inversionistas)
+
+    def ingenuo():
+        for emp_id, mascara in muestra_emp:
+            pares = sorted(((-puntaje(mascara, m), inv_id) for inv_id, m in mapa_inv.items()))
+            esperado = [(inv_id, -p) for p, inv_id in pares[:args.top_k] if p < 0]
+            assert esperado == indice.top_k_emprendedor(emp_id), f'Diferencia en el emprendedor {emp_id}'
+    inicio = time.perf_counter()
+    ingenuo()
+    por_emp = (time.perf_counter() - inicio) / len(muestra_emp)
+    print(f'  par a par (verificado en {len(muestra_emp)} emprendedores): {por_emp * 1000:.1f} ms por emprendedor, '
+          f'~{por_emp * args.emprendedores:.0f} s para todos')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""Comprobaciones de unicidad del registro y /registro/disponible, con y sin filtro de Bloom.
+
+Siembra N usuarios (la mitad instituciones con NIT) en una base desechable y mide:
+    - las comprobaciones previas de un registro de institución: una consulta por
+      campo (como antes) contra la UNION ALL de EXISTS de registro.campos_ocupados,
+    - /registro/disponible con valores libres y ocupados, con el filtro de Bloom y
+      sin él (REGISTRO_BLOOM_ENABLED=false), y cuántas respuestas no fueron a la BD,
+    - el tiempo de construcción y el tamaño del filtro.
+
+Uso:
+    python scripts/bench_registro.py --url sqlite:////tmp/bench_registro.db --usuarios 200000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+HASH_FIJO = 'scrypt:32768:8:1$benchmark$' + '0' * 128
+
+
+def sembrar(db, total, lote=20000):
+    from models import Usuario, Institucion
+    db.drop_all()
+    db.create_all()
+    for base in range(0, total, lote):
+        ids = range(base + 1, min(base + lote, total) + 1)
+        db.session.execute(Usuario.__table__.insert(), [
+            {'id': i, 'email': f'usuario{i}@example.com', 'password_hash': HASH_FIJO,
+             'tipo_perfil': 'INSTITUCION' if i % 2 else 'ADMIN', 'is_admin': False, 'activo': True} for i in ids])
+        db.session.execute(Institucion.__table__.insert(), [
+            {'usuario_id': i, 'nombre_completo': f'Institución {i}', 'nit': f'{9_000_000_000 + i}',
+             'tipo_institucion': 'x', 'municipio': 'x', 'descripcion': 'x', 'area_especializacion': 'x'}
+            for i in ids if i % 2])
+        db.session.commit()
+
+
+def percentiles(tiempos):
+    tiempos = sorted(tiempos)
+    return statistics.median(tiempos), tiempos[min(len(tiempos) - 1, int(len(tiempos) * 0.99))]
+
+
+def medir(etiqueta, n, funcion):
+    tiempos = []
+    for i in range(n):
+        inicio = time.perf_counter()
+        funcion(i)
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    p50, p99 = percentiles(tiempos)
+    print(f'  {etiqueta:<52} p50={p50:6.3f} ms  p99={p99:6.3f} ms')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='sqlite:////tmp/bench_registro.db', help='Base de datos desechable.')
+    parser.add_argument('--usuarios', type=int, default=200_000)
+    parser.add_argument('--n', type=int, default=2000, help='Peticiones por medición.')
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = args.url
+    from sqlalchemy import func
+    from play import create_app
+    from extensions import db
+    from models import Usuario, Institucion, TipoPerfil
+    import registro
+
+    app = create_app({'RATELIMIT_ENABLED': False, 'TELEMETRY_ENABLED': False})
+    with app.app_context():
+        inicio = time.perf_counter()
+        sembrar(db, args.usuarios)
+        print(f'{args.usuarios:,} usuarios sembrados en {time.perf_counter() - inicio:.1f} s\n')
+
+        print('Comprobaciones previas de un registro de institución (correo y NIT):')
+
+        def por_campo(i):
+            correo, nit = f'usuario{i * 7 % args.usuarios}@example.com', f'{9_000_000_000 + i}'
+            db.session.execute(db.select(Usuario.id).where(func.lower(Usuario.email) == correo)).first()
+            db.session.execute(db.select(Institucion.id).filter_by(nit=nit)).first()
+
+        def unificada(i):
+            correo, nit = f'usuario{i * 7 % args.usuarios}@example.com', f'{9_000_000_000 + i}'
+            registro.campos_ocupados({'correo': (Usuario.email, correo), 'nit': (Institucion.nit, nit)})
+
+        medir('una consulta por campo (2 idas a la BD)', args.n, por_campo)
+        medir('UNION ALL de EXISTS (1 ida a la BD)', args.n, unificada)
+
+        inicio = time.perf_counter()
+        total = registro.disponibilidad.construir(app.config['REGISTRO_BLOOM_ERROR_RATE'])
+        filtro = registro.disponibilidad.filtro
+        print(f'\nFiltro de Bloom: {total:,} valores, {filtro.bytes / 2**20:.2f} MiB, k={filtro.k}, '
+              f'construido en {time.perf_counter() - inicio:.2f} s')
+
+    cliente = app.test_client()
+    libres = [f'nuevo{random.randrange(10**9)}@example.com' for _ in range(args.n)]
+    ocupados = [f'usuario{random.randrange(1, args.usuarios)}@example.com' for _ in range(args.n)]
+    for habilitado in (False, True):
+        app.config['REGISTRO_BLOOM_ENABLED'] = habilitado
+        etiqueta = 'con filtro' if habilitado else 'sin filtro'
+        print(f'\n/registro/disponible {etiqueta}:')
+        antes = registro.disponibilidad.stats()
+        medir('correos libres', args.n, lambda i: cliente.get('/registro/disponible',
+                                                             query_string={'campo': 'correo', 'valor': libres[i]}))
+        medir('correos ocupados', args.n, lambda i: cliente.get('/registro/disponible',
+                                                               query_string={'campo': 'correo', 'valor': ocupados[i]}))
+        despues = registro.disponibilidad.stats()
+        sin_bd = despues['bloom_negatives'] - antes['bloom_negatives']
+        falsos = despues['false_positives'] - antes['false_positives']
+        print(f'  respuestas sin ir a la BD: {sin_bd}/{2 * args.n}; falsos positivos del filtro: {falsos}/{args.n}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""Benchmark del índice de búsqueda en memoria.
+
+Genera documentos sintéticos con un vocabulario de distribución Zipf (como el
+texto real: pocas palabras muy frecuentes y muchas raras), los indexa y mide
+la latencia p50/p99 de consultas de 1 a 3 términos y el costo de las
+actualizaciones incrementales. El objetivo es < 50 ms por consulta a 500k
+documentos.
+
+Uso:
+    python scripts/bench_search.py --docs 500000 --consultas 500
+"""
+import argparse
+import itertools
+import os
+import random
+import resource
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+from search import InvertedIndex  # noqa: E402
+
+SILABAS = ['ca', 'bo', 'mi', 'ne', 'ro', 'ta', 'le', 'su', 'pi', 'do', 'ga', 'fe', 'lu', 'sa', 'ver', 'tra', 'con', 'pro']
+DOMINIO = ['minería', 'carbón', 'coque', 'sostenible', 'comunidad', 'ambiental', 'proyecto', 'tecnología',
+           'seguridad', 'procesos', 'transformación', 'comercialización', 'boyacá', 'páramo', 'agua']
+
+
+def vocabulario(tamano):
+    palabras = list(DOMINIO)
+    for combinacion in itertools.product(SILABAS, repeat=3):
+        if len(palabras) >= tamano:
+            break
+        palabras.append(''.join(combinacion))
+    return palabras
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--docs', type=int, default=500_000)
+    parser.add_argument('--palabras-por-doc', type=int, default=40)
+    parser.add_argument('--vocabulario', type=int, default=5000)
+    parser.add_argument('--consultas', type=int, default=500)
+    parser.add_argument('--actualizaciones', type=int, default=2000)
+    args = parser.parse_args()
+    random.seed(7)
+
+    palabras = vocabulario(args.vocabulario)
+    pesos = [1 / (rango + 1) for rango in range(len(palabras))]
+    acumulados = list(itertools.accumulate(pesos))
+
+    def texto(n):
+        return ' '.join(random.choices(palabras, cum_weights=acumulados, k=n))
+
+    indice = InvertedIndex()
+    inicio = time.perf_counter()
+    for i in range(args.docs):
+        indice.agregar(('emprendedor', i), texto(args.palabras_por_doc))
+    construccion = time.perf_counter() - inicio
+    memoria = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f'{args.docs:,} documentos indexados en {construccion:.1f} s '
+          f'({construccion / args.docs * 1e6:.0f} µs por documento), memoria máxima {memoria:.0f} MB')
+
+    for terminos in (1, 2, 3):
+        tiempos, aproximadas = [], 0
+        for _ in range(args.consultas):
+            consulta = ' '.join(random.choices(palabras, cum_weights=acumulados, k=terminos))
+            inicio = time.perf_counter()
+            _, _, aproximado = indice.buscar(consulta, pagina=1, por_pagina=10)
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+            aproximadas += aproximado
+        tiempos.sort()
+        print(f'  consultas de {terminos} término(s): p50={statistics.median(tiempos):6.2f} ms '
+              f'p99={tiempos[int(len(tiempos) * 0.99) - 1]:6.2f} ms  máx={tiempos[-1]:6.2f} ms  '
+              f'({aproximadas} con listas de campeones)')
+
+    inicio = time.perf_counter()
+    for _ in range(args.actualizaciones):
+        indice.agregar(('emprendedor', random.randrange(args.docs)), texto(args.palabras_por_doc))
+    por_update = (time.perf_counter() - inicio) / args.actualizaciones
+    print(f'  actualización incremental: {por_update * 1e6:.0f} µs por documento')
+
+
+if __name__ == '__main__':
+    main()
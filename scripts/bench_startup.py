@@ -0,0 +1,146 @@
+"""Tiempo de arranque de la aplicación, con presupuesto para detectar regresiones.
+
+Mide, en procesos nuevos y tomando la mediana de varias repeticiones:
+    import     'import play' según python -X importtime (tiempo acumulado del módulo),
+    respuesta  desde lanzar 'flask run' hasta la primera respuesta de /health/live
+               y, a continuación, la primera de '/' (compila y renderiza la plantilla),
+    cli        un comando barato de la CLI ('flask --app play --help').
+
+Si alguna mediana supera su presupuesto el script termina con código 1, así que
+puede ejecutarse en CI después de cambiar imports o la inicialización de la app:
+
+    python scripts/bench_startup.py --repeticiones 5
+    python scripts/bench_startup.py --presupuesto-import-ms 1000 --detalle
+
+Con --detalle lista los módulos que más tardan en importarse desde play.py.
+"""
+import argparse
+import http.client
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+RAIZ = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+LINEA_IMPORTTIME = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)')
+
+
+def medir_import():
+    """(ms acumulados de 'import play', [(ms, módulo) importados directamente por play])."""
+    salida = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import play'],
+                            cwd=RAIZ, capture_output=True, text=True, check=True).stderr
+    total, directos = None, []
+    for linea in salida.splitlines():
+        coincidencia = LINEA_IMPORTTIME.match(linea)
+        if not coincidencia:
+            continue
+        _, acumulado, sangria, modulo = coincidencia.groups()
+        if modulo == 'play' and not sangria:
+            total = int(acumulado) / 1000
+        elif len(sangria) == 2:
+            directos.append((int(acumulado) / 1000, modulo))
+    return total, sorted(directos, reverse=True)
+
+
+def _puerto_libre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _get(puerto, ruta):
+    conexion = http.client.HTTPConnection('127.0.0.1', puerto, timeout=5)
+    try:
+        conexion.request('GET', ruta)
+        respuesta = conexion.getresponse()
+        respuesta.read()
+        return respuesta.status
+    finally:
+        conexion.close()
+
+
+def medir_respuesta(espera=30.0):
+    """(ms hasta la primera respuesta de /health/live, ms de la primera respuesta de '/')."""
+    puerto = _puerto_libre()
+    inicio = time.perf_counter()
+    proceso = subprocess.Popen([sys.executable, '-m', 'flask', '--app', 'play', 'run', '--port', str(puerto),
+                                '--no-reload', '--no-debugger'],
+                               cwd=RAIZ, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while True:
+            try:
+                _get(puerto, '/health/live')
+                break
+            except OSError:
+                if proceso.poll() is not None or time.perf_counter() - inicio > espera:
+                    raise RuntimeError('El servidor no respondió.')
+                time.sleep(0.005)
+        listo = time.perf_counter()
+        _get(puerto, '/')
+        pagina = time.perf_counter()
+        return (listo - inicio) * 1000, (pagina - listo) * 1000
+    finally:
+        proceso.terminate()
+        proceso.wait()
+
+
+def medir_cli():
+    inicio = time.perf_counter()
+    subprocess.run([sys.executable, '-m', 'flask', '--app', 'play', '--help'],
+                   cwd=RAIZ, capture_output=True, check=True)
+    return (time.perf_counter() - inicio) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeticiones', type=int, default=5)
+    parser.add_argument('--presupuesto-import-ms', type=float, default=1000.0)
+    parser.add_argument('--presupuesto-respuesta-ms', type=float, default=1500.0,
+                        help="Presupuesto para la primera respuesta de /health/live.")
+    parser.add_argument('--presupuesto-cli-ms', type=float, default=1700.0)
+    parser.add_argument('--detalle', action='store_true', help='Lista los imports más lentos de play.py.')
+    args = parser.parse_args()
+
+    medir_import()  # Calienta la caché de bytecode (__pycache__) y la del sistema de archivos.
+    imports, respuestas, paginas, clis, directos = [], [], [], [], []
+    for _ in range(args.repeticiones):
+        total, directos = medir_import()
+        imports.append(total)
+        listo, pagina = medir_respuesta()
+        respuestas.append(listo)
+        paginas.append(pagina)
+        clis.append(medir_cli())
+
+    resultados = [
+        ('import play', statistics.median(imports), args.presupuesto_import_ms),
+        ('primera respuesta (/health/live)', statistics.median(respuestas), args.presupuesto_respuesta_ms),
+        ("primera respuesta de '/' después", statistics.median(paginas), None),
+        ('flask --app play --help', statistics.median(clis), args.presupuesto_cli_ms),
+    ]
+    print(f'Mediana de {args.repeticiones} repeticiones (Python {sys.version.split()[0]}):')
+    excedidos = []
+    for etiqueta, valor, presupuesto in resultados:
+        if presupuesto is None:
+            print(f'  {etiqueta:<36} {valor:8.1f} ms')
+            continue
+        marca = '✅' if valor <= presupuesto else '❌'
+        print(f'  {etiqueta:<36} {valor:8.1f} ms  (presupuesto {presupuesto:.0f} ms) {marca}')
+        if valor > presupuesto:
+            excedidos.append(etiqueta)
+
+    if args.detalle:
+        print('\nImports más lentos de play.py (última repetición, ms acumulados):')
+        for ms, modulo in directos[:15]:
+            print(f'  {ms:8.1f}  {modulo}')
+
+    if excedidos:
+        print(f"\n❌ Presupuesto excedido: {', '.join(excedidos)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
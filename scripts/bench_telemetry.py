@@ -0,0 +1,99 @@
+"""Sobrecarga de la telemetría por petición (telemetry.py).
+
+Mide con el cliente de pruebas de Flask el tiempo medio por petición de varias
+rutas representativas, con la telemetría encendida y apagada en la misma
+aplicación (telemetry.enabled): una página renderizada en cada
+petición, una con consultas a la BD, la página principal servida desde la caché
+y /health/live (casi solo el coste del framework: el peor caso relativo).
+Las rondas se alternan para que el ruido de la máquina afecte a ambas por igual
+y se compara la mediana.
+
+Termina con código 1 si la sobrecarga total supera el presupuesto:
+
+    python scripts/bench_telemetry.py --rondas 7 --peticiones 500 --presupuesto 2
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault('DATABASE_URL', 'sqlite:////tmp/bench_telemetry.db')
+
+RUTAS = ['/registro_institucion', '/diagnostico/competitividad/comparacion', '/', '/health/live']
+
+
+def preparar(app):
+    from extensions import db
+    from models import Usuario, TipoPerfil, Empresario
+    with app.app_context():
+        db.create_all()
+        usuario = db.session.execute(db.select(Usuario).filter_by(email='bench@example.com')).scalar_one_or_none()
+        if usuario is None:
+            usuario = Usuario(email='bench@example.com', tipo_perfil=TipoPerfil.EMPRESARIO, password_hash='-')
+            usuario.empresario = Empresario(
+                nombre_completo='Bench', tipo_documento_personal='CC', numero_documento_personal='1',
+                numero_celular='1', nombre_empresa='Bench', tipo_contribuyente='natural', tamano='micro',
+                sector_produccion='si', sector_transformacion='no', sector_comercializacion='no')
+            db.session.add(usuario)
+            db.session.commit()
+        return usuario.id
+
+
+def medir(cliente, ruta, peticiones):
+    inicio = time.perf_counter()
+    for _ in range(peticiones):
+        respuesta = cliente.get(ruta)
+        respuesta.close()
+    return (time.perf_counter() - inicio) / peticiones * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rondas', type=int, default=7)
+    parser.add_argument('--peticiones', type=int, default=500, help='Peticiones por ruta en cada ronda.')
+    parser.add_argument('--presupuesto', type=float, default=2.0, help='Sobrecarga máxima en %% (sobre el total).')
+    args = parser.parse_args()
+
+    import logging
+    logging.disable(logging.WARNING)
+    from play import create_app
+    from telemetry import telemetry
+    app = create_app({'PASSWORD_HASH_WORKERS': 0, 'TELEMETRY_SLOW_REQUEST_MS': 0})
+    usuario_id = preparar(app)
+    cliente = app.test_client()
+    with cliente.session_transaction() as sesion:
+        sesion.update({'user_id': usuario_id, 'user_profile': 'empresario'})
+    for ruta in RUTAS:
+        medir(cliente, ruta, 50)  # Calentamiento: plantillas compiladas, cachés llenas.
+
+    modos = {'sin telemetría': False, 'con telemetría': True}
+    tiempos = {(etiqueta, ruta): [] for etiqueta in modos for ruta in RUTAS}
+    for ronda in range(args.rondas):
+        orden = list(modos) if ronda % 2 == 0 else list(reversed(modos))
+        for etiqueta in orden:
+            telemetry.enabled = modos[etiqueta]
+            for ruta in RUTAS:
+                tiempos[(etiqueta, ruta)].append(medir(cliente, ruta, args.peticiones))
+
+    print(f'Mediana de {args.rondas} rondas x {args.peticiones} peticiones (µs por petición):')
+    print(f"  {'ruta':<42} {'sin':>9} {'con':>9} {'sobrecarga':>11}")
+    totales = {etiqueta: 0.0 for etiqueta in modos}
+    for ruta in RUTAS:
+        sin = statistics.median(tiempos[('sin telemetría', ruta)])
+        con = statistics.median(tiempos[('con telemetría', ruta)])
+        totales['sin telemetría'] += sin
+        totales['con telemetría'] += con
+        print(f'  {ruta:<42} {sin:9.1f} {con:9.1f} {100 * (con / sin - 1):10.1f}%')
+    sobrecarga = 100 * (totales['con telemetría'] / totales['sin telemetría'] - 1)
+    print(f"  {'total':<42} {totales['sin telemetría']:9.1f} {totales['con telemetría']:9.1f} {sobrecarga:10.1f}%")
+
+    if sobrecarga > args.presupuesto:
+        print(f'\n❌ Sobrecarga {sobrecarga:.1f}% por encima del presupuesto ({args.presupuesto:.1f}%)')
+        sys.exit(1)
+    print(f'\n✅ Sobrecarga dentro del presupuesto ({args.presupuesto:.1f}%)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""Memoria y tiempos del almacén de códigos de verificación en memoria.
+
+Crea N verificaciones pendientes en un MemoryStore y muestra:
+    - la memoria que ocupan (tracemalloc) y los bytes por verificación,
+    - el tiempo de create() y de check() (correctos e incorrectos),
+    - el tiempo de create() con el almacén lleno (descarta una de las más próximas a vencer),
+    - el tiempo de vaciar las ranuras vencidas,
+y compara el tamaño de la cookie de sesión firmada con el código en la sesión
+(como antes) y con solo el token.
+
+Uso:
+    python scripts/bench_verification.py --n 100000
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from verification import MemoryStore  # noqa: E402
+
+
+def medir(etiqueta, n, funcion):
+    inicio = time.perf_counter()
+    funcion()
+    segundos = time.perf_counter() - inicio
+    print(f'  {etiqueta:<40} {segundos * 1e6 / n:8.2f} µs/op')
+
+
+def tamano_cookies():
+    from flask import Flask
+    app = Flask(__name__)
+    app.secret_key = 'x' * 32
+    serializador = app.session_interface.get_signing_serializer(app)
+    antes = {'verification_code': '123456',
+             'code_expiration': (datetime.now(timezone.utc) + timedelta(minutes=10)).isoformat(),
+             'user_to_verify': 123456}
+    despues = {'verification_token': 'x' * 22}
+    return len(serializador.dumps(antes)), len(serializador.dumps(despues))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--n', type=int, default=100_000, help='Verificaciones pendientes.')
+    parser.add_argument('--ttl', type=int, default=600)
+    args = parser.parse_args()
+    n = args.n
+
+    tracemalloc.start()
+    base = tracemalloc.take_snapshot()
+    store = MemoryStore(ttl=args.ttl, max_pending=n)
+    creadas = [store.create(i) for i in range(n)]
+    ocupado = sum(d.size_diff for d in tracemalloc.take_snapshot().compare_to(base, 'filename'))
+    # La lista 'creadas' y sus tuplas son del benchmark; los tokens y códigos los comparte con el almacén.
+    lista = sys.getsizeof(creadas) + sum(sys.getsizeof(t) for t in creadas)
+    tracemalloc.stop()
+
+    # Los tiempos, sin tracemalloc y con un almacén nuevo.
+    store = MemoryStore(ttl=args.ttl, max_pending=n)
+    inicio = time.perf_counter()
+    creadas = [store.create(i) for i in range(n)]
+    crear = time.perf_counter() - inicio
+
+    print(f'{n:,} verificaciones pendientes (TTL {args.ttl} s, {len(store._ranuras)} ranuras)')
+    print(f'  memoria del almacén: {(ocupado - lista) / 2**20:.1f} MiB, {(ocupado - lista) / n:.0f} bytes por verificación')
+    print(f'  {"create()":<40} {crear * 1e6 / n:8.2f} µs/op')
+
+    mitad = creadas[: n // 2]
+    medir('check() incorrecto', len(mitad), lambda: [store.check(t, '000000') for t, _ in mitad])
+    medir('check() correcto', len(mitad), lambda: [store.check(t, c) for t, c in mitad])
+    medir('create() con el almacén lleno (descarta)', n, lambda: [store.create(i) for i in range(n)])
+    print(f'  descartadas por tamaño: {store.evicted:,}')
+
+    # Vencimiento: adelantar el reloj del almacén más allá del TTL y vaciar las ranuras.
+    pendientes = len(store)
+    inicio = time.perf_counter()
+    store._avanzar(time.monotonic() + args.ttl + 2)
+    segundos = time.perf_counter() - inicio
+    print(f'  vencer {pendientes:,} verificaciones: {segundos * 1000:.1f} ms '
+          f'({segundos * 1e6 / max(pendientes, 1):.2f} µs cada una), quedan {len(store)}')
+
+    antes, despues = tamano_cookies()
+    print(f'\nCookie de sesión firmada: {antes} bytes con el código en la sesión -> {despues} bytes con el token')
+
+
+if __name__ == '__main__':
+    main()
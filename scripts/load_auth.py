@@ -0,0 +1,178 @@
+"""Prueba de carga de /login bajo un ataque de credential stuffing.
+
+Levanta un servidor gunicorn por escenario y mide la latencia de usuarios
+legítimos que inician sesión con su contraseña correcta mientras varios hilos
+atacantes prueban contraseñas contra cuentas víctima desde unas pocas IP:
+
+    sin ataque          solo el tráfico legítimo (línea base),
+    ataque sin límites  RATELIMIT_ENABLED=false y PASSWORD_HASH_MAX_INFLIGHT=0,
+    ataque con límites  la configuración por defecto.
+
+Las IP de los clientes se simulan con X-Forwarded-For (PROXY_FIX_X_FOR=1). Los
+correos se encolan contra un servidor SMTP inexistente sin reintentos, así que
+no sale ninguno. La base de datos es un archivo SQLite desechable que el script
+recrea con los usuarios legítimos y las víctimas.
+
+Uso:
+    python scripts/load_auth.py --duracion 20 --atacantes 32
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+
+RAIZ = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, RAIZ)
+
+CONTRASENA = 'Contrasena-Legitima-1'
+
+
+def preparar(url_bd, legitimos, victimas):
+    """Recrea el esquema y crea los usuarios (emprendedores) de la prueba."""
+    os.environ['DATABASE_URL'] = url_bd
+    from play import create_app
+    from extensions import db
+    from models import Usuario, Emprendedor, TipoPerfil
+
+    app = create_app()
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        hash_legitimo = Usuario(email='-', tipo_perfil=TipoPerfil.EMPRENDEDOR)
+        hash_legitimo.set_password(CONTRASENA)  # Un solo hash real, compartido por todas las cuentas.
+        emails = [f'legitimo{i}@example.com' for i in range(legitimos)] + \
+                 [f'victima{i}@example.com' for i in range(victimas)]
+        for i, email in enumerate(emails, start=1):
+            db.session.add(Usuario(id=i, email=email, tipo_perfil=TipoPerfil.EMPRENDEDOR,
+                                   password_hash=hash_legitimo.password_hash))
+            db.session.add(Emprendedor(usuario_id=i, nombre_completo=f'Usuario {i}', tipo_documento='CC',
+                                       numero_documento=f'D{i}', numero_celular='3000000000',
+                                       programa_formacion='x', titulo_proyecto='x', descripcion_proyecto='x',
+                                       relacion_sector='x', tipo_apoyo='x'))
+        db.session.commit()
+    return emails[:legitimos], emails[legitimos:]
+
+
+def arrancar(puerto, url_bd, hilos, entorno_extra):
+    entorno = dict(os.environ, DATABASE_URL=url_bd, PROXY_FIX_X_FOR='1', MAIL_SERVER='127.0.0.1', MAIL_PORT='1',
+                   MAIL_USE_TLS='false', MAIL_QUEUE_MAX_RETRIES='0', TELEMETRY_ENABLED='false', **entorno_extra)
+    # Un solo proceso: el backend en memoria lleva la cuenta por proceso.
+    proceso = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-w', '1', '--threads', str(hilos), '-b', f'127.0.0.1:{puerto}',
+         '--log-level', 'warning', 'play:app'],
+        cwd=RAIZ, env=entorno, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    for _ in range(200):
+        try:
+            conexion = http.client.HTTPConnection('127.0.0.1', puerto, timeout=1)
+            conexion.request('GET', '/health/live')
+            conexion.getresponse().read()
+            return proceso
+        except OSError:
+            time.sleep(0.1)
+    proceso.kill()
+    raise RuntimeError('El servidor no arrancó')
+
+
+def login(puerto, ip, email, contrasena):
+    conexion = http.client.HTTPConnection('127.0.0.1', puerto, timeout=60)
+    cuerpo = json.dumps({'email': email, 'password': contrasena, 'profile': 'emprendedor'})
+    inicio = time.perf_counter()
+    conexion.request('POST', '/login', body=cuerpo,
+                     headers={'Content-Type': 'application/json', 'X-Forwarded-For': ip})
+    respuesta = conexion.getresponse()
+    respuesta.read()
+    conexion.close()
+    return respuesta.status, (time.perf_counter() - inicio) * 1000
+
+
+def escenario(etiqueta, args, legitimos, victimas, entorno_extra, atacantes):
+    proceso = arrancar(args.puerto, args.url, args.hilos_servidor, entorno_extra)
+    fin = time.monotonic() + args.duracion
+    tiempos, estados_legitimos, estados_ataque = [], Counter(), Counter()
+    lock = threading.Lock()
+
+    def legitimo(n):
+        # Cada cuenta legítima entra desde su propia IP, como usuarios reales distintos.
+        usuarios = list(range(n, len(legitimos), args.legitimos_hilos))
+        i = 0
+        while time.monotonic() < fin:
+            u = usuarios[i % len(usuarios)]
+            estado, ms = login(args.puerto, f'192.168.{u // 250}.{u % 250 + 1}', legitimos[u], CONTRASENA)
+            i += 1
+            with lock:
+                tiempos.append(ms)
+                estados_legitimos[estado] += 1
+            time.sleep(args.pausa)
+
+    def atacante(n):
+        rng = random.Random(n)
+        intervalo = atacantes / args.ataque_rps
+        siguiente = time.monotonic()
+        while time.monotonic() < fin:
+            ip = f'10.0.0.{rng.randrange(args.ips_atacantes) + 1}'
+            estado, _ = login(args.puerto, ip, rng.choice(victimas), f'adivinanza-{rng.random()}')
+            with lock:
+                estados_ataque[estado] += 1
+            # Ritmo fijo por hilo: los clientes comparten la máquina con el servidor.
+            siguiente += intervalo
+            time.sleep(max(0.0, siguiente - time.monotonic()))
+
+    hilos = [threading.Thread(target=legitimo, args=(n,)) for n in range(args.legitimos_hilos)]
+    hilos += [threading.Thread(target=atacante, args=(n,)) for n in range(atacantes)]
+    try:
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+    finally:
+        proceso.terminate()
+        proceso.wait()
+
+    tiempos.sort()
+    exitos = estados_legitimos[200] / max(sum(estados_legitimos.values()), 1)
+    p = lambda q: tiempos[min(len(tiempos) - 1, int(len(tiempos) * q))]  # noqa: E731
+    print(f'{etiqueta:<20} legítimos: {len(tiempos):5} logins, éxito {100 * exitos:5.1f}%, '
+          f'p50={statistics.median(tiempos):7.1f} ms  p95={p(0.95):7.1f} ms  p99={p(0.99):7.1f} ms')
+    if exitos < 1:
+        detalle = ', '.join(f'{estado}: {n}' for estado, n in sorted(estados_legitimos.items()))
+        print(f'{"":<20} legítimos por estado -> {detalle}')
+    if atacantes:
+        total = sum(estados_ataque.values())
+        detalle = ', '.join(f'{estado}: {n}' for estado, n in sorted(estados_ataque.items()))
+        print(f'{"":<20} ataque: {total} peticiones ({total / args.duracion:.0f}/s) -> {detalle}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='sqlite:////tmp/load_auth.db', help='Base de datos desechable.')
+    parser.add_argument('--puerto', type=int, default=8765)
+    parser.add_argument('--duracion', type=float, default=20.0, help='Segundos por escenario.')
+    parser.add_argument('--legitimos', type=int, default=200, help='Cuentas legítimas.')
+    parser.add_argument('--legitimos-hilos', type=int, default=4)
+    parser.add_argument('--pausa', type=float, default=0.5, help='Segundos entre logins de cada usuario legítimo.')
+    parser.add_argument('--victimas', type=int, default=1000)
+    parser.add_argument('--atacantes', type=int, default=32, help='Hilos atacantes.')
+    parser.add_argument('--ataque-rps', type=float, default=100.0,
+                        help='Peticiones por segundo que intentan enviar los atacantes en total.')
+    parser.add_argument('--ips-atacantes', type=int, default=8)
+    parser.add_argument('--hilos-servidor', type=int, default=32)
+    args = parser.parse_args()
+
+    legitimos, victimas = preparar(args.url, args.legitimos, args.victimas)
+    print(f'{len(legitimos)} cuentas legítimas, {len(victimas)} víctimas, {args.atacantes} atacantes '
+          f'({args.ataque_rps:.0f} peticiones/s) desde {args.ips_atacantes} IP, {args.duracion:.0f} s por escenario\n')
+    escenario('sin ataque', args, legitimos, victimas, {}, 0)
+    escenario('ataque sin límites', args, legitimos, victimas,
+              {'RATELIMIT_ENABLED': 'false', 'PASSWORD_HASH_MAX_INFLIGHT': '0'}, args.atacantes)
+    escenario('ataque con límites', args, legitimos, victimas, {}, args.atacantes)
+
+
+if __name__ == '__main__':
+    main()
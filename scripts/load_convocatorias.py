@@ -0,0 +1,241 @@
+"""Prueba de carga del listado de convocatorias mientras se escriben postulaciones.
+
+Siembra N convocatorias (con criterios de tamaño y sector, algunas con cupos) y
+M empresarios en una base desechable (de nuevo antes de cada escenario),
+levanta un servidor gunicorn por escenario y mide la latencia de
+/convocatorias (primera página y siguientes, con filtros variados) mientras
+otros hilos envían postulaciones, un 10 % de ellas repetidas con la misma
+Idempotency-Key, como un doble clic. Cada
+--publicar-cada segundos el script publica una convocatoria nueva, lo que
+invalida la caché del listado en el servidor:
+
+    sin caché    CONVOCATORIAS_CACHE_ENABLED=false: cada página consulta la BD,
+    con caché    la configuración por defecto.
+
+Tras cada escenario comprueba que no hay postulaciones repetidas, que los contadores de
+las convocatorias coinciden con las filas y que ninguna supera sus cupos. Las
+sesiones de los empresarios se firman con la SECRET_KEY de la aplicación.
+
+Uso:
+    python scripts/load_convocatorias.py --duracion 20 --lectores 16 --escritores 4
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+
+RAIZ = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, RAIZ)
+
+HASH_FIJO = 'scrypt:32768:8:1$benchmark$' + '0' * 128
+TAMANOS = ('pequena', 'mediana', 'grande')
+SECTORES = ('perforacion', 'voladura', 'lavado', 'secado', 'triturado', 'exportadores', 'minoristas', 'tics')
+
+
+def preparar(url_bd, total_convocatorias, total_empresarios, semilla=1):
+    """Recrea el esquema, siembra convocatorias y empresarios y devuelve la app y las cookies de sesión."""
+    os.environ['DATABASE_URL'] = url_bd
+    from play import create_app
+    from extensions import db
+    from models import Usuario, Empresario, Convocatoria, ConvocatoriaCriterio
+
+    rng = random.Random(semilla)
+    ahora = datetime.utcnow()
+    app = create_app({'TELEMETRY_ENABLED': False})
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        db.session.execute(Usuario.__table__.insert(), [
+            {'id': i, 'email': f'empresario{i}@example.com', 'password_hash': HASH_FIJO, 'tipo_perfil': 'EMPRESARIO',
+             'is_admin': False, 'activo': True} for i in range(1, total_empresarios + 1)])
+        db.session.execute(Empresario.__table__.insert(), [
+            {'id': i, 'usuario_id': i, 'nombre_completo': f'Empresario {i}', 'tipo_documento_personal': 'CC',
+             'numero_documento_personal': f'P{i}', 'numero_celular': '3000000000', 'nombre_empresa': f'Empresa {i}',
+             'tipo_contribuyente': 'juridica', 'nit': f'N{i}', 'tamano': rng.choice(TAMANOS),
+             'sector_produccion': rng.choice(SECTORES[:2]), 'sector_transformacion': rng.choice(SECTORES[2:5]),
+             'sector_comercializacion': rng.choice(SECTORES[5:])} for i in range(1, total_empresarios + 1)])
+        db.session.execute(Convocatoria.__table__.insert(), [
+            {'id': i, 'titulo': f'Convocatoria {i}', 'descripcion': 'Capital semilla para modernización de maquinaria',
+             'requisitos': 'RUT actualizado\nCertificado de Cámara de Comercio', 'estado': 'publicada',
+             'destacada': i % 100 == 0, 'postulaciones': 0, 'fecha_creacion': ahora, 'fecha_publicacion': ahora,
+             'fecha_cierre': ahora + timedelta(days=rng.randrange(30, 365)) if rng.random() < 0.7 else None,
+             'cupos': rng.randrange(5, 50) if rng.random() < 0.1 else None}
+            for i in range(1, total_convocatorias + 1)])
+        criterios = []
+        for i in range(1, total_convocatorias + 1):
+            if rng.random() < 0.3:
+                criterios += [{'convocatoria_id': i, 'campo': 'tamano', 'valor': v} for v in rng.sample(TAMANOS, 2)]
+            if rng.random() < 0.3:
+                criterios += [{'convocatoria_id': i, 'campo': 'sector', 'valor': v} for v in rng.sample(SECTORES, 3)]
+        db.session.execute(ConvocatoriaCriterio.__table__.insert(), criterios)
+        db.session.commit()
+
+        serializador = app.session_interface.get_signing_serializer(app)
+        return app, [f"{app.config['SESSION_COOKIE_NAME']}="
+                     f"{serializador.dumps({'user_id': i, 'user_profile': 'empresario'})}"
+                     for i in range(1, total_empresarios + 1)]
+
+
+def publicar_nueva(app, numero):
+    """Crea y publica una convocatoria desde este proceso, como 'flask create-convocatoria --publicar'."""
+    from extensions import db
+    from models import Convocatoria
+    import convocatorias
+
+    with app.app_context():
+        convocatoria = Convocatoria(titulo=f'Publicada durante la prueba {numero}', descripcion='Nueva')
+        db.session.add(convocatoria)
+        convocatorias.publicar(convocatoria)
+        db.session.commit()
+
+
+def arrancar(puerto, url_bd, hilos, entorno_extra):
+    entorno = dict(os.environ, DATABASE_URL=url_bd, TELEMETRY_ENABLED='false', RATELIMIT_ENABLED='false',
+                   **entorno_extra)
+    proceso = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-w', '1', '--threads', str(hilos), '-b', f'127.0.0.1:{puerto}',
+         '--log-level', 'warning', 'play:app'],
+        cwd=RAIZ, env=entorno, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    for _ in range(200):
+        try:
+            conexion = http.client.HTTPConnection('127.0.0.1', puerto, timeout=1)
+            conexion.request('GET', '/health/live')
+            conexion.getresponse().read()
+            return proceso
+        except OSError:
+            time.sleep(0.1)
+    proceso.kill()
+    raise RuntimeError('El servidor no arrancó')
+
+
+def pedir(conexion, metodo, ruta, cuerpo=None, cabeceras=None):
+    inicio = time.perf_counter()
+    conexion.request(metodo, ruta, body=cuerpo, headers=cabeceras or {})
+    respuesta = conexion.getresponse()
+    datos = respuesta.read()
+    return respuesta.status, datos, (time.perf_counter() - inicio) * 1000
+
+
+def filtros_al_azar(rng):
+    # Pocas combinaciones, como las de los empresarios reales: muchos piden lo mismo.
+    params = []
+    if rng.random() < 0.5:
+        params.append(f'tamano={rng.choice(TAMANOS)}')
+    if rng.random() < 0.3:
+        params += [f'sector={s}' for s in sorted(rng.sample(SECTORES, 2))]
+    if rng.random() < 0.05:
+        params.append(f'q={rng.randrange(1, 10)}')
+    return params
+
+
+def escenario(etiqueta, args, app, cookies, entorno_extra):
+    proceso = arrancar(args.puerto, args.url, args.hilos_servidor, entorno_extra)
+    fin = time.monotonic() + args.duracion
+    tiempos, estados_lectura, estados_escritura = [], Counter(), Counter()
+    lock = threading.Lock()
+
+    def lector(n):
+        rng = random.Random(n)
+        conexion = http.client.HTTPConnection('127.0.0.1', args.puerto, timeout=60)
+        while time.monotonic() < fin:
+            params = filtros_al_azar(rng)
+            # Primera página y, a veces, las siguientes por cursor.
+            for _ in range(1 + (rng.random() < 0.3) * rng.randrange(1, 4)):
+                estado, datos, ms = pedir(conexion, 'GET', '/convocatorias?' + '&'.join(params))
+                with lock:
+                    tiempos.append(ms)
+                    estados_lectura[estado] += 1
+                siguiente = json.loads(datos).get('siguiente') if estado == 200 else None
+                if not siguiente:
+                    break
+                params = [p for p in params if not p.startswith('antes=')] + [f'antes={siguiente}']
+
+    def escritor(n):
+        rng = random.Random(1000 + n)
+        conexion = http.client.HTTPConnection('127.0.0.1', args.puerto, timeout=60)
+        while time.monotonic() < fin:
+            cabeceras = {'Content-Type': 'application/json', 'Cookie': rng.choice(cookies),
+                         'Idempotency-Key': uuid.uuid4().hex}
+            cuerpo = json.dumps({'nombre_proyecto': 'Modernización planta', 'descripcion': 'Proyecto de prueba'})
+            ruta = f'/convocatorias/{rng.randrange(1, args.convocatorias + 1)}/postulaciones'
+            for _ in range(2 if rng.random() < 0.1 else 1):  # Doble clic: la misma clave dos veces.
+                estado, _, _ = pedir(conexion, 'POST', ruta, cuerpo, cabeceras)
+                with lock:
+                    estados_escritura[estado] += 1
+
+    hilos = [threading.Thread(target=lector, args=(n,)) for n in range(args.lectores)]
+    hilos += [threading.Thread(target=escritor, args=(n,)) for n in range(args.escritores)]
+    publicadas = 0
+    try:
+        for hilo in hilos:
+            hilo.start()
+        while time.monotonic() < fin:
+            time.sleep(min(args.publicar_cada, max(0.0, fin - time.monotonic())))
+            if time.monotonic() < fin:
+                publicadas += 1
+                publicar_nueva(app, publicadas)
+        for hilo in hilos:
+            hilo.join()
+    finally:
+        proceso.terminate()
+        proceso.wait()
+
+    tiempos.sort()
+    p = lambda q: tiempos[min(len(tiempos) - 1, int(len(tiempos) * q))]  # noqa: E731
+    print(f'{etiqueta:<12} listado: {len(tiempos) / args.duracion:6.0f} pág/s  p50={statistics.median(tiempos):6.1f} ms  '
+          f'p95={p(0.95):6.1f} ms  p99={p(0.99):6.1f} ms  ({publicadas} publicaciones durante la prueba)')
+    detalle = lambda contador: ', '.join(f'{e}: {n}' for e, n in sorted(contador.items()))  # noqa: E731
+    print(f'{"":<12} lecturas por estado -> {detalle(estados_lectura)}')
+    print(f'{"":<12} postulaciones ({sum(estados_escritura.values()) / args.duracion:.0f}/s) por estado -> '
+          f'{detalle(estados_escritura)}')
+
+
+def comprobar(app):
+    from sqlalchemy import text
+    from extensions import db
+
+    consultas = {
+        'postulaciones repetidas': 'SELECT count(*) FROM (SELECT 1 FROM postulaciones '
+                                   'GROUP BY convocatoria_id, empresario_id HAVING count(*) > 1)',
+        'contadores desfasados': 'SELECT count(*) FROM convocatorias c WHERE c.postulaciones != '
+                                 '(SELECT count(*) FROM postulaciones p WHERE p.convocatoria_id = c.id)',
+        'cupos superados': 'SELECT count(*) FROM convocatorias WHERE postulaciones > cupos',
+    }
+    with app.app_context():
+        total = db.session.execute(text('SELECT count(*) FROM postulaciones')).scalar()
+        print(f'{"":<12} {total:,} postulaciones guardadas; ' +
+              ', '.join(f'{nombre}: {db.session.execute(text(sql)).scalar()}' for nombre, sql in consultas.items()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='sqlite:////tmp/load_convocatorias.db', help='Base de datos desechable.')
+    parser.add_argument('--puerto', type=int, default=8766)
+    parser.add_argument('--duracion', type=float, default=20.0, help='Segundos por escenario.')
+    parser.add_argument('--convocatorias', type=int, default=5000)
+    parser.add_argument('--empresarios', type=int, default=20_000)
+    parser.add_argument('--lectores', type=int, default=16, help='Hilos que piden el listado.')
+    parser.add_argument('--escritores', type=int, default=4, help='Hilos que envían postulaciones.')
+    parser.add_argument('--publicar-cada', type=float, default=5.0, help='Segundos entre publicaciones.')
+    parser.add_argument('--hilos-servidor', type=int, default=24)
+    args = parser.parse_args()
+
+    print(f'{args.convocatorias:,} convocatorias, {args.empresarios:,} empresarios, {args.lectores} lectores, '
+          f'{args.escritores} escritores, {args.duracion:.0f} s por escenario\n')
+    for etiqueta, entorno_extra in (('sin caché', {'CONVOCATORIAS_CACHE_ENABLED': 'false'}), ('con caché', {})):
+        app, cookies = preparar(args.url, args.convocatorias, args.empresarios)
+        escenario(etiqueta, args, app, cookies, entorno_extra)
+        comprobar(app)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+"""Prueba de carga del stream de mensajes (Server-Sent Events).
+
+Abre N conexiones SSE inactivas contra un servidor en marcha y, con ellas
+abiertas, mide:
+    - la latencia de peticiones normales (¿los streams ocupan los workers?),
+    - el tiempo que tarda un mensaje en llegar a todas las conexiones.
+
+El script prepara en la base de datos dos usuarios y una conversación entre
+ellos, y firma las cookies de sesión con la SECRET_KEY de la aplicación, así que
+debe ejecutarse con las mismas variables de entorno (DATABASE_URL, SECRET_KEY)
+que el servidor. Por ejemplo:
+
+    export DATABASE_URL=sqlite:////tmp/carga.db SECRET_KEY=carga MENSAJES_SINCRONIZAR_BD=false
+    flask --app play db upgrade
+    gunicorn -k gevent --worker-connections 10000 -w 1 -b 127.0.0.1:8000 play:app &
+    python scripts/load_mensajes_sse.py --servidor http://127.0.0.1:8000 --conexiones 5000
+
+Para comparar, el mismo comando contra gunicorn con workers síncronos
+(gunicorn -w 4 play:app) muestra cómo 4 streams abiertos bloquean todo lo demás.
+"""
+import argparse
+import asyncio
+import http.client
+import json
+import os
+import statistics
+import sys
+import time
+from urllib.parse import urlparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+
+def preparar():
+    """Crea (si no existen) dos usuarios y su conversación; devuelve las cookies de sesión y el id."""
+    from play import app
+    from extensions import db
+    from models import Usuario, TipoPerfil
+    import mensajeria
+
+    with app.app_context():
+        ids = []
+        for email in ('carga-remitente@example.com', 'carga-receptor@example.com'):
+            usuario = db.session.execute(db.select(Usuario).where(Usuario.email == email)).scalars().first()
+            if usuario is None:
+                usuario = Usuario(email=email, tipo_perfil=TipoPerfil.ADMIN, password_hash='-')
+                db.session.add(usuario)
+                db.session.flush()
+            ids.append(usuario.id)
+        conversacion = mensajeria.obtener_o_crear_directa(*ids)
+        db.session.commit()
+        serializador = app.session_interface.get_signing_serializer(app)
+        cookies = [f"{app.config['SESSION_COOKIE_NAME']}={serializador.dumps({'user_id': uid})}" for uid in ids]
+        return cookies, conversacion.id
+
+
+async def abrir_stream(host, puerto, cookie, recibidos, listo):
+    lector, escritor = await asyncio.open_connection(host, puerto)
+    escritor.write((f'GET /mensajes/stream HTTP/1.1\r\nHost: {host}\r\nCookie: {cookie}\r\n'
+                    f'Accept: text/event-stream\r\n\r\n').encode())
+    await escritor.drain()
+    await lector.readuntil(b'\r\n\r\n')
+    listo()
+    try:
+        while True:
+            linea = await lector.readline()
+            if not linea:
+                break
+            if linea.startswith(b'event: mensaje'):
+                recibidos.append(time.perf_counter())
+    finally:
+        escritor.close()
+
+
+def peticion(host, puerto, metodo, ruta, cookie, cuerpo=None):
+    conexion = http.client.HTTPConnection(host, puerto, timeout=30)
+    cabeceras = {'Cookie': cookie}
+    if cuerpo is not None:
+        cabeceras['Content-Type'] = 'application/json'
+    inicio = time.perf_counter()
+    conexion.request(metodo, ruta, body=json.dumps(cuerpo) if cuerpo is not None else None, headers=cabeceras)
+    respuesta = conexion.getresponse()
+    respuesta.read()
+    conexion.close()
+    return respuesta.status, (time.perf_counter() - inicio) * 1000
+
+
+def percentiles(tiempos):
+    tiempos = sorted(tiempos)
+    return statistics.median(tiempos), tiempos[min(len(tiempos) - 1, int(len(tiempos) * 0.99))]
+
+
+async def main_async(args):
+    url = urlparse(args.servidor)
+    host, puerto = url.hostname, url.port or 80
+    (cookie_remitente, cookie_receptor), conversacion_id = preparar()
+
+    def medir_peticiones(etiqueta):
+        tiempos = [peticion(host, puerto, 'GET', '/mensajes/no-leidos', cookie_remitente)[1]
+                   for _ in range(args.peticiones)]
+        p50, p99 = percentiles(tiempos)
+        print(f'  {etiqueta:<42} p50={p50:7.2f} ms  p99={p99:7.2f} ms')
+
+    print(f'Servidor {args.servidor}, {args.conexiones:,} conexiones SSE')
+    await asyncio.to_thread(medir_peticiones, 'peticiones sin streams abiertos')
+
+    recibidos, abiertas = [], 0
+
+    def listo():
+        nonlocal abiertas
+        abiertas += 1
+
+    inicio = time.perf_counter()
+    tareas = []
+    for i in range(args.conexiones):
+        tareas.append(asyncio.create_task(abrir_stream(host, puerto, cookie_receptor, recibidos, listo)))
+        if i % 200 == 199:
+            await asyncio.sleep(0.05)  # No desbordar la cola de accept del servidor.
+    while abiertas < args.conexiones and time.perf_counter() - inicio < args.espera:
+        await asyncio.sleep(0.1)
+    print(f'  {abiertas:,} streams abiertos en {time.perf_counter() - inicio:.1f} s')
+
+    await asyncio.to_thread(medir_peticiones, f'peticiones con {abiertas:,} streams abiertos')
+
+    for _ in range(args.mensajes):
+        recibidos.clear()
+        estado, _ = await asyncio.to_thread(peticion, host, puerto, 'POST',
+                                            f'/mensajes/conversaciones/{conversacion_id}/mensajes',
+                                            cookie_remitente, {'texto': 'prueba de carga'})
+        enviado = time.perf_counter()
+        while len(recibidos) < abiertas and time.perf_counter() - enviado < args.espera:
+            await asyncio.sleep(0.01)
+        if recibidos:
+            ultimo = (max(recibidos) - enviado) * 1000
+            print(f'  mensaje (HTTP {estado}) entregado a {len(recibidos):,}/{abiertas:,} streams; '
+                  f'último a los {ultimo:.0f} ms')
+        else:
+            print(f'  mensaje (HTTP {estado}) no llegó a ningún stream')
+
+    for tarea in tareas:
+        tarea.cancel()
+    await asyncio.gather(*tareas, return_exceptions=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--servidor', default='http://127.0.0.1:8000')
+    parser.add_argument('--conexiones', type=int, default=2000)
+    parser.add_argument('--peticiones', type=int, default=200, help='Peticiones normales a medir en cada fase.')
+    parser.add_argument('--mensajes', type=int, default=3)
+    parser.add_argument('--espera', type=float, default=30.0, help='Segundos máximos para abrir streams y entregar.')
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+"""Bytes transferidos al cargar la página principal, antes y después del pipeline de estáticos.
+
+Renderiza '/' con el cliente de pruebas de Flask, recorre los recursos que
+cargaría un navegador (hojas de estilo, scripts, imágenes, la fuente del video
+y los url() de las hojas de estilo) y los pide con las cabeceras de un navegador
+actual (Accept-Encoding: gzip, br; Accept: image/avif, image/webp). En los
+<picture> elige la fuente y el ancho como lo haría el navegador según el ancho de
+la ventana y la densidad de píxeles.
+
+Compara dos escenarios:
+    antes     los archivos originales con el manejador estático de Flask,
+    después   los archivos de Static/dist (ejecutar antes 'flask assets build').
+y para cada uno la primera visita y una visita repetida (caché del navegador).
+
+Uso:
+    python scripts/report_assets.py --ancho 1280 --dpr 1
+"""
+import argparse
+import gzip
+import os
+import re
+import sys
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urlparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+CABECERAS = {
+    'Accept-Encoding': 'gzip, deflate, br',
+    'Accept': 'image/avif,image/webp,image/apng,*/*;q=0.8',
+}
+TIPOS_SOPORTADOS = {'image/avif', 'image/webp'}
+URL_CSS = re.compile(r'''url\(\s*['"]?([^'")]+)['"]?\s*\)''')
+
+
+class Recursos(HTMLParser):
+    """Recoge las URL que un navegador descargaría al cargar la página."""
+
+    def __init__(self, ancho, dpr):
+        super().__init__()
+        self.ancho, self.dpr = ancho, dpr
+        self.urls = []
+        self._picture = None  # URL elegida dentro del <picture> actual
+
+    def handle_starttag(self, tag, attrs):
+        a = dict(attrs)
+        if tag == 'link' and a.get('href') and set(a.get('rel', '').split()) & {'stylesheet', 'icon', 'preload'}:
+            self.urls.append(a['href'])
+        elif tag == 'script' and a.get('src'):
+            self.urls.append(a['src'])
+        elif tag == 'picture':
+            self._picture = ''
+        elif tag == 'source' and self._picture is not None:
+            if not self._picture and a.get('type') in TIPOS_SOPORTADOS and a.get('srcset'):
+                self._picture = self._elegir(a['srcset'], a.get('sizes', '100vw'))
+        elif tag == 'source' and a.get('src'):
+            self.urls.append(a['src'])  # <video><source>
+        elif tag == 'img' and a.get('src'):
+            if self._picture:
+                self.urls.append(self._picture)
+            else:
+                self.urls.append(a['src'])
+
+    def handle_endtag(self, tag):
+        if tag == 'picture':
+            self._picture = None
+
+    def _elegir(self, srcset, sizes):
+        """Candidato más pequeño que cubre el ancho mostrado × densidad (o el mayor disponible)."""
+        tamano = sizes.strip().split()[-1]
+        if tamano.endswith('vw'):
+            mostrado = self.ancho * float(tamano[:-2]) / 100
+        else:
+            mostrado = float(tamano.rstrip('px'))
+        necesario = mostrado * self.dpr
+        candidatos = sorted(
+            (int(descriptor.rstrip('w')), url)
+            for url, descriptor in (parte.strip().rsplit(' ', 1) for parte in srcset.split(','))
+        )
+        for ancho, url in candidatos:
+            if ancho >= necesario:
+                return url
+        return candidatos[-1][1]
+
+
+def cargar_pagina(cliente, ancho, dpr, cache):
+    """Carga '/' y sus recursos usando 'cache' como caché del navegador (y guardando en ella)."""
+    filas = []
+    pendientes = ['/']
+    vistos = set()
+    while pendientes:
+        url = pendientes.pop(0)
+        if url in vistos or urlparse(url).scheme in ('http', 'https', 'data') or url.startswith('//'):
+            continue
+        vistos.add(url)
+        cabeceras = dict(CABECERAS)
+        anterior = cache.get(url)
+        if anterior is not None:
+            control = anterior.headers.get('Cache-Control', '')
+            if 'immutable' in control or re.search(r'max-age=[1-9]', control):
+                filas.append((url, 'caché', 0, 0))
+                continue
+            if anterior.headers.get('ETag'):
+                cabeceras['If-None-Match'] = anterior.headers['ETag']
+            if anterior.headers.get('Last-Modified'):
+                cabeceras['If-Modified-Since'] = anterior.headers['Last-Modified']
+        respuesta = cliente.get(url, headers=cabeceras)
+        cuerpo = respuesta.get_data()
+        filas.append((url, respuesta.status_code, len(cuerpo), 1))
+        if respuesta.status_code == 200:
+            cache[url] = respuesta
+
+        # Con 304 el navegador usa la copia que ya tiene para descubrir los demás recursos.
+        vigente = respuesta if respuesta.status_code == 200 else anterior if respuesta.status_code == 304 else None
+        if vigente is not None and vigente.mimetype in ('text/html', 'text/css'):
+            texto = _decodificar(vigente, vigente.get_data())
+            if vigente.mimetype == 'text/html':
+                parser = Recursos(ancho, dpr)
+                parser.feed(texto)
+                pendientes.extend(parser.urls)
+            else:
+                pendientes.extend(urljoin(url, u) for u in URL_CSS.findall(texto))
+    return filas
+
+
+def _decodificar(respuesta, cuerpo):
+    codificacion = respuesta.headers.get('Content-Encoding')
+    if codificacion == 'gzip':
+        cuerpo = gzip.decompress(cuerpo)
+    elif codificacion == 'br':
+        import brotli
+        cuerpo = brotli.decompress(cuerpo)
+    return cuerpo.decode('utf-8', errors='replace')
+
+
+def resumen(etiqueta, filas, detalle):
+    total = sum(bytes_ for _, _, bytes_, _ in filas)
+    peticiones = sum(n for *_, n in filas)
+    print(f'\n=== {etiqueta}: {peticiones} peticiones, {total / 1024:,.0f} KB ===')
+    if detalle:
+        for url, estado, bytes_, _ in filas:
+            print(f'  {estado!s:>5} {bytes_ / 1024:10,.1f} KB  {url}')
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--ancho', type=int, default=1280, help='Ancho de la ventana en píxeles CSS.')
+    parser.add_argument('--dpr', type=float, default=1.0, help='Densidad de píxeles del dispositivo.')
+    parser.add_argument('--detalle', action='store_true', help='Lista cada recurso.')
+    args = parser.parse_args()
+
+    from play import app
+    from assets import assets
+    cliente = app.test_client()
+    totales = {}
+    for escenario, habilitado in (('antes', False), ('después', True)):
+        app.config['ASSETS_ENABLED'] = habilitado
+        assets.cargar(app)
+        if habilitado and assets.manifiesto is None:
+            print("\n⚠️  No existe Static/dist/manifest.json: ejecute primero 'flask assets build'.")
+            break
+        cache = {}
+        primera = cargar_pagina(cliente, args.ancho, args.dpr, cache)
+        repetida = cargar_pagina(cliente, args.ancho, args.dpr, cache)
+        sin_video = sum(b for url, _, b, _ in primera if not url.endswith('.mp4'))
+        totales[escenario] = (resumen(f'{escenario} - primera visita', primera, args.detalle),
+                              resumen(f'{escenario} - visita repetida', repetida, args.detalle), sin_video)
+
+    if len(totales) == 2:
+        (a1, a2, av), (d1, d2, dv) = totales['antes'], totales['después']
+        print(f'\nPrimera visita: {a1 / 1024:,.0f} KB -> {d1 / 1024:,.0f} KB ({100 * (1 - d1 / a1):.0f}% menos)')
+        print(f'Primera visita sin el video: {av / 1024:,.0f} KB -> {dv / 1024:,.0f} KB ({100 * (1 - dv / av):.0f}% menos)')
+        print(f'Visita repetida: {a2 / 1024:,.0f} KB -> {d2 / 1024:,.0f} KB')
+        print('(El video se transfiere completo en ambos casos: ya viene comprimido en H.264.)')
+
+
+if __name__ == '__main__':
+    main()
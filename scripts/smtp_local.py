@@ -0,0 +1,125 @@
+"""Servidor SMTP local de reemplazo para probar la cola de correos.
+
+No envía nada: acepta los mensajes, los cuenta y opcionalmente simula la latencia
+de un relay real o fallos aleatorios.
+
+Uso:
+    python scripts/smtp_local.py --port 2525 --delay 0.2
+    python scripts/smtp_local.py --port 2525 --fail-rate 0.1 --demo 200
+
+Con --demo N arranca el servidor, encola N correos a través de la app (con
+MAIL_SERVER=localhost y MAIL_USE_TLS=false) y muestra los contadores de la cola.
+"""
+import argparse
+import os
+import random
+import socketserver
+import sys
+import threading
+import time
+
+recibidos = 0
+conexiones = 0
+_lock = threading.Lock()
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    delay = 0.0
+    fail_rate = 0.0
+
+    def reply(self, line):
+        self.wfile.write(line.encode() + b'\r\n')
+
+    def handle(self):
+        global recibidos, conexiones
+        with _lock:
+            conexiones += 1
+        time.sleep(self.delay)  # Simula el handshake con el relay.
+        self.reply('220 localhost ESMTP stand-in')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            cmd = line.decode(errors='replace').strip().upper()
+            if cmd.startswith('EHLO') or cmd.startswith('HELO'):
+                self.reply('250 localhost')
+            elif cmd.startswith('MAIL') or cmd.startswith('RCPT') or cmd.startswith('RSET') or cmd.startswith('NOOP'):
+                self.reply('250 OK')
+            elif cmd == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                while self.rfile.readline() not in (b'.\r\n', b'.\n', b''):
+                    pass
+                if random.random() < self.fail_rate:
+                    self.reply('451 Temporary failure')
+                    continue
+                with _lock:
+                    recibidos += 1
+                self.reply('250 Queued')
+            elif cmd == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('502 Command not implemented')
+
+
+class ThreadedSMTPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+def run_demo(port, total):
+    os.environ.update({
+        'MAIL_SERVER': 'localhost',
+        'MAIL_PORT': str(port),
+        'MAIL_USE_TLS': 'false',
+        'MAIL_USERNAME': 'demo@mineconect.local',
+        'MAIL_QUEUE_BACKOFF': '0.05',
+    })
+    os.environ.setdefault('DATABASE_URL', 'sqlite://')
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+    from play import create_app
+    from mail_queue import mail_dispatcher
+    app = create_app()
+
+    inicio = time.perf_counter()
+    with app.app_context():
+        for i in range(total):
+            mail_dispatcher.enqueue(mail_dispatcher.message(subject=f'Prueba {i}', recipients=[f'usuario{i}@example.com'], body='hola'))
+    encolado = time.perf_counter() - inicio
+    mail_dispatcher.join(timeout=120)
+    time.sleep(1)  # Deja terminar los reintentos programados.
+    total_tiempo = time.perf_counter() - inicio
+
+    print(f'Encolados {total} correos en {encolado * 1000:.1f} ms ({encolado / total * 1e6:.0f} µs por correo)')
+    print(f'Entregados {recibidos} en {total_tiempo:.2f} s usando {conexiones} conexiones SMTP')
+    for clave, valor in mail_dispatcher.stats().items():
+        print(f'  {clave}: {valor}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=2525)
+    parser.add_argument('--delay', type=float, default=0.0, help='Segundos de espera por conexión (simula TLS).')
+    parser.add_argument('--fail-rate', type=float, default=0.0, help='Probabilidad de responder 451 a un DATA.')
+    parser.add_argument('--demo', type=int, default=0, help='Encola N correos contra el servidor y muestra las métricas.')
+    args = parser.parse_args()
+
+    SMTPHandler.delay = args.delay
+    SMTPHandler.fail_rate = args.fail_rate
+    server = ThreadedSMTPServer(('localhost', args.port), SMTPHandler)
+
+    if args.demo:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        run_demo(args.port, args.demo)
+        server.shutdown()
+        return
+
+    print(f'Servidor SMTP de prueba escuchando en localhost:{args.port}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
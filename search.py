@@ -0,0 +1,477 @@
+# Búsqueda de texto completo sobre proyectos de emprendedores e instituciones.
+#
+# En PostgreSQL se usa to_tsvector('spanish', ...) con índices GIN sobre la
+# misma expresión (migración 0004) y unaccent para ignorar tildes. En SQLite y
+# en desarrollo se usa un índice invertido en memoria con el mismo
+# comportamiento: sin tildes, con raíces en español, ranking BM25 y paginación,
+# actualizado en cada commit que toca un documento.
+#
+# El índice se construye con la primera búsqueda del proceso. Después un hilo lo
+# reconstruye cada SEARCH_REBUILD_INTERVAL segundos (recoge los cambios de otros
+# workers) fuera de las peticiones: el índice nuevo se arma aparte y se
+# intercambia bajo el lock, así las búsquedas siguen usando el anterior entero
+# mientras tanto. Los cambios de este proceso que llegan durante la reconstrucción
+# se vuelven a aplicar sobre el índice nuevo.
+import heapq
+import logging
+import math
+import re
+import threading
+import time
+import unicodedata
+from array import array
+from bisect import bisect_left, insort
+
+from flask import Blueprint, current_app, jsonify, request
+from sqlalchemy import event, literal, literal_column, union_all
+
+from extensions import db
+from models import Emprendedor, Institucion
+
+logger = logging.getLogger(__name__)
+
+# --- Análisis de texto ---
+
+STOPWORDS = frozenset("""
+a al algo algun alguna algunas alguno algunos ante antes como con contra cual cuando de del desde donde
+durante e el ella ellas ellos en entre era es esa esas ese eso esos esta estas este esto estos fue ha hay
+la las le les lo los mas me mi muy nada ni no nos o otra otro para pero poco por porque que se segun ser
+si sin sobre son su sus tambien te tiene tu un una unas uno unos y ya
+""".split())
+
+_TOKEN = re.compile(r'[a-z0-9]+')
+# Sufijos derivativos frecuentes, del más largo al más corto.
+_SUFIJOS = ('amientos', 'imientos', 'amiento', 'imiento', 'aciones', 'uciones', 'acion', 'ucion',
+            'mente', 'idades', 'idad', 'ivas', 'ivos', 'iva', 'ivo', 'ables', 'ibles', 'able', 'ible',
+            'istas', 'ista', 'ando', 'iendo', 'ados', 'idos', 'adas', 'idas', 'ado', 'ido', 'ada', 'ida')
+
+
+def normalizar(texto):
+    """Minúsculas y sin tildes ('Minería' -> 'mineria')."""
+    texto = unicodedata.normalize('NFKD', (texto or '').lower())
+    return ''.join(c for c in texto if not unicodedata.combining(c))
+
+
+def raiz(palabra):
+    """Stemmer ligero para español: quita un sufijo derivativo y el plural."""
+    for sufijo in _SUFIJOS:
+        if palabra.endswith(sufijo) and len(palabra) - len(sufijo) >= 4:
+            return palabra[:-len(sufijo)]
+    if len(palabra) > 4 and palabra.endswith('es'):
+        return palabra[:-2]
+    if len(palabra) > 3 and palabra.endswith('s'):
+        return palabra[:-1]
+    return palabra
+
+
+def analizar(texto):
+    """Lista de términos (raíces) de un texto, sin palabras vacías."""
+    return [raiz(t) for t in _TOKEN.findall(normalizar(texto)) if t not in STOPWORDS and len(t) > 1]
+
+
+# --- Índice invertido en memoria ---
+
+class InvertedIndex:
+    """Índice invertido con ranking BM25.
+
+    Cada documento recibe un id interno creciente; las listas de posteo guardan
+    ids y pesos en arrays compactos ordenados por id. Actualizar un documento
+    lo marca como borrado y lo vuelve a insertar con un id nuevo, así las
+    listas solo crecen por el final; se compactan cuando los borrados superan
+    una cuarta parte.
+    """
+
+    K1 = 1.2
+    B = 0.75
+    LIMITE_EXACTO = 5000     # Términos más frecuentes se puntúan con sus listas de campeones.
+    CAMPEONES = 1000
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._diario = None  # Cambios recibidos durante cargar(), para aplicarlos al índice nuevo
+        self.limpiar()
+
+    def limpiar(self):
+        with self._lock:
+            self._postings = {}        # término -> (array ids internos, array pesos)
+            self._campeones = {}       # término frecuente -> [(peso, id interno)] ascendente, los de mayor peso
+            self._claves = []          # id interno -> clave externa (None si está borrado)
+            self._interno = {}         # clave externa -> id interno vivo
+            self._longitud_total = 0
+            self._borrados = 0
+
+    def __len__(self):
+        return len(self._interno)
+
+    def cargar(self, documentos):
+        """Reemplaza todo el contenido por los documentos (clave, texto).
+
+        El índice nuevo se construye aparte; las búsquedas siguen viendo el
+        anterior completo hasta el intercambio.
+        """
+        with self._lock:
+            self._diario = []
+        nuevo = InvertedIndex()
+        try:
+            for clave, texto in documentos:
+                nuevo.agregar(clave, texto)
+        except BaseException:
+            with self._lock:
+                self._diario = None
+            raise
+        with self._lock:
+            diario, self._diario = self._diario, None
+            for clave, texto in diario:
+                if texto is None:
+                    nuevo.eliminar(clave)
+                else:
+                    nuevo.agregar(clave, texto)
+            self._postings, self._campeones = nuevo._postings, nuevo._campeones
+            self._claves, self._interno = nuevo._claves, nuevo._interno
+            self._longitud_total, self._borrados = nuevo._longitud_total, nuevo._borrados
+
+    def agregar(self, clave, texto):
+        """Indexa (o reindexa) un documento. La clave es cualquier valor hashable."""
+        terminos = analizar(texto)
+        with self._lock:
+            if self._diario is not None:
+                self._diario.append((clave, texto))
+            self._borrar(clave)
+            doc = len(self._claves)
+            self._claves.append(clave)
+            self._interno[clave] = doc
+            frecuencias = {}
+            for t in terminos:
+                frecuencias[t] = frecuencias.get(t, 0) + 1
+            self._longitud_total += len(terminos)
+            promedio = self._longitud_total / len(self._interno)
+            norma = self.K1 * (1 - self.B + self.B * len(terminos) / promedio)
+            for t, tf in frecuencias.items():
+                if t not in self._postings:
+                    self._postings[t] = (array('I'), array('f'))
+                ids, pesos = self._postings[t]
+                peso = tf * (self.K1 + 1) / (tf + norma)
+                ids.append(doc)
+                pesos.append(peso)
+                campeones = self._campeones.get(t)
+                if campeones is not None:
+                    if len(campeones) < self.CAMPEONES or peso > campeones[0][0]:
+                        insort(campeones, (peso, doc))
+                        if len(campeones) > self.CAMPEONES:
+                            del campeones[0]
+                elif len(ids) > self.LIMITE_EXACTO:
+                    self._lista_campeones(t)
+
+    def eliminar(self, clave):
+        with self._lock:
+            if self._diario is not None:
+                self._diario.append((clave, None))
+            self._borrar(clave)
+
+    def buscar(self, consulta, pagina=1, por_pagina=10, filtro=None):
+        """Documentos que contienen todos los términos, ordenados por relevancia.
+
+        Devuelve (total, [(clave, puntaje), ...], aproximado). 'filtro' es una
+        función opcional clave -> bool (por ejemplo, por tipo de documento).
+        """
+        terminos = list(dict.fromkeys(analizar(consulta)))
+        with self._lock:
+            if not terminos or any(t not in self._postings for t in terminos):
+                return 0, [], False
+            terminos.sort(key=lambda t: len(self._postings[t][0]))
+            n = max(len(self._interno), 1)
+            idf = {t: math.log(1 + (n - len(self._postings[t][0]) + 0.5) / (len(self._postings[t][0]) + 0.5))
+                   for t in terminos}
+
+            raro_ids, raro_pesos = self._postings[terminos[0]]
+            aproximado = len(raro_ids) > self.LIMITE_EXACTO
+            if aproximado:
+                candidatos = sorted({d for t in terminos for d in self._lista_campeones(t)})
+                iniciales = [(d, self._peso(terminos[0], d)) for d in candidatos]
+            else:
+                iniciales = zip(raro_ids, raro_pesos)
+
+            resultados = []
+            for doc, peso in iniciales:
+                clave = self._claves[doc]
+                if clave is None or peso is None or (filtro is not None and not filtro(clave)):
+                    continue
+                puntaje = peso * idf[terminos[0]]
+                for t in terminos[1:]:
+                    otro = self._peso(t, doc)
+                    if otro is None:
+                        break
+                    puntaje += otro * idf[t]
+                else:
+                    resultados.append((clave, puntaje))
+
+        resultados.sort(key=lambda par: -par[1])
+        inicio = (pagina - 1) * por_pagina
+        return len(resultados), resultados[inicio:inicio + por_pagina], aproximado
+
+    # --- Funcionamiento interno ---
+
+    def _borrar(self, clave):
+        doc = self._interno.pop(clave, None)
+        if doc is not None:
+            self._claves[doc] = None
+            self._borrados += 1
+            if self._borrados > 1000 and self._borrados > len(self._claves) // 4:
+                self._compactar()
+
+    def _peso(self, termino, doc):
+        """Peso del término en el documento (búsqueda binaria en la lista ordenada por id)."""
+        ids, pesos = self._postings[termino]
+        i = bisect_left(ids, doc)
+        if i < len(ids) and ids[i] == doc:
+            return pesos[i]
+        return None
+
+    def _lista_campeones(self, termino):
+        """Ids vivos con mayor peso para el término.
+
+        Se calcula una vez cuando el término supera LIMITE_EXACTO y luego se
+        mantiene al insertar; los borrados se filtran al leer.
+        """
+        campeones = self._campeones.get(termino)
+        if campeones is None:
+            ids, pesos = self._postings[termino]
+            vivos = ((peso, doc) for peso, doc in zip(pesos, ids) if self._claves[doc] is not None)
+            campeones = sorted(heapq.nlargest(self.CAMPEONES, vivos))
+            self._campeones[termino] = campeones
+        return [doc for _, doc in campeones if self._claves[doc] is not None]
+
+    def _compactar(self):
+        """Reconstruye el índice sin los documentos borrados."""
+        vivos = [(clave, doc) for clave, doc in self._interno.items()]
+        viejos_postings = self._postings
+        self._postings, self._campeones = {}, {}
+        self._claves, self._interno = [], {}
+        self._borrados = 0
+        remapeo = {}
+        for clave, doc in sorted(vivos, key=lambda par: par[1]):
+            nuevo = len(self._claves)
+            remapeo[doc] = nuevo
+            self._claves.append(clave)
+            self._interno[clave] = nuevo
+        for termino, (ids, pesos) in viejos_postings.items():
+            nuevos_ids, nuevos_pesos = array('I'), array('f')
+            for doc, peso in zip(ids, pesos):
+                if doc in remapeo:
+                    nuevos_ids.append(remapeo[doc])
+                    nuevos_pesos.append(peso)
+            if nuevos_ids:
+                self._postings[termino] = (nuevos_ids, nuevos_pesos)
+
+
+# --- Documentos indexados ---
+
+# tipo -> (modelo, columnas de texto, columna del título mostrado)
+DOCUMENTOS = {
+    'emprendedor': (Emprendedor, ('titulo_proyecto', 'descripcion_proyecto'), 'titulo_proyecto'),
+    'institucion': (Institucion, ('area_especializacion', 'descripcion'), 'nombre_completo'),
+}
+
+# Deben coincidir exactamente con las expresiones de los índices GIN de la migración 0004.
+EXPRESIONES_PG = {
+    'emprendedor': "to_tsvector('spanish'::regconfig, f_unaccent(coalesce(emprendedores.titulo_proyecto, '') "
+                   "|| ' ' || coalesce(emprendedores.descripcion_proyecto, '')))",
+    'institucion': "to_tsvector('spanish'::regconfig, f_unaccent(coalesce(instituciones.area_especializacion, '') "
+                   "|| ' ' || coalesce(instituciones.descripcion, '')))",
+}
+
+search_index = InvertedIndex()
+_estado = {'construido_en': None, 'hilo': None}
+_construccion = threading.Lock()  # La primera construcción, una sola vez aunque lleguen varias búsquedas
+
+
+def _texto(obj, columnas):
+    return ' '.join(getattr(obj, c) or '' for c in columnas)
+
+
+def _documentos():
+    for tipo, (modelo, columnas, _) in DOCUMENTOS.items():
+        stmt = db.select(modelo.id, *[getattr(modelo, c) for c in columnas]).execution_options(yield_per=5000)
+        for fila in db.session.execute(stmt):
+            yield (tipo, fila[0]), ' '.join(v or '' for v in fila[1:])
+
+
+def construir_desde_bd():
+    """Reconstruye el índice en memoria leyendo los documentos por lotes."""
+    search_index.cargar(_documentos())
+    _estado['construido_en'] = time.monotonic()
+    return len(search_index)
+
+
+def _usa_postgres():
+    return db.engine.dialect.name == 'postgresql'
+
+
+def _asegurar_indice():
+    """Construye el índice con la primera búsqueda y arranca el hilo que lo refresca."""
+    if _estado['construido_en'] is None:
+        with _construccion:
+            if _estado['construido_en'] is None:
+                construir_desde_bd()
+    if _estado['hilo'] is None and current_app.config['SEARCH_REBUILD_INTERVAL']:
+        with _construccion:
+            if _estado['hilo'] is None:
+                # Nace con la primera búsqueda, ya dentro del worker (después del fork).
+                _estado['hilo'] = threading.Thread(target=_refrescar, args=(current_app._get_current_object(),),
+                                                   name='search-rebuild', daemon=True)
+                _estado['hilo'].start()
+
+
+def _refrescar(app):
+    while True:
+        time.sleep(app.config['SEARCH_REBUILD_INTERVAL'])
+        with app.app_context():
+            try:
+                construir_desde_bd()
+            except Exception as e:  # El hilo de refresco nunca debe morir.
+                logger.error(f"❌ Error al reconstruir el índice de búsqueda: {e}")
+            finally:
+                db.session.remove()
+
+
+def buscar(consulta, tipo=None, pagina=1, por_pagina=10):
+    """Busca en proyectos e instituciones. Devuelve (total, resultados, aproximado).
+
+    Cada resultado es un dict con tipo, id, titulo y puntaje.
+    """
+    tipos = [tipo] if tipo else list(DOCUMENTOS)
+    if _usa_postgres():
+        return _buscar_postgres(consulta, tipos, pagina, por_pagina)
+
+    _asegurar_indice()
+    filtro = (lambda clave: clave[0] == tipo) if tipo else None
+    total, encontrados, aproximado = search_index.buscar(consulta, pagina, por_pagina, filtro)
+
+    # Los títulos se leen con una consulta por tipo, solo para la página pedida.
+    titulos = {}
+    for t in tipos:
+        modelo, _, col_titulo = DOCUMENTOS[t]
+        ids = [i for (tt, i), _ in encontrados if tt == t]
+        if ids:
+            for obj_id, titulo in db.session.execute(db.select(modelo.id, getattr(modelo, col_titulo)).where(modelo.id.in_(ids))):
+                titulos[(t, obj_id)] = titulo
+    resultados = [
+        {'tipo': t, 'id': obj_id, 'titulo': titulos.get((t, obj_id)), 'puntaje': round(p, 4)}
+        for (t, obj_id), p in encontrados
+    ]
+    return total, resultados, aproximado
+
+
+def _buscar_postgres(consulta, tipos, pagina, por_pagina):
+    tsquery = db.func.websearch_to_tsquery(literal_column("'spanish'::regconfig"), db.func.f_unaccent(consulta))
+    selects = []
+    for t in tipos:
+        modelo, _, col_titulo = DOCUMENTOS[t]
+        vector = literal_column(EXPRESIONES_PG[t])
+        selects.append(
+            db.select(
+                literal(t).label('tipo'),
+                modelo.id.label('id'),
+                getattr(modelo, col_titulo).label('titulo'),
+                db.func.ts_rank(vector, tsquery).label('puntaje'),
+            ).where(vector.op('@@')(tsquery))
+        )
+    unidos = union_all(*selects).subquery()
+    stmt = (
+        db.select(unidos, db.func.count().over().label('total'))
+        .order_by(unidos.c.puntaje.desc(), unidos.c.tipo, unidos.c.id)
+        .limit(por_pagina)
+        .offset((pagina - 1) * por_pagina)
+    )
+    filas = db.session.execute(stmt).all()
+    total = filas[0].total if filas else 0
+    resultados = [
+        {'tipo': f.tipo, 'id': f.id, 'titulo': f.titulo, 'puntaje': round(float(f.puntaje), 4)} for f in filas
+    ]
+    return total, resultados, False
+
+
+# --- Actualización incremental a partir de la sesión ---
+
+def _registrar_cambios(session, flush_context):
+    tocados = session.info.setdefault('search_tocados', set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        for tipo, (modelo, _, _) in DOCUMENTOS.items():
+            if isinstance(obj, modelo):
+                tocados.add((tipo, obj.id))
+
+
+def _leer_tocados(session, flush_context):
+    tocados = session.info.pop('search_tocados', None)
+    if not tocados:
+        return
+    pendientes = session.info.setdefault('search_pendientes', {})
+    for tipo, obj_id in tocados:
+        modelo, columnas, _ = DOCUMENTOS[tipo]
+        obj = session.get(modelo, obj_id)
+        pendientes[(tipo, obj_id)] = None if obj is None or obj in session.deleted else _texto(obj, columnas)
+
+
+def _aplicar_cambios(session):
+    pendientes = session.info.pop('search_pendientes', None)
+    if not pendientes or _estado['construido_en'] is None:
+        return
+    for clave, texto in pendientes.items():
+        if texto is None:
+            search_index.eliminar(clave)
+        else:
+            search_index.agregar(clave, texto)
+
+
+def _descartar_cambios(session):
+    session.info.pop('search_tocados', None)
+    session.info.pop('search_pendientes', None)
+
+
+# --- Integración con Flask ---
+
+bp = Blueprint('search', __name__, cli_group=None)
+
+
+def init_app(app):
+    """Registra la ruta de búsqueda y, para el índice en memoria, los eventos de sesión."""
+    app.config.setdefault('SEARCH_REBUILD_INTERVAL', 300)
+    app.config.setdefault('SEARCH_MAX_PER_PAGE', 50)
+    sesion = db.session.session_factory.class_
+    if not event.contains(sesion, 'after_flush', _registrar_cambios):
+        event.listen(sesion, 'after_flush', _registrar_cambios)
+        event.listen(sesion, 'after_flush_postexec', _leer_tocados)
+        event.listen(sesion, 'after_commit', _aplicar_cambios)
+        event.listen(sesion, 'after_rollback', _descartar_cambios)
+    app.register_blueprint(bp)
+
+
+@bp.route('/buscar')
+def buscar_endpoint():
+    """Búsqueda paginada: /buscar?q=texto&tipo=emprendedor|institucion&pagina=1&por_pagina=10"""
+    consulta = (request.args.get('q') or '').strip()
+    tipo = request.args.get('tipo') or None
+    if not consulta:
+        return jsonify({'success': False, 'message': 'Escribe algo para buscar.'}), 400
+    if tipo is not None and tipo not in DOCUMENTOS:
+        return jsonify({'success': False, 'message': 'Tipo de búsqueda no válido.'}), 400
+
+    pagina = max(request.args.get('pagina', 1, type=int), 1)
+    por_pagina = min(max(request.args.get('por_pagina', 10, type=int), 1), current_app.config['SEARCH_MAX_PER_PAGE'])
+    total, resultados, aproximado = buscar(consulta, tipo, pagina, por_pagina)
+    return jsonify({
+        'success': True,
+        'total': total,
+        'aproximado': aproximado,
+        'pagina': pagina,
+        'por_pagina': por_pagina,
+        'resultados': resultados,
+    })
+
+
+@bp.cli.command('rebuild-search-index')
+def rebuild_search_index():
+    """Reconstruye el índice de búsqueda en memoria (solo aplica fuera de PostgreSQL)."""
+    inicio = time.perf_counter()
+    total = construir_desde_bd()
+    print(f"✅ Índice de búsqueda reconstruido: {total} documentos en {time.perf_counter() - inicio:.2f} s")
@@ -0,0 +1,376 @@
+# Telemetría por petición y endpoint /metrics en formato Prometheus.
+#
+# Cada petición acumula "spans" ligeros: tiempo en la base de datos (y número de
+# consultas), renderizado de plantillas, envío SMTP y hash de contraseñas. Al
+# terminar se observan en histogramas por ruta, de modo que un /login lento se
+# puede atribuir a scrypt, a la BD, a render_template o a mail.send.
+#
+# Los spans se registran con span('nombre') o add_span('nombre', segundos) desde
+# cualquier módulo; fuera de una petición (p. ej. los hilos de la cola de
+# correos) solo cuentan en el histograma global por span.
+#
+# Opcionalmente se perfila con cProfile una fracción de las peticiones y se
+# guarda el perfil de las que superan el umbral de lentitud.
+#
+# Los contadores son del proceso: con varios workers, Prometheus debe consultar
+# cada uno o agregarse detrás de un proxy.
+#
+# /metrics solo responde a los administradores o a quien envíe la cabecera
+# 'Authorization: Bearer <TELEMETRY_METRICS_TOKEN>' (la que configura Prometheus
+# con bearer_token).
+import cProfile
+import hmac
+import logging
+import os
+import random
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from flask import Blueprint, before_render_template, current_app, jsonify, request, template_rendered
+
+logger = logging.getLogger(__name__)
+
+bp = Blueprint('telemetry', __name__, cli_group=None)
+
+SPANS = ('db', 'template', 'smtp', 'hashing')
+BUCKETS_SEGUNDOS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_CONSULTAS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+# Medición de la petición en curso (None fuera de una petición o con la telemetría apagada).
+_actual = ContextVar('telemetria_peticion', default=None)
+
+
+class _Medicion:
+    __slots__ = ('inicio', 'spans', 'consultas', 'estado', 'perfil', 'plantillas')
+
+    def __init__(self, inicio):
+        self.inicio = inicio
+        self.spans = {}
+        self.consultas = 0
+        self.estado = 500  # Si no llega a after_request es que hubo una excepción.
+        self.perfil = None
+        self.plantillas = []
+
+
+def add_span(nombre, segundos):
+    """Suma 'segundos' al span 'nombre' de la petición actual y al histograma global."""
+    if not telemetry.enabled:
+        return
+    medicion = _actual.get()
+    if medicion is not None:
+        medicion.spans[nombre] = medicion.spans.get(nombre, 0.0) + segundos
+        if nombre == 'db':
+            medicion.consultas += 1
+    telemetry.observe_span(nombre, segundos)
+
+
+@contextmanager
+def span(nombre):
+    """Mide el bloque como parte del span 'nombre'."""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_span(nombre, time.perf_counter() - inicio)
+
+
+class _Histograma:
+    __slots__ = ('conteos', 'suma', 'total')
+
+    def __init__(self, n_buckets):
+        self.conteos = [0] * (n_buckets + 1)
+        self.suma = 0.0
+        self.total = 0
+
+    def observar(self, buckets, valor):
+        self.conteos[bisect_left(buckets, valor)] += 1
+        self.suma += valor
+        self.total += 1
+
+
+class Telemetry:
+    """Middleware de telemetría por petición y registro de métricas para /metrics.
+
+    Se configura con app.config:
+        TELEMETRY_ENABLED               Si es False no se mide nada (por defecto True).
+        TELEMETRY_SLOW_REQUEST_MS       Peticiones más lentas se registran en el log con su desglose
+                                        (por defecto 1000; 0 desactiva).
+        TELEMETRY_PROFILE_SAMPLE_RATE   Fracción de peticiones que se ejecutan bajo cProfile (por defecto 0).
+        TELEMETRY_PROFILE_DIR           Dónde guardar los .prof de las peticiones lentas perfiladas
+                                        (por defecto <instance_path>/perfiles).
+        TELEMETRY_PROFILE_KEEP          Máximo de .prof guardados; se borran los más antiguos (por defecto 50).
+        TELEMETRY_SERVER_TIMING         Añade la cabecera Server-Timing con el desglose (por defecto False).
+        TELEMETRY_METRICS_TOKEN         Token con el que Prometheus lee /metrics sin sesión
+                                        (por defecto ninguno: solo los administradores).
+    """
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self._duracion = {}    # (ruta, método) -> _Histograma
+        self._peticiones = {}  # (ruta, método, estado) -> int
+        self._spans_ruta = {}  # (ruta, span) -> _Histograma
+        self._consultas = {}   # ruta -> _Histograma
+        self._spans = {}       # span -> _Histograma (también fuera de peticiones)
+        self._perfiles = 0
+        self.enabled = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('TELEMETRY_ENABLED', True)
+        app.config.setdefault('TELEMETRY_SLOW_REQUEST_MS', 1000)
+        app.config.setdefault('TELEMETRY_PROFILE_SAMPLE_RATE', 0.0)
+        app.config.setdefault('TELEMETRY_PROFILE_DIR', os.path.join(app.instance_path, 'perfiles'))
+        app.config.setdefault('TELEMETRY_PROFILE_KEEP', 50)
+        app.config.setdefault('TELEMETRY_SERVER_TIMING', False)
+        app.config.setdefault('TELEMETRY_METRICS_TOKEN', None)
+        app.extensions['telemetry'] = self
+        app.register_blueprint(bp)
+        # Los hooks se registran siempre; con enabled=False vuelven de inmediato.
+        self.enabled = app.config['TELEMETRY_ENABLED']
+        app.before_request(self._empezar)
+        app.after_request(self._respuesta)
+        app.teardown_request(self._terminar)
+        before_render_template.connect(_antes_de_plantilla, app)
+        template_rendered.connect(_plantilla_renderizada, app)
+
+    # --- Ciclo de la petición ---
+
+    def _empezar(self):
+        if not self.enabled:
+            return
+        medicion = _Medicion(time.perf_counter())
+        tasa = current_app.config['TELEMETRY_PROFILE_SAMPLE_RATE']
+        if tasa and random.random() < tasa:
+            perfil = cProfile.Profile()
+            try:
+                perfil.enable()
+                medicion.perfil = perfil
+            except ValueError:  # Ya hay otro perfilador activo en este hilo.
+                pass
+        request.environ['mineconect.telemetria'] = _actual.set(medicion)
+
+    def _respuesta(self, response):
+        medicion = _actual.get()
+        if medicion is not None:
+            medicion.estado = response.status_code
+            if current_app.config['TELEMETRY_SERVER_TIMING']:
+                response.headers['Server-Timing'] = _server_timing(medicion, time.perf_counter())
+        return response
+
+    def _terminar(self, exc):
+        medicion = _actual.get()
+        token = request.environ.pop('mineconect.telemetria', None)
+        if medicion is None or token is None:
+            return
+        try:
+            _actual.reset(token)
+        except ValueError:  # Respuestas en streaming: el generador terminó en otro contexto.
+            pass
+        duracion = time.perf_counter() - medicion.inicio
+        if medicion.perfil is not None:
+            medicion.perfil.disable()
+        ruta = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        self._observar_peticion(ruta, request.method, medicion, duracion)
+
+        umbral = current_app.config['TELEMETRY_SLOW_REQUEST_MS']
+        if umbral and duracion * 1000 >= umbral:
+            logger.warning(f"Petición lenta {request.method} {ruta} ({medicion.estado}) "
+                           f"{duracion * 1000:.0f} ms: {_desglose(medicion)}")
+            if medicion.perfil is not None:
+                self._guardar_perfil(medicion.perfil, ruta, duracion)
+
+    # --- Registro ---
+
+    def _observar_peticion(self, ruta, metodo, medicion, duracion):
+        with self._lock:
+            clave = (ruta, metodo)
+            histograma = self._duracion.get(clave)
+            if histograma is None:
+                histograma = self._duracion[clave] = _Histograma(len(BUCKETS_SEGUNDOS))
+            histograma.observar(BUCKETS_SEGUNDOS, duracion)
+
+            clave = (ruta, metodo, medicion.estado)
+            self._peticiones[clave] = self._peticiones.get(clave, 0) + 1
+
+            for nombre in SPANS:
+                clave = (ruta, nombre)
+                histograma = self._spans_ruta.get(clave)
+                if histograma is None:
+                    histograma = self._spans_ruta[clave] = _Histograma(len(BUCKETS_SEGUNDOS))
+                histograma.observar(BUCKETS_SEGUNDOS, medicion.spans.get(nombre, 0.0))
+
+            histograma = self._consultas.get(ruta)
+            if histograma is None:
+                histograma = self._consultas[ruta] = _Histograma(len(BUCKETS_CONSULTAS))
+            histograma.observar(BUCKETS_CONSULTAS, medicion.consultas)
+
+    def observe_span(self, nombre, segundos):
+        with self._lock:
+            histograma = self._spans.get(nombre)
+            if histograma is None:
+                histograma = self._spans[nombre] = _Histograma(len(BUCKETS_SEGUNDOS))
+            histograma.observar(BUCKETS_SEGUNDOS, segundos)
+
+    def _guardar_perfil(self, perfil, ruta, duracion):
+        carpeta = current_app.config['TELEMETRY_PROFILE_DIR']
+        nombre = re.sub(r'[^A-Za-z0-9_-]+', '_', f'{request.method}{ruta}').strip('_')
+        archivo = os.path.join(carpeta, f'{time.strftime("%Y%m%dT%H%M%S")}-{nombre}-{duracion * 1000:.0f}ms.prof')
+        try:
+            os.makedirs(carpeta, exist_ok=True)
+            perfil.dump_stats(archivo)
+            with self._lock:
+                self._perfiles += 1
+            guardados = sorted(os.path.join(carpeta, a) for a in os.listdir(carpeta) if a.endswith('.prof'))
+            for viejo in guardados[:-current_app.config['TELEMETRY_PROFILE_KEEP']]:
+                os.remove(viejo)
+            logger.info(f"Perfil de la petición guardado en {archivo}")
+        except OSError as e:
+            logger.error(f"❌ No se pudo guardar el perfil de la petición: {e}")
+
+    # --- Exportación ---
+
+    def render_prometheus(self, app):
+        """Todas las métricas en el formato de texto de Prometheus (versión 0.0.4)."""
+        lineas = []
+        with self._lock:
+            _histogramas(lineas, 'mineconect_http_request_duration_seconds',
+                         'Duración de las peticiones por ruta.', BUCKETS_SEGUNDOS,
+                         (({'route': r, 'method': m}, h) for (r, m), h in sorted(self._duracion.items())))
+            _metrica(lineas, 'mineconect_http_requests_total', 'counter', 'Peticiones por ruta y código de estado.',
+                     (({'route': r, 'method': m, 'status': str(e)}, n)
+                      for (r, m, e), n in sorted(self._peticiones.items())))
+            _histogramas(lineas, 'mineconect_http_request_span_seconds',
+                         'Tiempo de cada petición en BD, plantillas, SMTP y hashing, por ruta.', BUCKETS_SEGUNDOS,
+                         (({'route': r, 'span': s}, h) for (r, s), h in sorted(self._spans_ruta.items())))
+            _histogramas(lineas, 'mineconect_http_request_db_queries',
+                         'Consultas SQL por petición, por ruta.', BUCKETS_CONSULTAS,
+                         (({'route': r}, h) for r, h in sorted(self._consultas.items())))
+            _histogramas(lineas, 'mineconect_span_seconds',
+                         'Duración de cada span, dentro o fuera de una petición.', BUCKETS_SEGUNDOS,
+                         (({'span': s}, h) for s, h in sorted(self._spans.items())))
+            _metrica(lineas, 'mineconect_profiles_saved_total', 'counter',
+                     'Perfiles cProfile guardados de peticiones lentas.', [({}, self._perfiles)])
+
+        db_metrics = app.extensions.get('db_metrics')
+        if db_metrics is not None:
+            datos = db_metrics.stats()
+            for nombre, clave, tipo, ayuda in (
+                    ('mineconect_db_pool_in_use', 'in_use', 'gauge', 'Conexiones del pool en uso.'),
+                    ('mineconect_db_pool_checkouts_total', 'checkouts', 'counter', 'Conexiones sacadas del pool.'),
+                    ('mineconect_db_pool_checkout_wait_seconds_total', 'checkout_wait_total', 'counter',
+                     'Segundos esperando una conexión libre.'),
+                    ('mineconect_db_pool_checkout_timeouts_total', 'checkout_timeouts', 'counter',
+                     'Esperas por una conexión que agotaron el timeout.'),
+                    ('mineconect_db_pool_invalidated_total', 'invalidated', 'counter',
+                     'Conexiones descartadas por el pool.'),
+                    ('mineconect_db_slow_queries_total', 'slow_queries', 'counter',
+                     'Sentencias más lentas que DB_SLOW_QUERY_MS.')):
+                _metrica(lineas, nombre, tipo, ayuda, [({}, datos[clave])])
+        rate_limiter = app.extensions.get('rate_limiter')
+        if rate_limiter is not None:
+            datos = rate_limiter.stats()
+            _metrica(lineas, 'mineconect_ratelimit_limited_total', 'counter',
+                     'Peticiones rechazadas con 429, por regla.',
+                     (({'rule': regla}, n) for regla, n in sorted(datos['limited_by_rule'].items())))
+            _metrica(lineas, 'mineconect_ratelimit_shed_total', 'counter',
+                     'Peticiones rechazadas con 503 por saturación del hashing.', [({}, datos['shed'])])
+            _metrica(lineas, 'mineconect_hashing_in_flight', 'gauge',
+                     'Hashes de contraseña en curso o en espera.', [({}, datos['hashing_in_flight'])])
+        verification_codes = app.extensions.get('verification_codes')
+        if verification_codes is not None:
+            datos = verification_codes.stats()
+            _metrica(lineas, 'mineconect_verification_results_total', 'counter',
+                     'Comprobaciones de códigos de verificación, por resultado.',
+                     (({'result': r}, datos[r]) for r in ('verified', 'incorrect', 'locked', 'expired')))
+            if 'pending' in datos:
+                _metrica(lineas, 'mineconect_verification_pending', 'gauge',
+                         'Verificaciones de login pendientes en este proceso.', [({}, datos['pending'])])
+        mail_queue = app.extensions.get('mail_queue')
+        if mail_queue is not None:
+            _metrica(lineas, 'mineconect_mail_queue_depth', 'gauge', 'Correos pendientes en la cola.',
+                     [({}, mail_queue.stats()['queue_depth'])])
+        return '\n'.join(lineas) + '\n'
+
+
+def _antes_de_plantilla(app, template, context, **extra):
+    medicion = _actual.get()
+    if medicion is not None:
+        medicion.plantillas.append(time.perf_counter())
+
+
+def _plantilla_renderizada(app, template, context, **extra):
+    medicion = _actual.get()
+    if medicion is not None and medicion.plantillas:
+        add_span('template', time.perf_counter() - medicion.plantillas.pop())
+
+
+def _desglose(medicion):
+    partes = [f"db {medicion.spans.get('db', 0.0) * 1000:.0f} ms/{medicion.consultas} consultas"]
+    partes += [f"{nombre} {medicion.spans.get(nombre, 0.0) * 1000:.0f} ms" for nombre in SPANS[1:]]
+    return ', '.join(partes)
+
+
+def _server_timing(medicion, ahora):
+    partes = [f"{nombre};dur={medicion.spans.get(nombre, 0.0) * 1000:.1f}" for nombre in SPANS]
+    partes.append(f"total;dur={(ahora - medicion.inicio) * 1000:.1f}")
+    return ', '.join(partes)
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _etiquetas(etiquetas):
+    if not etiquetas:
+        return ''
+    return '{' + ','.join(f'{clave}="{_escapar(valor)}"' for clave, valor in etiquetas.items()) + '}'
+
+
+def _numero(valor):
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+def _metrica(lineas, nombre, tipo, ayuda, series):
+    lineas.append(f'# HELP {nombre} {ayuda}')
+    lineas.append(f'# TYPE {nombre} {tipo}')
+    for etiquetas, valor in series:
+        lineas.append(f'{nombre}{_etiquetas(etiquetas)} {_numero(valor)}')
+
+
+def _histogramas(lineas, nombre, ayuda, buckets, series):
+    lineas.append(f'# HELP {nombre} {ayuda}')
+    lineas.append(f'# TYPE {nombre} histogram')
+    for etiquetas, histograma in series:
+        acumulado = 0
+        for limite, conteo in zip(list(buckets) + ['+Inf'], histograma.conteos):
+            acumulado += conteo
+            le = limite if limite == '+Inf' else _numero(float(limite))
+            lineas.append(f'{nombre}_bucket{_etiquetas({**etiquetas, "le": le})} {acumulado}')
+        lineas.append(f'{nombre}_sum{_etiquetas(etiquetas)} {_numero(histograma.suma)}')
+        lineas.append(f'{nombre}_count{_etiquetas(etiquetas)} {histograma.total}')
+
+
+def _token_valido():
+    token = current_app.config['TELEMETRY_METRICS_TOKEN']
+    cabecera = request.headers.get('Authorization', '')
+    if not token or not cabecera.startswith('Bearer '):
+        return False
+    return hmac.compare_digest(cabecera[len('Bearer '):].encode(), token.encode())
+
+
+@bp.route('/metrics')
+def metrics():
+    # Se importa aquí: autorizacion usa los modelos, y extensions importa este módulo al cargarse.
+    from autorizacion import es_admin
+    if not _token_valido() and not es_admin():
+        return jsonify({'success': False, 'message': 'Solo los administradores pueden ver estas estadísticas.'}), 403
+    app = current_app._get_current_object()
+    return app.response_class(telemetry.render_prometheus(app), mimetype='text/plain; version=0.0.4')
+
+
+telemetry = Telemetry()
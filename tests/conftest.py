@@ -0,0 +1,70 @@
+# Aplicación de pruebas: SQLite en un archivo temporal por prueba, hash barato
+# sin pool de procesos, correo síncrono que no se envía, sin límite de intentos y
+# con la actividad escrita en cada anotación.
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+from play import create_app  # noqa: E402
+from extensions import db  # noqa: E402
+from models import Usuario, TipoPerfil  # noqa: E402
+
+CONTRASENA = 'Clave-segura-1'
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'pruebas.db'}",
+        'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1',
+        'PASSWORD_HASH_WORKERS': 0,
+        'MAIL_SUPPRESS_SEND': True,
+        'MAIL_QUEUE_SYNC': True,
+        'MAIL_DEFAULT_SENDER': ('Mineconect', 'pruebas@example.com'),
+        'TELEMETRY_ENABLED': False,
+        'RATELIMIT_ENABLED': False,
+        'REGISTRO_BLOOM_ENABLED': False,
+        'ACTIVITY_FLUSH_INTERVAL': 0,
+    })
+    with app.app_context():
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def crear_usuario(app):
+    """Crea un usuario (con perfil si se pasa) y devuelve su id."""
+    def crear(email, tipo_perfil=TipoPerfil.ADMIN, perfil=None, **campos):
+        with app.app_context():
+            usuario = Usuario(email=email, tipo_perfil=tipo_perfil, **campos)
+            usuario.set_password(CONTRASENA)
+            if perfil is not None:
+                setattr(usuario, tipo_perfil.value, perfil)
+            db.session.add(usuario)
+            db.session.commit()
+            return usuario.id
+    return crear
+
+
+@pytest.fixture
+def iniciar_sesion(client):
+    """Deja la sesión del cliente como la de un usuario ya verificado."""
+    def iniciar(usuario_id, perfil=None):
+        with client.session_transaction() as sesion:
+            sesion['user_id'] = usuario_id
+            if perfil is not None:
+                sesion['user_profile'] = perfil
+    return iniciar
@@ -0,0 +1,122 @@
+from datetime import datetime
+
+import pytest
+
+from activity import ActivityTracker
+from extensions import db
+from models import EventoAcceso, Usuario
+
+ENERO = datetime(2026, 1, 1)
+FEBRERO = datetime(2026, 2, 1)
+MARZO = datetime(2026, 3, 1)
+
+
+@pytest.fixture
+def tracker(app, monkeypatch):
+    """Tracker que acumula hasta que se llama a flush(), sin hilo de volcado."""
+    tracker = ActivityTracker(app)
+    monkeypatch.setattr(tracker, '_programar', lambda: None)
+    return tracker
+
+
+@pytest.fixture
+def usuarios(crear_usuario):
+    return [crear_usuario(f'usuario{n}@example.com') for n in (1, 2, 3)]
+
+
+def ultima_conexion(app, usuario_id):
+    with app.app_context():
+        try:
+            return db.session.get(Usuario, usuario_id).ultima_conexion
+        finally:
+            db.session.remove()
+
+
+def eventos(app):
+    with app.app_context():
+        try:
+            return db.session.execute(db.select(EventoAcceso.usuario_id, EventoAcceso.ip)).all()
+        finally:
+            db.session.remove()
+
+
+def fallar_una_vez(tracker, monkeypatch, mientras=lambda: None):
+    """El siguiente volcado falla; 'mientras' simula lo que anotan otras peticiones entretanto."""
+    escribir = tracker._escribir
+
+    def fallar(vistos, eventos):
+        monkeypatch.setattr(tracker, '_escribir', escribir)
+        mientras()
+        raise ConnectionError('base de datos no disponible')
+    monkeypatch.setattr(tracker, '_escribir', fallar)
+
+
+def test_el_volcado_escribe_una_fila_por_usuario(app, tracker, usuarios):
+    tracker.seen(usuarios[0], ENERO)
+    tracker.seen(usuarios[0], FEBRERO)
+    tracker.seen(usuarios[1], ENERO)
+    tracker.login(usuarios[2], ip='10.0.0.1')
+    assert (tracker.stats()['pending_seen'], tracker.stats()['pending_events']) == (3, 1)
+    assert ultima_conexion(app, usuarios[0]) is None
+
+    assert tracker.flush() == (3, 1)
+    assert ultima_conexion(app, usuarios[0]) == FEBRERO
+    assert ultima_conexion(app, usuarios[1]) == ENERO
+    assert ultima_conexion(app, usuarios[2]) is not None
+    assert eventos(app) == [(usuarios[2], '10.0.0.1')]
+    assert tracker.flush() == (0, 0)
+
+
+def test_el_volcado_no_retrocede_la_ultima_conexion(app, tracker, usuarios):
+    tracker.seen(usuarios[0], MARZO)
+    tracker.flush()
+    # Otro worker anotó una petición anterior y vuelca después.
+    tracker.seen(usuarios[0], ENERO)
+    tracker.flush()
+    assert ultima_conexion(app, usuarios[0]) == MARZO
+
+
+def test_los_eventos_de_usuarios_borrados_se_descartan(app, tracker, usuarios):
+    tracker.login(usuarios[0])
+    tracker.login(usuarios[1])
+    with app.app_context():
+        db.session.execute(db.delete(Usuario).where(Usuario.id == usuarios[0]))
+        db.session.commit()
+        db.session.remove()
+    assert tracker.flush() == (2, 1)
+    assert [usuario_id for usuario_id, _ in eventos(app)] == [usuarios[1]]
+
+
+def test_un_volcado_fallido_devuelve_lo_pendiente(app, tracker, usuarios, monkeypatch):
+    tracker.seen(usuarios[0], FEBRERO)
+    tracker.login(usuarios[1])
+    # Mientras falla el volcado llegan una fecha anterior del mismo usuario y otra nueva.
+    fallar_una_vez(tracker, monkeypatch, lambda: (tracker.seen(usuarios[0], ENERO), tracker.seen(usuarios[2], MARZO)))
+
+    assert tracker.flush() == (0, 0)
+    stats = tracker.stats()
+    assert (stats['failed_flushes'], stats['pending_seen'], stats['pending_events']) == (1, 3, 1)
+
+    assert tracker.flush() == (3, 1)
+    assert ultima_conexion(app, usuarios[0]) == FEBRERO  # Se queda la más reciente.
+    assert ultima_conexion(app, usuarios[2]) == MARZO
+    assert [usuario_id for usuario_id, _ in eventos(app)] == [usuarios[1]]
+
+
+def test_lo_devuelto_no_pasa_de_los_limites(app, tracker, usuarios, monkeypatch):
+    app.config.update(ACTIVITY_MAX_USERS=2, ACTIVITY_MAX_EVENTS=1)
+    tracker.seen(usuarios[0], ENERO)
+    tracker.login(usuarios[1])
+    # Entretanto el buffer vuelve a llenarse: un usuario y un evento nuevos.
+    fallar_una_vez(tracker, monkeypatch, lambda: tracker.login(usuarios[2]))
+
+    assert tracker.flush() == (0, 0)
+    stats = tracker.stats()
+    assert (stats['pending_seen'], stats['pending_events']) == (2, 1)
+    assert (stats['dropped_seen'], stats['dropped_events']) == (1, 1)
+
+
+def test_las_peticiones_que_leen_la_sesion_anotan_la_conexion(app, client, iniciar_sesion, usuarios):
+    iniciar_sesion(usuarios[0])
+    assert client.get('/foro/temas').status_code == 200
+    assert ultima_conexion(app, usuarios[0]) is not None
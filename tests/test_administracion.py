@@ -0,0 +1,168 @@
+from datetime import datetime
+
+import pytest
+
+import diagnostico
+from extensions import db
+from models import DiagnosticoEnvio, DiagnosticoHistograma, Empresario, Respuesta, Tema, TipoPerfil, Usuario
+
+
+def empresario(n):
+    return Empresario(nombre_completo=f'Empresario {n}', tipo_documento_personal='CC',
+                      numero_documento_personal=f'P{n}', numero_celular='3000000000', nombre_empresa=f'Empresa {n}',
+                      tipo_contribuyente='juridica', nit=f'N{n}', tamano='pequena', sector_produccion='carbon',
+                      sector_transformacion='ninguna', sector_comercializacion='ninguna')
+
+
+def respuestas(valor):
+    return {'respuestas': {pregunta: valor for pregunta in diagnostico.preguntas('cadena_valor')}}
+
+
+def histograma(app):
+    with app.app_context():
+        try:
+            return {(h.seccion, h.bucket): h.total for h in db.session.execute(
+                db.select(DiagnosticoHistograma).where(DiagnosticoHistograma.total != 0)).scalars()}
+        finally:
+            db.session.remove()
+
+
+def reacciones(app, modelo, objeto_id):
+    with app.app_context():
+        try:
+            return db.session.get(modelo, objeto_id).reacciones
+        finally:
+            db.session.remove()
+
+
+@pytest.fixture
+def borrar(app, tmp_path):
+    """Borra empresa1@example.com con el comando dado y comprueba que terminó bien."""
+    def ejecutar(comando):
+        if None in comando:
+            archivo = tmp_path / 'correos.txt'
+            archivo.write_text('empresa1@example.com\n')
+            comando = [str(archivo) if a is None else a for a in comando]
+        resultado = app.test_cli_runner().invoke(args=comando)
+        assert resultado.exit_code == 0, resultado.output
+    return ejecutar
+
+
+@pytest.fixture
+def actividad(client, crear_usuario, iniciar_sesion):
+    """Dos empresarios con diagnóstico ('si' el primero, 'no' el segundo) que reaccionan a un tema y a una
+    respuesta. Devuelve (tema_id, respuesta_id)."""
+    iniciar_sesion(crear_usuario('admin@example.com'))
+    tema_id = client.post('/foro/temas', json={'titulo': 'Secado', 'categoria': 'general',
+                                               'contenido': '¿Cómo secan el carbón?'}).get_json()['tema']['id']
+    respuesta_id = client.post(f'/foro/temas/{tema_id}/respuestas',
+                               json={'texto': 'Al sol'}).get_json()['respuestas'][0]['id']
+    for n, valor in ((1, 'si'), (2, 'no')):
+        iniciar_sesion(crear_usuario(f'empresa{n}@example.com', TipoPerfil.EMPRESARIO, empresario(n)), 'empresario')
+        assert client.post('/diagnostico/cadena_valor', json=respuestas(valor)).status_code == 200
+        assert client.post(f'/foro/temas/{tema_id}/reacciones', json={'tipo': 'me_gusta'}).status_code == 200
+        assert client.post(f'/foro/respuestas/{respuesta_id}/reacciones', json={'tipo': 'util'}).status_code == 200
+    return tema_id, respuesta_id
+
+
+@pytest.mark.parametrize('comando', [
+    ['delete-user', 'empresa1@example.com'],
+    ['delete-users', '--correos', None, '--si'],
+])
+def test_borrar_usuarios_descuenta_su_diagnostico_y_sus_reacciones(app, actividad, borrar, comando):
+    tema_id, respuesta_id = actividad
+    assert histograma(app)[('total', 100)] == 1
+
+    borrar(comando)
+
+    guardado = histograma(app)
+    assert ('total', 100) not in guardado
+    assert guardado[('total', 0)] == 1
+    assert reacciones(app, Tema, tema_id) == 1
+    assert reacciones(app, Respuesta, respuesta_id) == 1
+
+    # Los contadores mantenidos coinciden con los recalculados desde las tablas.
+    assert app.test_cli_runner().invoke(args=['rebuild-diagnostic-benchmarks']).exit_code == 0
+    assert histograma(app) == guardado
+    assert app.test_cli_runner().invoke(args=['recount-forum']).exit_code == 0
+    assert reacciones(app, Tema, tema_id) == 1
+    assert reacciones(app, Respuesta, respuesta_id) == 1
+
+
+def ejecutar(app, *comando):
+    resultado = app.test_cli_runner().invoke(args=list(comando))
+    assert resultado.exit_code == 0, resultado.output
+    return resultado.output
+
+
+def usuarios(app):
+    """correo -> activo de los usuarios que quedan."""
+    with app.app_context():
+        try:
+            return dict(db.session.execute(db.select(Usuario.email, Usuario.activo)).all())
+        finally:
+            db.session.remove()
+
+
+def filas(app, modelo):
+    with app.app_context():
+        try:
+            return db.session.execute(db.select(db.func.count()).select_from(modelo)).scalar()
+        finally:
+            db.session.remove()
+
+
+@pytest.fixture
+def spam(client, crear_usuario, iniciar_sesion):
+    """Tres empresarios de spam.example con diagnóstico, uno de example.com y un administrador de spam.example."""
+    for n in (1, 2, 3, 4):
+        dominio = 'example.com' if n == 4 else 'spam.example'
+        iniciar_sesion(crear_usuario(f'empresa{n}@{dominio}', TipoPerfil.EMPRESARIO, empresario(n)), 'empresario')
+        assert client.post('/diagnostico/cadena_valor', json=respuestas('si')).status_code == 200
+    crear_usuario('admin@spam.example', is_admin=True)
+
+
+def test_delete_users_borra_por_lotes_con_sus_perfiles(app, spam):
+    salida = ejecutar(app, 'delete-users', '--dominio', 'spam.example', '--lote', '2', '--si')
+    assert '3 usuarios elegidos' in salida
+    assert '2/3 borrados' in salida and '3/3 borrados' in salida
+    assert '✅ 3 usuarios borrados' in salida
+
+    assert set(usuarios(app)) == {'empresa4@example.com', 'admin@spam.example'}
+    assert filas(app, Empresario) == 1
+    assert filas(app, DiagnosticoEnvio) == 1
+    assert histograma(app)[('total', 100)] == 1
+
+
+def test_simular_no_modifica_nada(app, spam):
+    salida = ejecutar(app, 'delete-users', '--dominio', 'spam.example', '--simular')
+    assert '3 usuarios elegidos. Por ejemplo: empresa1@spam.example' in salida
+    assert len(usuarios(app)) == 5
+    assert filas(app, DiagnosticoEnvio) == 4
+
+
+def test_sin_filtros_no_se_elige_a_nadie(app, spam):
+    assert '❌ Indique al menos un filtro' in ejecutar(app, 'delete-users', '--si')
+    assert len(usuarios(app)) == 5
+
+
+def test_desactivar_y_reactivar(app, spam):
+    assert '✅ 3 usuarios desactivados' in ejecutar(app, 'deactivate-users', '--dominio', 'spam.example', '--si')
+    assert [correo for correo, activo in usuarios(app).items() if not activo] == [
+        'empresa1@spam.example', 'empresa2@spam.example', 'empresa3@spam.example']
+
+    # empresa4@example.com sigue activa: --solo-desactivados no la elige.
+    assert '0 usuarios elegidos' in ejecutar(app, 'delete-users', '--solo-desactivados', '--dominio', 'example.com')
+    assert len(usuarios(app)) == 5
+    assert '✅ 3 usuarios reactivados' in ejecutar(app, 'reactivate-users', '--si')
+    assert all(usuarios(app).values())
+
+
+def test_purge_inactive_users(app, crear_usuario):
+    crear_usuario('reciente@example.com', TipoPerfil.EMPRESARIO, empresario(1), ultima_conexion=datetime(2026, 6, 1))
+    crear_usuario('antiguo@example.com', TipoPerfil.EMPRESARIO, empresario(2), ultima_conexion=datetime(2025, 1, 1))
+    crear_usuario('nunca@example.com', TipoPerfil.EMPRESARIO, empresario(3), fecha_registro=datetime(2025, 1, 1))
+    crear_usuario('nuevo@example.com', TipoPerfil.EMPRESARIO, empresario(4), fecha_registro=datetime(2026, 6, 1))
+
+    assert '✅ 2 usuarios borrados' in ejecutar(app, 'purge-inactive-users', '--desde', '2026-01-01', '--si')
+    assert set(usuarios(app)) == {'reciente@example.com', 'nuevo@example.com'}
@@ -0,0 +1,134 @@
+import pytest
+
+import alianzas
+from alianzas import indice
+from extensions import db
+from models import Alianza, Empresario, Institucion, TipoPerfil
+
+
+def empresario(n, produccion='carbon', transformacion='ninguna', comercializacion='ninguna'):
+    return Empresario(nombre_completo=f'Empresario {n}', tipo_documento_personal='CC',
+                      numero_documento_personal=f'P{n}', numero_celular='3000000000', nombre_empresa=f'Empresa {n}',
+                      tipo_contribuyente='juridica', nit=f'N{n}', tamano='pequena', sector_produccion=produccion,
+                      sector_transformacion=transformacion, sector_comercializacion=comercializacion)
+
+
+def institucion(n, area='asesoria_tecnica'):
+    return Institucion(nombre_completo=f'Institución {n}', nit=f'T{n}', tipo_institucion='universidad',
+                       municipio='Tunja', descripcion='x', area_especializacion=area)
+
+
+@pytest.fixture(autouse=True)
+def indice_nuevo(monkeypatch):
+    """Cada prueba empieza sin índice construido ni hilo de refresco."""
+    monkeypatch.setattr(indice, 'construido_en', None)
+    monkeypatch.setitem(alianzas._estado, 'hilo', None)
+    monkeypatch.setattr(alianzas, '_refrescar', lambda app: None)
+    indice.cargar([], [])
+    indice.construido_en = None
+
+
+@pytest.fixture
+def nodos(crear_usuario):
+    """Un productor, un transformador y una institución. Devuelve sus usuario_id."""
+    return {
+        'productor': crear_usuario('productor@example.com', TipoPerfil.EMPRESARIO, empresario(1)),
+        'transformador': crear_usuario('transformador@example.com', TipoPerfil.EMPRESARIO,
+                                       empresario(2, produccion='ninguna', transformacion='lavado')),
+        'institucion': crear_usuario('udb@example.com', TipoPerfil.INSTITUCION, institucion(1)),
+    }
+
+
+def sugeridos(client, consulta=''):
+    respuesta = client.get(f'/alianzas/sugerencias{consulta}')
+    assert respuesta.status_code == 200, respuesta.get_json()
+    return [(s['usuario_id'], s['puntaje']) for s in respuesta.get_json()['sugerencias']]
+
+
+def test_sugerencias_requieren_sesion(client, nodos):
+    assert client.get('/alianzas/sugerencias').status_code == 401
+
+
+def test_sugerencias_por_puntaje_y_por_tipo(client, nodos, iniciar_sesion):
+    iniciar_sesion(nodos['productor'], 'empresario')
+    # El transformador cubre la etapa vecina en ambos sentidos; la institución, solo el apoyo.
+    assert sugeridos(client) == [(nodos['transformador'], 6), (nodos['institucion'], 4)]
+    assert sugeridos(client, '?tipo=instituciones') == [(nodos['institucion'], 4)]
+    assert sugeridos(client, '?k=1') == [(nodos['transformador'], 6)]
+    assert client.get('/alianzas/sugerencias?tipo=otro').status_code == 400
+
+
+def test_proponer_y_aceptar_una_alianza(client, nodos, iniciar_sesion):
+    productor, transformador = nodos['productor'], nodos['transformador']
+    iniciar_sesion(productor, 'empresario')
+    propuesta = client.post('/alianzas', json={'usuario_id': transformador})
+    assert propuesta.status_code == 201
+    alianza = propuesta.get_json()['alianza']
+    assert alianza['estado'] == 'pendiente' and alianza['solicitada_por_mi']
+    assert client.post('/alianzas', json={'usuario_id': transformador}).status_code == 200
+    assert client.post(f"/alianzas/{alianza['id']}/aceptar").status_code == 404  # Solo la acepta el otro.
+    # Con la alianza propuesta deja de sugerirse a los dos.
+    assert [u for u, _ in sugeridos(client)] == [nodos['institucion']]
+
+    iniciar_sesion(transformador, 'empresario')
+    assert transformador not in [u for u, _ in sugeridos(client)]
+    aceptada = client.post(f"/alianzas/{alianza['id']}/aceptar")
+    assert aceptada.status_code == 200
+    assert aceptada.get_json()['alianza']['estado'] == 'confirmada'
+    listado = client.get('/alianzas').get_json()['alianzas']
+    assert [(a['usuario_id'], a['estado']) for a in listado] == [(productor, 'confirmada')]
+    assert listado[0]['perfil']['nombre'] == 'Empresa 1'
+
+    # Terminada la alianza, vuelve a sugerirse.
+    assert client.delete(f"/alianzas/{alianza['id']}").status_code == 200
+    assert productor in [u for u, _ in sugeridos(client)]
+
+
+def test_proponer_a_quien_ya_propuso_confirma_la_alianza(client, nodos, iniciar_sesion):
+    iniciar_sesion(nodos['productor'], 'empresario')
+    client.post('/alianzas', json={'usuario_id': nodos['institucion']})
+    iniciar_sesion(nodos['institucion'], 'institucion')
+    mutua = client.post('/alianzas', json={'usuario_id': nodos['productor']})
+    assert mutua.status_code == 200
+    assert mutua.get_json()['alianza']['estado'] == 'confirmada'
+
+
+@pytest.mark.parametrize('destino', [None, 'propio', 9999])
+def test_proponer_a_un_aliado_no_valido(client, nodos, iniciar_sesion, destino):
+    iniciar_sesion(nodos['productor'], 'empresario')
+    usuario_id = nodos['productor'] if destino == 'propio' else destino
+    assert client.post('/alianzas', json={'usuario_id': usuario_id}).status_code == 400
+
+
+def test_la_reconstruccion_conserva_las_alianzas_confirmadas_mientras_tanto(app, nodos, monkeypatch):
+    a, b = sorted((nodos['productor'], nodos['transformador']))
+    leer_aristas = alianzas._aristas
+
+    def aristas():
+        yield from leer_aristas()
+        # Commit de otra petición de este proceso mientras se construye el índice nuevo.
+        with app.app_context():
+            db.session.add(Alianza(usuario_menor_id=a, usuario_mayor_id=b, solicitante_id=a))
+            db.session.commit()
+            db.session.remove()
+    monkeypatch.setattr(alianzas, '_aristas', aristas)
+
+    with app.app_context():
+        alianzas.construir_desde_bd()
+        db.session.remove()
+    assert indice.aliados(a) == {b}
+    assert a not in {candidato for candidato, _ in indice.sugerencias(b)}
+
+
+def test_las_peticiones_no_reconstruyen_el_indice(app, client, nodos, iniciar_sesion, monkeypatch):
+    iniciar_sesion(nodos['productor'], 'empresario')
+    assert client.get('/alianzas/sugerencias').status_code == 200
+    assert alianzas._estado['hilo'] is not None
+
+    # Aunque el índice tenga horas, la petición responde con él; reconstruir es cosa del hilo.
+    monkeypatch.setattr(indice, 'construido_en', 0)
+
+    def no_reconstruir():
+        raise AssertionError('la petición reconstruyó el índice')
+    monkeypatch.setattr(alianzas, 'construir_desde_bd', no_reconstruir)
+    assert client.get('/alianzas/sugerencias').status_code == 200
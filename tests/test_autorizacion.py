@@ -0,0 +1,43 @@
+import pytest
+
+from models import TipoPerfil
+
+# Estadísticas internas: solo las ven los administradores.
+RUTAS = [
+    '/db/stats',
+    '/mail/stats',
+    '/ratelimit/stats',
+    '/verification/stats',
+    '/activity/stats',
+    '/metrics',
+    '/registro/stats',
+    '/mensajes/stats',
+    '/convocatorias/cache/stats',
+    '/cache/stats',
+]
+
+
+@pytest.mark.parametrize('ruta', RUTAS)
+def test_estadisticas_internas_rechazan_anonimos(client, ruta):
+    respuesta = client.get(ruta)
+    assert respuesta.status_code == 403
+    assert respuesta.get_json()['success'] is False
+
+
+@pytest.mark.parametrize('ruta', RUTAS)
+def test_estadisticas_internas_rechazan_usuarios_sin_permiso(client, crear_usuario, iniciar_sesion, ruta):
+    iniciar_sesion(crear_usuario('usuario@example.com', TipoPerfil.ADMIN, is_admin=False))
+    assert client.get(ruta).status_code == 403
+
+
+@pytest.mark.parametrize('ruta', RUTAS)
+def test_estadisticas_internas_para_administradores(client, crear_usuario, iniciar_sesion, ruta):
+    iniciar_sesion(crear_usuario('admin@example.com', TipoPerfil.ADMIN, is_admin=True))
+    assert client.get(ruta).status_code == 200
+
+
+def test_metrics_con_el_token_de_prometheus(app, client):
+    app.config['TELEMETRY_METRICS_TOKEN'] = 'token-de-prometheus'
+    assert client.get('/metrics', headers={'Authorization': 'Bearer token-de-prometheus'}).status_code == 200
+    assert client.get('/metrics', headers={'Authorization': 'Bearer otro'}).status_code == 403
+    assert client.get('/metrics').status_code == 403
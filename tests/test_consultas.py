@@ -0,0 +1,43 @@
+import pytest
+
+import verification
+from verification import verification_codes
+from models import Emprendedor, TipoPerfil
+from conftest import CONTRASENA
+
+
+@pytest.fixture
+def usuario_id(app, crear_usuario):
+    app.config['QUERY_COUNT_HEADER'] = True
+    return crear_usuario('ana@example.com', TipoPerfil.EMPRENDEDOR, Emprendedor(
+        nombre_completo='Ana Rojas', tipo_documento='CC', numero_documento='1001', numero_celular='3000000000',
+        programa_formacion='Minería', titulo_proyecto='Proyecto', descripcion_proyecto='x', relacion_sector='x',
+        tipo_apoyo='financiero'))
+
+
+def consultas(respuesta):
+    return int(respuesta.headers['X-Query-Count'])
+
+
+def test_login_hace_una_consulta(client, usuario_id):
+    respuesta = client.post('/login', json={'email': 'ANA@example.com', 'password': CONTRASENA,
+                                            'profile': TipoPerfil.EMPRENDEDOR.value})
+    assert respuesta.get_json()['success'] is True
+    assert consultas(respuesta) <= 1
+
+
+def test_verify_code_hace_una_consulta(client, usuario_id):
+    token, codigo = verification_codes.store.create(usuario_id)
+    with client.session_transaction() as sesion:
+        sesion[verification.SESSION_KEY] = token
+
+    respuesta = client.post('/verify_code', json={'code': codigo})
+    assert respuesta.get_json()['success'] is True
+    assert consultas(respuesta) <= 1
+
+
+@pytest.mark.parametrize('email', ['ana@example.com', 'nadie@example.com'])
+def test_verificador_hace_una_consulta(client, usuario_id, email):
+    respuesta = client.post('/verificador', json={'email': email})
+    assert respuesta.get_json()['success'] is True
+    assert consultas(respuesta) <= 1
@@ -0,0 +1,129 @@
+from datetime import datetime
+
+import pytest
+
+import convocatorias
+from extensions import db
+from models import Convocatoria, Empresario, TipoPerfil
+
+
+def empresario(n):
+    return Empresario(nombre_completo=f'Empresario {n}', tipo_documento_personal='CC',
+                      numero_documento_personal=f'P{n}', numero_celular='3000000000', nombre_empresa=f'Empresa {n}',
+                      tipo_contribuyente='juridica', nit=f'N{n}', tamano='pequena', sector_produccion='carbon',
+                      sector_transformacion='ninguna', sector_comercializacion='ninguna')
+
+
+@pytest.fixture(autouse=True)
+def cache_vacia(app, monkeypatch):
+    """Caché vacía que relee la versión en cada petición, como un worker tras CONVOCATORIAS_VERSION_TTL."""
+    convocatorias.cache.limpiar()
+    monkeypatch.setattr(convocatorias.cache, 'ttl_version', 0)
+
+
+@pytest.fixture
+def convocatoria(app):
+    """Convocatoria publicada con dos cupos. Devuelve su id."""
+    with app.app_context():
+        nueva = Convocatoria(titulo='Fondo de innovación minera', descripcion='Capital semilla', cupos=2,
+                             estado='publicada', fecha_publicacion=datetime.utcnow())
+        db.session.add(nueva)
+        db.session.commit()
+        return nueva.id
+
+
+@pytest.fixture
+def empresarios(crear_usuario):
+    return [crear_usuario(f'empresa{n}@example.com', TipoPerfil.EMPRESARIO, empresario(n)) for n in (1, 2, 3)]
+
+
+@pytest.fixture
+def postular(client, iniciar_sesion):
+    def enviar(usuario_id, convocatoria_id, clave=None):
+        iniciar_sesion(usuario_id, 'empresario')
+        headers = {'Idempotency-Key': clave} if clave else {}
+        return client.post(f'/convocatorias/{convocatoria_id}/postulaciones', headers=headers,
+                           json={'nombre_proyecto': 'Secado solar', 'descripcion': 'Secado de carbón'})
+    return enviar
+
+
+def ocupados(app, convocatoria_id):
+    with app.app_context():
+        try:
+            return db.session.get(Convocatoria, convocatoria_id).postulaciones
+        finally:
+            db.session.remove()
+
+
+def listadas(client):
+    return [c['id'] for c in client.get('/convocatorias').get_json()['convocatorias']]
+
+
+def test_postular_requiere_sesion_de_empresario(client, convocatoria):
+    assert client.post(f'/convocatorias/{convocatoria}/postulaciones', json={}).status_code == 401
+
+
+def test_repetir_la_clave_devuelve_la_misma_postulacion(app, convocatoria, empresarios, postular):
+    primera = postular(empresarios[0], convocatoria, 'clave-1')
+    assert primera.status_code == 201
+    repetida = postular(empresarios[0], convocatoria, 'clave-1')
+    assert repetida.status_code == 200
+    assert repetida.get_json()['postulacion']['id'] == primera.get_json()['postulacion']['id']
+    assert ocupados(app, convocatoria) == 1
+
+    for clave in ('clave-2', None):
+        duplicada = postular(empresarios[0], convocatoria, clave)
+        assert duplicada.status_code == 409
+        assert duplicada.get_json()['postulacion']['id'] == primera.get_json()['postulacion']['id']
+    assert ocupados(app, convocatoria) == 1
+
+
+def test_sin_cupos_la_convocatoria_sale_del_listado(app, client, convocatoria, empresarios, postular):
+    assert listadas(client) == [convocatoria]
+    for usuario_id in empresarios[:2]:
+        assert postular(usuario_id, convocatoria).status_code == 201
+    assert listadas(client) == []
+
+    agotada = postular(empresarios[2], convocatoria)
+    assert agotada.status_code == 409
+    assert agotada.get_json()['success'] is False
+    assert ocupados(app, convocatoria) == 2
+
+
+@pytest.mark.parametrize('borrar', [
+    ['delete-user', 'empresa1@example.com'],
+    ['delete-users', '--correos', None, '--si'],
+])
+def test_borrar_usuarios_libera_sus_cupos(app, client, convocatoria, empresarios, postular, tmp_path, borrar):
+    for usuario_id in empresarios[:2]:
+        assert postular(usuario_id, convocatoria).status_code == 201
+    assert ocupados(app, convocatoria) == 2
+    assert listadas(client) == []  # Agotada
+
+    if None in borrar:
+        archivo = tmp_path / 'correos.txt'
+        archivo.write_text('empresa1@example.com\n')
+        borrar = [str(archivo) if a is None else a for a in borrar]
+    resultado = app.test_cli_runner().invoke(args=borrar)
+    assert resultado.exit_code == 0, resultado.output
+
+    assert ocupados(app, convocatoria) == 1
+    assert listadas(client) == [convocatoria]
+    assert postular(empresarios[2], convocatoria).status_code == 201
+
+
+def test_postular_a_una_convocatoria_borrada_entre_medias(app, convocatoria, empresarios):
+    with app.app_context():
+        leida = db.session.get(Convocatoria, convocatoria)
+        perfil = db.session.execute(db.select(Empresario).where(Empresario.usuario_id == empresarios[0])).scalar_one()
+        db.session.expunge_all()
+        db.session.commit()
+        # Otra petición la borra después de que esta la leyera.
+        with app.app_context():
+            db.session.execute(db.delete(Convocatoria).where(Convocatoria.id == convocatoria))
+            db.session.commit()
+            db.session.remove()
+
+        with pytest.raises(convocatorias.ConvocatoriaNoDisponible):
+            convocatorias.postular(leida, perfil, 'Secado solar', 'Secado de carbón')
+        db.session.remove()
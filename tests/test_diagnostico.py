@@ -0,0 +1,56 @@
+import pytest
+
+import diagnostico
+from extensions import db
+from models import DiagnosticoHistograma, Empresario, TipoPerfil
+
+
+@pytest.fixture
+def empresario(crear_usuario, iniciar_sesion):
+    usuario_id = crear_usuario('bruno@example.com', TipoPerfil.EMPRESARIO, Empresario(
+        nombre_completo='Bruno Pérez', tipo_documento_personal='CC', numero_documento_personal='1002',
+        numero_celular='3000000000', nombre_empresa='Carbones de Samacá', tipo_contribuyente='juridica',
+        nit='900100200', tamano='pequena', sector_produccion='carbon', sector_transformacion='ninguna',
+        sector_comercializacion='ninguna'))
+    iniciar_sesion(usuario_id, 'empresario')
+
+
+def respuestas(valor):
+    return {'respuestas': {pregunta: valor for pregunta in diagnostico.preguntas('cadena_valor')}}
+
+
+def histograma(app):
+    with app.app_context():
+        return {(h.seccion, h.bucket): h.total for h in db.session.execute(
+            db.select(DiagnosticoHistograma).where(DiagnosticoHistograma.total != 0)).scalars()}
+
+
+def test_reenviar_descuenta_el_envio_anterior(app, client, empresario):
+    assert client.post('/diagnostico/cadena_valor', json=respuestas('no')).status_code == 200
+    assert client.post('/diagnostico/cadena_valor', json=respuestas('si')).status_code == 200
+
+    guardado = histograma(app)
+    assert guardado[('total', 100)] == 1
+    assert ('total', 0) not in guardado
+    with app.app_context():
+        diagnostico.reconstruir_histograma()
+        db.session.commit()
+    assert histograma(app) == guardado
+
+
+@pytest.mark.parametrize('metodo, ruta, cuerpo', [
+    ('post', '/diagnostico/cadena_valor', respuestas('si')),
+    ('get', '/diagnostico/cadena_valor/comparacion', None),
+])
+def test_el_empresario_se_consulta_una_vez_por_peticion(client, empresario, monkeypatch, metodo, ruta, cuerpo):
+    client.post('/diagnostico/cadena_valor', json=respuestas('no'))
+    llamadas = []
+    original = diagnostico._empresario_en_sesion
+
+    def contar():
+        llamadas.append(1)
+        return original()
+    monkeypatch.setattr(diagnostico, '_empresario_en_sesion', contar)
+
+    assert getattr(client, metodo)(ruta, json=cuerpo).status_code == 200
+    assert len(llamadas) == 1
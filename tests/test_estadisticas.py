@@ -0,0 +1,104 @@
+import csv
+
+import pytest
+
+import estadisticas
+from extensions import db
+from models import Usuario
+from conftest import CONTRASENA
+
+REGISTROS = {
+    '/registro_emprendedor': {
+        'nombre_completo': 'Ana Rojas', 'tipo_documento': 'CC', 'numero_documento': '1001',
+        'numero_celular': '3001112233', 'programa_formacion': 'Minería', 'titulo_proyecto': 'Secado solar',
+        'descripcion_proyecto': 'Secado de carbón', 'relacion_sector': 'Proveedor', 'tipo_apoyo': 'financiero',
+        'correo': 'ana@example.com',
+    },
+    '/registro_empresario': {
+        'correo': 'bruno@example.com', 'tipo_contribuyente': 'juridica', 'nit': '900100200',
+        'nombre_completo': 'Bruno Pérez', 'tipo_documento_personal': 'CC', 'numero_documento_personal': '1002',
+        'numero_celular': '3001112234', 'nombre_empresa': 'Carbones de Samacá', 'tamano': 'pequena',
+        'sector_produccion': 'carbon', 'sector_transformacion': 'ninguna', 'sector_comercializacion': 'ninguna',
+    },
+    '/registro_institucion': {
+        'nombre_institucion': 'Universidad de Boyacá', 'nit': '900100300', 'tipo_institucion': 'universidad',
+        'municipio': 'Tunja', 'descripcion': 'Investigación minera', 'area_especializacion': 'mineria',
+        'participacion_activa': ['capacitacion'], 'correo': 'udb@example.com',
+    },
+    '/registro_inversionista': {
+        'nombreCompleto': 'Carla Gómez', 'tipoDocumento': 'CC', 'numeroDocumento': '1003',
+        'numeroCelular': '3001112235', 'nombreFondo': 'Fondo Andino', 'tipoInversion': 'angel',
+        'etapas': ['semilla'], 'areas': ['carbon'], 'correo': 'carla@example.com',
+    },
+}
+
+
+def coinciden(app):
+    with app.app_context():
+        try:
+            return estadisticas.guardados() == estadisticas.conteos_reales()
+        finally:
+            db.session.remove()
+
+
+def total_usuarios(app):
+    with app.app_context():
+        try:
+            return db.session.query(Usuario).count()
+        finally:
+            db.session.remove()
+
+
+@pytest.fixture
+def registrados(app, client):
+    """Un usuario de cada perfil dado de alta por los formularios de registro."""
+    for ruta, datos in REGISTROS.items():
+        respuesta = client.post(ruta, data=dict(datos, contrasena=CONTRASENA))
+        assert respuesta.status_code == 200, ruta
+    assert total_usuarios(app) == 4
+
+
+def test_registros_por_formulario(app, registrados):
+    assert coinciden(app)
+    with app.app_context():
+        registros, perfiles = estadisticas.guardados()
+    assert sum(registros.values()) == 4
+    assert perfiles[('municipio', 'Tunja')] == 1
+
+
+def test_flask_delete_user(app, registrados):
+    resultado = app.test_cli_runner().invoke(args=['delete-user', 'udb@example.com'])
+    assert resultado.exit_code == 0, resultado.output
+    assert total_usuarios(app) == 3
+    assert coinciden(app)
+
+
+def test_flask_delete_users(app, registrados):
+    resultado = app.test_cli_runner().invoke(args=['delete-users', '--dominio', 'example.com', '--si'])
+    assert resultado.exit_code == 0, resultado.output
+    assert total_usuarios(app) == 0
+    assert coinciden(app)
+
+
+def test_flask_import_profiles(app, registrados, tmp_path):
+    archivo = tmp_path / 'empresarios.csv'
+    columnas = ['correo', 'contrasena', 'tipo_contribuyente', 'nit', 'nombre_completo', 'tipo_documento_personal',
+                'numero_documento_personal', 'numero_celular', 'nombre_empresa', 'tamano', 'sector_produccion',
+                'sector_transformacion', 'sector_comercializacion']
+    with open(archivo, 'w', newline='', encoding='utf-8') as salida:
+        escritor = csv.DictWriter(salida, fieldnames=columnas)
+        escritor.writeheader()
+        for n, tamano in enumerate(['micro', 'micro', 'grande']):
+            escritor.writerow({'correo': f'importado{n}@example.com', 'contrasena': CONTRASENA,
+                               'tipo_contribuyente': 'juridica', 'nit': f'80010{n}', 'nombre_completo': f'Importado {n}',
+                               'tipo_documento_personal': 'CC', 'numero_documento_personal': f'20{n}',
+                               'numero_celular': '3000000000', 'nombre_empresa': f'Empresa {n}', 'tamano': tamano,
+                               'sector_produccion': 'carbon', 'sector_transformacion': 'ninguna',
+                               'sector_comercializacion': 'ninguna'})
+
+    resultado = app.test_cli_runner().invoke(args=['import-profiles', str(archivo), '--perfil', 'empresario'])
+    assert resultado.exit_code == 0, resultado.output
+    assert total_usuarios(app) == 7
+    assert coinciden(app)
+    with app.app_context():
+        assert estadisticas.guardados()[1][('tamano', 'micro')] == 2
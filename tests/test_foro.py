@@ -0,0 +1,138 @@
+import pytest
+
+import foro
+from extensions import db
+from models import Respuesta, Tema
+
+
+@pytest.fixture
+def tema(client, crear_usuario, iniciar_sesion):
+    """Tema publicado por un usuario con la sesión iniciada. Devuelve su id."""
+    iniciar_sesion(crear_usuario('ana@example.com'))
+    respuesta = client.post('/foro/temas', json={'titulo': 'Ventilación', 'categoria': 'seguridad',
+                                                 'contenido': '¿Qué caudal usan?'})
+    assert respuesta.status_code == 201
+    return respuesta.get_json()['tema']['id']
+
+
+@pytest.fixture
+def responder(client, tema):
+    def enviar(texto, padre_id=None):
+        datos = {'texto': texto} if padre_id is None else {'texto': texto, 'padre_id': padre_id}
+        respuesta = client.post(f'/foro/temas/{tema}/respuestas', json=datos)
+        assert respuesta.status_code == 201, respuesta.get_json()
+        return respuesta.get_json()['respuestas'][0]['id']
+    return enviar
+
+
+@pytest.fixture
+def arbol(responder):
+    """a (a1 (a1x), a2) y b, con a2 publicada después de b. Devuelve {texto: id}."""
+    ids = {'a': responder('a')}
+    ids['a1'] = responder('a1', ids['a'])
+    ids['a1x'] = responder('a1x', ids['a1'])
+    ids['b'] = responder('b')
+    ids['a2'] = responder('a2', ids['a'])
+    return ids
+
+
+def leer(client, ruta):
+    respuesta = client.get(ruta)
+    assert respuesta.status_code == 200
+    return respuesta.get_json()
+
+
+def contadores(app, tema_id):
+    with app.app_context():
+        try:
+            return (db.session.get(Tema, tema_id).respuestas,
+                    {r.texto: (r.descendientes, r.reacciones)
+                     for r in db.session.execute(db.select(Respuesta)).scalars()})
+        finally:
+            db.session.remove()
+
+
+def test_el_foro_requiere_sesion(app):
+    assert app.test_client().get('/foro/temas').status_code == 401
+
+
+def test_las_respuestas_se_leen_en_orden_de_arbol(app, client, tema, arbol):
+    datos = leer(client, f'/foro/temas/{tema}/respuestas')
+    assert [(r['texto'], r['profundidad']) for r in datos['respuestas']] == [
+        ('a', 0), ('a1', 1), ('a1x', 2), ('a2', 1), ('b', 0)]
+    assert datos['siguiente'] is None
+    assert contadores(app, tema) == (5, {'a': (3, 0), 'a1': (1, 0), 'a1x': (0, 0), 'a2': (0, 0), 'b': (0, 0)})
+    assert leer(client, f'/foro/temas/{tema}')['tema']['respuestas'] == 5
+
+
+def test_el_hilo_es_el_subarbol_de_la_respuesta(client, arbol):
+    assert [r['texto'] for r in leer(client, f"/foro/respuestas/{arbol['a1']}/hilo")['respuestas']] == ['a1', 'a1x']
+    assert [r['texto'] for r in leer(client, f"/foro/respuestas/{arbol['b']}/hilo")['respuestas']] == ['b']
+
+
+def test_las_respuestas_se_paginan_por_cursor(client, tema, arbol):
+    leidas, despues = [], ''
+    while True:
+        datos = leer(client, f'/foro/temas/{tema}/respuestas?limite=2{despues}')
+        assert len(datos['respuestas']) <= 2
+        leidas += [r['texto'] for r in datos['respuestas']]
+        if datos['siguiente'] is None:
+            break
+        despues = f"&despues={datos['siguiente']}"
+    assert leidas == ['a', 'a1', 'a1x', 'a2', 'b']
+
+
+def test_mas_alla_de_la_profundidad_maxima_se_cuelga_del_abuelo(app, client, tema, responder):
+    app.config['FORO_MAX_PROFUNDIDAD'] = 2
+    a = responder('a')
+    a1 = responder('a1', a)
+    responder('a1x', a1)
+    filas = leer(client, f'/foro/temas/{tema}/respuestas')['respuestas']
+    assert [(r['texto'], r['padre_id'], r['profundidad']) for r in filas] == [('a', None, 0), ('a1', a, 1), ('a1x', a, 1)]
+
+
+def test_responder_a_una_respuesta_de_otro_tema(client, arbol):
+    otro = client.post('/foro/temas', json={'titulo': 'Otro', 'categoria': 'general', 'contenido': 'x'})
+    respuesta = client.post(f"/foro/temas/{otro.get_json()['tema']['id']}/respuestas",
+                            json={'texto': 'x', 'padre_id': arbol['a']})
+    assert respuesta.status_code == 404
+
+
+def test_las_reacciones_cuentan_una_vez_por_usuario_y_tipo(app, client, tema, arbol):
+    url = f'/foro/temas/{tema}/reacciones'
+    assert client.post(url, json={'tipo': 'me_gusta'}).get_json()['reacciones'] == 1
+    assert client.post(url, json={'tipo': 'me_gusta'}).get_json()['reacciones'] == 1
+    assert client.post(url, json={'tipo': 'util'}).get_json()['reacciones'] == 2
+    assert sorted(leer(client, f'/foro/temas/{tema}')['tema']['mis_reacciones']) == ['me_gusta', 'util']
+    assert client.delete(url, json={'tipo': 'util'}).get_json()['reacciones'] == 1
+    assert client.delete(url, json={'tipo': 'util'}).get_json()['reacciones'] == 1
+    assert client.post(url, json={'tipo': 'otro'}).status_code == 400
+
+    respuesta = client.post(f"/foro/respuestas/{arbol['a1']}/reacciones", json={'tipo': 'util'})
+    assert respuesta.get_json()['reacciones'] == 1
+    a1 = leer(client, f"/foro/respuestas/{arbol['a1']}/hilo")['respuestas'][0]
+    assert (a1['reacciones'], a1['mis_reacciones']) == (1, ['util'])
+
+
+def test_recount_forum_recalcula_los_contadores(app, client, tema, arbol):
+    client.post(f'/foro/temas/{tema}/reacciones', json={'tipo': 'me_gusta'})
+    client.post(f"/foro/respuestas/{arbol['a']}/reacciones", json={'tipo': 'util'})
+    esperado = contadores(app, tema)
+    assert esperado[1]['a'] == (3, 1)
+
+    with app.app_context():
+        db.session.execute(db.update(Tema).values(respuestas=0, reacciones=7))
+        db.session.execute(db.update(Respuesta).values(descendientes=9, reacciones=9))
+        db.session.commit()
+        db.session.remove()
+    resultado = app.test_cli_runner().invoke(args=['recount-forum'])
+    assert resultado.exit_code == 0, resultado.output
+
+    assert contadores(app, tema) == esperado
+    assert leer(client, f'/foro/temas/{tema}')['tema']['reacciones'] == 1
+
+
+def test_ancestros_salen_de_la_ruta():
+    ruta = foro.segmento(1) + foro.segmento(26) + foro.segmento(300)
+    assert foro.ancestros(ruta) == [1, 26]
+    assert foro.ancestros(foro.segmento(1)) == []
@@ -0,0 +1,31 @@
+import pytest
+from werkzeug.security import generate_password_hash
+
+import hashing
+from hashing import PasswordHasher
+
+
+@pytest.fixture
+def hasher():
+    hasher = PasswordHasher()
+    yield hasher
+    hasher.shutdown()
+
+
+@pytest.mark.parametrize('metodo', ['scrypt:16384:8:1', 'pbkdf2:sha256:1'])
+def test_configurar_un_metodo_completo_no_calcula_hashes(hasher, monkeypatch, metodo):
+    def no_calcular(*args, **kwargs):
+        raise AssertionError('configure calculó un hash')
+    monkeypatch.setattr(hashing, 'generate_password_hash', no_calcular)
+    hasher.configure(metodo, 0)
+    monkeypatch.undo()
+
+    assert not hasher.needs_rehash(generate_password_hash('x', metodo))
+    assert hasher.needs_rehash(generate_password_hash('x', 'pbkdf2:sha256:2'))
+
+
+@pytest.mark.parametrize('metodo', ['scrypt', 'pbkdf2', 'pbkdf2:sha256'])
+def test_un_metodo_abreviado_se_completa_como_en_werkzeug(hasher, metodo):
+    hasher.configure(metodo, 0)
+    assert not hasher.needs_rehash(generate_password_hash('x', metodo))
+    assert hasher.needs_rehash(generate_password_hash('x', 'pbkdf2:sha256:1'))
@@ -0,0 +1,62 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+from flask import Flask
+
+from mail_queue import MailDispatcher
+
+
+class ServidorFalso:
+    """Conexión SMTP de prueba: falla los primeros 'fallos' envíos y guarda el resto."""
+
+    def __init__(self, fallos):
+        self.fallos = fallos
+        self.enviados = []
+        self._lock = threading.Lock()
+
+    def connect(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def send(self, msg):
+        with self._lock:
+            if self.fallos:
+                self.fallos -= 1
+                raise ConnectionError('SMTP no disponible')
+            self.enviados.append(msg)
+
+
+@pytest.fixture
+def despachador():
+    def crear(fallos, backoff):
+        app = Flask(__name__)
+        app.config.update(MAIL_QUEUE_WORKERS=1, MAIL_QUEUE_BACKOFF=backoff, MAIL_QUEUE_MAX_RETRIES=3)
+        servidor = ServidorFalso(fallos)
+        return MailDispatcher(mail=servidor, app=app), servidor
+    return crear
+
+
+def test_join_espera_los_reintentos_programados(despachador):
+    dispatcher, servidor = despachador(fallos=2, backoff=0.05)
+    msg = SimpleNamespace(recipients=['ana@example.com'])
+    dispatcher.enqueue(msg)
+
+    assert dispatcher.join(timeout=5)
+    assert servidor.enviados == [msg]
+    assert dispatcher.stats()['retried'] == 2
+    assert dispatcher.stats()['retries_pending'] == 0
+
+
+def test_join_vence_con_un_reintento_pendiente(despachador):
+    dispatcher, servidor = despachador(fallos=1, backoff=60)
+    dispatcher.enqueue(SimpleNamespace(recipients=['ana@example.com']))
+
+    assert dispatcher.join(timeout=0.3) is False
+    assert dispatcher.stats()['retries_pending'] == 1
+    assert servidor.enviados == []
@@ -0,0 +1,82 @@
+import pytest
+
+import matching
+from extensions import db
+from matching import matching_index
+from models import Emprendedor, Inversionista, TipoPerfil, Usuario
+
+
+@pytest.fixture
+def perfiles(app, crear_usuario, monkeypatch):
+    """Dos emprendedoras y un inversionista. Devuelve {nombre: (usuario_id, perfil_id)}."""
+    monkeypatch.setattr(matching_index, 'construido_en', None)
+    monkeypatch.setitem(matching._estado, 'hilo', None)
+    monkeypatch.setattr(matching, '_refrescar', lambda app: None)
+    ids = {}
+    for n in (1, 2):
+        ids[f'emprendedora{n}'] = crear_usuario(f'emprendedora{n}@example.com', TipoPerfil.EMPRENDEDOR, Emprendedor(
+            nombre_completo=f'Emprendedora {n}', tipo_documento='CC', numero_documento=f'10{n}',
+            numero_celular='3000000000', programa_formacion='Minería', titulo_proyecto='Plataforma digital',
+            descripcion_proyecto='Software de seguridad minera', relacion_sector='x', tipo_apoyo='financiamiento'))
+    ids['inversionista'] = crear_usuario('inversionista@example.com', TipoPerfil.INVERSIONISTA, Inversionista(
+        nombre_completo='Inversionista', tipo_documento='CC', numero_documento='200', numero_celular='3000000000',
+        tipo_inversion='capital'))
+    with app.app_context():
+        return {nombre: (usuario_id, db.session.get(Usuario, usuario_id).get_perfil().id)
+                for nombre, usuario_id in ids.items()}
+
+
+def url(perfiles, nombre):
+    return f'/matching/emprendedores/{perfiles[nombre][1]}'
+
+
+def test_sugeridos_requieren_sesion(client, perfiles):
+    assert client.get(url(perfiles, 'emprendedora1')).status_code == 401
+
+
+def test_el_emprendedor_ve_sus_sugeridos(client, iniciar_sesion, perfiles):
+    iniciar_sesion(perfiles['emprendedora1'][0], 'emprendedor')
+    respuesta = client.get(url(perfiles, 'emprendedora1'))
+    assert respuesta.status_code == 200
+    assert [s['inversionista_id'] for s in respuesta.get_json()['inversionistas']] == [perfiles['inversionista'][1]]
+
+
+def test_el_emprendedor_no_ve_los_de_otro(client, iniciar_sesion, perfiles):
+    iniciar_sesion(perfiles['emprendedora1'][0], 'emprendedor')
+    assert client.get(url(perfiles, 'emprendedora2')).status_code == 403
+
+
+def test_un_inversionista_ve_los_de_cualquier_emprendedor(client, iniciar_sesion, perfiles):
+    iniciar_sesion(perfiles['inversionista'][0], 'inversionista')
+    assert client.get(url(perfiles, 'emprendedora2')).status_code == 200
+
+
+def test_la_reconstruccion_conserva_los_cambios_recibidos_mientras_tanto(app, crear_usuario, perfiles, monkeypatch):
+    leer_emprendedores = matching._emprendedores
+
+    def emprendedores():
+        yield from leer_emprendedores()
+        # Commit de otra petición de este proceso mientras se construye el índice nuevo.
+        crear_usuario('nuevo@example.com', TipoPerfil.INVERSIONISTA, Inversionista(
+            nombre_completo='Nuevo', tipo_documento='CC', numero_documento='201', numero_celular='3000000000',
+            tipo_inversion='capital'))
+    monkeypatch.setattr(matching, '_emprendedores', emprendedores)
+
+    with app.app_context():
+        matching.construir_desde_bd()
+        db.session.remove()
+    assert len(matching_index.top_k_emprendedor(perfiles['emprendedora1'][1])) == 2
+
+
+def test_la_consulta_no_reconstruye_el_indice(client, iniciar_sesion, perfiles, monkeypatch):
+    iniciar_sesion(perfiles['inversionista'][0], 'inversionista')
+    assert client.get(url(perfiles, 'emprendedora1')).status_code == 200
+    assert matching._estado['hilo'] is not None
+
+    # Aunque el índice tenga horas, la consulta responde con él; reconstruir es cosa del hilo.
+    monkeypatch.setattr(matching_index, 'construido_en', 0)
+
+    def no_reconstruir():
+        raise AssertionError('la consulta reconstruyó el índice')
+    monkeypatch.setattr(matching, 'construir_desde_bd', no_reconstruir)
+    assert client.get(url(perfiles, 'emprendedora1')).status_code == 200
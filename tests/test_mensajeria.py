@@ -0,0 +1,120 @@
+import pytest
+
+from mensajeria import CERRAR, Broker
+
+
+@pytest.fixture
+def usuarios(crear_usuario):
+    return {nombre: crear_usuario(f'{nombre}@example.com') for nombre in ('ana', 'bruno', 'carla')}
+
+
+@pytest.fixture
+def conversar(client, iniciar_sesion, usuarios):
+    """Abre (o devuelve) la conversación directa entre dos usuarios y deja la sesión del primero."""
+    def abrir(remitente, destinatario):
+        iniciar_sesion(usuarios[remitente])
+        respuesta = client.post('/mensajes/conversaciones', json={'destinatario_id': usuarios[destinatario]})
+        assert respuesta.status_code == 200
+        return respuesta.get_json()['conversacion_id']
+    return abrir
+
+
+@pytest.fixture
+def enviar(client, iniciar_sesion, usuarios):
+    def escribir(remitente, conversacion_id, *textos):
+        iniciar_sesion(usuarios[remitente])
+        ids = []
+        for texto in textos:
+            respuesta = client.post(f'/mensajes/conversaciones/{conversacion_id}/mensajes', json={'texto': texto})
+            assert respuesta.status_code == 201
+            ids.append(respuesta.get_json()['mensaje']['id'])
+        return ids
+    return escribir
+
+
+def leer(client, ruta):
+    respuesta = client.get(ruta)
+    assert respuesta.status_code == 200
+    return respuesta.get_json()
+
+
+def test_la_conversacion_directa_es_unica(client, conversar, usuarios):
+    conversacion_id = conversar('ana', 'bruno')
+    assert conversar('bruno', 'ana') == conversacion_id
+    for destinatario in (usuarios['bruno'], 9999, 'bruno'):
+        assert client.post('/mensajes/conversaciones', json={'destinatario_id': destinatario}).status_code == 400
+
+
+def test_solo_los_participantes_leen_y_escriben(client, iniciar_sesion, conversar, usuarios):
+    conversacion_id = conversar('ana', 'bruno')
+    iniciar_sesion(usuarios['carla'])
+    assert client.get(f'/mensajes/conversaciones/{conversacion_id}/mensajes').status_code == 404
+    assert client.post(f'/mensajes/conversaciones/{conversacion_id}/mensajes', json={'texto': 'x'}).status_code == 404
+
+
+def test_contadores_de_no_leidos(client, iniciar_sesion, conversar, enviar, usuarios):
+    conversacion_id = conversar('ana', 'bruno')
+    ids = enviar('ana', conversacion_id, 'uno', 'dos', 'tres')
+    assert leer(client, '/mensajes/no-leidos')['no_leidos'] == 0  # Los propios no cuentan.
+
+    iniciar_sesion(usuarios['bruno'])
+    assert leer(client, '/mensajes/no-leidos')['no_leidos'] == 3
+    bandeja = leer(client, '/mensajes/conversaciones')['conversaciones']
+    assert [(c['id'], c['no_leidos'], c['ultimo_mensaje']['texto']) for c in bandeja] == [(conversacion_id, 3, 'tres')]
+    assert [p['id'] for p in bandeja[0]['participantes']] == [usuarios['ana']]
+
+    url = f'/mensajes/conversaciones/{conversacion_id}/leido'
+    assert client.post(url, json={'hasta_id': ids[1]}).get_json()['no_leidos'] == 1
+    assert client.post(url, json={'hasta_id': ids[0]}).get_json()['no_leidos'] == 1  # No retrocede.
+    assert client.post(url).get_json()['no_leidos'] == 0
+
+    enviar('bruno', conversacion_id, 'cuatro')
+    assert leer(client, '/mensajes/no-leidos')['no_leidos'] == 0
+    iniciar_sesion(usuarios['ana'])
+    assert leer(client, '/mensajes/no-leidos')['no_leidos'] == 1
+
+
+def test_los_mensajes_se_paginan_por_cursor(client, conversar, enviar):
+    conversacion_id = conversar('ana', 'bruno')
+    ids = enviar('ana', conversacion_id, *(f'm{n}' for n in range(1, 6)))
+    url = f'/mensajes/conversaciones/{conversacion_id}/mensajes?limite=2'
+
+    paginas, cursor = [], ''
+    while True:
+        datos = leer(client, url + cursor)
+        paginas.append([m['texto'] for m in datos['mensajes']])
+        if datos['siguiente'] is None:
+            break
+        cursor = f"&antes={datos['siguiente']}"
+    assert paginas == [['m4', 'm5'], ['m2', 'm3'], ['m1']]
+
+    datos = leer(client, f'{url}&despues={ids[0]}')
+    assert ([m['texto'] for m in datos['mensajes']], datos['siguiente']) == (['m2', 'm3'], ids[2])
+
+
+def test_la_bandeja_se_ordena_por_actividad_y_se_pagina(client, iniciar_sesion, conversar, enviar, usuarios):
+    con_bruno = conversar('ana', 'bruno')
+    con_carla = conversar('ana', 'carla')
+    enviar('ana', con_bruno, 'hola bruno')
+    enviar('ana', con_carla, 'hola carla')
+    enviar('bruno', con_bruno, 'hola ana')
+
+    iniciar_sesion(usuarios['ana'])
+    primera = leer(client, '/mensajes/conversaciones?limite=1')
+    assert [c['id'] for c in primera['conversaciones']] == [con_bruno]
+    segunda = leer(client, f"/mensajes/conversaciones?limite=1&antes={primera['siguiente']}")
+    assert [c['id'] for c in segunda['conversaciones']] == [con_carla]
+    assert segunda['siguiente'] is None
+
+
+def test_el_broker_pide_reconectar_a_un_cliente_lento():
+    broker = Broker(max_pendientes=2)
+    cola = broker.suscribir(1)
+    for n in range(3):
+        broker.publicar([1, 2], ('mensaje', n, {}))
+    assert cola.get_nowait() is CERRAR
+    assert cola.empty()
+    assert broker.stats['desbordados'] == 1
+
+    broker.cancelar(1, cola)
+    assert broker.conectados(1) == 0
@@ -0,0 +1,10 @@
+import pytest
+
+
+@pytest.mark.parametrize('ruta', ['/registro_emprendedor', '/registro_empresario', '/registro_institucion',
+                                  '/registro_inversionista'])
+def test_formularios_incluyen_la_consulta_de_disponibilidad(client, ruta):
+    html = client.get(ruta).get_data(as_text=True)
+    assert 'Js/disponibilidad.js' in html
+    # Antes del script del formulario, que la usa al salir de los campos.
+    assert html.index('Js/disponibilidad.js') < html.rindex('<script src=')
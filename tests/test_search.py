@@ -0,0 +1,68 @@
+import time
+
+import pytest
+
+import search
+from search import InvertedIndex
+from models import Emprendedor, TipoPerfil
+
+
+@pytest.fixture(autouse=True)
+def indice_nuevo(monkeypatch):
+    """Cada prueba empieza sin índice construido ni hilo de refresco."""
+    monkeypatch.setitem(search._estado, 'construido_en', None)
+    monkeypatch.setitem(search._estado, 'hilo', None)
+    monkeypatch.setattr(search, '_refrescar', lambda app: None)
+    search.search_index.limpiar()
+
+
+def test_cargar_mantiene_el_indice_anterior_hasta_el_intercambio():
+    indice = InvertedIndex()
+    indice.cargar([(('doc', i), 'carbón térmico') for i in range(100)])
+
+    vistos = []
+
+    def documentos():
+        for i in range(200):
+            if i == 150:
+                vistos.append(indice.buscar('carbon', por_pagina=1000)[0])
+            yield ('doc', i), 'carbón térmico'
+
+    indice.cargar(documentos())
+    assert vistos == [100]
+    assert indice.buscar('carbon', por_pagina=1000)[0] == 200
+
+
+def test_cargar_aplica_los_cambios_recibidos_durante_la_reconstruccion():
+    indice = InvertedIndex()
+    indice.cargar([(('doc', 1), 'esmeraldas de Muzo'), (('doc', 2), 'carbón de Samacá')])
+
+    def documentos():
+        yield ('doc', 1), 'esmeraldas de Muzo'
+        # Commits de este proceso mientras se lee la base de datos.
+        indice.agregar(('doc', 3), 'esmeraldas talladas')
+        indice.eliminar(('doc', 1))
+        yield ('doc', 2), 'carbón de Samacá'
+
+    indice.cargar(documentos())
+    claves = [clave for clave, _ in indice.buscar('esmeraldas')[1]]
+    assert claves == [('doc', 3)]
+
+
+def test_buscar_no_reconstruye_dentro_de_la_peticion(app, client, crear_usuario, monkeypatch):
+    app.config['SEARCH_REBUILD_INTERVAL'] = 1
+    crear_usuario('ana@example.com', TipoPerfil.EMPRENDEDOR, Emprendedor(
+        nombre_completo='Ana', tipo_documento='CC', numero_documento='1', numero_celular='3000000000',
+        programa_formacion='Minería', titulo_proyecto='Secado solar de carbón', descripcion_proyecto='x',
+        relacion_sector='x', tipo_apoyo='financiero'))
+
+    assert client.get('/buscar?q=carbon').get_json()['total'] == 1
+    assert search._estado['hilo'] is not None
+
+    # Con el índice vencido la búsqueda responde con el actual; reconstruir es cosa del hilo.
+    monkeypatch.setitem(search._estado, 'construido_en', time.monotonic() - 3600)
+
+    def no_reconstruir():
+        raise AssertionError('la petición reconstruyó el índice')
+    monkeypatch.setattr(search, 'construir_desde_bd', no_reconstruir)
+    assert client.get('/buscar?q=carbon').get_json()['total'] == 1
@@ -0,0 +1,45 @@
+import pytest
+
+import verification
+from verification import MemoryStore, verification_codes
+from models import Emprendedor, TipoPerfil
+
+
+def emprendedor(n=1):
+    return Emprendedor(nombre_completo=f'Emprendedora {n}', tipo_documento='CC', numero_documento=f'10{n}',
+                       numero_celular='3000000000', programa_formacion='Minería', titulo_proyecto='Proyecto',
+                       descripcion_proyecto='x', relacion_sector='x', tipo_apoyo='financiero')
+
+
+@pytest.fixture
+def pendiente(client, crear_usuario):
+    """Verificación pendiente en la sesión del cliente. Devuelve el código correcto."""
+    usuario_id = crear_usuario('ana@example.com', TipoPerfil.EMPRENDEDOR, emprendedor())
+    token, codigo = verification_codes.store.create(usuario_id)
+    with client.session_transaction() as sesion:
+        sesion[verification.SESSION_KEY] = token
+    return codigo
+
+
+def test_memory_store_compara_codigos_no_ascii():
+    store = MemoryStore(max_attempts=3)
+    token, codigo = store.create(1)
+    assert store.check(token, 'ñ')[0] == verification.INCORRECT
+    assert store.check(token, codigo)[0] == verification.VERIFIED
+
+
+@pytest.mark.parametrize('codigo', ['ñ', '12345ñ', '١٢٣٤٥٦', '12345', '1234567', 'abcdef', ['123456']])
+def test_verify_code_rechaza_codigos_mal_formados(client, pendiente, codigo):
+    respuesta = client.post('/verify_code', json={'code': codigo})
+    assert respuesta.status_code == 400
+    assert '6 dígitos' in respuesta.get_json()['message']
+
+    # No gasta un intento ni descarta la verificación: el código correcto sigue valiendo.
+    respuesta = client.post('/verify_code', json={'code': pendiente})
+    assert respuesta.status_code == 200
+    assert respuesta.get_json()['success'] is True
+
+
+def test_verify_code_acepta_el_codigo_como_numero(client, pendiente):
+    respuesta = client.post('/verify_code', json={'code': int(pendiente)})
+    assert respuesta.get_json()['success'] is True
@@ -0,0 +1,278 @@
+# Códigos de verificación del login guardados en el servidor.
+#
+# /login crea una verificación pendiente (usuario, código, vencimiento, intentos)
+# y en la sesión solo queda un token aleatorio que la identifica. /verify_code
+# comprueba el código contra el almacén: cada código admite un número limitado
+# de intentos y se borra al usarse, al agotarlos o al vencer.
+#
+# Backends (VERIFICATION_STORE_URL):
+#   memory://            Un diccionario por proceso con una rueda de vencimientos
+#                        y tamaño máximo. Con varios workers el login y la
+#                        verificación deben caer en el mismo proceso.
+#   redis://host:6379/0  Compartido entre workers y servidores (paquete 'redis').
+# Se puede pasar cualquier objeto con create(), check() y discard() a init_app().
+import hmac
+import math
+import re
+import secrets
+import threading
+import time
+
+from flask import session
+
+# Resultados de check()
+VERIFIED = 'verified'      # Código correcto; la verificación se borra.
+INCORRECT = 'incorrect'    # Código incorrecto; quedan intentos.
+LOCKED = 'locked'          # Código incorrecto y sin intentos; la verificación se borra.
+EXPIRED = 'expired'        # No existe: venció, ya se usó o el token no es válido.
+MALFORMED = 'malformed'    # No tiene el formato de un código; no llega al almacén ni gasta un intento.
+
+SESSION_KEY = 'verification_token'
+
+_FORMATO = re.compile(r'[0-9]{6}')  # \d aceptaría dígitos de otros alfabetos
+
+
+def _nuevo_codigo():
+    return f'{secrets.randbelow(900000) + 100000}'
+
+
+class _Pendiente:
+    __slots__ = ('user_id', 'codigo', 'expira', 'intentos', 'ranura')
+
+    def __init__(self, user_id, codigo, expira, ranura):
+        self.user_id = user_id
+        self.codigo = codigo
+        self.expira = expira
+        self.intentos = 0
+        self.ranura = ranura
+
+
+class MemoryStore:
+    """Verificaciones pendientes en memoria del proceso.
+
+    Los vencimientos se guardan en una rueda de ranuras de 'resolucion' segundos:
+    cada ranura es un diccionario de tokens, así que añadir, borrar y vencer una
+    entrada es O(1). Al avanzar el reloj se vacían las ranuras que quedaron atrás.
+    Si se llega a max_pending se descarta una de las verificaciones más próximas
+    a vencer.
+    """
+
+    def __init__(self, ttl=600, max_pending=100_000, max_attempts=5, resolucion=1.0):
+        self.ttl = ttl
+        self.max_pending = max_pending
+        self.max_attempts = max_attempts
+        self.resolucion = resolucion
+        self._lock = threading.Lock()
+        self._entradas = {}  # token -> _Pendiente
+        self._ranuras = [{} for _ in range(int(math.ceil(ttl / resolucion)) + 2)]
+        self._cursor = self._tick(time.monotonic())  # Primera ranura sin vaciar
+        self._primera = self._cursor  # Ranura desde la que buscar al descartar
+        self.expired = 0
+        self.evicted = 0
+
+    def create(self, user_id):
+        """Crea una verificación para el usuario. Devuelve (token, código)."""
+        token, codigo = secrets.token_urlsafe(16), _nuevo_codigo()
+        ahora = time.monotonic()
+        with self._lock:
+            self._avanzar(ahora)
+            if len(self._entradas) >= self.max_pending:
+                self._descartar_proxima()
+            expira = ahora + self.ttl
+            ranura = self._tick(expira) % len(self._ranuras)
+            self._entradas[token] = _Pendiente(user_id, codigo, expira, ranura)
+            self._ranuras[ranura][token] = None
+        return token, codigo
+
+    def check(self, token, codigo):
+        """Comprueba el código. Devuelve (resultado, user_id, intentos restantes)."""
+        ahora = time.monotonic()
+        with self._lock:
+            self._avanzar(ahora)
+            pendiente = self._entradas.get(token)
+            if pendiente is None or pendiente.expira <= ahora:
+                return EXPIRED, None, 0
+            # En bytes: compare_digest no admite str con caracteres no ASCII.
+            if hmac.compare_digest(pendiente.codigo.encode(), str(codigo).encode()):
+                self._borrar(token, pendiente)
+                return VERIFIED, pendiente.user_id, 0
+            pendiente.intentos += 1
+            restantes = self.max_attempts - pendiente.intentos
+            if restantes <= 0:
+                self._borrar(token, pendiente)
+                return LOCKED, pendiente.user_id, 0
+            return INCORRECT, pendiente.user_id, restantes
+
+    def discard(self, token):
+        with self._lock:
+            pendiente = self._entradas.get(token)
+            if pendiente is not None:
+                self._borrar(token, pendiente)
+
+    def __len__(self):
+        return len(self._entradas)
+
+    # --- Internos (con el lock tomado) ---
+
+    def _tick(self, instante):
+        return int(instante // self.resolucion)
+
+    def _borrar(self, token, pendiente):
+        del self._entradas[token]
+        del self._ranuras[pendiente.ranura][token]
+
+    def _avanzar(self, ahora):
+        # Una ranura se vacía cuando su intervalo de tiempo entero quedó en el pasado.
+        actual = self._tick(ahora)
+        vueltas = min(actual - self._cursor, len(self._ranuras))
+        for i in range(vueltas):
+            ranura = self._ranuras[(self._cursor + i) % len(self._ranuras)]
+            for token in ranura:
+                del self._entradas[token]
+            self.expired += len(ranura)
+            ranura.clear()
+        self._cursor = max(self._cursor, actual)
+
+    def _descartar_proxima(self):
+        # Con el TTL fijo nunca se añaden entradas antes de la última ranura
+        # ocupada que se encontró, así que la búsqueda sigue desde ahí.
+        inicio = max(self._cursor, self._primera)
+        for tick in range(inicio, inicio + len(self._ranuras)):
+            ranura = self._ranuras[tick % len(self._ranuras)]
+            if ranura:
+                self._primera = tick
+                # Cualquiera de la ranura vence dentro de la misma 'resolucion';
+                # popitem() es O(1), sacar la primera no (deja huecos al inicio del dict).
+                token, _ = ranura.popitem()
+                del self._entradas[token]
+                self.evicted += 1
+                return
+
+
+class RedisStore:
+    """Verificaciones pendientes en Redis: un hash por token que Redis borra al vencer."""
+
+    CHECK_SCRIPT = """
+    local datos = redis.call('HMGET', KEYS[1], 'u', 'c')
+    if not datos[1] then
+        return {0, '', 0}
+    end
+    if datos[2] == ARGV[1] then
+        redis.call('DEL', KEYS[1])
+        return {1, datos[1], 0}
+    end
+    local intentos = redis.call('HINCRBY', KEYS[1], 'i', 1)
+    local restantes = tonumber(ARGV[2]) - intentos
+    if restantes <= 0 then
+        redis.call('DEL', KEYS[1])
+        return {2, datos[1], 0}
+    end
+    return {3, datos[1], restantes}
+    """
+    RESULTADOS = {0: EXPIRED, 1: VERIFIED, 2: LOCKED, 3: INCORRECT}
+
+    def __init__(self, url, ttl=600, max_attempts=5, prefijo='verification:'):
+        import redis  # Opcional: solo hace falta con VERIFICATION_STORE_URL=redis://...
+        self._cliente = redis.Redis.from_url(url)
+        self._check = self._cliente.register_script(self.CHECK_SCRIPT)
+        self.ttl = ttl
+        self.max_attempts = max_attempts
+        self.prefijo = prefijo
+
+    def create(self, user_id):
+        token, codigo = secrets.token_urlsafe(16), _nuevo_codigo()
+        clave = self.prefijo + token
+        with self._cliente.pipeline() as pipe:
+            pipe.hset(clave, mapping={'u': user_id, 'c': codigo, 'i': 0})
+            pipe.expire(clave, int(self.ttl))
+            pipe.execute()
+        return token, codigo
+
+    def check(self, token, codigo):
+        resultado, user_id, restantes = self._check(keys=[self.prefijo + token],
+                                                     args=[str(codigo), self.max_attempts])
+        return self.RESULTADOS[resultado], int(user_id) if user_id else None, int(restantes)
+
+    def discard(self, token):
+        self._cliente.delete(self.prefijo + token)
+
+
+def create_store(url, ttl=600, max_pending=100_000, max_attempts=5):
+    if not url or url.startswith('memory://'):
+        return MemoryStore(ttl=ttl, max_pending=max_pending, max_attempts=max_attempts)
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisStore(url, ttl=ttl, max_attempts=max_attempts)
+    raise ValueError(f'Almacén de verificaciones no soportado: {url!r}')
+
+
+class VerificationCodes:
+    """Códigos de verificación del login, con el token de la verificación en la sesión.
+
+    Se configura con app.config:
+        VERIFICATION_STORE_URL      'memory://' (por defecto) o 'redis://...'.
+        VERIFICATION_CODE_TTL       Segundos de validez del código (por defecto 600).
+        VERIFICATION_MAX_ATTEMPTS   Intentos por código (por defecto 5).
+        VERIFICATION_MAX_PENDING    Máximo de verificaciones en memoria (por defecto 100000).
+    """
+
+    def __init__(self, app=None, store=None):
+        self.store = store
+        self._lock = threading.Lock()
+        self._stats = {'created': 0, 'verified': 0, 'incorrect': 0, 'locked': 0, 'expired': 0, 'malformed': 0}
+        if app is not None:
+            self.init_app(app, store)
+
+    def init_app(self, app, store=None):
+        app.config.setdefault('VERIFICATION_STORE_URL', 'memory://')
+        app.config.setdefault('VERIFICATION_CODE_TTL', 600)
+        app.config.setdefault('VERIFICATION_MAX_ATTEMPTS', 5)
+        app.config.setdefault('VERIFICATION_MAX_PENDING', 100_000)
+        if store is not None:
+            self.store = store
+        elif self.store is None:
+            self.store = create_store(app.config['VERIFICATION_STORE_URL'], app.config['VERIFICATION_CODE_TTL'],
+                                      app.config['VERIFICATION_MAX_PENDING'], app.config['VERIFICATION_MAX_ATTEMPTS'])
+        app.extensions['verification_codes'] = self
+
+    def start(self, user_id):
+        """Crea el código para el usuario y guarda el token en la sesión. Devuelve el código."""
+        anterior = session.get(SESSION_KEY)
+        if anterior:
+            self.store.discard(anterior)  # Un login nuevo invalida el código anterior.
+        token, codigo = self.store.create(user_id)
+        session[SESSION_KEY] = token
+        self._contar('created')
+        return codigo
+
+    def verify(self, codigo):
+        """Comprueba el código de la sesión actual. Devuelve (resultado, user_id, intentos restantes)."""
+        token = session.get(SESSION_KEY)
+        if not token or not codigo:
+            self._contar(EXPIRED)
+            return EXPIRED, None, 0
+        codigo = str(codigo).strip()
+        if not _FORMATO.fullmatch(codigo):
+            self._contar(MALFORMED)
+            return MALFORMED, None, 0
+        resultado, user_id, restantes = self.store.check(token, codigo)
+        if resultado != INCORRECT:
+            session.pop(SESSION_KEY, None)
+        self._contar(resultado)
+        return resultado, user_id, restantes
+
+    def stats(self):
+        with self._lock:
+            datos = dict(self._stats)
+        datos['backend'] = type(self.store).__name__
+        if isinstance(self.store, MemoryStore):  # En Redis contarlas exigiría recorrer las claves.
+            datos['pending'] = len(self.store)
+            datos['evicted'] = self.store.evicted
+            datos['expired_unused'] = self.store.expired
+        return datos
+
+    def _contar(self, clave):
+        with self._lock:
+            self._stats[clave] += 1
+
+
+verification_codes = VerificationCodes()